@@ -13,13 +13,10 @@ import os
 import re
 import io
 import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 
-# Third-party imports
-import pandas as pd
-from googleapiclient.http import MediaIoBaseDownload
-
 # Thêm project root vào Python path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
@@ -27,11 +24,29 @@ sys.path.insert(0, str(project_root))
 from config.config_manager import get_config
 from utils.menu_utils import *
 from utils.file_utils import ensure_directories
-from converters import JSONToExcelTemplateConverter
-from processors.local_processor import LocalDataProcessor
-from config.onluyen_api import OnLuyenAPIClient
-from extractors import GoogleSheetsExtractor
-from config.google_oauth_drive import GoogleOAuthDriveClient
+from utils.upload_queue import get_upload_queue, extract_drive_folder_id, JOB_PENDING, JOB_UPLOADING, JOB_DONE, JOB_FAILED
+from config.sheet_writeback import get_sheet_writeback
+from utils.fuzzy_matcher import create_fuzzy_matcher
+from utils.match_state import get_match_state_store, import_row_hash, record_identity, record_fingerprint
+from utils.snapshot_store import get_snapshot_store
+from utils.snapshot_diff import write_diff_report, print_diff_summary
+from utils.http_transport import get_http_transport
+from utils.worker_client import run_with_worker
+from utils.job_manager import check_cancelled, report_progress, submit_in_context
+from utils.lazy_import import lazy_module, lazy_attr
+
+# Module nặng (pandas, Google API client, requests...) chỉ import khi dùng lần đầu
+# để menu hiện ngay khi khởi động - xem benchmarks/startup_benchmark.py
+pd = lazy_module('pandas')
+MediaIoBaseDownload = lazy_attr('googleapiclient.http', 'MediaIoBaseDownload')
+JSONToExcelTemplateConverter = lazy_attr('converters', 'JSONToExcelTemplateConverter')
+LocalDataProcessor = lazy_attr('processors.local_processor', 'LocalDataProcessor')
+OnLuyenAPIClient = lazy_attr('config.onluyen_api', 'OnLuyenAPIClient')
+find_login_file = lazy_attr('config.onluyen_api', 'find_login_file')
+new_login_file_path = lazy_attr('config.onluyen_api', 'new_login_file_path')
+write_json_atomic = lazy_attr('config.onluyen_api', 'write_json_atomic')
+GoogleSheetsExtractor = lazy_attr('extractors', 'GoogleSheetsExtractor')
+GoogleOAuthDriveClient = lazy_attr('config.google_oauth_drive', 'GoogleOAuthDriveClient')
 
 
 class SchoolProcessApp:
@@ -110,14 +125,18 @@ class SchoolProcessApp:
             "Case 1: Toàn bộ dữ liệu",
             "Case 2: Dữ liệu theo file import",
             "Lấy danh sách Giáo viên",
-            "Lấy danh sách Học sinh"
+            "Lấy danh sách Học sinh",
+            "Xuất lại Excel từ snapshot đã lưu",
+            "So sánh thay đổi giữa 2 lần chạy"
         ]
         
         handlers = [
             self._workflow_case_1_full_data,
             self._workflow_case_2_import_filtered,
             self.onluyen_get_teachers,
-            self.onluyen_get_students
+            self.onluyen_get_students,
+            self.onluyen_export_from_snapshot,
+            self.onluyen_diff_report
         ]
         
         run_menu_loop("ONLUYEN API INTEGRATION", options, handlers)
@@ -513,13 +532,8 @@ class SchoolProcessApp:
     def _logout_onluyen_api(self, client):
         """Đăng xuất OnLuyen API"""
         try:
-            # Clear token từ client
-            if hasattr(client, 'auth_token'):
-                client.auth_token = None
-            
-            # Remove Authorization header
-            if 'Authorization' in client.session.headers:
-                del client.session.headers['Authorization']
+            # Clear token và Authorization header của client
+            client.clear_auth_token()
             
             print("   🔓 Đã xóa token khỏi session")
             return True
@@ -560,7 +574,15 @@ class SchoolProcessApp:
             print(f"   {key}: {value}")
     
     def _save_successful_login_info(self, school_name, admin_email, result, drive_link, password=None):
-        """Lưu thông tin login thành công bao gồm tokens và password"""
+        """
+        Lưu thông tin login thành công bao gồm tokens và password
+        
+        Mỗi lần login ghi một file riêng theo tài khoản admin (tên file có hậu tố ngẫu nhiên,
+        ghi nguyên tử) nên nhiều trường login song song không ghi đè file của nhau
+        
+        Returns:
+            str: Đường dẫn file login đã lưu hoặc None nếu lỗi
+        """
         try:
             
             # Lấy data từ response
@@ -587,16 +609,16 @@ class SchoolProcessApp:
                 }
             }
             
-            filename = f"onluyen_login_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            filepath = f"data/output/{filename}"
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(login_info, f, ensure_ascii=False, indent=2)
+            filepath = new_login_file_path(admin_email)
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            write_json_atomic(filepath, login_info)
             
             print_status(f"✅ Đã lưu thông tin login vào: {filepath}", "success")
+            return filepath
             
         except Exception as e:
             print_status(f"Lỗi lưu thông tin login: {e}", "warning")
+            return None
     
     def onluyen_complete_workflow(self):
         """Tích hợp hoàn chỉnh: Sheets → Login → Lấy dữ liệu GV/HS → Chuyển đổi Excel"""
@@ -610,12 +632,14 @@ class SchoolProcessApp:
         # Menu chọn case
         case_options = [
             "Case 1: Toàn bộ dữ liệu (Sheets → Login → Dữ liệu → Excel)",
-            "Case 2: Dữ liệu theo file import (Sheets → Login → Dữ liệu → So sánh → Excel)"
+            "Case 2: Dữ liệu theo file import (Sheets → Login → Dữ liệu → So sánh → Excel)",
+            "Case 1 nhiều năm học: Lấy song song GV/HS nhiều năm (một file JSON)"
         ]
         
         case_handlers = [
             self._workflow_case_1_full_data,
-            self._workflow_case_2_import_filtered
+            self._workflow_case_2_import_filtered,
+            self._workflow_case_1_multi_year
         ]
         
         run_menu_loop("CHỌN LUỒNG XỬ LÝ", case_options, case_handlers)
@@ -671,26 +695,122 @@ class SchoolProcessApp:
         print()
         self._execute_workflow_case_2()
 
-    def _get_authenticated_client(self, admin_email=None, password=None, ui_mode=False) -> tuple:
+    def _list_school_login_files(self):
+        """
+        Liệt kê file login mới nhất của từng trường (theo tài khoản admin)
+        
+        Returns:
+            list: [(login_file_path, login_data)] sắp xếp file mới nhất trước
+        """
+        latest_by_account = {}
+        login_files = glob.glob("data/output/onluyen_login_*.json")
+        for login_file in sorted(login_files, key=os.path.getmtime, reverse=True):
+            try:
+                with open(login_file, 'r', encoding='utf-8') as f:
+                    login_data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            account = (login_data.get('admin_email') or '').lower().strip()
+            if account and account not in latest_by_account:
+                latest_by_account[account] = (login_file, login_data)
+        return list(latest_by_account.values())
+    
+    def _choose_school_login_file(self):
+        """
+        Cho người dùng chọn trường đã login trước đó (mỗi trường một file login)
+        
+        Returns:
+            tuple: (login_file_path, login_data) hoặc (None, None) nếu không chọn được
+        """
+        school_logins = self._list_school_login_files()
+        if not school_logins:
+            print_status("Không tìm thấy file login nào - hãy chạy Case 1 cho trường trước", "warning")
+            return None, None
+        
+        if len(school_logins) == 1:
+            return school_logins[0]
+        
+        print(f"\nTìm thấy {len(school_logins)} trường đã login:")
+        for i, (login_file, login_data) in enumerate(school_logins, 1):
+            print(f"{i}. {login_data.get('school_name', 'N/A')} ({login_data.get('admin_email', '')}) - "
+                  f"{login_data.get('timestamp', '')}")
+        
+        try:
+            choice = get_user_input(f"Chọn trường (1-{len(school_logins)})", required=True)
+            choice_idx = int(choice) - 1
+            if 0 <= choice_idx < len(school_logins):
+                return school_logins[choice_idx]
+        except (ValueError, TypeError):
+            pass
+        print_status("Lựa chọn không hợp lệ", "error")
+        return None, None
+    
+    def _workflow_case_1_multi_year(self):
+        """Case 1 nhiều năm học: dùng thông tin trường từ file login của trường được chọn"""
+        print_separator("CASE 1: NHIỀU NĂM HỌC SONG SONG")
+        
+        login_file_path, login_data = self._choose_school_login_file()
+        if not login_file_path:
+            return
+        
+        selected_school_data = {
+            'Tên trường': login_data.get('school_name', 'N/A'),
+            'Admin': login_data.get('admin_email', ''),
+            'Mật khẩu': login_data.get('admin_password', ''),
+            'Link driver dữ liệu': login_data.get('drive_link', 'N/A')
+        }
+        print(f"🏫 Trường: {selected_school_data['Tên trường']} ({selected_school_data['Admin']})")
+        
+        default_years = self.config.get_multi_year_config()['default_years']
+        years_text = get_user_input("Nhập các năm học (vd: 2024,2025)", required=True, default=default_years or None)
+        school_years = self._parse_school_years(years_text)
+        if not school_years:
+            print_status("Danh sách năm học không hợp lệ", "error")
+            return
+        
+        run_with_worker('case_1_multi_year',
+                        {'school_data': selected_school_data, 'school_years': school_years,
+                         'login_file_path': os.path.abspath(login_file_path)},
+                        lambda: self._execute_workflow_case_1_multi_year(selected_school_data, school_years,
+                                                                         login_file_path=login_file_path))
+    
+    def _start_step(self, percent, message):
+        """
+        Bắt đầu một bước workflow: điểm kiểm tra hủy, in tiêu đề bước và báo tiến độ cho job
+        
+        Args:
+            percent: Tiến độ (0-100) của job khi bắt đầu bước
+            message: Tiêu đề bước
+        """
+        check_cancelled()
+        print_status(message, "info")
+        report_progress(percent, message)
+    
+    def _get_authenticated_client(self, admin_email=None, password=None, ui_mode=False,
+                                  login_file_path=None) -> tuple:
         """
         Lấy OnLuyenAPIClient đã được xác thực
-        - Ưu tiên sử dụng access_token từ file login nếu email khớp với trường hiện tại
+        - Ưu tiên sử dụng access_token từ file login của chính trường này nếu email khớp
         - Nếu token không thuộc trường hiện tại hoặc hết hạn, thực hiện login lại
         
         Args:
             admin_email (str, optional): Email admin để login nếu cần
             password (str, optional): Password để login nếu cần
             ui_mode (bool): Có phải chế độ UI không
+            login_file_path (str, optional): File login của trường (mặc định file login
+                                             mới nhất của admin_email)
             
         Returns:
-            tuple: (OnLuyenAPIClient, bool, dict) - (client, success, login_result)
+            tuple: (OnLuyenAPIClient, bool, dict) - (client, success, login_result);
+                   client.login_file_path là file login đã dùng (None nếu vừa login mới)
         """
         client = OnLuyenAPIClient()
         
-        # Bước 1: Thử load token từ file login (từ chức năng chuyển năm học)
+        # Bước 1: Thử load token từ file login của trường (từ chức năng chuyển năm học)
         print_status("🔍 Kiểm tra access token từ file login...", "info")
+        login_file_path = login_file_path or find_login_file(admin_email)
         
-        if client.load_token_from_login_file():
+        if login_file_path and client.load_token_from_login_file(login_file_path):
             print_status("✅ Đã load access token từ file login", "success")
             
             # Kiểm tra email trong token có khớp với trường hiện tại không
@@ -743,6 +863,8 @@ class SchoolProcessApp:
         print_status("🔐 Thực hiện login để lấy token mới...", "info")
         print_status(f"Đang login với Admin: {admin_email}", "info")
         
+        # Token mới chưa có file login - caller lưu file và gán client.login_file_path
+        client.login_file_path = None
         login_result = client.login(admin_email, password)
         
         if not login_result['success']:
@@ -767,8 +889,15 @@ class SchoolProcessApp:
         
         return client, True, login_result
 
-    def _execute_workflow_case_1(self, selected_school_data, ui_mode=False):
-        """Execute Case 1 workflow - toàn bộ dữ liệu"""
+    def _execute_workflow_case_1(self, selected_school_data, ui_mode=False, delta_sync=False):
+        """
+        Execute Case 1 workflow - toàn bộ dữ liệu
+        
+        Args:
+            selected_school_data: Dòng dữ liệu trường từ Google Sheets
+            ui_mode: Có phải chế độ UI không
+            delta_sync: Chỉ lấy học sinh tạo sau mốc dateCreate lần trước và chỉ xuất tài khoản mới
+        """
 
         workflow_results = {
             'sheets_extraction': False,
@@ -782,7 +911,9 @@ class SchoolProcessApp:
             'data_summary': {},
             'json_file_path': None,
             'excel_file_path': None,
-            'upload_results': {}
+            'upload_results': {},
+            'upload_queued': False,
+            'upload_job_id': None
         }
         
         try:
@@ -862,7 +993,7 @@ class SchoolProcessApp:
                 return
             
             # Bước 2: Lấy client đã xác thực (ưu tiên token từ file, nếu không có thì login)
-            print_status("BƯỚC 2: Xác thực OnLuyen API", "info")
+            self._start_step(10, "BƯỚC 2: Xác thực OnLuyen API")
             
             client, auth_success, login_result = self._get_authenticated_client(admin_email, password, ui_mode)
             
@@ -875,10 +1006,11 @@ class SchoolProcessApp:
             
             # Lưu thông tin login nếu có login mới
             if login_result.get('data', {}).get('source') != 'login_file':
-                self._save_successful_login_info(school_name, admin_email, login_result, drive_link, password)
+                client.login_file_path = self._save_successful_login_info(
+                    school_name, admin_email, login_result, drive_link, password)
             
             # Bước 3: Lấy danh sách Giáo viên
-            print_status("BƯỚC 3: Lấy danh sách Giáo viên", "info")
+            self._start_step(20, "BƯỚC 3: Lấy danh sách Giáo viên")
             
             teachers_result = client.get_teachers(page_size=1000)
             
@@ -912,52 +1044,29 @@ class SchoolProcessApp:
                 print_status(f"❌ Lỗi lấy danh sách giáo viên: {teachers_result.get('error')}", "error")
             
             # Bước 4: Lấy danh sách Học sinh
-            print_status("BƯỚC 4: Lấy danh sách Học sinh", "info")
+            self._start_step(35, "BƯỚC 4: Lấy danh sách Học sinh")
             
-            # Gọi API lần đầu để biết tổng số học sinh
-            students_result = client.get_students(page_index=1, page_size=1000)
+            # Delta sync: chỉ lấy học sinh tạo sau mốc dateCreate của lần chạy trước
+            delta_context = self._prepare_delta_sync(client, workflow_results['school_info']) if delta_sync else None
+            use_delta = bool(delta_context and not delta_context['full_sync'])
+            def on_students_page(page_index, total_pages):
+                print_status(f"   🔄 Đang lấy batch {page_index}/{total_pages}...", "info")
+                report_progress(35 + 30 * (page_index - 1) / total_pages,
+                                f"Lấy học sinh batch {page_index}/{total_pages}")
             
-            if students_result['success'] and students_result.get('data'):
+            # Delta sync chỉ lấy phần học sinh mới, còn lại lấy toàn bộ theo trang
+            students_result = self._fetch_students_delta(client, delta_context, workflow_results) if use_delta \
+                else self._fetch_all_students(client, on_page=on_students_page)
+            
+            if not use_delta and students_result['success'] and students_result.get('data'):
                 students_data = students_result['data']
                 if isinstance(students_data, dict) and 'data' in students_data:
-                    all_students_list = []
+                    all_students_list = students_data['data']
                     students_count = students_data.get('totalCount', 0)
                     
-                    print_status(f"📊 Tổng số học sinh cần lấy: {students_count}", "info")
+                    print_status(f"📊 Tổng số học sinh: {students_count}", "info")
                     
                     if students_count > 0:
-                        # Lấy dữ liệu từ lần gọi đầu tiên
-                        first_batch = students_data['data']
-                        all_students_list.extend(first_batch)
-                        print_status(f"   ✅ Lấy được batch 1: {len(first_batch)} học sinh", "info")
-                        
-                        # Tính số lần gọi API cần thiết
-                        page_size = 1000  # Sử dụng page size nhỏ hơn để đảm bảo ổn định
-                        total_pages = (students_count + page_size - 1) // page_size
-                        
-                        # Gọi API cho các trang còn lại
-                        for page_index in range(2, total_pages + 1):
-                            print_status(f"   🔄 Đang lấy batch {page_index}/{total_pages}...", "info")
-                            
-                            batch_result = client.get_students(page_index=page_index, page_size=page_size)
-                            
-                            if batch_result['success'] and batch_result.get('data'):
-                                batch_data = batch_result['data']
-                                if isinstance(batch_data, dict) and 'data' in batch_data:
-                                    batch_students = batch_data['data']
-                                    all_students_list.extend(batch_students)
-                                    print_status(f"   ✅ Lấy được batch {page_index}: {len(batch_students)} học sinh", "info")
-                                else:
-                                    print_status(f"   ⚠️ Batch {page_index}: Định dạng dữ liệu không đúng", "warning")
-                            else:
-                                print_status(f"   ❌ Batch {page_index}: {batch_result.get('error', 'Lỗi không xác định')}", "error")
-                        
-                        # Cập nhật students_result với tất cả dữ liệu
-                        students_result['data'] = {
-                            'data': all_students_list,
-                            'totalCount': students_count
-                        }
-                        
                         workflow_results['students_data'] = True
                         workflow_results['data_summary']['students'] = {
                             'total': students_count,
@@ -974,19 +1083,35 @@ class SchoolProcessApp:
                         print_status("⚠️ Không có học sinh nào trong hệ thống", "warning")
                 else:
                     print_status("⚠️ Định dạng dữ liệu học sinh không đúng", "warning")
-            else:
+            elif not use_delta:
                 print_status(f"❌ Lỗi lấy danh sách học sinh: {students_result.get('error')}", "error")
             
+            # Lưu snapshot GV/HS vào SQLite (so khớp/so sánh/xuất lại đọc từ đây)
+            workflow_results['school_year'] = self._store_snapshot(
+                client, workflow_results['school_info'],
+                teachers_result if workflow_results['teachers_data'] else None,
+                students_result if workflow_results['students_data'] else None,
+                students_full_snapshot=not use_delta
+            )
+            
+            # Delta sync: chỉ xuất tài khoản chưa có trong snapshot trước lần chạy này
+            if delta_context:
+                teachers_result, students_result = self._filter_new_accounts(
+                    delta_context, teachers_result, students_result, workflow_results
+                )
+            
             # Bước 5: Lưu dữ liệu workflow JSON tổng hợp
-            print_status("BƯỚC 5: Lưu dữ liệu workflow JSON tổng hợp", "info")
+            self._start_step(70, "BƯỚC 5: Lưu dữ liệu workflow JSON tổng hợp")
             
-            if workflow_results['teachers_data'] or workflow_results['students_data']:
+            if workflow_results.get('delta_sync', {}).get('new_accounts') == 0:
+                print_status("ℹ️ Không có tài khoản mới kể từ lần chạy trước - bỏ qua xuất file", "info")
+            elif workflow_results['teachers_data'] or workflow_results['students_data']:
                 json_file_path = self._save_unified_workflow_data(
                     workflow_results=workflow_results,
                     teachers_result=teachers_result,
                     students_result=students_result,
                     admin_password=password,
-                    workflow_type="case_1"
+                    workflow_type="case_1_delta" if delta_context else "case_1"
                 )
                 if json_file_path:
                     workflow_results['json_saved'] = True
@@ -998,7 +1123,7 @@ class SchoolProcessApp:
                 print_status("⚠️ Không có dữ liệu để lưu", "warning")
             
             # Bước 6: Chuyển đổi JSON → Excel
-            print_status("BƯỚC 6: Chuyển đổi JSON → Excel", "info")
+            self._start_step(80, "BƯỚC 6: Chuyển đổi JSON → Excel")
             
             if workflow_results['json_saved'] and workflow_results['json_file_path']:
                 excel_file_path = self._convert_json_to_excel(workflow_results['json_file_path'])
@@ -1012,7 +1137,7 @@ class SchoolProcessApp:
                 print_status("⚠️ Không có file JSON để chuyển đổi", "warning")
             
             # Bước 7: Hỏi có muốn upload file Excel lên Google Drive không
-            print_status("BƯỚC 7: Upload file Excel lên Google Drive (Tùy chọn)", "info")
+            self._start_step(90, "BƯỚC 7: Upload file Excel lên Google Drive (Tùy chọn)")
             
             # Kiểm tra có file Excel để upload không
             excel_file_exists = workflow_results['excel_converted'] and workflow_results['excel_file_path'] and os.path.exists(workflow_results['excel_file_path'])
@@ -1052,30 +1177,8 @@ class SchoolProcessApp:
                         print(f"   ❌ Drive link không hợp lệ")
                     
                     if is_valid_drive_link:
-                        print_status(f"📤 Đang upload file Excel: {excel_file_name}", "info")
-                        
-                        # Upload chỉ file Excel
-                        upload_results = self._upload_files_to_drive_oauth([workflow_results['excel_file_path']], drive_link)
-                        
-                        workflow_results['upload_results'] = upload_results
-                        
-                        if upload_results.get('success', 0) > 0:
-                            workflow_results['drive_uploaded'] = True
-                            print_status(f"✅ Upload file Excel thành công!", "success")
-                            
-                            # Hiển thị URL
-                            if upload_results.get('urls'):
-                                print(f"\n📂 FILE EXCEL ĐÃ UPLOAD:")
-                                print(f"   🔗 {upload_results['urls'][0]}")
-                        else:
-                            workflow_results['drive_uploaded'] = False
-                            print_status("❌ Upload file Excel thất bại", "error")
-                            
-                            # Debug thông tin lỗi
-                            if upload_results.get('errors'):
-                                print(f"\n🚨 CHI TIẾT LỖI:")
-                                for error in upload_results['errors']:
-                                    print(f"   ❌ {error}")
+                        # Đưa file Excel vào hàng đợi upload nền - không chặn workflow
+                        self._queue_excel_upload(workflow_results, drive_link, school_name)
                     else:
                         workflow_results['drive_uploaded'] = False
                         print_status("⚠️ Không thể upload do Drive link không hợp lệ", "warning")
@@ -1091,20 +1194,8 @@ class SchoolProcessApp:
                             if manual_drive_link and 'drive.google.com' in manual_drive_link:
                                 folder_id_manual = self._extract_drive_folder_id(manual_drive_link)
                                 if folder_id_manual:
-                                    print_status(f"📤 Uploading với Drive link thủ công...", "info")
-                                    upload_results = self._upload_files_to_drive_oauth([workflow_results['excel_file_path']], manual_drive_link)
-                                    
-                                    workflow_results['upload_results'] = upload_results
-                                    
-                                    if upload_results.get('success', 0) > 0:
-                                        workflow_results['drive_uploaded'] = True
-                                        print_status(f"✅ Upload file Excel thành công với Drive link thủ công!", "success")
-                                        if upload_results.get('urls'):
-                                            print(f"\n📂 FILE EXCEL ĐÃ UPLOAD:")
-                                            print(f"   🔗 {upload_results['urls'][0]}")
-                                    else:
-                                        workflow_results['drive_uploaded'] = False
-                                        print_status("❌ Upload file Excel thất bại", "error")
+                                    print_status(f"📤 Upload với Drive link thủ công...", "info")
+                                    self._queue_excel_upload(workflow_results, manual_drive_link, school_name)
                                 else:
                                     workflow_results['drive_uploaded'] = False
                                     print_status("❌ Drive link thủ công không hợp lệ", "error")
@@ -1121,8 +1212,17 @@ class SchoolProcessApp:
                 workflow_results['drive_uploaded'] = False
                 print_status("⚠️ Không có file Excel để upload", "warning")
             
+            # Ghi số lượng GV/HS đã nạp về sheet tổng (gộp và flush nền)
+            if workflow_results['excel_converted']:
+                data_summary = workflow_results['data_summary']
+                self._record_school_counts(
+                    selected_school_data,
+                    data_summary.get('teachers', {}).get('retrieved'),
+                    data_summary.get('students', {}).get('retrieved')
+                )
+            
             # Bước 8: Tổng hợp và báo cáo kết quả
-            print_status("BƯỚC 8: Tổng hợp kết quả", "info")
+            self._start_step(95, "BƯỚC 8: Tổng hợp kết quả")
             
             self._print_workflow_summary(workflow_results)
             
@@ -1177,6 +1277,133 @@ class SchoolProcessApp:
             print_status(f"Lỗi trong quy trình tích hợp: {e}", "error")
             return None
 
+    def _execute_workflow_case_1_multi_year(self, selected_school_data, school_years, ui_mode=False,
+                                            login_file_path=None):
+        """
+        Execute Case 1 cho nhiều năm học trong một lần chạy: mỗi năm một access_token riêng,
+        lấy GV/HS các năm song song và lưu cạnh nhau trong một file JSON
+        
+        Args:
+            selected_school_data: Dòng dữ liệu trường từ Google Sheets
+            school_years: Danh sách năm học (vd [2024, 2025])
+            ui_mode: Có phải chế độ UI không
+            login_file_path: File login của trường (mặc định file login mới nhất của Admin)
+        """
+        workflow_results = {
+            'api_login': False,
+            'teachers_data': False,
+            'students_data': False,
+            'json_saved': False,
+            'school_info': {},
+            'school_years': list(school_years),
+            'year_summary': {},
+            'json_file_path': None,
+            'excel_file_path': None
+        }
+        
+        try:
+            school_name = selected_school_data.get('Tên trường', 'N/A')
+            admin_email = selected_school_data.get('Admin', '')
+            password = selected_school_data.get('Mật khẩu', '')
+            drive_link = selected_school_data.get('Link driver dữ liệu', 'N/A')
+            
+            workflow_results['school_info'] = {
+                'name': school_name,
+                'admin': admin_email,
+                'drive_link': drive_link
+            }
+            
+            print(f"\n📋 THÔNG TIN TRƯỜNG ĐÃ CHỌN:")
+            print(f"   🏫 Tên trường: {school_name}")
+            print(f"   👤 Admin: {admin_email}")
+            print(f"   📅 Năm học: {', '.join(str(year) for year in school_years)}")
+            
+            if not school_years:
+                print_status("❌ Chưa chọn năm học nào", "error")
+                return None
+            
+            if not admin_email or not password:
+                print_status("❌ Thiếu thông tin Admin email hoặc Mật khẩu", "error")
+                return None
+            
+            # Bước 1: Xác thực một lần, các năm học dùng token riêng suy ra từ token này
+            self._start_step(10, "BƯỚC 1: Xác thực OnLuyen API")
+            client, auth_success, login_result = self._get_authenticated_client(admin_email, password, ui_mode,
+                                                                                login_file_path)
+            if not auth_success:
+                print_status(f"❌ Xác thực thất bại: {login_result.get('error', 'Unknown error')}", "error")
+                return None
+            
+            workflow_results['api_login'] = True
+            if login_result.get('data', {}).get('source') != 'login_file':
+                client.login_file_path = self._save_successful_login_info(
+                    school_name, admin_email, login_result, drive_link, password)
+            
+            # Bước 2: Lấy GV/HS các năm học song song
+            max_workers = max(1, min(len(school_years), self.config.get_multi_year_config()['max_workers']))
+            self._start_step(20, f"BƯỚC 2: Lấy dữ liệu {len(school_years)} năm học song song ({max_workers} luồng)")
+            
+            year_results = {}
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="school-year") as executor:
+                futures = {
+                    submit_in_context(executor, self._fetch_school_year_data, client, year,
+                                      workflow_results['school_info'], client.login_file_path): year
+                    for year in school_years
+                }
+                for done_count, future in enumerate(as_completed(futures), start=1):
+                    year = futures[future]
+                    report_progress(20 + 60 * done_count / len(futures),
+                                    f"Đã lấy {done_count}/{len(futures)} năm học")
+                    try:
+                        year_results[year] = future.result()
+                    except Exception as e:
+                        print_status(f"❌ [{year}] Lỗi lấy dữ liệu năm học: {e}", "error")
+                        year_results[year] = {
+                            'year': year, 'success': False, 'token_source': None, 'teachers_result': None,
+                            'students_result': None, 'ht_hp_info': {}, 'data_summary': {}, 'error': str(e)
+                        }
+            
+            for year in sorted(year_results):
+                year_result = year_results[year]
+                workflow_results['year_summary'][year] = {
+                    'success': year_result['success'],
+                    'error': year_result['error'],
+                    'token_source': year_result['token_source'],
+                    'teachers': year_result['data_summary'].get('teachers', {}).get('retrieved', 0),
+                    'students': year_result['data_summary'].get('students', {}).get('retrieved', 0),
+                    'elapsed_seconds': year_result.get('elapsed_seconds')
+                }
+                workflow_results['teachers_data'] |= bool(year_result['teachers_result'])
+                workflow_results['students_data'] |= bool(year_result['students_result'])
+            
+            # Bước 3: Lưu một file JSON chứa dữ liệu tất cả các năm
+            self._start_step(85, "BƯỚC 3: Lưu dữ liệu nhiều năm học")
+            if workflow_results['teachers_data'] or workflow_results['students_data']:
+                json_file_path = self._save_multi_year_workflow_data(workflow_results, year_results, password)
+                workflow_results['json_saved'] = bool(json_file_path)
+                workflow_results['json_file_path'] = json_file_path
+            else:
+                print_status("⚠️ Không có dữ liệu để lưu", "warning")
+            
+            # Bước 4: Tổng hợp
+            print_separator("TỔNG HỢP NHIỀU NĂM HỌC")
+            for year, summary in workflow_results['year_summary'].items():
+                if summary['success']:
+                    print(f"   📅 {year}: {summary['teachers']} giáo viên, {summary['students']} học sinh "
+                          f"({summary['elapsed_seconds']}s, token: {summary['token_source']})")
+                else:
+                    print(f"   📅 {year}: ❌ {summary['error']}")
+            if workflow_results['json_file_path']:
+                print(f"   📄 File JSON: {workflow_results['json_file_path']}")
+                print("   💡 Xuất Excel từng năm: menu 'Xuất lại Excel từ snapshot đã lưu'")
+            get_http_transport().print_stats()
+            
+            return workflow_results
+            
+        except Exception as e:
+            print_status(f"Lỗi trong quy trình nhiều năm học: {e}", "error")
+            return None
+
     def _execute_workflow_case_2(self, selected_school_data, ui_mode=False):
         """Case 2: Workflow với so sánh file import"""
         
@@ -1196,12 +1423,14 @@ class SchoolProcessApp:
             'comparison_results': {},
             'json_file_path': None,
             'excel_file_path': None,
-            'upload_results': {}
+            'upload_results': {},
+            'upload_queued': False,
+            'upload_job_id': None
         }
         
         try:
             # Bước 1-4: Giống Case 1 - Lấy dữ liệu từ Sheets và OnLuyen API
-            print_status("BƯỚC 1-4: Lấy dữ liệu cơ bản (giống Case 1)", "info")
+            self._start_step(10, "BƯỚC 1-4: Lấy dữ liệu cơ bản (giống Case 1)")
             
             # Thực hiện các bước giống Case 1
             basic_results = self._execute_basic_workflow_steps(selected_school_data)
@@ -1219,7 +1448,7 @@ class SchoolProcessApp:
                 return
 
             # Bước 5: Tải file import từ Google Drive
-            print_status("BƯỚC 5: Tải file import từ Google Drive", "info")
+            self._start_step(40, "BƯỚC 5: Tải file import từ Google Drive")
             
             school_name = workflow_results['school_info'].get('name', '')
             drive_link = workflow_results['school_info'].get('drive_link', '')
@@ -1238,12 +1467,14 @@ class SchoolProcessApp:
                 return
             
             # Bước 6: So sánh và lọc dữ liệu
-            print_status("BƯỚC 6: So sánh và lọc dữ liệu", "info")
+            self._start_step(50, "BƯỚC 6: So sánh và lọc dữ liệu")
             
             comparison_results = self._compare_and_filter_data(
                 workflow_results.get('teachers_result'), 
                 workflow_results.get('students_result'),
-                import_file_path
+                import_file_path,
+                school_key=workflow_results['school_info'].get('admin') or school_name,
+                school_year=workflow_results.get('school_year')
             )
             
             if comparison_results:
@@ -1284,7 +1515,7 @@ class SchoolProcessApp:
             
 
             # Bước 7: Lưu dữ liệu đã lọc vào JSON tổng hợp
-            print_status("BƯỚC 7: Lưu dữ liệu đã lọc workflow JSON tổng hợp", "info")
+            self._start_step(70, "BƯỚC 7: Lưu dữ liệu đã lọc workflow JSON tổng hợp")
             
             json_file_path = self._save_unified_workflow_data(
                 workflow_results=workflow_results,
@@ -1302,7 +1533,7 @@ class SchoolProcessApp:
                 print_status("❌ Lỗi lưu dữ liệu JSON", "error")
             
             # Bước 8: Chuyển đổi JSON → Excel
-            print_status("BƯỚC 8: Chuyển đổi JSON → Excel", "info")
+            self._start_step(80, "BƯỚC 8: Chuyển đổi JSON → Excel")
             
             if workflow_results['json_saved'] and workflow_results['json_file_path']:
                 excel_file_path = self._convert_json_to_excel(workflow_results['json_file_path'])
@@ -1316,7 +1547,7 @@ class SchoolProcessApp:
                 print_status("⚠️ Không có file JSON để chuyển đổi", "warning")
             
             # Bước 9: Upload files lên Google Drive  
-            print_status("BƯỚC 9: Upload file Excel lên Google Drive (Tùy chọn)", "info")
+            self._start_step(90, "BƯỚC 9: Upload file Excel lên Google Drive (Tùy chọn)")
             
             excel_file_exists = workflow_results['excel_converted'] and workflow_results['excel_file_path'] and os.path.exists(workflow_results['excel_file_path'])
             
@@ -1326,17 +1557,8 @@ class SchoolProcessApp:
                 should_upload = ui_mode or get_user_confirmation("\n📤 Bạn có muốn upload file Excel lên Google Drive?")
                 
                 if should_upload and not ui_mode:  # Chỉ upload ngay khi ở console mode
-                    # Upload chỉ file Excel
-                    upload_results = self._upload_files_to_drive_oauth([workflow_results['excel_file_path']], drive_link)
-                    
-                    workflow_results['upload_results'] = upload_results
-                    
-                    if upload_results.get('success', 0) > 0:
-                        workflow_results['drive_uploaded'] = True
-                        print_status(f"✅ Upload file Excel thành công!", "success")
-                    else:
-                        workflow_results['drive_uploaded'] = False
-                        print_status("❌ Upload file Excel thất bại", "error")
+                    # Đưa file Excel vào hàng đợi upload nền - không chặn workflow
+                    self._queue_excel_upload(workflow_results, drive_link, school_name)
                 else:
                     workflow_results['drive_uploaded'] = False
                     if ui_mode:
@@ -1347,8 +1569,17 @@ class SchoolProcessApp:
                 workflow_results['drive_uploaded'] = False
                 print_status("⚠️ Không có file Excel để upload", "warning")
             
+            # Ghi số lượng GV/HS đã nạp (sau so sánh) về sheet tổng
+            if workflow_results['excel_converted'] and workflow_results.get('comparison_results'):
+                comparison_results = workflow_results['comparison_results']
+                self._record_school_counts(
+                    selected_school_data,
+                    comparison_results.get('teachers_matched'),
+                    comparison_results.get('students_matched')
+                )
+            
             # Bước 10: Tổng hợp và báo cáo kết quả
-            print_status("BƯỚC 10: Tổng hợp kết quả", "info")
+            self._start_step(95, "BƯỚC 10: Tổng hợp kết quả")
             
             self._print_workflow_summary_case_2(workflow_results)
             
@@ -1451,59 +1682,111 @@ class SchoolProcessApp:
         except Exception as e:
             return None
     
-    def upload_to_drive(self, json_file_path, excel_file_path, drive_link, school_name):
+    def upload_to_drive(self, json_file_path, excel_file_path, drive_link, school_name, wait=False):
         """
         Upload file Excel to Google Drive - Wrapper method cho UI
         
+        File được đưa vào hàng đợi upload nền (utils.upload_queue), trạng thái
+        hàng đợi được lưu ra file nên không mất khi tắt ứng dụng.
+        
         Args:
             json_file_path (str): Đường dẫn file JSON (không sử dụng, chỉ để compatibility)
             excel_file_path (str): Đường dẫn file Excel
             drive_link (str): Link Google Drive folder
             school_name (str): Tên trường
+            wait (bool): Chờ upload xong mới trả về (mặc định chỉ đưa vào hàng đợi)
             
         Returns:
-            dict: Kết quả upload {'success': bool, 'error': str}
+            dict: Kết quả upload {'success': bool, 'queued': bool, 'job_id': str, 'error': str}
         """
         try:
             # Chỉ upload file Excel, không upload file JSON
-            files_to_upload = []
-            
-            if excel_file_path and os.path.exists(excel_file_path):
-                files_to_upload.append(excel_file_path)
-            
-            # Không thêm JSON file vào danh sách upload
-            # if json_file_path and os.path.exists(json_file_path):
-            #     files_to_upload.append(json_file_path)
-            
-            if not files_to_upload:
+            if not excel_file_path or not os.path.exists(excel_file_path):
                 return {'success': False, 'error': 'Không có file Excel để upload'}
             
-            # Validate Drive link
-            if not drive_link or drive_link == 'N/A' or 'drive.google.com' not in drive_link:
-                return {'success': False, 'error': 'Drive link không hợp lệ'}
-            
-            folder_id = self._extract_drive_folder_id(drive_link)
-            if not folder_id:
-                return {'success': False, 'error': 'Không thể extract folder ID từ Drive link'}
+            print_status(f"📤 Đưa file Excel vào hàng đợi upload cho trường: {school_name}", "info")
             
-            print_status(f"📤 Đang upload file Excel cho trường: {school_name}", "info")
+            upload_queue = get_upload_queue()
+            enqueue_result = upload_queue.enqueue(excel_file_path, drive_link, school_name)
+            if not enqueue_result['success']:
+                return {'success': False, 'error': enqueue_result['error']}
             
-            # Thực hiện upload
-            upload_results = self._upload_files_to_drive_oauth(files_to_upload, drive_link)
+            job_id = enqueue_result['job_id']
+            if not wait:
+                return {'success': True, 'queued': True, 'job_id': job_id}
             
-            if upload_results.get('success', 0) > 0:
+            upload_queue.wait_until_idle()
+            job = upload_queue.get_job(job_id) or {}
+            if job.get('status') == JOB_DONE:
                 return {
                     'success': True,
-                    'uploaded_count': upload_results.get('success', 0),
-                    'urls': upload_results.get('urls', [])
+                    'queued': False,
+                    'job_id': job_id,
+                    'uploaded_count': 1,
+                    'urls': [job.get('url')]
                 }
-            else:
-                errors = upload_results.get('errors', ['Unknown error'])
-                return {'success': False, 'error': '; '.join(errors)}
+            return {'success': False, 'job_id': job_id, 'error': job.get('last_error') or 'Unknown error'}
                 
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
+    def _queue_excel_upload(self, workflow_results, drive_link, school_name):
+        """
+        Đưa file Excel của workflow vào hàng đợi upload nền
+        
+        Args:
+            workflow_results (dict): Kết quả workflow (cập nhật upload_queued/upload_job_id)
+            drive_link (str): Link Google Drive folder
+            school_name (str): Tên trường
+            
+        Returns:
+            bool: True nếu đã đưa vào hàng đợi
+        """
+        enqueue_result = get_upload_queue().enqueue(workflow_results['excel_file_path'], drive_link, school_name)
+        
+        if enqueue_result['success']:
+            workflow_results['upload_queued'] = True
+            workflow_results['upload_job_id'] = enqueue_result['job_id']
+            print_status("⏳ File Excel sẽ được upload nền, có thể xử lý trường tiếp theo", "info")
+            return True
+        
+        workflow_results['upload_queued'] = False
+        workflow_results['upload_results'] = {'success': 0, 'failed': 1, 'urls': [], 'errors': [enqueue_result['error']]}
+        print_status(f"❌ Không thể đưa file vào hàng đợi upload: {enqueue_result['error']}", "error")
+        return False
+
+    def _record_school_counts(self, selected_school_data, teachers_count, students_count):
+        """
+        Ghi nhận số lượng GV/HS nạp của trường để ghi ngược về sheet tổng
+        
+        Args:
+            selected_school_data (dict): Dữ liệu trường (cần 'sheet_row' hoặc 'row_index',
+                'sheet_name' là tab chứa hàng để ghi đúng tab)
+            teachers_count (int): Số lượng GV nạp
+            students_count (int): Số lượng HS nạp
+        """
+        try:
+            if get_sheet_writeback().record_school_result(selected_school_data, teachers_count, students_count):
+                print_status(f"📝 Sẽ cập nhật sheet tổng: {teachers_count} GV, {students_count} HS", "info")
+        except Exception as e:
+            print_status(f"⚠️ Không ghi nhận được số lượng nạp: {e}", "warning")
+
+    def _wait_for_pending_uploads(self):
+        """Chờ hàng đợi upload nền chạy xong trước khi thoát (console mode)"""
+        upload_queue = get_upload_queue()
+        stats = upload_queue.get_stats()
+        active = stats[JOB_PENDING] + stats[JOB_UPLOADING]
+        if not active:
+            return
+        
+        print_status(f"⏳ Còn {active} file đang chờ upload lên Google Drive...", "info")
+        try:
+            upload_queue.wait_until_idle()
+            stats = upload_queue.get_stats()
+            print_status(f"📤 Upload nền: {stats[JOB_DONE]} thành công, {stats[JOB_FAILED]} thất bại", "info")
+        except KeyboardInterrupt:
+            print_status("ℹ️ Các file chưa upload sẽ được tiếp tục ở lần chạy sau", "info")
+
     def _upload_files_to_drive_oauth(self, file_paths, drive_link):
         """
         Upload files lên Google Drive sử dụng OAuth 2.0
@@ -1601,29 +1884,11 @@ class SchoolProcessApp:
             return result
 
     def _extract_drive_folder_id(self, drive_link):
-        """Extract folder ID từ Google Drive link"""
-        try:
-            
-            # Patterns cho Drive folder links
-            patterns = [
-                r'drive\.google\.com/drive/folders/([a-zA-Z0-9-_]+)',
-                r'drive\.google\.com/drive/u/\d+/folders/([a-zA-Z0-9-_]+)',
-                r'drive\.google\.com/open\?id=([a-zA-Z0-9-_]+)',
-                r'/folders/([a-zA-Z0-9-_]+)',
-                r'id=([a-zA-Z0-9-_]+)'
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, drive_link)
-                if match:
-                    return match.group(1)
-            
+        """Extract folder ID từ Google Drive link (dùng chung utils.upload_queue.extract_drive_folder_id)"""
+        folder_id = extract_drive_folder_id(drive_link)
+        if not folder_id:
             print_status("❌ Không thể extract folder ID từ link", "error")
-            return None
-            
-        except Exception as e:
-            print_status(f"❌ Lỗi extract folder ID: {e}", "error")
-            return None
+        return folder_id
 
     def _print_workflow_summary(self, results):
         """In tóm tắt kết quả workflow"""
@@ -1642,7 +1907,7 @@ class SchoolProcessApp:
             ("4️⃣ Lấy dữ liệu Học sinh", results['students_data']),
             ("5️⃣ Lưu dữ liệu JSON", results['json_saved']),
             ("6️⃣ Chuyển đổi Excel", results['excel_converted']),
-            ("7️⃣ Upload Google Drive", results['drive_uploaded'])
+            ("7️⃣ Upload Google Drive", results['drive_uploaded'] or results.get('upload_queued', False))
         ]
         
         for step_name, status in steps:
@@ -1662,7 +1927,15 @@ class SchoolProcessApp:
             if 'students' in data_summary:
                 students = data_summary['students']
                 print(f"   👨‍🎓 Học sinh: {students['retrieved']}/{students['total']}")
-        
+
+        # Delta sync
+        if results.get('delta_sync'):
+            delta_info = results['delta_sync']
+            print(f"\n🔄 DELTA SYNC (mốc dateCreate: {delta_info.get('since') or 'chưa có'}):")
+            if delta_info.get('pages_fetched'):
+                print(f"   📄 Chế độ {delta_info.get('mode')}: {delta_info['pages_fetched']}/{delta_info.get('total_pages')} trang")
+            print(f"   🆕 Tài khoản mới: {delta_info.get('new_teachers', 0)} GV, {delta_info.get('new_students', 0)} HS")
+
         # Thông tin HT/HP
         if results.get('ht_hp_info'):
             ht_hp_info = results['ht_hp_info']
@@ -1692,6 +1965,11 @@ class SchoolProcessApp:
             if results.get('ht_hp_file'):
                 print(f"   👑 HT/HP Info: {results['ht_hp_file']}")
         
+        # Upload nền
+        if results.get('upload_queued'):
+            print(f"\n📤 DRIVE UPLOAD:")
+            print(f"   ⏳ Đã đưa vào hàng đợi upload nền (job {results.get('upload_job_id')})")
+        
         # Upload results
         if results.get('upload_results'):
             upload_info = results['upload_results']
@@ -1706,11 +1984,14 @@ class SchoolProcessApp:
                 if len(upload_info['urls']) > 3:
                     print(f"      ... và {len(upload_info['urls']) - 3} URLs khác")
         
+        # Thống kê tái sử dụng kết nối HTTP (session chung theo host)
+        get_http_transport().print_stats()
+        
         # Tổng kết
         success_count = sum([results['sheets_extraction'], results['api_login'], 
                            results['teachers_data'], results['students_data'],
                            results['json_saved'], results['excel_converted'], 
-                           results['drive_uploaded']])
+                           results['drive_uploaded'] or results.get('upload_queued', False)])
         total_steps = 7
         
         print(f"\n🎯 TỔNG KẾT: {success_count}/{total_steps} bước thành công")
@@ -1854,6 +2135,9 @@ class SchoolProcessApp:
                     'students_matched': comparison_results.get('students_matched', 0),
                     'teachers_filtered': comparison_results.get('teachers_filtered', []),
                     'students_filtered': comparison_results.get('students_filtered', []),
+                    # Cặp khớp gần đúng (fuzzy) - tách riêng để người vận hành kiểm tra
+                    'teachers_fuzzy': comparison_results.get('teachers_fuzzy', []),
+                    'students_fuzzy': comparison_results.get('students_fuzzy', []),
                     'has_students_in_system': workflow_results.get('data_summary', {}).get('has_students_in_system', True)
                 }
                 
@@ -1898,6 +2182,367 @@ class SchoolProcessApp:
             traceback.print_exc()
             return None
     
+    def _get_token_school_year(self, client):
+        """
+        Năm học hiện tại trong access token của client
+        
+        Returns:
+            int: Năm học hoặc None nếu không xác định được
+        """
+        year_info = client.get_current_school_year_info()
+        school_year = year_info.get('school_year') if year_info.get('success') else None
+        try:
+            return int(school_year) if school_year else None
+        except (TypeError, ValueError):
+            return None
+    
+    def _store_snapshot(self, client, school_info, teachers_result=None, students_result=None,
+                        students_full_snapshot=True):
+        """
+        Ghi dữ liệu GV/HS vừa lấy vào snapshot store SQLite theo trường và năm học
+        
+        Args:
+            client: OnLuyenAPIClient đã xác thực (lấy năm học từ token)
+            school_info: {'name', 'admin', ...}
+            teachers_result: Kết quả API giáo viên (None = bỏ qua)
+            students_result: Kết quả API học sinh (None = bỏ qua)
+            students_full_snapshot: False khi students_result chỉ là phần delta (không xóa record cũ)
+            
+        Returns:
+            int: Năm học đã lưu, hoặc None nếu snapshot store tắt/lỗi
+        """
+        snapshot_store = get_snapshot_store()
+        school_key = school_info.get('admin') or school_info.get('name')
+        if not snapshot_store or not school_key:
+            return None
+        
+        try:
+            school_year = self._get_token_school_year(client)
+            if not school_year:
+                print_status("⚠️ Không xác định được năm học từ token - bỏ qua snapshot store", "warning")
+                return None
+            
+            sections = (
+                ('teachers', self._extract_teachers_data_for_unified(teachers_result) if teachers_result else None, True),
+                ('students', self._extract_students_data_for_unified(students_result) if students_result else None,
+                 students_full_snapshot)
+            )
+            for record_type, section, full_snapshot in sections:
+                if not section or not section['success']:
+                    continue
+                stats = snapshot_store.upsert_records(
+                    school_key, school_year, record_type, section['data'],
+                    key_func=lambda record, record_type=record_type: self._extract_match_keys(record, record_type),
+                    full_snapshot=full_snapshot, school_name=school_info.get('name')
+                )
+                # Mốc dateCreate cho delta sync lần sau
+                high_water_mark = max((OnLuyenAPIClient.date_create_key(record) for record in section['data']),
+                                      default=None)
+                snapshot_store.update_sync_state(school_key, school_year, record_type, high_water_mark,
+                                                 full_sync=full_snapshot)
+                print_status(f"🗄️ Snapshot {record_type} ({school_year}): +{stats['inserted']} mới, "
+                             f"{stats['updated']} cập nhật, {stats['unchanged']} không đổi, "
+                             f"-{stats['removed']} đã xóa", "info")
+            return school_year
+        except Exception as e:
+            print_status(f"⚠️ Lỗi ghi snapshot store: {e}", "warning")
+            return None
+    
+    def _prepare_delta_sync(self, client, school_info):
+        """
+        Chuẩn bị delta sync: đọc mốc dateCreate và danh sách tài khoản đã có trong snapshot
+        
+        Full sync (lấy toàn bộ, phát hiện record bị xóa/sửa) khi chưa có mốc hoặc lần full sync
+        gần nhất đã quá DELTA_SYNC_FULL_EVERY_DAYS ngày.
+        
+        Returns:
+            dict: {'school_key', 'school_year', 'since', 'full_sync', 'existing_ids'} hoặc None
+                  nếu snapshot store tắt/không xác định được năm học (chạy như Case 1 thường)
+        """
+        snapshot_store = get_snapshot_store()
+        school_key = school_info.get('admin') or school_info.get('name')
+        school_year = self._get_token_school_year(client) if snapshot_store and school_key else None
+        if not school_year:
+            print_status("⚠️ Delta sync cần snapshot store và năm học trong token - lấy toàn bộ dữ liệu", "warning")
+            return None
+        
+        sync_config = get_config().get_delta_sync_config()
+        sync_state = snapshot_store.get_sync_state(school_key, school_year, 'students') or {}
+        since = sync_state.get('high_water_mark')
+        
+        full_sync = not since or not sync_state.get('last_full_sync_at')
+        if not full_sync:
+            try:
+                last_full_sync = datetime.fromisoformat(sync_state['last_full_sync_at'])
+                full_sync = (datetime.now() - last_full_sync).days >= sync_config['full_sync_days']
+            except ValueError:
+                full_sync = True
+        
+        if full_sync:
+            print_status("🔄 Delta sync: chưa có mốc hoặc đến hạn đồng bộ toàn bộ - lấy toàn bộ học sinh", "info")
+        else:
+            print_status(f"🔄 Delta sync: lấy học sinh có dateCreate >= {since}", "info")
+        
+        return {
+            'school_key': school_key,
+            'school_year': school_year,
+            'since': since,
+            'full_sync': full_sync,
+            'existing_ids': {record_type: snapshot_store.get_record_ids(school_key, school_year, record_type)
+                             for record_type in ('teachers', 'students')}
+        }
+    
+    def _fetch_students_delta(self, client, delta_context, workflow_results):
+        """
+        Lấy phần học sinh mới (dateCreate >= mốc) qua client.get_students_since
+        
+        Returns:
+            dict: students_result cùng cấu trúc với client.get_students
+        """
+        sync_config = get_config().get_delta_sync_config()
+        sort_params = dict(pair.split('=', 1) for pair in sync_config['sort_params'].split('&') if '=' in pair)
+        
+        students_result = client.get_students_since(
+            delta_context['since'],
+            page_size=sync_config['page_size'],
+            sort_params=sort_params,
+            filter_param=sync_config['filter_param'] or None
+        )
+        if not students_result.get('success'):
+            print_status(f"❌ Lỗi lấy danh sách học sinh: {students_result.get('error')}", "error")
+            return students_result
+        
+        delta_students = students_result['data']['data']
+        students_count = students_result['data'].get('totalCount', 0)
+        workflow_results['students_data'] = True
+        workflow_results['data_summary']['students'] = {
+            'total': students_count,
+            'retrieved': len(delta_students)
+        }
+        workflow_results['delta_sync'] = {
+            'since': delta_context['since'],
+            'mode': students_result.get('mode'),
+            'pages_fetched': students_result.get('pages_fetched'),
+            'total_pages': students_result.get('total_pages')
+        }
+        print_status(f"✅ Delta sync ({students_result.get('mode')}): {len(delta_students)} học sinh từ "
+                     f"{students_result.get('pages_fetched')}/{students_result.get('total_pages')} trang", "success")
+        
+        # Tổng số trên server lệch với snapshot sau khi gộp → có record bị xóa/sửa trước mốc, lần sau full sync
+        snapshot_store = get_snapshot_store()
+        known_ids = delta_context['existing_ids']['students'] | {record_identity(record) for record in delta_students}
+        if len(known_ids) != students_count:
+            print_status(f"⚠️ Snapshot có {len(known_ids)} học sinh, OnLuyen có {students_count} - "
+                         "lần chạy sau sẽ đồng bộ toàn bộ", "warning")
+            snapshot_store.update_sync_state(delta_context['school_key'], delta_context['school_year'],
+                                             'students', reset_full_sync=True)
+        
+        return students_result
+    
+    def _filter_new_accounts(self, delta_context, teachers_result, students_result, workflow_results):
+        """
+        Chỉ giữ GV/HS chưa có trong snapshot trước lần chạy này (tài khoản mới)
+        
+        Returns:
+            tuple: (teachers_result, students_result) đã lọc
+        """
+        new_counts = {}
+        filtered = []
+        for record_type, result in (('teachers', teachers_result), ('students', students_result)):
+            if not result or not result.get('success') or not isinstance(result.get('data'), dict):
+                filtered.append(result)
+                new_counts[record_type] = 0
+                continue
+            existing_ids = delta_context['existing_ids'][record_type]
+            new_records = [record for record in result['data'].get('data', [])
+                           if record_identity(record) not in existing_ids]
+            new_counts[record_type] = len(new_records)
+            filtered.append(dict(result, data=dict(result['data'], data=new_records)))
+        
+        delta_info = workflow_results.setdefault('delta_sync', {'since': delta_context['since'], 'mode': 'full'})
+        delta_info.update(new_teachers=new_counts['teachers'], new_students=new_counts['students'],
+                          new_accounts=new_counts['teachers'] + new_counts['students'])
+        print_status(f"🆕 Tài khoản mới: {new_counts['teachers']} giáo viên, {new_counts['students']} học sinh", "info")
+        return filtered[0], filtered[1]
+    
+    @staticmethod
+    def _parse_school_years(years_text):
+        """
+        Parse danh sách năm học dạng "2024,2025" hoặc "2024 2025"
+        
+        Returns:
+            list: Danh sách năm học (int) không trùng, giữ thứ tự nhập
+        """
+        years = []
+        for token in re.split(r'[\s,;]+', str(years_text or '').strip()):
+            if token.isdigit() and len(token) == 4 and int(token) not in years:
+                years.append(int(token))
+        return years
+    
+    def _fetch_all_students(self, client, page_size=1000, log_prefix="", on_page=None):
+        """
+        Lấy toàn bộ học sinh theo từng trang
+        
+        Args:
+            client: OnLuyenAPIClient đã xác thực
+            page_size: Số học sinh mỗi trang
+            log_prefix: Tiền tố log (vd "[2024]") khi chạy song song nhiều năm
+            on_page: Callback (page_index, total_pages) gọi trước khi lấy mỗi trang từ trang 2 (báo tiến độ)
+            
+        Returns:
+            dict: Kết quả dạng get_students với data = {'data': [...], 'totalCount': N}
+        """
+        students_result = client.get_students(page_index=1, page_size=page_size)
+        if not students_result['success'] or not isinstance(students_result.get('data'), dict):
+            return students_result
+        
+        students_data = students_result['data']
+        students_count = students_data.get('totalCount', 0)
+        all_students_list = list(students_data.get('data', []))
+        total_pages = (students_count + page_size - 1) // page_size
+        
+        for page_index in range(2, total_pages + 1):
+            if on_page:
+                on_page(page_index, total_pages)
+            batch_result = client.get_students(page_index=page_index, page_size=page_size)
+            if batch_result['success'] and isinstance(batch_result.get('data'), dict):
+                all_students_list.extend(batch_result['data'].get('data', []))
+            else:
+                print_status(f"   ❌ {log_prefix} Batch {page_index}/{total_pages}: "
+                             f"{batch_result.get('error', 'Lỗi không xác định')}", "error")
+        
+        students_result['data'] = {
+            'data': all_students_list,
+            'totalCount': students_count
+        }
+        return students_result
+    
+    def _fetch_school_year_data(self, client, year, school_info, login_file_path=None):
+        """
+        Lấy GV/HS của một năm học bằng client mang token riêng của năm đó (chạy trong thread)
+        
+        Args:
+            client: OnLuyenAPIClient đã xác thực (token năm bất kỳ)
+            year: Năm học cần lấy
+            school_info: Thông tin trường (name, admin, drive_link)
+            login_file_path: File login của trường này (đọc/lưu token theo năm)
+            
+        Returns:
+            dict: Kết quả của năm học (teachers_result, students_result, ht_hp_info, data_summary...)
+        """
+        log_prefix = f"[{year}]"
+        year_result = {
+            'year': year,
+            'success': False,
+            'token_source': None,
+            'teachers_result': None,
+            'students_result': None,
+            'ht_hp_info': {},
+            'data_summary': {},
+            'error': None
+        }
+        started_at = datetime.now()
+        
+        year_client_result = client.get_year_client(year, login_file_path)
+        if not year_client_result['success']:
+            year_result['error'] = year_client_result.get('error')
+            print_status(f"❌ {log_prefix} Không lấy được token năm học: {year_result['error']}", "error")
+            return year_result
+        
+        year_client = year_client_result['client']
+        year_result['token_source'] = year_client_result['source']
+        print_status(f"🔑 {log_prefix} Token năm học ({year_client_result['source']})", "info")
+        
+        teachers_result = year_client.get_teachers(page_size=1000)
+        if teachers_result['success'] and isinstance(teachers_result.get('data'), dict):
+            teachers_list = teachers_result['data'].get('data', [])
+            year_result['teachers_result'] = teachers_result
+            year_result['ht_hp_info'] = self._extract_ht_hp_info(teachers_result['data'])
+            year_result['data_summary']['teachers'] = {
+                'total': teachers_result['data'].get('totalCount', len(teachers_list)),
+                'retrieved': len(teachers_list)
+            }
+            print_status(f"✅ {log_prefix} Giáo viên: {len(teachers_list)}", "success")
+        else:
+            print_status(f"❌ {log_prefix} Lỗi lấy danh sách giáo viên: {teachers_result.get('error')}", "error")
+        
+        students_result = self._fetch_all_students(year_client, log_prefix=log_prefix)
+        if students_result['success'] and isinstance(students_result.get('data'), dict):
+            students_list = students_result['data'].get('data', [])
+            year_result['students_result'] = students_result
+            year_result['data_summary']['students'] = {
+                'total': students_result['data'].get('totalCount', len(students_list)),
+                'retrieved': len(students_list)
+            }
+            print_status(f"✅ {log_prefix} Học sinh: {len(students_list)}", "success")
+        else:
+            print_status(f"❌ {log_prefix} Lỗi lấy danh sách học sinh: {students_result.get('error')}", "error")
+        
+        # Snapshot theo (trường, năm học) - năm lấy từ token của client năm đó
+        self._store_snapshot(year_client, school_info, year_result['teachers_result'],
+                             year_result['students_result'])
+        
+        year_result['success'] = bool(year_result['teachers_result'] or year_result['students_result'])
+        year_result['elapsed_seconds'] = round((datetime.now() - started_at).total_seconds(), 1)
+        return year_result
+    
+    def _save_multi_year_workflow_data(self, workflow_results, year_results, admin_password=None):
+        """
+        Lưu dữ liệu nhiều năm học cạnh nhau vào 1 file JSON (years.<năm>.teachers/students)
+        
+        Args:
+            workflow_results: Kết quả workflow tổng quát
+            year_results: Dict {năm: kết quả _fetch_school_year_data}
+            admin_password: Mật khẩu admin (nếu có)
+            
+        Returns:
+            str: Đường dẫn file JSON đã lưu
+        """
+        try:
+            school_name = workflow_results['school_info'].get('name', 'Unknown')
+            safe_school_name = "".join(c for c in school_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            
+            multi_year_data = {
+                'metadata': {
+                    'workflow_type': 'case_1_multi_year',
+                    'timestamp': timestamp,
+                    'processed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'school_years': sorted(year_results),
+                    'version': '1.0'
+                },
+                'school_info': {
+                    'name': workflow_results['school_info'].get('name'),
+                    'admin_email': workflow_results['school_info'].get('admin'),
+                    'drive_link': workflow_results['school_info'].get('drive_link'),
+                    'admin_password': admin_password
+                },
+                'years': {}
+            }
+            
+            for year in sorted(year_results):
+                year_result = year_results[year]
+                multi_year_data['years'][str(year)] = {
+                    'success': year_result['success'],
+                    'error': year_result['error'],
+                    'token_source': year_result['token_source'],
+                    'data_summary': year_result['data_summary'],
+                    'ht_hp_info': year_result['ht_hp_info'],
+                    'teachers': self._extract_teachers_data_for_unified(year_result['teachers_result']),
+                    'students': self._extract_students_data_for_unified(year_result['students_result'])
+                }
+            
+            filepath = f"data/output/multi_year_workflow_{safe_school_name}_{timestamp}.json"
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(multi_year_data, f, ensure_ascii=False, indent=2)
+            
+            print_status(f"✅ Đã lưu dữ liệu nhiều năm học vào: {filepath}", "success")
+            return filepath
+            
+        except Exception as e:
+            print_status(f"⚠️ Lỗi lưu dữ liệu nhiều năm học: {e}", "warning")
+            return None
+    
     def _extract_teachers_data_for_unified(self, teachers_result):
         """Trích xuất và chuẩn hóa dữ liệu teachers cho unified workflow"""
         if not teachers_result:
@@ -1978,27 +2623,17 @@ class SchoolProcessApp:
             'data': students_list
         }
     
-    def _load_latest_login_tokens(self):
-        """Tải tokens từ file login gần nhất"""
+    def _load_school_login_tokens(self):
+        """Tải tokens từ file login của trường được chọn"""
         try:
             
-            # Tìm file login gần nhất
-            pattern = "data/output/onluyen_login_*.json"
-            files = glob.glob(pattern)
-            
-            if not files:
-                print_status("Không tìm thấy file login nào", "warning")
+            login_file_path, login_data = self._choose_school_login_file()
+            if not login_file_path:
                 return None
             
-            # Sắp xếp theo thời gian tạo, lấy file mới nhất
-            latest_file = max(files, key=lambda f: Path(f).stat().st_mtime)
-            
-            with open(latest_file, 'r', encoding='utf-8') as f:
-                login_data = json.load(f)
-            
             tokens = login_data.get('tokens', {})
             if tokens.get('access_token'):
-                print_status(f"Đã tải tokens từ: {latest_file}", "success")
+                print_status(f"Đã tải tokens từ: {login_file_path}", "success")
                 return tokens
             else:
                 print_status("File login không chứa tokens hợp lệ", "warning")
@@ -2013,7 +2648,7 @@ class SchoolProcessApp:
         print_separator("SỬ DỤNG TOKENS ĐÃ LƯU")
         
         # Tải tokens từ file
-        tokens = self._load_latest_login_tokens()
+        tokens = self._load_school_login_tokens()
         if not tokens:
             return
         
@@ -2085,35 +2720,17 @@ class SchoolProcessApp:
                     print_status("Lựa chọn không hợp lệ", "error")
                     return
             
-            # Import và sử dụng converter
-            converter = JSONToExcelTemplateConverter(selected_file)
-            
-            # Load và kiểm tra JSON data
-            if not converter.load_json_data():
-                print_status("Không thể load JSON data", "error")
-                return
-            
-            # Extract data
-            teachers_extracted = converter.extract_teachers_data()
-            students_extracted = converter.extract_students_data()
-            
-            if not teachers_extracted and not students_extracted:
-                print_status("Không thể trích xuất dữ liệu giáo viên hoặc học sinh", "error")
-                return
-            
-            # Convert to Excel
-            output_path = converter.convert()
+            # Chuyển đổi trên worker daemon nếu đang chạy (converter đã import sẵn), không thì chạy trực tiếp
+            convert_result = run_with_worker(
+                'convert', {'json_file_path': os.path.abspath(selected_file)},
+                lambda: {'excel_file_path': self._convert_json_to_excel(selected_file)}
+            ) or {}
+            output_path = convert_result.get('excel_file_path')
             
             if output_path:
                 print_status("Chuyển đổi thành công!", "success")
                 print(f"File Excel: {output_path}")
                 
-                # Hiển thị thống kê
-                teachers_count = len(converter.teachers_df) if converter.teachers_df is not None else 0
-                students_count = len(converter.students_df) if converter.students_df is not None else 0
-                
-                print(f"\nThống kê: {teachers_count} giáo viên, {students_count} học sinh")
-                
                 # Hỏi có muốn mở file Excel không
                 if get_user_confirmation("Bạn có muốn mở file Excel?"):
                     try:
@@ -2131,6 +2748,105 @@ class SchoolProcessApp:
 
     
     
+    def onluyen_export_from_snapshot(self):
+        """Xuất lại Excel (toàn bộ dữ liệu) từ snapshot store mà không gọi lại OnLuyen API"""
+        print_separator("XUẤT LẠI EXCEL TỪ SNAPSHOT")
+        
+        snapshot_store = get_snapshot_store()
+        if not snapshot_store:
+            print_status("Snapshot store đang tắt (SNAPSHOT_STORE_ENABLED=false)", "warning")
+            return
+        
+        schools = snapshot_store.list_schools()
+        if not schools:
+            print_status("Chưa có snapshot nào - chạy Case 1/Case 2 trước", "warning")
+            return
+        
+        print(f"\nTìm thấy {len(schools)} snapshot:")
+        for i, school in enumerate(schools, 1):
+            print(f"{i}. {school['school_name'] or school['school_key']} - năm học {school['school_year']} "
+                  f"({school['teachers_count']} GV, {school['students_count']} HS, lấy lúc {school['last_fetch_at']})")
+        
+        try:
+            choice = get_user_input(f"Chọn snapshot để xuất (1-{len(schools)})", required=True)
+            choice_idx = int(choice) - 1
+            if not 0 <= choice_idx < len(schools):
+                print_status("Lựa chọn không hợp lệ", "error")
+                return
+        except (ValueError, TypeError):
+            print_status("Lựa chọn không hợp lệ", "error")
+            return
+        
+        school = schools[choice_idx]
+        school_name = school['school_name'] or school['school_key']
+        safe_school_name = "".join(c for c in school_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        json_file_path = f"data/output/unified_workflow_snapshot_{safe_school_name}_{timestamp}.json"
+        
+        teachers = snapshot_store.get_records(school['school_key'], school['school_year'], 'teachers')
+        ht_hp_info = self._extract_ht_hp_info({'data': teachers}) if teachers else {}
+        
+        json_file_path = snapshot_store.export_workflow_json(
+            school['school_key'], school['school_year'], json_file_path,
+            school_info={'name': school_name, 'admin_email': school['school_key'], 'drive_link': None,
+                         'admin_password': None},
+            ht_hp_info=ht_hp_info
+        )
+        if not json_file_path:
+            print_status("Không thể xuất dữ liệu từ snapshot", "error")
+            return
+        
+        print_status(f"✅ Đã xuất JSON từ snapshot: {json_file_path}", "success")
+        excel_file_path = self._convert_json_to_excel(json_file_path)
+        if excel_file_path:
+            print_status(f"✅ Đã tạo file Excel: {excel_file_path}", "success")
+        else:
+            print_status("❌ Lỗi chuyển đổi sang Excel", "error")
+    
+    def onluyen_diff_report(self):
+        """So sánh GV/HS giữa 2 lần chạy (file workflow JSON hoặc snapshot hiện tại) và xuất báo cáo"""
+        print_separator("SO SÁNH THAY ĐỔI GIỮA 2 LẦN CHẠY")
+        
+        # Nguồn: snapshot hiện tại của từng trường + các file unified workflow
+        sources = []
+        snapshot_store = get_snapshot_store()
+        if snapshot_store:
+            for school in snapshot_store.list_schools():
+                sources.append((f"snapshot:{school['school_key']}:{school['school_year']}",
+                                f"[Snapshot] {school['school_name'] or school['school_key']} - năm học "
+                                f"{school['school_year']} (lấy lúc {school['last_fetch_at']})"))
+        json_files = sorted(glob.glob("data/output/unified_workflow_*.json"), key=os.path.getmtime, reverse=True)
+        sources.extend((path, Path(path).name) for path in json_files)
+        
+        if len(sources) < 2:
+            print_status("Cần ít nhất 2 lần chạy (file workflow JSON hoặc snapshot) để so sánh", "warning")
+            return
+        
+        print(f"\nTìm thấy {len(sources)} nguồn dữ liệu:")
+        for i, (_, label) in enumerate(sources, 1):
+            print(f"{i}. {label}")
+        
+        try:
+            old_idx = int(get_user_input(f"Chọn lần TRƯỚC (1-{len(sources)})", required=True)) - 1
+            new_idx = int(get_user_input(f"Chọn lần NÀY (1-{len(sources)})", required=True)) - 1
+        except (ValueError, TypeError):
+            print_status("Lựa chọn không hợp lệ", "error")
+            return
+        if not (0 <= old_idx < len(sources) and 0 <= new_idx < len(sources)) or old_idx == new_idx:
+            print_status("Lựa chọn không hợp lệ", "error")
+            return
+        
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output_path = f"data/output/diff_report_{timestamp}.xlsx"
+        print_status("🔍 Đang so sánh...", "info")
+        result = write_diff_report(sources[old_idx][0], sources[new_idx][0], output_path)
+        
+        if result['success']:
+            print_status(f"✅ Đã ghi báo cáo: {output_path}", "success")
+            print_diff_summary(result['summary'])
+        else:
+            print_status(f"❌ Lỗi so sánh: {result['error']}", "error")
+    
     def _get_sheet_name_with_fallback(self, extractor):
         """
         Lấy tên sheet với logic fallback:
@@ -2248,7 +2964,7 @@ class SchoolProcessApp:
                 return None
             
             # Bước 2: Lấy client đã xác thực (ưu tiên token từ file, nếu không có thì login)
-            print_status("BƯỚC 2: Xác thực OnLuyen API", "info")
+            self._start_step(15, "BƯỚC 2: Xác thực OnLuyen API")
             
             client, auth_success, login_result = self._get_authenticated_client(admin_email, password, False)
             
@@ -2259,8 +2975,13 @@ class SchoolProcessApp:
             basic_results['api_login'] = True
             print_status("✅ OnLuyen API xác thực thành công", "success")
             
+            # Lưu thông tin login nếu có login mới
+            if login_result.get('data', {}).get('source') != 'login_file':
+                client.login_file_path = self._save_successful_login_info(
+                    school_name, admin_email, login_result, drive_link, password)
+            
             # Bước 3: Lấy danh sách Giáo viên
-            print_status("BƯỚC 3: Lấy danh sách Giáo viên", "info")
+            self._start_step(20, "BƯỚC 3: Lấy danh sách Giáo viên")
             
             teachers_result = client.get_teachers(page_size=1000)
             
@@ -2295,7 +3016,7 @@ class SchoolProcessApp:
                 print_status(f"❌ Lỗi lấy danh sách giáo viên: {teachers_result.get('error')}", "error")
             
             # Bước 4: Lấy danh sách Học sinh
-            print_status("BƯỚC 4: Lấy danh sách Học sinh", "info")
+            self._start_step(30, "BƯỚC 4: Lấy danh sách Học sinh")
             
             # Gọi API lần đầu để biết tổng số học sinh
             students_result = client.get_students(page_index=1, page_size=1000)
@@ -2362,6 +3083,12 @@ class SchoolProcessApp:
             else:
                 print_status(f"❌ Lỗi lấy danh sách học sinh: {students_result.get('error')}", "error")
             
+            # Lưu snapshot GV/HS vào SQLite (so khớp/so sánh/xuất lại đọc từ đây)
+            basic_results['school_year'] = self._store_snapshot(
+                client, basic_results['school_info'],
+                basic_results.get('teachers_result'), basic_results.get('students_result')
+            )
+            
             return basic_results
             
         except Exception as e:
@@ -2491,8 +3218,15 @@ class SchoolProcessApp:
             print_status(f"❌ Lỗi download file: {e}", "error")
             return False
     
-    def _compare_and_filter_data(self, teachers_result, students_result, import_file_path):
-        """So sánh và lọc dữ liệu dựa trên file import theo Họ tên và Ngày sinh"""
+    def _compare_and_filter_data(self, teachers_result, students_result, import_file_path, school_key=None,
+                                 school_year=None):
+        """
+        So sánh và lọc dữ liệu dựa trên file import theo Họ tên và Ngày sinh
+        
+        Args:
+            school_key: Key của trường cho so khớp incremental (None = so khớp lại toàn bộ)
+            school_year: Năm học của dữ liệu đã lưu trong snapshot store (None = tự chuẩn hóa key)
+        """
         try:
             
             # Đọc file import với tất cả sheets
@@ -2506,6 +3240,8 @@ class SchoolProcessApp:
                 'import_students_count': 0,
                 'teachers_matched': 0,
                 'students_matched': 0,
+                'teachers_fuzzy': [],
+                'students_fuzzy': [],
                 'comparison_method': 'name_and_birthdate'
             }
             
@@ -2652,13 +3388,15 @@ class SchoolProcessApp:
                         print(f"      📋 Import có {len(teachers_import_data)} giáo viên")
                         
                         # Sử dụng enhanced matching logic
-                        matched_teachers, matched_count = self._match_with_enhanced_logic(
-                            onluyen_teachers, teachers_import_data, "teachers"
+                        matched_teachers, matched_count, fuzzy_teachers = self._match_with_enhanced_logic(
+                            onluyen_teachers, teachers_import_data, "teachers", school_key, school_year
                         )
                         
                         comparison_results['teachers_filtered'] = matched_teachers
                         comparison_results['teachers_matched'] = matched_count
-                        print(f"      ✅ Khớp {matched_count}/{len(teachers_import_data)} giáo viên")
+                        comparison_results['teachers_fuzzy'] = fuzzy_teachers
+                        print(f"      ✅ Khớp {matched_count}/{len(teachers_import_data)} giáo viên"
+                              + (f" (trong đó {len(fuzzy_teachers)} khớp gần đúng)" if fuzzy_teachers else ""))
                         
                     else:
                         print(f"      ⚠️ Không có dữ liệu giáo viên import để so sánh")
@@ -2676,13 +3414,15 @@ class SchoolProcessApp:
                         print("   🔍 So sánh với file import...")
                         
                         # Sử dụng enhanced matching logic
-                        matched_students, matched_count = self._match_with_enhanced_logic(
-                            onluyen_students, students_import_data, "students"
+                        matched_students, matched_count, fuzzy_students = self._match_with_enhanced_logic(
+                            onluyen_students, students_import_data, "students", school_key, school_year
                         )
                         
                         comparison_results['students_filtered'] = matched_students
                         comparison_results['students_matched'] = matched_count
-                        print(f"      ✅ Khớp {matched_count}/{len(students_import_data)} học sinh")
+                        comparison_results['students_fuzzy'] = fuzzy_students
+                        print(f"      ✅ Khớp {matched_count}/{len(students_import_data)} học sinh"
+                              + (f" (trong đó {len(fuzzy_students)} khớp gần đúng)" if fuzzy_students else ""))
                     
                     else:
                         # Nếu không có import data, xuất tất cả học sinh
@@ -2823,12 +3563,16 @@ class SchoolProcessApp:
         
         return valid_candidates[0][0]  # Trả về candidate có dateCreate mới nhất
     
-    def _match_with_enhanced_logic(self, onluyen_records, import_data, record_type="students"):
+    def _match_with_enhanced_logic(self, onluyen_records, import_data, record_type="students", school_key=None,
+                                   school_year=None):
         """
-        So sánh với logic nâng cao 3 mức ưu tiên:
+        So sánh với logic nâng cao 4 mức ưu tiên:
         1. Ưu tiên cao nhất: Tên + Ngày sinh (exact match)
         2. Ưu tiên cao: Tên + Tên đăng nhập (khi có username)
         3. Ưu tiên thấp: Chỉ Tên (dùng dateCreate để chọn người mới nhất nếu có nhiều người cùng tên)
+        4. Fuzzy: Tên gần đúng (gõ sai, đảo tên đệm) qua utils.fuzzy_matcher, chỉ cho các record
+           và dòng import không có tên trùng khớp chính xác (tắt mặc định, bật bằng
+           FUZZY_MATCH_ENABLED=true) - các cặp này được trả về riêng để người vận hành kiểm tra
         
         Logic cho Method 3:
         - Nếu chỉ có 1 người cùng tên: match luôn
@@ -2841,13 +3585,23 @@ class SchoolProcessApp:
             onluyen_records: List records từ OnLuyen API
             import_data: List records từ file import đã parse
             record_type: "students" hoặc "teachers"
+            school_key: Key của trường (vd admin email) - nếu có, lưu trạng thái so khớp
+                        (utils.match_state) để lần chạy sau chỉ đánh giá lại dòng import
+                        thêm/sửa và record OnLuyen mới/thay đổi
+            school_year: Năm học - cùng school_key, đọc key đã chuẩn hóa từ snapshot store
             
         Returns:
-            tuple: (matched_records, matched_count)
+            tuple: (matched_records, matched_count, fuzzy_matches) - fuzzy_matches là danh sách
+                   {'onluyen_name', 'import_name', 'birthdate', 'account', 'score'} của các cặp
+                   khớp gần đúng (đã nằm trong matched_records)
         """
         matched_records = []
         matched_count = 0
         
+        # Trạng thái so khớp lần trước của trường (incremental re-matching)
+        match_state_store = get_match_state_store() if school_key else None
+        match_state = match_state_store.load(school_key, record_type) if match_state_store else None
+        
         # Tạo lookup dictionaries
         # 1. Name + Birthdate exact match (ưu tiên cao nhất)
         name_birth_lookup = {}
@@ -2877,114 +3631,210 @@ class SchoolProcessApp:
         print(f"         - Name+Username lookup: {len(name_username_lookup)} items")
         print(f"         - Name-only lookup: {len(name_only_lookup)} items")
         
+        # Key đã chuẩn hóa sẵn trong snapshot store (ghi khi fetch) - không cần chuẩn hóa lại
+        snapshot_store = get_snapshot_store() if school_key and school_year else None
+        snapshot_keys = snapshot_store.get_match_keys(school_key, school_year, record_type) if snapshot_store else {}
+        
+        # Chuẩn hóa name/birth/username của OnLuyen records (dùng lại key đã lưu nếu record không đổi)
+        record_entries = []
+        record_keys = {}
+        changed_record_ids = []
+        for record in onluyen_records:
+            record_id = record_identity(record) if match_state or snapshot_keys else ''
+            fingerprint = record_fingerprint(record) if record_id else ''
+            keys = None
+            if match_state and record_id:
+                keys = match_state.get_record_keys(record_id, fingerprint)
+                if keys is None:
+                    changed_record_ids.append(record_id)
+            if keys is None and record_id in snapshot_keys and snapshot_keys[record_id][0] == fingerprint:
+                keys = snapshot_keys[record_id][1:]
+            if keys is None:
+                keys = self._extract_match_keys(record, record_type)
+            if match_state and record_id:
+                record_keys[record_id] = (fingerprint,) + tuple(keys)
+            record_entries.append((record, record_id) + tuple(keys))
+        
         # Group OnLuyen records by name for efficient lookup
         onluyen_by_name = {}
-        for record in onluyen_records:
-            if record_type == "students":
-                user_info = record.get('userInfo', {})
-                record_name = self._normalize_name(
-                    record.get('fullName', '') or user_info.get('displayName', '')
-                )
-            else:  # teachers
-                record_info = record.get('teacherInfo', {})
-                record_name = self._normalize_name(
-                    record.get('fullName', '') or record_info.get('displayName', '')
-                )
-            
+        for record, _, record_name, _, _ in record_entries:
             if record_name:
                 if record_name not in onluyen_by_name:
                     onluyen_by_name[record_name] = []
                 onluyen_by_name[record_name].append(record)
         
+        # Tên cần đánh giá lại so với lần chạy trước (None = đánh giá toàn bộ)
+        import_rows = {import_row_hash(item): item for item in import_data} if match_state else {}
+        affected_names = None
+        if match_state and not match_state.is_empty:
+            affected_names = match_state.affected_names(import_rows, changed_record_ids, set(record_keys))
+            # Record mới/thay đổi làm thay đổi nhóm cùng tên của nó
+            changed_ids = set(changed_record_ids)
+            affected_names.update(entry[2] for entry in record_entries if entry[1] in changed_ids)
+            # Nhóm nhiều người cùng tên chọn theo dateCreate trong 30 ngày so với hôm nay → đánh giá lại
+            # nếu có người nằm trong cửa sổ đó ở lần chạy trước hoặc lần này
+            window_days = 30 + match_state.days_since_update() + 1
+            affected_names.update(
+                name for name, group in onluyen_by_name.items()
+                if len(group) > 1 and any(self._is_date_create_within_days(candidate.get('dateCreate', ''), window_days)
+                                          for candidate in group)
+            )
+        
+        decisions = {}
+        reused_count = 0
+        
+        # Records không khớp và không có tên trùng trong import → ứng viên cho fuzzy tier
+        unmatched_records = []
+        
         # Process each OnLuyen record
-        for record in onluyen_records:
+        for record, record_id, record_name, record_birth, record_username in record_entries:
             # Skip GVCN teachers
             if record_type == "teachers" and self._is_gvcn_teacher(record):
                 continue
             
-            # Extract name, birthdate and username
-            if record_type == "students":
-                user_info = record.get('userInfo', {})
-                record_name = self._normalize_name(
-                    record.get('fullName', '') or user_info.get('displayName', '')
-                )
-                record_birth = self._normalize_date(
-                    record.get('birthDate', '') or user_info.get('userBirthday', '')
-                )
-                record_username = (record.get('account', '') or user_info.get('account', '')).lower().strip()
-            else:  # teachers
-                record_info = record.get('teacherInfo', {})
-                record_name = self._normalize_name(
-                    record.get('fullName', '') or record_info.get('displayName', '')
-                )
-                record_birth = self._normalize_date(record.get('birthDate', ''))
-                record_username = record.get('account', '').lower().strip()
-            
             if not record_name:
                 continue
             
-            matched = False
-            
-            # Method 1: Exact name + birthdate match (ưu tiên cao nhất)
-            if record_name and record_birth:
-                key = (record_name, record_birth)
-                if key in name_birth_lookup:
-                    matched_records.append(record)
-                    matched_count += 1
-                    matched = True
-                    print(f"         ✅ Name+Birth match: '{record_name}' | '{record_birth}'")
-                    continue
-            
-            # Method 2: Name + Username match (ưu tiên cao)
-            if not matched and record_name and record_username:
-                key = (record_name, record_username)
-                if key in name_username_lookup:
-                    matched_records.append(record)
-                    matched_count += 1
-                    matched = True
-                    print(f"         ✅ Name+Username match: '{record_name}' | '{record_username}'")
-                    continue
+            # Không có dòng import/record nào liên quan thay đổi → dùng lại quyết định lần trước
+            if affected_names is not None and record_id and record_name not in affected_names \
+                    and record_id in match_state.decisions:
+                method = match_state.decisions[record_id]
+                if method == 'fuzzy':
+                    method = None  # Fuzzy tier luôn được chạy lại trên phần chưa khớp
+                reused_count += 1
+            else:
+                method = self._decide_exact_match(
+                    record, record_name, record_birth, record_username, onluyen_by_name,
+                    name_birth_lookup, name_username_lookup, name_only_lookup
+                )
             
-            # Method 3: Name-only match với dateCreate logic (ưu tiên thấp nhất)
-            if not matched and record_name in name_only_lookup:
-                # Lấy tất cả OnLuyen records có cùng tên
-                candidates_with_same_name = onluyen_by_name.get(record_name, [])
-                
-                if len(candidates_with_same_name) == 1:
-                    # Chỉ có 1 candidate, match luôn
-                    matched_records.append(record)
-                    matched_count += 1
-                    matched = True
-                    print(f"         ✅ Name-only match (single): '{record_name}'")
-                
-                elif len(candidates_with_same_name) > 1:
-                    # Có nhiều candidates cùng tên, chọn theo dateCreate mới nhất trong vòng 30 ngày
-                    print(f"         🔍 Found {len(candidates_with_same_name)} candidates with name '{record_name}', checking dateCreate...")
-                    
-                    # Debug: hiển thị dateCreate của các candidates
-                    for i, candidate in enumerate(candidates_with_same_name, 1):
-                        date_create = candidate.get('dateCreate', 'No dateCreate')
-                        print(f"            Candidate {i}: dateCreate = {date_create}")
-                    
-                    best_match = self._find_best_date_create_match(candidates_with_same_name, 30)
-                    
-                    if best_match and best_match == record:  # Chỉ add nếu record hiện tại là best match
-                        matched_records.append(best_match)
-                        matched_count += 1
-                        matched = True
-                        print(f"         ✅ Name-only match (best dateCreate of {len(candidates_with_same_name)}): '{record_name}' | dateCreate: {best_match.get('dateCreate', '')}")
-                    elif not best_match:
-                        # Không có ai trong vòng 30 ngày, lấy người đầu tiên (fallback)
-                        if record == candidates_with_same_name[0]:
-                            matched_records.append(record)
-                            matched_count += 1
-                            matched = True
-                            print(f"         ✅ Name-only match (fallback first of {len(candidates_with_same_name)}): '{record_name}'")
-            
-            if not matched:
-                print(f"         ❌ No match found: '{record_name}'")
-        
-        return matched_records, matched_count
+            decisions[record_id] = method
+            if method:
+                matched_records.append(record)
+                matched_count += 1
+            elif record_name not in name_only_lookup:
+                unmatched_records.append({'name': record_name, 'birthdate': record_birth, 'record': record,
+                                          'record_id': record_id})
+        
+        if affected_names is not None:
+            print(f"      ♻️ Incremental: dùng lại {reused_count} quyết định, đánh giá lại "
+                  f"{len(decisions) - reused_count} record ({len(affected_names)} tên bị ảnh hưởng)")
+
+        # Method 4: Fuzzy match cho tên gõ sai/đảo tên đệm (chỉ với dòng import không có tên trùng khớp chính xác)
+        fuzzy_report = []
+        fuzzy_matcher = create_fuzzy_matcher()
+        if fuzzy_matcher and unmatched_records:
+            unmatched_import = [item for item in import_data if item['name'] and item['name'] not in onluyen_by_name]
+            fuzzy_matches = fuzzy_matcher.match(unmatched_records, unmatched_import)
+
+            for record_index, import_index, score in fuzzy_matches:
+                record = unmatched_records[record_index]['record']
+                decisions[unmatched_records[record_index]['record_id']] = 'fuzzy'
+                matched_records.append(record)
+                matched_count += 1
+                info = record.get('userInfo') or record.get('teacherInfo') or {}
+                fuzzy_report.append({
+                    'onluyen_name': record.get('fullName') or info.get('displayName') or unmatched_records[record_index]['name'],
+                    'import_name': unmatched_import[import_index].get('raw_name', ''),
+                    'birthdate': unmatched_records[record_index]['birthdate'],
+                    'account': record.get('account') or info.get('account') or info.get('userName') or '',
+                    'score': round(score, 3)
+                })
+                print(f"         🔎 Fuzzy match ({score:.2f}): '{unmatched_import[import_index].get('raw_name', '')}' "
+                      f"→ '{unmatched_records[record_index]['name']}'")
+
+            if unmatched_import:
+                print(f"      🔎 Fuzzy tier: {len(fuzzy_matches)} khớp thêm "
+                      f"({fuzzy_matcher.stats['comparisons']} phép so sánh cho {len(unmatched_records)}×{len(unmatched_import)})")
+
+        if match_state:
+            decisions.pop('', None)
+            match_state.update(import_rows, record_keys, decisions)
+            match_state_store.save(match_state)
+
+        return matched_records, matched_count, fuzzy_report
+    
+    def _extract_match_keys(self, record, record_type):
+        """
+        Trích xuất name/birth/username đã chuẩn hóa của record OnLuyen để so khớp
+        
+        Returns:
+            tuple: (record_name, record_birth, record_username)
+        """
+        if record_type == "students":
+            user_info = record.get('userInfo', {})
+            record_name = self._normalize_name(
+                record.get('fullName', '') or user_info.get('displayName', '')
+            )
+            record_birth = self._normalize_date(
+                record.get('birthDate', '') or user_info.get('userBirthday', '')
+            )
+            record_username = (record.get('account', '') or user_info.get('account', '')).lower().strip()
+        else:  # teachers
+            record_info = record.get('teacherInfo', {})
+            record_name = self._normalize_name(
+                record.get('fullName', '') or record_info.get('displayName', '')
+            )
+            record_birth = self._normalize_date(record.get('birthDate', ''))
+            record_username = record.get('account', '').lower().strip()
+        
+        return record_name, record_birth, record_username
+    
+    def _decide_exact_match(self, record, record_name, record_birth, record_username, onluyen_by_name,
+                            name_birth_lookup, name_username_lookup, name_only_lookup):
+        """
+        Quyết định khớp chính xác (Method 1-3) cho một record OnLuyen
+        
+        Returns:
+            str: 'name_birth' | 'name_username' | 'name_single' | 'name_best_date' | 'name_fallback',
+                 hoặc None nếu không khớp
+        """
+        # Method 1: Exact name + birthdate match (ưu tiên cao nhất)
+        if record_name and record_birth:
+            key = (record_name, record_birth)
+            if key in name_birth_lookup:
+                print(f"         ✅ Name+Birth match: '{record_name}' | '{record_birth}'")
+                return 'name_birth'
+        
+        # Method 2: Name + Username match (ưu tiên cao)
+        if record_name and record_username:
+            key = (record_name, record_username)
+            if key in name_username_lookup:
+                print(f"         ✅ Name+Username match: '{record_name}' | '{record_username}'")
+                return 'name_username'
+        
+        # Method 3: Name-only match với dateCreate logic (ưu tiên thấp nhất)
+        if record_name in name_only_lookup:
+            # Lấy tất cả OnLuyen records có cùng tên
+            candidates_with_same_name = onluyen_by_name.get(record_name, [])
+            
+            if len(candidates_with_same_name) == 1:
+                # Chỉ có 1 candidate, match luôn
+                print(f"         ✅ Name-only match (single): '{record_name}'")
+                return 'name_single'
+            
+            elif len(candidates_with_same_name) > 1:
+                # Có nhiều candidates cùng tên, chọn theo dateCreate mới nhất trong vòng 30 ngày
+                print(f"         🔍 Found {len(candidates_with_same_name)} candidates with name '{record_name}', checking dateCreate...")
+                
+                # Debug: hiển thị dateCreate của các candidates
+                for i, candidate in enumerate(candidates_with_same_name, 1):
+                    date_create = candidate.get('dateCreate', 'No dateCreate')
+                    print(f"            Candidate {i}: dateCreate = {date_create}")
+                
+                best_match = self._find_best_date_create_match(candidates_with_same_name, 30)
+                
+                if best_match and best_match == record:  # Chỉ add nếu record hiện tại là best match
+                    print(f"         ✅ Name-only match (best dateCreate of {len(candidates_with_same_name)}): '{record_name}' | dateCreate: {best_match.get('dateCreate', '')}")
+                    return 'name_best_date'
+                elif not best_match:
+                    # Không có ai trong vòng 30 ngày, lấy người đầu tiên (fallback)
+                    if record == candidates_with_same_name[0]:
+                        print(f"         ✅ Name-only match (fallback first of {len(candidates_with_same_name)}): '{record_name}'")
+                        return 'name_fallback'
+        
+        print(f"         ❌ No match found: '{record_name}'")
+        return None
     
     def _analyze_date_format_in_import(self, df, column_name):
         """Phân tích format ngày tháng thực tế trong DataFrame cột cụ thể"""
@@ -3603,7 +4453,7 @@ class SchoolProcessApp:
             ("6️⃣ So sánh dữ liệu", results['data_comparison']),
             ("7️⃣ Lưu dữ liệu JSON", results['json_saved']),
             ("8️⃣ Chuyển đổi Excel", results['excel_converted']),
-            ("9️⃣ Upload Google Drive", results['drive_uploaded'])
+            ("9️⃣ Upload Google Drive", results['drive_uploaded'] or results.get('upload_queued', False))
         ]
         
         for step_name, status in steps:
@@ -3632,6 +4482,15 @@ class SchoolProcessApp:
                 print(f"   👨‍🎓 Học sinh khớp: {comp.get('students_matched', 0)}/{comp.get('import_students_count', 0)}")
             
             print(f"   🔧 Phương pháp: {comp.get('method', 'name_and_birthdate')}")
+            
+            # Khớp gần đúng: liệt kê riêng để kiểm tra trước khi dùng file Excel
+            for label, fuzzy_key in (("Giáo viên", 'teachers_fuzzy'), ("Học sinh", 'students_fuzzy')):
+                fuzzy_matches = comp.get(fuzzy_key) or []
+                if fuzzy_matches:
+                    print(f"\n🔎 {label.upper()} KHỚP GẦN ĐÚNG ({len(fuzzy_matches)}) - CẦN KIỂM TRA:")
+                    for i, match in enumerate(fuzzy_matches, 1):
+                        print(f"   {i}. Import '{match['import_name']}' → OnLuyen '{match['onluyen_name']}' "
+                              f"({match['account'] or 'N/A'}, {match['birthdate'] or 'N/A'}) - độ giống {match['score']:.2f}")
         
         # Thông tin HT/HP
         if results.get('ht_hp_info'):
@@ -3662,6 +4521,11 @@ class SchoolProcessApp:
             if results.get('ht_hp_file'):
                 print(f"   👑 HT/HP Info: {results['ht_hp_file']}")
         
+        # Upload nền
+        if results.get('upload_queued'):
+            print(f"\n📤 DRIVE UPLOAD:")
+            print(f"   ⏳ Đã đưa vào hàng đợi upload nền (job {results.get('upload_job_id')})")
+        
         # Upload results
         if results.get('upload_results'):
             upload_info = results['upload_results']
@@ -3674,7 +4538,7 @@ class SchoolProcessApp:
                            results['teachers_data'], results['students_data'],
                            results['import_file_downloaded'], results['data_comparison'],
                            results['json_saved'], results['excel_converted'], 
-                           results['drive_uploaded']])
+                           results['drive_uploaded'] or results.get('upload_queued', False)])
         total_steps = 9
         
         print(f"\n🎯 TỔNG KẾT: {success_count}/{total_steps} bước thành công")
@@ -3697,8 +4561,14 @@ class SchoolProcessApp:
             if self.config.is_debug_mode():
                 self.config.print_config_summary()
             
+            # Tiếp tục các upload còn dở từ lần chạy trước
+            get_upload_queue()
+            
             self.show_main_menu()
             
+            self._wait_for_pending_uploads()
+            get_sheet_writeback().stop()
+            
         except KeyboardInterrupt:
             print("\n\n⏹️  Ứng dụng bị dừng bởi người dùng")
         except Exception as e:
@@ -0,0 +1,5 @@
+"""
+Benchmarks Package
+Benchmark hiệu năng cho School Process (chạy offline với OnLuyen simulator
+và fake Google backend), kết quả được ghi vào file lịch sử JSON
+"""
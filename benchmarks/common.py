@@ -0,0 +1,261 @@
+"""
+Benchmark Common Utilities
+Đo thời gian theo bước, peak RSS và ghi lịch sử kết quả benchmark (JSON)
+dùng chung cho các benchmark
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import functools
+import subprocess
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    # Windows không có module resource
+    RESOURCE_AVAILABLE = False
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(PROJECT_ROOT, 'benchmarks', 'results')
+
+
+class StepTimer:
+    """
+    Cộng dồn thời gian (wall) và số lần gọi theo tên bước
+
+    Có thể đo bằng context manager step() hoặc bọc method có sẵn bằng wrap()
+    (method của class hoặc của instance). Các bước có thể lồng nhau, ví dụ
+    'compare' bao gồm cả thời gian 'match'.
+    """
+
+    def __init__(self):
+        self.steps: Dict[str, Dict[str, float]] = {}
+        self._patches: List[tuple] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        """Cộng thời gian cho bước"""
+        step = self.steps.setdefault(name, {'seconds': 0.0, 'calls': 0})
+        step['seconds'] += seconds
+        step['calls'] += 1
+
+    @contextmanager
+    def step(self, name: str):
+        """Đo một đoạn code: with timer.step('upload'): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def wrap(self, owner: Any, attr: str, name: str) -> None:
+        """
+        Bọc method owner.attr để đo thời gian mỗi lần gọi
+
+        Args:
+            owner: Class hoặc instance chứa method
+            attr (str): Tên method
+            name (str): Tên bước trong kết quả
+        """
+        original = getattr(owner, attr)
+        timer = self
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            with timer.step(name):
+                return original(*args, **kwargs)
+
+        is_class = isinstance(owner, type)
+        self._patches.append((owner, attr, original if is_class else None))
+        setattr(owner, attr, timed)
+
+    def restore(self) -> None:
+        """Gỡ toàn bộ method đã bọc"""
+        for owner, attr, original in reversed(self._patches):
+            if original is not None:
+                setattr(owner, attr, original)
+            else:
+                delattr(owner, attr)
+        self._patches = []
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        """Kết quả {bước: {'seconds', 'calls'}} (làm tròn)"""
+        return {name: {'seconds': round(step['seconds'], 4), 'calls': int(step['calls'])}
+                for name, step in self.steps.items()}
+
+
+class TracemallocStepTimer(StepTimer):
+    """
+    StepTimer đo thêm peak bộ nhớ Python (tracemalloc) của từng bước
+
+    Peak của bước cha luôn bao gồm peak của các bước con lồng bên trong.
+    tracemalloc làm chậm code đáng kể nên thời gian đo bằng timer này chỉ
+    dùng để tham khảo - nên đo thời gian ở một lượt chạy riêng.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._peak_stack: List[int] = []
+
+    def start(self) -> None:
+        """Bật tracemalloc (nếu chưa bật)"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self) -> None:
+        """Tắt tracemalloc"""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextmanager
+    def step(self, name: str):
+        """Đo thời gian và peak bộ nhớ (MB) của một đoạn code"""
+        current, peak = tracemalloc.get_traced_memory()
+        if self._peak_stack:
+            self._peak_stack[-1] = max(self._peak_stack[-1], peak)
+        tracemalloc.reset_peak()
+        self._peak_stack.append(0)
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            step_peak = max(self._peak_stack.pop(), tracemalloc.get_traced_memory()[1])
+            if self._peak_stack:
+                self._peak_stack[-1] = max(self._peak_stack[-1], step_peak)
+
+            self.add(name, elapsed)
+            step = self.steps[name]
+            step['peak_mb'] = max(step.get('peak_mb', 0.0), step_peak / (1024 * 1024))
+            step['growth_mb'] = max(step.get('growth_mb', 0.0), (step_peak - current) / (1024 * 1024))
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        """Kết quả {bước: {'seconds', 'calls', 'peak_mb', 'growth_mb'}}"""
+        result = super().as_dict()
+        for name, step in self.steps.items():
+            result[name]['peak_mb'] = round(step.get('peak_mb', 0.0), 2)
+            result[name]['growth_mb'] = round(step.get('growth_mb', 0.0), 2)
+        return result
+
+
+def get_peak_rss_mb() -> Optional[float]:
+    """
+    Peak RSS của process hiện tại (MB)
+
+    Returns:
+        Optional[float]: Peak RSS hoặc None nếu không đo được trên nền tảng này
+    """
+    if RESOURCE_AVAILABLE:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux trả KB, macOS trả bytes
+        divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        return round(peak / divisor, 1)
+
+    try:
+        import psutil
+        memory_info = psutil.Process().memory_info()
+        peak = getattr(memory_info, 'peak_wset', None) or memory_info.rss
+        return round(peak / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+def get_git_commit() -> Optional[str]:
+    """Commit hiện tại của repo (None nếu không phải git repo)"""
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, timeout=10)
+        return output.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def get_environment_info() -> Dict[str, Any]:
+    """Thông tin môi trường chạy benchmark"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def load_history(history_file: str) -> List[Dict[str, Any]]:
+    """Đọc file lịch sử (danh sách các lần chạy)"""
+    if not os.path.exists(history_file):
+        return []
+    try:
+        with open(history_file, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+        return history if isinstance(history, list) else []
+    except Exception as e:
+        print(f"⚠️  Không đọc được lịch sử benchmark: {e}")
+        return []
+
+
+def append_history(history_file: str, entry: Dict[str, Any]) -> None:
+    """
+    Thêm một lần chạy vào file lịch sử (ghi atomic)
+
+    Args:
+        history_file (str): Đường dẫn file JSON
+        entry (Dict): Kết quả lần chạy
+    """
+    history = load_history(history_file)
+    history.append(entry)
+
+    os.makedirs(os.path.dirname(os.path.abspath(history_file)), exist_ok=True)
+    tmp_file = history_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(history, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, history_file)
+
+
+def new_history_entry(benchmark: str, config: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Tạo entry lịch sử chuẩn cho một lần chạy benchmark"""
+    return {
+        'benchmark': benchmark,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': get_git_commit(),
+        'environment': get_environment_info(),
+        'config': config,
+        'results': results
+    }
+
+
+def find_previous_result(history: List[Dict[str, Any]], benchmark: str,
+                         match: Callable[[Dict[str, Any]], bool]) -> Optional[Dict[str, Any]]:
+    """
+    Tìm kết quả gần nhất trong lịch sử thỏa điều kiện (để so sánh hồi quy)
+
+    Args:
+        history (List[Dict]): Lịch sử đã đọc
+        benchmark (str): Tên benchmark
+        match (Callable): Hàm chọn result cùng cấu hình
+
+    Returns:
+        Optional[Dict]: Result gần nhất hoặc None
+    """
+    for entry in reversed(history):
+        if entry.get('benchmark') != benchmark:
+            continue
+        for result in entry.get('results', []):
+            if match(result):
+                return dict(result, git_commit=entry.get('git_commit'))
+    return None
+
+
+def format_delta(current: float, previous: Optional[float]) -> str:
+    """Chuỗi chênh lệch phần trăm so với lần trước (vd '+12.5%')"""
+    if previous in (None, 0) or current is None:
+        return ''
+    return f"{(current - previous) / previous * 100:+.1f}%"
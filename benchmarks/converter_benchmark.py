@@ -0,0 +1,261 @@
+"""
+Converter Benchmark
+Tạo unified workflow JSON với kích thước tùy chọn và đo riêng từng bước của
+JSONToExcelTemplateConverter (load_json_data, extract_*_data, fill_*_sheet,
+apply_border_to_sheet, workbook.save) kèm peak bộ nhớ (tracemalloc)
+
+Cách chạy:
+    python -m benchmarks.converter_benchmark --sizes 1000,10000,50000
+
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+from datetime import datetime
+from typing import Any, Dict, List
+
+from benchmarks.common import (
+    PROJECT_ROOT, RESULTS_DIR, StepTimer, TracemallocStepTimer, load_history, append_history,
+    new_history_entry, find_previous_result, format_delta
+)
+
+BENCHMARK_NAME = 'converter'
+DEFAULT_HISTORY_FILE = os.path.join(RESULTS_DIR, 'converter_history.json')
+DEFAULT_SIZES = [1000, 10000, 50000]
+STAGES = [
+    'load_json_data', 'extract_teachers_data', 'extract_students_data', 'copy_template',
+    'load_workbook', 'update_admin_sheet', 'fill_teachers_sheet', 'fill_students_sheet',
+    'apply_border_to_sheet', 'workbook.save'
+]
+
+
+def build_workflow_json(output_path: str, students: int, teachers: int, seed: int = 0) -> str:
+    """
+    Tạo file unified workflow JSON (cấu trúc giống _save_unified_workflow_data)
+
+    Args:
+        output_path (str): Đường dẫn file JSON
+        students (int): Số học sinh
+        teachers (int): Số giáo viên
+        seed (int): Seed sinh dữ liệu
+
+    Returns:
+        str: Đường dẫn file đã tạo
+    """
+    from utils.onluyen_simulator import SyntheticSchool, DEFAULT_SCHOOL_YEAR
+
+    school = SyntheticSchool(f"bench{students}@benchmark.onluyen.vn", 'benchmark',
+                             teachers=teachers, students=students, seed=seed)
+    teachers_list = school.get_teachers(DEFAULT_SCHOOL_YEAR)
+    students_list = school.get_students(DEFAULT_SCHOOL_YEAR)
+
+    def role_info(teacher):
+        info = teacher['teacherInfo']
+        return {'name': teacher['fullName'], 'displayName': info['displayName'],
+                'userName': info['userName'], 'pwd': info['pwd'], 'roles': teacher['roles']}
+
+    unified_data = {
+        'metadata': {
+            'workflow_type': 'case_1',
+            'timestamp': datetime.now().strftime('%Y%m%d_%H%M%S'),
+            'processed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'version': '1.0'
+        },
+        'school_info': {
+            'name': school.name,
+            'admin_email': school.account,
+            'drive_link': None,
+            'admin_password': 'benchmark'
+        },
+        'ht_hp_info': {
+            'ht': [role_info(teacher) for teacher in teachers_list if 'HT' in teacher['roles']],
+            'hp': [role_info(teacher) for teacher in teachers_list if 'HP' in teacher['roles']]
+        },
+        'teachers': {
+            'success': True,
+            'total_count': len(teachers_list),
+            'retrieved_count': len(teachers_list),
+            'data': teachers_list
+        },
+        'students': {
+            'success': True,
+            'total_count': len(students_list),
+            'retrieved_count': len(students_list),
+            'data': students_list,
+            'system_has_students': bool(students_list)
+        }
+    }
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(unified_data, f, ensure_ascii=False, indent=2)
+    return output_path
+
+
+def run_stages(json_path: str, template_path: str, output_path: str, timer: StepTimer) -> bool:
+    """
+    Chạy các bước của converter.convert() với timer đo riêng từng bước
+
+    Trình tự giống convert()/create_excel_output(); fill_*_sheet bao gồm
+    thời gian apply_border_to_sheet của sheet tương ứng.
+
+    Returns:
+        bool: True nếu tạo file thành công
+    """
+    from openpyxl import load_workbook
+    from converters import JSONToExcelTemplateConverter
+
+    converter = JSONToExcelTemplateConverter(json_path, template_path)
+    timer.wrap(converter, 'apply_border_to_sheet', 'apply_border_to_sheet')
+
+    try:
+        with timer.step('load_json_data'):
+            if not converter.load_json_data():
+                return False
+        with timer.step('extract_teachers_data'):
+            converter.extract_teachers_data()
+        with timer.step('extract_students_data'):
+            converter.extract_students_data()
+        with timer.step('copy_template'):
+            converter.copy_template(output_path)
+        with timer.step('load_workbook'):
+            workbook = load_workbook(output_path)
+        with timer.step('update_admin_sheet'):
+            converter.update_admin_sheet(workbook)
+        with timer.step('fill_teachers_sheet'):
+            converter.fill_teachers_sheet(workbook)
+        with timer.step('fill_students_sheet'):
+            converter.fill_students_sheet(workbook)
+        with timer.step('workbook.save'):
+            workbook.save(output_path)
+            workbook.close()
+        return True
+    finally:
+        timer.restore()
+
+
+def run_one(students: int, teachers: int, args, work_dir: str, template_path: str) -> Dict[str, Any]:
+    """Đo một kích thước: lượt thời gian (không tracemalloc) và lượt bộ nhớ"""
+    json_path = build_workflow_json(os.path.join(work_dir, f"unified_workflow_{students}.json"),
+                                    students, teachers, args.seed)
+    output_path = os.path.join(work_dir, f"Export_{students}.xlsx")
+    log_target = sys.stderr if args.verbose else open(os.devnull, 'w', encoding='utf-8')
+
+    try:
+        with redirect_stdout(log_target):
+            timer = StepTimer()
+            success = run_stages(json_path, template_path, output_path, timer)
+
+            memory = {}
+            if success and args.memory:
+                memory_timer = TracemallocStepTimer()
+                memory_timer.start()
+                try:
+                    run_stages(json_path, template_path, output_path, memory_timer)
+                finally:
+                    memory_timer.stop()
+                memory = {name: {'peak_mb': step['peak_mb'], 'growth_mb': step['growth_mb']}
+                          for name, step in memory_timer.as_dict().items()}
+    finally:
+        if log_target is not sys.stderr:
+            log_target.close()
+
+    steps = timer.as_dict()
+    for name, values in memory.items():
+        steps.setdefault(name, {}).update(values)
+
+    top_level = [name for name in STAGES if name != 'apply_border_to_sheet']
+    return {
+        'students': students,
+        'teachers': teachers,
+        'success': success,
+        'json_size_mb': round(os.path.getsize(json_path) / (1024 * 1024), 2),
+        'excel_size_mb': round(os.path.getsize(output_path) / (1024 * 1024), 2) if success else None,
+        'total_seconds': round(sum(steps.get(name, {}).get('seconds', 0) for name in top_level), 4),
+        'peak_mb': max((step.get('peak_mb', 0) for step in steps.values()), default=None) if memory else None,
+        'steps': steps
+    }
+
+
+def print_result(result: Dict[str, Any], previous: Dict[str, Any] = None) -> None:
+    """In thời gian/bộ nhớ từng bước kèm chênh lệch so với lần trước"""
+    status = "✅" if result['success'] else "❌"
+    previous_steps = (previous or {}).get('steps', {})
+    print(f"\n{status} {result['students']:,} HS / {result['teachers']:,} GV "
+          f"(JSON {result['json_size_mb']} MB → Excel {result['excel_size_mb']} MB)")
+    print(f"   ⏱️  Tổng: {result['total_seconds']:.3f}s "
+          f"{format_delta(result['total_seconds'], (previous or {}).get('total_seconds'))}")
+
+    for name in STAGES:
+        step = result['steps'].get(name)
+        if not step:
+            continue
+        memory = f"peak {step['peak_mb']:>8.1f} MB (+{step['growth_mb']:.1f})" if 'peak_mb' in step else ''
+        indent = '  ' if name == 'apply_border_to_sheet' else ''
+        print(f"      - {indent}{name:<24} {step.get('seconds', 0):>8.3f}s "
+              f"{format_delta(step.get('seconds'), previous_steps.get(name, {}).get('seconds')):>8}  {memory}")
+
+
+def run_benchmark(args) -> List[Dict[str, Any]]:
+    sys.path.insert(0, PROJECT_ROOT)
+    from benchmarks.e2e_benchmark import ensure_template
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    work_dir = tempfile.mkdtemp(prefix='schoolprocess_converter_bench_')
+    template_path = args.template or os.path.join(work_dir, 'Template_Export.xlsx')
+    if not args.template:
+        ensure_template(template_path)
+
+    history = load_history(args.history)
+    results = []
+    print(f"🏁 CONVERTER BENCHMARK - sizes: {sizes} (memory: {'on' if args.memory else 'off'})")
+
+    try:
+        for students in sizes:
+            teachers = args.teachers or max(20, students // 25)
+            result = run_one(students, teachers, args, work_dir, template_path)
+            previous = find_previous_result(history, BENCHMARK_NAME,
+                                            lambda r: r.get('students') == students and r.get('teachers') == teachers)
+            print_result(result, previous)
+            results.append(result)
+    finally:
+        if not args.keep_files:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if not args.no_history:
+        config = {'sizes': sizes, 'teachers': args.teachers, 'seed': args.seed, 'memory': args.memory,
+                  'template': 'custom' if args.template else 'default'}
+        append_history(args.history, new_history_entry(BENCHMARK_NAME, config, results))
+        print(f"\n💾 Đã ghi kết quả vào {args.history}")
+
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='JSON → Excel converter benchmark')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES), help='Số học sinh')
+    parser.add_argument('--teachers', type=int, default=None, help='Số giáo viên (mặc định ~HS/25)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--template', default=None, help='Template Excel (mặc định template của repo)')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='Bỏ lượt đo tracemalloc')
+    parser.add_argument('--history', default=DEFAULT_HISTORY_FILE)
+    parser.add_argument('--no-history', action='store_true')
+    parser.add_argument('--keep-files', action='store_true')
+    parser.add_argument('--verbose', action='store_true', help='Hiện log của converter')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_benchmark(args)
+    return 0 if all(result['success'] for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
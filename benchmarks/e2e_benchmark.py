@@ -0,0 +1,370 @@
+"""
+End-to-End Throughput Benchmark
+Chạy Case 1 và Case 2 với OnLuyen simulator và fake Google backend,
+đo thời gian từng bước, peak RSS, requests/s và ghi vào file lịch sử JSON
+
+Cách chạy:
+    python -m benchmarks.e2e_benchmark --sizes 500,5000,50000 --cases 1,2
+
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+from typing import Any, Dict, List
+
+from benchmarks.common import (
+    PROJECT_ROOT, RESULTS_DIR, StepTimer, get_peak_rss_mb, load_history, append_history,
+    new_history_entry, find_previous_result, format_delta
+)
+
+BENCHMARK_NAME = 'e2e'
+DEFAULT_HISTORY_FILE = os.path.join(RESULTS_DIR, 'e2e_history.json')
+DEFAULT_SIZES = [500, 5000, 50000]
+XLSX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Các bước được đo trong worker: (owner, method, tên bước)
+APP_STEPS = [
+    ('_get_authenticated_client', 'authenticate'),
+    ('_save_unified_workflow_data', 'save_json'),
+    ('_download_import_file', 'download_import'),
+    ('_compare_and_filter_data', 'compare'),
+    ('_match_with_enhanced_logic', 'match'),
+    ('_convert_json_to_excel', 'convert_excel'),
+]
+CLIENT_STEPS = [
+    ('login', 'login'),
+    ('get_teachers', 'fetch_teachers'),
+    ('get_students', 'fetch_students'),
+]
+
+
+def school_account(students: int) -> str:
+    """Tài khoản admin của trường benchmark theo quy mô"""
+    return f"bench{students}@benchmark.onluyen.vn"
+
+
+def default_teachers(students: int) -> int:
+    """Số giáo viên tương ứng quy mô học sinh (~1 GV / 25 HS)"""
+    return max(20, students // 25)
+
+
+# ----------------------------------------------------------------------
+# Chuẩn bị dữ liệu (process điều phối)
+# ----------------------------------------------------------------------
+
+def build_import_file(school, year: int, output_path: str, import_ratio: float = 0.9) -> str:
+    """
+    Tạo file import_*.xlsx (sheet Teachers/Students) từ dữ liệu simulator cho Case 2
+
+    Args:
+        school (SyntheticSchool): Trường tổng hợp
+        year (int): Năm học
+        output_path (str): Đường dẫn file xlsx
+        import_ratio (float): Tỷ lệ GV/HS có trong file import
+
+    Returns:
+        str: Đường dẫn file đã tạo
+    """
+    import pandas as pd
+
+    def pick(records):
+        step = max(1, round(1 / import_ratio)) if import_ratio < 1 else 1
+        return [record for index, record in enumerate(records) if step == 1 or index % step != 0]
+
+    teachers = pick(school.get_teachers(year))
+    students = pick(school.get_students(year))
+
+    teachers_df = pd.DataFrame([{
+        'STT': index + 1,
+        'Họ tên': teacher['fullName'],
+        'Ngày sinh': teacher['teacherInfo']['userBirthday'],
+        'Tên đăng nhập': teacher['account']
+    } for index, teacher in enumerate(teachers)])
+
+    students_df = pd.DataFrame([{
+        'STT': index + 1,
+        'Họ và tên': student['fullName'],
+        'Ngày sinh': student['userInfo']['userBirthday'],
+        'Lớp': student['groupClass'][0]['className']
+    } for index, student in enumerate(students)])
+
+    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+        teachers_df.to_excel(writer, sheet_name='Teachers', index=False)
+        students_df.to_excel(writer, sheet_name='Students', index=False)
+
+    return output_path
+
+
+def ensure_template(template_path: str) -> None:
+    """Copy template export của repo, hoặc tạo template tối thiểu (ADMIN, GIAO-VIEN, HOC-SINH)"""
+    if os.path.exists(template_path):
+        return
+
+    os.makedirs(os.path.dirname(template_path), exist_ok=True)
+    repo_template = os.path.join(PROJECT_ROOT, 'data', 'temp', 'Template_Export.xlsx')
+    if os.path.exists(repo_template):
+        shutil.copy2(repo_template, template_path)
+        return
+
+    from openpyxl import Workbook
+    workbook = Workbook()
+    workbook.active.title = 'ADMIN'
+    workbook.create_sheet('GIAO-VIEN')
+    workbook.create_sheet('HOC-SINH')
+    workbook.save(template_path)
+
+
+# ----------------------------------------------------------------------
+# Worker (process con, một lần chạy case/size)
+# ----------------------------------------------------------------------
+
+def run_worker(args) -> Dict[str, Any]:
+    """
+    Chạy một workflow trong process riêng (peak RSS đo được là của riêng lần chạy này)
+
+    Returns:
+        Dict: Kết quả đo
+    """
+    os.environ['GOOGLE_API_BACKEND'] = 'fake'
+    sys.path.insert(0, PROJECT_ROOT)
+
+    from config.fake_google import get_fake_google_backend
+
+    backend = get_fake_google_backend()
+    folder_id = backend.add_folder(f"Benchmark {args.students}")
+    if args.import_file:
+        with open(args.import_file, 'rb') as f:
+            backend.add_file(os.path.basename(args.import_file), f.read(), [folder_id], XLSX_MIME_TYPE)
+
+    ensure_template(os.path.join('data', 'temp', 'Template_Export.xlsx'))
+
+    from app import SchoolProcessApp
+    from config.onluyen_api import OnLuyenAPIClient
+
+    school_data = {
+        'Tên trường': f"Trường benchmark {args.students}",
+        'Admin': args.account,
+        'Mật khẩu': args.password,
+        'Link driver dữ liệu': f"https://drive.google.com/drive/folders/{folder_id}"
+    }
+
+    timer = StepTimer()
+    log_target = sys.stderr if args.verbose else open(os.devnull, 'w', encoding='utf-8')
+    results = None
+    upload_result = None
+
+    try:
+        with redirect_stdout(log_target):
+            app = SchoolProcessApp()
+            for attr, step_name in APP_STEPS:
+                timer.wrap(app, attr, step_name)
+            for attr, step_name in CLIENT_STEPS:
+                timer.wrap(OnLuyenAPIClient, attr, step_name)
+
+            start = time.perf_counter()
+            if args.case == 1:
+                results = app._execute_workflow_case_1(school_data, ui_mode=True)
+            else:
+                results = app._execute_workflow_case_2(school_data, ui_mode=True)
+
+            excel_path = (results or {}).get('excel_file_path')
+            if excel_path and os.path.exists(excel_path):
+                with timer.step('upload'):
+                    upload_result = app._upload_files_to_drive_oauth([excel_path], school_data['Link driver dữ liệu'])
+            wall_time = time.perf_counter() - start
+    finally:
+        timer.restore()
+        if log_target is not sys.stderr:
+            log_target.close()
+
+    google_stats = backend.get_stats()
+    data_summary = (results or {}).get('data_summary', {})
+
+    return {
+        'case': args.case,
+        'students': args.students,
+        'teachers': args.teachers,
+        'success': bool(results and results.get('excel_converted')),
+        'uploaded': bool(upload_result and upload_result.get('success')),
+        'wall_time': round(wall_time, 4),
+        'steps': timer.as_dict(),
+        'peak_rss_mb': get_peak_rss_mb(),
+        'google_requests': google_stats['requests'],
+        'google_by_operation': google_stats['by_operation'],
+        'students_retrieved': (data_summary.get('students') or {}).get('retrieved'),
+        'teachers_retrieved': (data_summary.get('teachers') or {}).get('retrieved')
+    }
+
+
+# ----------------------------------------------------------------------
+# Điều phối
+# ----------------------------------------------------------------------
+
+def run_one(simulator, case: int, students: int, teachers: int, args, work_root: str) -> Dict[str, Any]:
+    """Chạy một (case, size) trong process con với thư mục làm việc riêng"""
+    account = school_account(students)
+    school = simulator.add_school(account, password='benchmark', teachers=teachers, students=students)
+
+    work_dir = tempfile.mkdtemp(prefix=f"case{case}_{students}_", dir=work_root)
+    result_file = os.path.join(work_dir, 'result.json')
+
+    command = [sys.executable, '-m', 'benchmarks.e2e_benchmark', '--worker',
+               '--case', str(case), '--students', str(students), '--teachers', str(teachers),
+               '--account', account, '--password', 'benchmark', '--result-file', result_file]
+    if case == 2:
+        import_file = build_import_file(school, simulator.school_year,
+                                        os.path.join(work_dir, f"import_benchmark_{students}.xlsx"),
+                                        args.import_ratio)
+        command += ['--import-file', import_file]
+    if args.verbose:
+        command.append('--verbose')
+
+    env = dict(os.environ)
+    env.update(simulator.env())
+    env['GOOGLE_API_BACKEND'] = 'fake'
+    env['GOOGLE_FAKE_LATENCY_MS'] = str(args.google_latency_ms)
+    env['PYTHONPATH'] = PROJECT_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+
+    requests_before = simulator.get_stats()['requests']
+    completed = subprocess.run(command, cwd=work_dir, env=env, timeout=args.timeout)
+    onluyen_requests = simulator.get_stats()['requests'] - requests_before
+
+    if completed.returncode != 0 or not os.path.exists(result_file):
+        return {'case': case, 'students': students, 'teachers': teachers, 'success': False,
+                'error': f"worker exit code {completed.returncode}"}
+
+    with open(result_file, 'r', encoding='utf-8') as f:
+        result = json.load(f)
+
+    total_requests = onluyen_requests + result['google_requests']
+    result['onluyen_requests'] = onluyen_requests
+    result['requests_per_sec'] = round(total_requests / result['wall_time'], 2) if result['wall_time'] else None
+    return result
+
+
+def print_result(result: Dict[str, Any], previous: Dict[str, Any] = None) -> None:
+    """In kết quả một lần chạy kèm chênh lệch so với lần trước"""
+    status = "✅" if result.get('success') else "❌"
+    print(f"\n{status} Case {result['case']} - {result['students']:,} HS / {result['teachers']:,} GV")
+
+    if result.get('error'):
+        print(f"   ❌ {result['error']}")
+        return
+
+    previous_steps = (previous or {}).get('steps', {})
+    print(f"   ⏱️  Tổng: {result['wall_time']:.2f}s "
+          f"{format_delta(result['wall_time'], (previous or {}).get('wall_time'))}")
+    for step_name, step in result['steps'].items():
+        previous_seconds = previous_steps.get(step_name, {}).get('seconds')
+        print(f"      - {step_name:<16} {step['seconds']:>9.3f}s  x{step['calls']:<4} "
+              f"{format_delta(step['seconds'], previous_seconds)}")
+    print(f"   🧠 Peak RSS: {result['peak_rss_mb']} MB "
+          f"{format_delta(result['peak_rss_mb'], (previous or {}).get('peak_rss_mb'))}")
+    print(f"   🌐 Requests: OnLuyen {result['onluyen_requests']}, Google {result['google_requests']} "
+          f"({result['requests_per_sec']} req/s)")
+    if previous:
+        print(f"   📎 So với commit {previous.get('git_commit') or '?'}")
+
+
+def run_benchmark(args) -> List[Dict[str, Any]]:
+    """Chạy toàn bộ ma trận case x size và ghi lịch sử"""
+    sys.path.insert(0, PROJECT_ROOT)
+    from utils.onluyen_simulator import OnLuyenSimulator
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    cases = [int(case) for case in args.cases.split(',') if case.strip()]
+
+    simulator = OnLuyenSimulator(seed=args.seed, latency=args.onluyen_latency_ms / 1000,
+                                 compression=args.compression)
+    simulator.start()
+    work_root = tempfile.mkdtemp(prefix='schoolprocess_bench_')
+    history = load_history(args.history)
+    config = {
+        'sizes': sizes,
+        'cases': cases,
+        'seed': args.seed,
+        'onluyen_latency_ms': args.onluyen_latency_ms,
+        'google_latency_ms': args.google_latency_ms,
+        'compression': args.compression,
+        'import_ratio': args.import_ratio
+    }
+
+    print(f"🏁 E2E BENCHMARK - simulator {simulator.base_url}")
+    print(f"   Sizes: {sizes}, Cases: {cases}")
+
+    results = []
+    try:
+        for students in sizes:
+            teachers = default_teachers(students)
+            for case in cases:
+                result = run_one(simulator, case, students, teachers, args, work_root)
+                previous = find_previous_result(
+                    history, BENCHMARK_NAME,
+                    lambda r: r.get('case') == case and r.get('students') == students and r.get('success')
+                )
+                print_result(result, previous)
+                results.append(result)
+    finally:
+        simulator.stop()
+        if not args.keep_files:
+            shutil.rmtree(work_root, ignore_errors=True)
+
+    if not args.no_history:
+        append_history(args.history, new_history_entry(BENCHMARK_NAME, config, results))
+        print(f"\n💾 Đã ghi kết quả vào {args.history}")
+
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='End-to-end throughput benchmark (Case 1 / Case 2)')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='Số học sinh mỗi trường, phân cách bằng dấu phẩy')
+    parser.add_argument('--cases', default='1,2', help='Case cần chạy (1, 2)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--onluyen-latency-ms', type=float, default=0)
+    parser.add_argument('--google-latency-ms', type=float, default=0)
+    parser.add_argument('--compression', choices=['auto', 'br', 'gzip', 'none'], default='auto')
+    parser.add_argument('--import-ratio', type=float, default=0.9, help='Tỷ lệ GV/HS có trong file import (Case 2)')
+    parser.add_argument('--history', default=DEFAULT_HISTORY_FILE, help='File lịch sử JSON')
+    parser.add_argument('--no-history', action='store_true', help='Không ghi lịch sử')
+    parser.add_argument('--keep-files', action='store_true', help='Giữ thư mục làm việc tạm')
+    parser.add_argument('--timeout', type=int, default=3600, help='Timeout mỗi lần chạy (giây)')
+    parser.add_argument('--verbose', action='store_true', help='Hiện log của workflow')
+
+    # Tham số nội bộ cho process con
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--case', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--students', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--teachers', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--account', help=argparse.SUPPRESS)
+    parser.add_argument('--password', help=argparse.SUPPRESS)
+    parser.add_argument('--import-file', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.worker:
+        result = run_worker(args)
+        with open(args.result_file, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False)
+        return 0
+
+    results = run_benchmark(args)
+    return 0 if all(result.get('success') for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""
+Matching Micro-Benchmark
+Đo tốc độ _normalize_name, _normalize_date, _standardize_import_date_formats và
+_match_with_enhanced_logic trên corpus 1k/10k/100k dòng, đồng thời so sánh output
+của engine mới với implementation hiện tại (phải khớp tuyệt đối)
+
+Cách chạy:
+    python -m benchmarks.matching_benchmark --sizes 1000,10000,100000
+    python -m benchmarks.matching_benchmark --engine my_module:FastMatchingEngine
+
+Engine là class khởi tạo không tham số, có các method:
+    normalize_name(name), normalize_date(date_str, detected_format=None),
+    standardize_import_date_formats(df), is_gvcn_name(name),
+    match(onluyen_records, import_data, record_type) -> (matched_records, matched_count, fuzzy_report)
+
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import os
+import sys
+import time
+import hashlib
+import argparse
+import importlib
+from contextlib import redirect_stdout
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.common import (
+    PROJECT_ROOT, RESULTS_DIR, load_history, append_history, new_history_entry,
+    find_previous_result, format_delta
+)
+
+BENCHMARK_NAME = 'matching'
+DEFAULT_HISTORY_FILE = os.path.join(RESULTS_DIR, 'matching_history.json')
+DEFAULT_SIZES = [1000, 10000, 100000]
+OPERATIONS = ['normalize_name', 'normalize_date', 'standardize_dates', 'parse_import', 'match']
+
+
+class LegacyMatchingEngine:
+    """Implementation hiện tại trong SchoolProcessApp (baseline)"""
+
+    name = 'legacy'
+
+    def __init__(self):
+        from app import SchoolProcessApp
+        # Không gọi __init__ để tránh tạo thư mục/đọc config - các method matching không dùng tới
+        self.app = SchoolProcessApp.__new__(SchoolProcessApp)
+
+    def normalize_name(self, name):
+        return self.app._normalize_name(name)
+
+    def normalize_date(self, date_str, detected_format=None):
+        return self.app._normalize_date(date_str, detected_format)
+
+    def standardize_import_date_formats(self, df):
+        return self.app._standardize_import_date_formats(df)
+
+    def is_gvcn_name(self, name):
+        return self.app._is_gvcn_name_in_import(name)
+
+    def match(self, onluyen_records, import_data, record_type):
+        return self.app._match_with_enhanced_logic(onluyen_records, import_data, record_type)
+
+
+def load_engine(spec: str):
+    """
+    Khởi tạo engine từ 'legacy' hoặc 'module:ClassName'
+
+    Returns:
+        object: Engine instance
+    """
+    if spec == 'legacy':
+        return LegacyMatchingEngine()
+
+    module_name, _, attr = spec.partition(':')
+    if not attr:
+        raise ValueError(f"Engine phải có dạng module:ClassName, nhận được '{spec}'")
+    engine = getattr(importlib.import_module(module_name), attr)()
+    if not getattr(engine, 'name', None):
+        engine.name = spec
+    return engine
+
+
+def parse_import(engine, df, corpus: Dict[str, Any]) -> List[Dict[str, str]]:
+    """
+    Parse DataFrame import thành import_data giống _compare_and_filter_data
+
+    Returns:
+        List[Dict]: Danh sách {'name', 'birthdate', 'username', 'raw_name', 'raw_birthdate'}
+    """
+    import pandas as pd
+
+    from benchmarks.matching_corpus import USERNAME_COLUMN
+
+    name_col = corpus['name_column']
+    birth_col = corpus['birth_column']
+    is_teachers = corpus['record_type'] == 'teachers'
+    import_data = []
+
+    for name_value, birth_value, username_value in zip(
+        df[name_col], df[birth_col], df[USERNAME_COLUMN] if is_teachers else [None] * len(df)
+    ):
+        name = str(name_value).strip() if pd.notna(name_value) else ""
+        birth = str(birth_value).strip() if pd.notna(birth_value) else ""
+        username = str(username_value).strip() if username_value is not None and pd.notna(username_value) else ""
+
+        if not name:
+            continue
+        if is_teachers:
+            if engine.is_gvcn_name(name):
+                continue
+        elif not birth:
+            continue
+
+        import_data.append({
+            'name': engine.normalize_name(name),
+            'birthdate': engine.normalize_date(birth) if birth else "",
+            'username': username.lower(),
+            'raw_name': name,
+            'raw_birthdate': birth
+        })
+
+    return import_data
+
+
+def record_id(record: Dict[str, Any]) -> str:
+    return str(record.get('studentId') or record.get('teacherId') or record.get('account'))
+
+
+def fingerprint(values: List[Any]) -> str:
+    digest = hashlib.sha1()
+    for value in values:
+        digest.update(str(value).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()[:16]
+
+
+def run_engine(engine, corpus: Dict[str, Any], repeat: int) -> Tuple[Dict[str, float], Dict[str, List[Any]]]:
+    """
+    Chạy các thao tác của một engine trên corpus
+
+    Returns:
+        Tuple: ({thao tác: giây (best of repeat)}, {thao tác: output để so sánh})
+    """
+    from benchmarks.matching_corpus import build_import_dataframe
+
+    records = corpus['onluyen_records']
+    raw_names = [row[corpus['name_column']] for row in corpus['import_rows']] + \
+                [record['fullName'] for record in records]
+    raw_dates = [row[corpus['birth_column']] for row in corpus['import_rows'] if row[corpus['birth_column']]] + \
+                [record['birthDate'] for record in records]
+    base_df = build_import_dataframe(corpus)
+
+    timings: Dict[str, float] = {}
+    outputs: Dict[str, List[Any]] = {}
+
+    def measure(operation: str, func: Callable[[], Any]) -> Any:
+        best = None
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[operation] = round(best, 4)
+        return result
+
+    outputs['normalize_name'] = measure('normalize_name', lambda: [engine.normalize_name(name) for name in raw_names])
+    outputs['normalize_date'] = measure('normalize_date', lambda: [engine.normalize_date(date) for date in raw_dates])
+
+    standardized = measure('standardize_dates', lambda: engine.standardize_import_date_formats(base_df.copy()))
+    outputs['standardize_dates'] = [str(value) for value in standardized[corpus['birth_column']]]
+
+    import_data = measure('parse_import', lambda: parse_import(engine, standardized, corpus))
+    outputs['parse_import'] = [(item['name'], item['birthdate'], item['username']) for item in import_data]
+
+    matched_records, matched_count, fuzzy_report = measure(
+        'match', lambda: engine.match(records, import_data, corpus['record_type'])
+    )
+    outputs['match'] = [record_id(record) for record in matched_records]
+    outputs['matched_count'] = [matched_count]
+    outputs['fuzzy'] = [(item['account'], item['import_name']) for item in fuzzy_report]
+
+    return timings, outputs
+
+
+def compare_outputs(baseline: Dict[str, List[Any]], candidate: Dict[str, List[Any]]) -> Dict[str, Any]:
+    """
+    So sánh output của engine với baseline
+
+    Returns:
+        Dict: {thao tác: {'identical', 'differences'}}
+    """
+    comparison = {}
+    for operation, expected in baseline.items():
+        actual = candidate.get(operation, [])
+        differences = sum(1 for left, right in zip(expected, actual) if left != right)
+        differences += abs(len(expected) - len(actual))
+        comparison[operation] = {'identical': differences == 0, 'differences': differences}
+
+    expected_ids = set(baseline['match'])
+    actual_ids = set(candidate.get('match', []))
+    comparison['match']['missing'] = sorted(expected_ids - actual_ids)[:20]
+    comparison['match']['extra'] = sorted(actual_ids - expected_ids)[:20]
+    return comparison
+
+
+def run_benchmark(args) -> List[Dict[str, Any]]:
+    """Chạy ma trận size x loại dữ liệu x engine"""
+    sys.path.insert(0, PROJECT_ROOT)
+    from benchmarks.matching_corpus import generate_corpus
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    record_types = [value.strip() for value in args.types.split(',') if value.strip()]
+    engines = [load_engine(spec) for spec in ['legacy'] + (args.engine or [])]
+    history = load_history(args.history)
+    log_target = sys.stderr if args.verbose else open(os.devnull, 'w', encoding='utf-8')
+    results = []
+
+    print(f"🏁 MATCHING BENCHMARK - engines: {[engine.name for engine in engines]}")
+
+    try:
+        for size in sizes:
+            for record_type in record_types:
+                corpus = generate_corpus(size, record_type, seed=args.seed, date_style=args.date_style,
+                                         duplicate_rate=args.duplicate_rate, noise_rate=args.noise_rate,
+                                         gvcn_rows=args.gvcn_rows if record_type == 'teachers' else 0)
+                print(f"\n📦 {record_type}: {len(corpus['onluyen_records']):,} OnLuyen / "
+                      f"{len(corpus['import_rows']):,} import ({args.date_style})")
+
+                baseline_outputs = None
+                for engine in engines:
+                    with redirect_stdout(log_target):
+                        timings, outputs = run_engine(engine, corpus, args.repeat)
+
+                    result = {
+                        'engine': engine.name,
+                        'record_type': record_type,
+                        'rows': size,
+                        'date_style': args.date_style,
+                        'timings': timings,
+                        'matched_count': outputs['matched_count'][0],
+                        'fuzzy_count': len(outputs['fuzzy']),
+                        'fingerprints': {operation: fingerprint(values) for operation, values in outputs.items()}
+                    }
+                    if baseline_outputs is None:
+                        baseline_outputs = outputs
+                    else:
+                        result['comparison'] = compare_outputs(baseline_outputs, outputs)
+                        result['identical'] = all(item['identical'] for item in result['comparison'].values())
+
+                    previous = find_previous_result(
+                        history, BENCHMARK_NAME,
+                        lambda r: (r.get('engine'), r.get('record_type'), r.get('rows'), r.get('date_style')) ==
+                                  (engine.name, record_type, size, args.date_style)
+                    )
+                    print_result(result, previous)
+                    results.append(result)
+    finally:
+        if log_target is not sys.stderr:
+            log_target.close()
+
+    if not args.no_history:
+        config = {
+            'sizes': sizes,
+            'types': record_types,
+            'seed': args.seed,
+            'date_style': args.date_style,
+            'duplicate_rate': args.duplicate_rate,
+            'noise_rate': args.noise_rate,
+            'gvcn_rows': args.gvcn_rows,
+            'repeat': args.repeat
+        }
+        append_history(args.history, new_history_entry(BENCHMARK_NAME, config, results))
+        print(f"\n💾 Đã ghi kết quả vào {args.history}")
+
+    return results
+
+
+def print_result(result: Dict[str, Any], previous: Dict[str, Any] = None) -> None:
+    """In thời gian từng thao tác và kết quả so khớp output"""
+    previous_timings = (previous or {}).get('timings', {})
+    print(f"   ⚙️  {result['engine']} - khớp {result['matched_count']:,}, gần đúng {result.get('fuzzy_count', 0):,}")
+    for operation in OPERATIONS:
+        seconds = result['timings'].get(operation)
+        if seconds is None:
+            continue
+        print(f"      - {operation:<18} {seconds:>9.4f}s {format_delta(seconds, previous_timings.get(operation))}")
+
+    if 'comparison' in result:
+        if result['identical']:
+            print("      ✅ Output giống hệt baseline")
+        else:
+            for operation, item in result['comparison'].items():
+                if not item['identical']:
+                    print(f"      ❌ {operation}: {item['differences']} khác biệt")
+            match_diff = result['comparison']['match']
+            if match_diff['missing'] or match_diff['extra']:
+                print(f"         Thiếu: {match_diff['missing'][:5]} | Thừa: {match_diff['extra'][:5]}")
+
+
+def parse_args(argv=None):
+    from benchmarks.matching_corpus import DATE_STYLES
+
+    parser = argparse.ArgumentParser(description='Matching micro-benchmark')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES))
+    parser.add_argument('--types', default='students,teachers', help='students, teachers')
+    parser.add_argument('--engine', action='append', help='Engine so sánh dạng module:ClassName (lặp lại được)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--date-style', choices=DATE_STYLES, default='mixed')
+    parser.add_argument('--duplicate-rate', type=float, default=0.05)
+    parser.add_argument('--noise-rate', type=float, default=0.15)
+    parser.add_argument('--gvcn-rows', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=1, help='Số lần chạy mỗi thao tác (lấy best)')
+    parser.add_argument('--history', default=DEFAULT_HISTORY_FILE)
+    parser.add_argument('--no-history', action='store_true')
+    parser.add_argument('--verbose', action='store_true', help='Hiện log của matcher')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_benchmark(args)
+    return 0 if all(result.get('identical', True) for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+Matching Benchmark Corpus
+Sinh corpus dữ liệu OnLuyen + file import với phân bố sát thực tế (tên tiếng Việt có dấu,
+trùng tên, ngày DD/MM lẫn MM/DD, chuỗi datetime của Excel, dòng GVCN placeholder)
+cho benchmark _normalize_name, _normalize_date, _standardize_import_date_formats
+và _match_with_enhanced_logic
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import random
+import unicodedata
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from utils.onluyen_simulator import HO, TEN_DEM_NAM, TEN_DEM_NU, TEN_NAM, TEN_NU, _slug
+
+# Tỷ lệ họ phổ biến ở Việt Nam (Nguyễn ~38%, Trần ~11%, Lê ~9.5%...)
+HO_WEIGHTS = [38, 11, 9.5, 7, 5.1, 4.5, 4.5, 3.9, 3.9, 2.1, 2, 1.4, 1.3, 1.3, 1, 0.5, 0.5, 0.5, 0.5, 0.3]
+
+DATE_STYLES = ['dmy', 'mdy', 'excel', 'iso', 'mixed']
+NAME_COLUMNS = {'students': 'Họ và tên', 'teachers': 'Họ tên'}
+BIRTH_COLUMN = 'Ngày sinh'
+USERNAME_COLUMN = 'Tên đăng nhập'
+GVCN_PLACEHOLDERS = ['GVCN', 'GV Chủ nhiệm', 'Giáo viên chủ nhiệm', 'gvcn {class_name}', 'CHUNHIEM']
+
+
+def _person_name(rng: random.Random) -> str:
+    ho = rng.choices(HO, weights=HO_WEIGHTS)[0]
+    if rng.random() < 0.5:
+        return f"{ho} {rng.choice(TEN_DEM_NAM)} {rng.choice(TEN_NAM)}"
+    return f"{ho} {rng.choice(TEN_DEM_NU)} {rng.choice(TEN_NU)}"
+
+
+def _noisy_name(rng: random.Random, name: str, noise_rate: float) -> str:
+    """Biến thể cách nhập tên trong file import (hoa/thường, khoảng trắng, NFD, dấu chấm)"""
+    if rng.random() >= noise_rate:
+        return name
+    variant = rng.randrange(5)
+    if variant == 0:
+        return name.upper()
+    if variant == 1:
+        return '  ' + name.replace(' ', '  ') + ' '
+    if variant == 2:
+        return unicodedata.normalize('NFD', name)
+    if variant == 3:
+        return name.lower()
+    return name + '.'
+
+
+def _format_birth(rng: random.Random, birth: datetime, style: str, mixed_rate: float) -> str:
+    """Định dạng ngày sinh theo kiểu của file import"""
+    if style == 'mixed':
+        style = 'mdy' if rng.random() < mixed_rate else 'dmy'
+    if style == 'mdy':
+        return f"{birth.month}/{birth.day}/{birth.year}"
+    if style == 'excel':
+        return birth.strftime('%Y-%m-%d 00:00:00')
+    if style == 'iso':
+        return birth.strftime('%Y-%m-%d')
+    if rng.random() < 0.3:
+        return f"{birth.day}/{birth.month}/{birth.year}"
+    return birth.strftime('%d/%m/%Y')
+
+
+def _date_create(rng: random.Random, now: datetime, recent_rate: float) -> str:
+    if rng.random() < recent_rate:
+        created = now - timedelta(days=rng.randint(0, 29), seconds=rng.randint(0, 86399))
+    else:
+        created = now - timedelta(days=rng.randint(60, 400), seconds=rng.randint(0, 86399))
+    return created.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def generate_corpus(rows: int, record_type: str = 'students', seed: int = 0, date_style: str = 'mixed',
+                    duplicate_rate: float = 0.05, import_ratio: float = 0.9, noise_rate: float = 0.15,
+                    mixed_rate: float = 0.1, missing_birth_rate: float = 0.02, gvcn_rows: int = 0,
+                    recent_rate: float = 0.1) -> Dict[str, Any]:
+    """
+    Sinh corpus OnLuyen records + dòng import cho một loại dữ liệu
+
+    Args:
+        rows (int): Số record OnLuyen
+        record_type (str): "students" hoặc "teachers"
+        seed (int): Seed (cùng tham số → cùng corpus)
+        date_style (str): Kiểu ngày trong import: dmy | mdy | excel | iso | mixed
+        duplicate_rate (float): Tỷ lệ record cố ý trùng tên với record khác
+        import_ratio (float): Tỷ lệ record OnLuyen có trong file import
+        noise_rate (float): Tỷ lệ tên import bị nhập khác (hoa/thường, NFD, khoảng trắng)
+        mixed_rate (float): Tỷ lệ dòng MM/DD khi date_style = mixed
+        missing_birth_rate (float): Tỷ lệ dòng import thiếu ngày sinh
+        gvcn_rows (int): Số dòng/record GVCN placeholder (chỉ với teachers)
+        recent_rate (float): Tỷ lệ record có dateCreate trong 30 ngày gần nhất
+
+    Returns:
+        Dict: {'record_type', 'onluyen_records', 'import_rows', 'name_column', 'birth_column', 'config'}
+    """
+    if date_style not in DATE_STYLES:
+        raise ValueError(f"date_style phải là một trong {DATE_STYLES}")
+
+    rng = random.Random(f"matching:{seed}:{record_type}:{rows}")
+    now = datetime.now()
+    is_students = record_type == 'students'
+    onluyen_records = []
+    import_rows = []
+    names = []
+
+    for index in range(rows):
+        if names and rng.random() < duplicate_rate:
+            full_name = rng.choice(names)
+        else:
+            full_name = _person_name(rng)
+        names.append(full_name)
+
+        if is_students:
+            birth = datetime(rng.randint(2006, 2019), rng.randint(1, 12), rng.randint(1, 28))
+            user_name = f"hs.{_slug(full_name.split()[-1])}{index + 1}"
+            onluyen_records.append({
+                'studentId': f"S{index + 1:07d}",
+                'fullName': full_name,
+                'birthDate': birth.strftime('%Y-%m-%dT00:00:00'),
+                'account': user_name,
+                'dateCreate': _date_create(rng, now, recent_rate),
+                'userInfo': {
+                    'displayName': full_name,
+                    'userName': user_name,
+                    'account': user_name,
+                    'userBirthday': birth.strftime('%d/%m/%Y')
+                }
+            })
+        else:
+            birth = datetime(rng.randint(1965, 1998), rng.randint(1, 12), rng.randint(1, 28))
+            user_name = f"gv.{_slug(full_name.split()[-1])}{index + 1}"
+            onluyen_records.append({
+                'teacherId': f"T{index + 1:06d}",
+                'fullName': full_name,
+                'birthDate': birth.strftime('%Y-%m-%dT00:00:00'),
+                'account': user_name,
+                'dateCreate': _date_create(rng, now, recent_rate),
+                'teacherInfo': {
+                    'displayName': full_name,
+                    'userName': user_name,
+                    'userBirthday': birth.strftime('%d/%m/%Y')
+                }
+            })
+
+        if rng.random() >= import_ratio:
+            continue
+
+        row = {NAME_COLUMNS[record_type]: _noisy_name(rng, full_name, noise_rate)}
+        row[BIRTH_COLUMN] = None if rng.random() < missing_birth_rate else \
+            _format_birth(rng, birth, date_style, mixed_rate)
+        if not is_students:
+            # Một phần giáo viên có tên đăng nhập trong import (Method 2)
+            row[USERNAME_COLUMN] = user_name if rng.random() < 0.5 else None
+        import_rows.append(row)
+
+    if not is_students:
+        for index in range(gvcn_rows):
+            class_name = f"{10 + index % 3}A{index // 3 + 1}"
+            placeholder = rng.choice(GVCN_PLACEHOLDERS).format(class_name=class_name)
+            onluyen_records.append({
+                'teacherId': f"G{index + 1:06d}",
+                'fullName': placeholder,
+                'birthDate': '',
+                'account': f"gvcn{index + 1}",
+                'dateCreate': _date_create(rng, now, recent_rate),
+                'teacherInfo': {'displayName': placeholder, 'userName': f"gvcn{index + 1}"}
+            })
+            import_rows.append({NAME_COLUMNS[record_type]: placeholder, BIRTH_COLUMN: None, USERNAME_COLUMN: None})
+
+    rng.shuffle(import_rows)
+    for stt, row in enumerate(import_rows, 1):
+        row['STT'] = stt
+
+    return {
+        'record_type': record_type,
+        'onluyen_records': onluyen_records,
+        'import_rows': import_rows,
+        'name_column': NAME_COLUMNS[record_type],
+        'birth_column': BIRTH_COLUMN,
+        'config': {
+            'rows': rows,
+            'seed': seed,
+            'date_style': date_style,
+            'duplicate_rate': duplicate_rate,
+            'import_ratio': import_ratio,
+            'noise_rate': noise_rate,
+            'mixed_rate': mixed_rate,
+            'missing_birth_rate': missing_birth_rate,
+            'gvcn_rows': gvcn_rows,
+            'recent_rate': recent_rate
+        }
+    }
+
+
+def build_import_dataframe(corpus: Dict[str, Any]):
+    """
+    DataFrame giống sheet Teachers/Students đọc từ file import
+
+    Returns:
+        pd.DataFrame: Các cột STT, tên, ngày sinh (và tên đăng nhập với teachers)
+    """
+    import pandas as pd
+
+    columns = ['STT', corpus['name_column'], corpus['birth_column']]
+    if corpus['record_type'] == 'teachers':
+        columns.append(USERNAME_COLUMN)
+    return pd.DataFrame(corpus['import_rows'], columns=columns)
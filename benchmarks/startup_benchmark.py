@@ -0,0 +1,230 @@
+"""
+Startup Benchmark
+Đo thời gian khởi động (python app.py tới lúc hiện menu, import UI) trong process
+riêng với `python -X importtime`, liệt kê các import tốn thời gian nhất và các
+module nặng bị import sớm; trả exit code 1 khi vượt ngân sách thời gian để dùng
+trong CI
+
+Cách chạy:
+    python -m benchmarks.startup_benchmark --budget-ms 800
+    python -m benchmarks.startup_benchmark --targets app --top 30
+
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import os
+import sys
+import time
+import argparse
+import importlib.util
+import statistics
+import subprocess
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import (
+    PROJECT_ROOT, RESULTS_DIR, load_history, append_history, new_history_entry,
+    find_previous_result, format_delta
+)
+
+BENCHMARK_NAME = 'startup'
+DEFAULT_HISTORY_FILE = os.path.join(RESULTS_DIR, 'startup_history.json')
+DEFAULT_BUDGET_MS = 800
+DEFAULT_REPEAT = 3
+
+# Code chạy trong process con cho từng entry point (không mở menu/cửa sổ)
+TARGETS = {
+    'app': "import app; app.SchoolProcessApp()",
+    'ui': "import main_ui; import ui.main_window"
+}
+
+# Module chỉ được import khi dùng lần đầu - xuất hiện lúc khởi động là hồi quy
+HEAVY_MODULES = [
+    'pandas', 'numpy', 'openpyxl', 'requests', 'urllib3', 'googleapiclient',
+    'google.auth', 'google_auth_oauthlib', 'httplib2'
+]
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """
+    Đọc output của `python -X importtime`
+
+    Args:
+        stderr (str): stderr của process con
+
+    Returns:
+        List[Dict[str, Any]]: [{module, depth, self_us, cumulative_us}] theo thứ tự import
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue
+        module = name.strip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append({'module': module, 'depth': depth, 'self_us': self_us, 'cumulative_us': cumulative_us})
+    return imports
+
+
+def run_target(code: str) -> Dict[str, Any]:
+    """
+    Chạy một entry point trong process mới với -X importtime
+
+    Args:
+        code (str): Code Python cần đo
+
+    Returns:
+        Dict[str, Any]: {success, wall_ms, imports, error}
+    """
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=PROJECT_ROOT,
+                               stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    error = None
+    if completed.returncode != 0:
+        traceback_lines = [line for line in completed.stderr.splitlines() if not line.startswith('import time:')]
+        error = traceback_lines[-1] if traceback_lines else f"exit code {completed.returncode}"
+    return {
+        'success': completed.returncode == 0,
+        'wall_ms': wall_ms,
+        'imports': parse_importtime(completed.stderr),
+        'error': error
+    }
+
+
+def measure(target: str, code: str, repeat: int, top: int) -> Dict[str, Any]:
+    """
+    Đo một entry point nhiều lần (lấy median) và tổng hợp import
+
+    Args:
+        target (str): Tên entry point
+        code (str): Code Python cần đo
+        repeat (int): Số lần chạy
+        top (int): Số import chậm nhất cần giữ lại
+
+    Returns:
+        Dict[str, Any]: Kết quả đo
+    """
+    # Interpreter trần để tách thời gian khởi động Python khỏi thời gian import của app
+    baseline_runs = [run_target('pass') for _ in range(repeat)]
+    baseline_ms = statistics.median(run['wall_ms'] for run in baseline_runs)
+    baseline_modules = {item['module'] for item in baseline_runs[-1]['imports']}
+
+    runs = [run_target(code) for _ in range(repeat)]
+    failed = next((run for run in runs if not run['success']), None)
+    imports = runs[-1]['imports']
+    loaded = {item['module'] for item in imports}
+
+    # Import của app = các import không có trong interpreter trần
+    app_imports = [item for item in imports if item['module'] not in baseline_modules]
+    slowest = {}
+    for item in app_imports:
+        if item['cumulative_us'] > slowest.get(item['module'], {}).get('cumulative_us', -1):
+            slowest[item['module']] = item
+
+    return {
+        'target': target,
+        'success': failed is None,
+        'error': failed['error'] if failed else None,
+        'repeat': repeat,
+        'wall_ms': round(statistics.median(run['wall_ms'] for run in runs), 1),
+        'wall_min_ms': round(min(run['wall_ms'] for run in runs), 1),
+        'interpreter_ms': round(baseline_ms, 1),
+        'import_ms': round(sum(item['cumulative_us'] for item in app_imports if item['depth'] == 0) / 1000, 1),
+        'module_count': len(app_imports),
+        'heavy_modules': [name for name in HEAVY_MODULES if name in loaded],
+        'top_imports': [
+            {'module': item['module'], 'cumulative_ms': round(item['cumulative_us'] / 1000, 1),
+             'self_ms': round(item['self_us'] / 1000, 1)}
+            for item in sorted(slowest.values(), key=lambda item: item['cumulative_us'], reverse=True)[:top]
+        ]
+    }
+
+
+def print_result(result: Dict[str, Any], budget_ms: float, previous: Optional[Dict[str, Any]] = None) -> None:
+    """In thời gian khởi động, import chậm nhất và module nặng bị import sớm"""
+    previous = previous or {}
+    within_budget = result['wall_ms'] <= budget_ms
+    status = "✅" if result['success'] and within_budget else "❌"
+
+    print(f"\n{status} {result['target']}: {result['wall_ms']:.0f} ms "
+          f"{format_delta(result['wall_ms'], previous.get('wall_ms'))} (ngân sách {budget_ms:.0f} ms, "
+          f"min {result['wall_min_ms']:.0f} ms, interpreter {result['interpreter_ms']:.0f} ms)")
+    if not result['success']:
+        print(f"   💥 Lỗi: {result['error']}")
+    print(f"   📦 Import: {result['import_ms']:.0f} ms cho {result['module_count']} module "
+          f"{format_delta(result['import_ms'], previous.get('import_ms'))}")
+    if result['heavy_modules']:
+        print(f"   ⚠️  Module nặng bị import lúc khởi động: {', '.join(result['heavy_modules'])}")
+
+    if result['top_imports']:
+        print("   🐢 Import chậm nhất (cumulative / self):")
+        for item in result['top_imports']:
+            print(f"      - {item['module']:<45} {item['cumulative_ms']:>8.1f} ms {item['self_ms']:>8.1f} ms")
+
+
+def tkinter_available() -> bool:
+    """Kiểm tra tkinter (target 'ui' cần tkinter, có thể thiếu trên máy CI)"""
+    return importlib.util.find_spec('_tkinter') is not None
+
+
+def run_benchmark(args) -> List[Dict[str, Any]]:
+    targets = [target.strip() for target in args.targets.split(',') if target.strip()]
+    history = load_history(args.history)
+    results = []
+    print(f"🏁 STARTUP BENCHMARK - targets: {targets} (repeat {args.repeat}, ngân sách {args.budget_ms:.0f} ms)")
+
+    for target in targets:
+        if target not in TARGETS:
+            print(f"\n⚠️  Bỏ qua target không hợp lệ: {target} (hỗ trợ: {', '.join(TARGETS)})")
+            continue
+        if target == 'ui' and not tkinter_available():
+            print("\n⚠️  Bỏ qua target 'ui': không có tkinter")
+            continue
+
+        result = measure(target, TARGETS[target], args.repeat, args.top)
+        result['budget_ms'] = args.budget_ms
+        previous = find_previous_result(history, BENCHMARK_NAME, lambda r: r.get('target') == target)
+        print_result(result, args.budget_ms, previous)
+        results.append(result)
+
+    if not args.no_history and results:
+        config = {'targets': targets, 'repeat': args.repeat, 'budget_ms': args.budget_ms}
+        append_history(args.history, new_history_entry(BENCHMARK_NAME, config, results))
+        print(f"\n💾 Đã ghi kết quả vào {args.history}")
+
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Startup time / import profile benchmark')
+    parser.add_argument('--targets', default=','.join(TARGETS), help='Entry point cần đo (app,ui)')
+    parser.add_argument('--budget-ms', type=float,
+                        default=float(os.getenv('STARTUP_BUDGET_MS', DEFAULT_BUDGET_MS)),
+                        help='Ngân sách thời gian khởi động (ms), mặc định STARTUP_BUDGET_MS hoặc 800')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Số lần chạy mỗi target (lấy median)')
+    parser.add_argument('--top', type=int, default=15, help='Số import chậm nhất cần in')
+    parser.add_argument('--allow-heavy', action='store_true',
+                        help='Không coi việc import module nặng lúc khởi động là lỗi')
+    parser.add_argument('--history', default=DEFAULT_HISTORY_FILE)
+    parser.add_argument('--no-history', action='store_true')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_benchmark(args)
+    failed = [result for result in results
+              if not result['success'] or result['wall_ms'] > args.budget_ms
+              or (result['heavy_modules'] and not args.allow_heavy)]
+    return 0 if results and not failed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
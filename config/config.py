@@ -66,6 +66,12 @@ LOCAL_SYNC_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'da
 # Thời gian timeout cho API calls (seconds)
 API_TIMEOUT = 30
 
+# Thư mục cache discovery documents của Google APIs (tránh tải lại mỗi lần build service)
+DISCOVERY_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'cache', 'discovery')
+
+# Thư mục lưu snapshot Google Sheets theo revision (dùng lại khi sheet chưa thay đổi)
+SHEET_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'cache', 'sheets')
+
 # =============================================================================
 # MAPPING CONFIGURATION
 # =============================================================================
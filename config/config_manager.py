@@ -93,7 +93,8 @@ class ConfigManager:
             'test_sheet_id': self.get('GOOGLE_TEST_SHEET_ID'),
             'credentials_file': self.get('GOOGLE_CREDENTIALS_FILE', 'config/service_account.json'),
             'api_timeout': self.get('GOOGLE_API_TIMEOUT', 30),
-            'max_retries': self.get('MAX_API_RETRIES', 3)
+            'max_retries': self.get('MAX_API_RETRIES', 3),
+            'api_backend': self.get('GOOGLE_API_BACKEND', 'google')
         }
     
     def get_paths_config(self) -> Dict[str, str]:
@@ -169,7 +170,155 @@ class ConfigManager:
             'auto_login': str(self.get('ONLUYEN_AUTO_LOGIN', 'false')).lower() == 'true',
             'cache_token': str(self.get('ONLUYEN_CACHE_TOKEN', 'true')).lower() == 'true'
         }
-    
+
+    def get_matching_config(self) -> Dict[str, Any]:
+        """
+        Lấy cấu hình so khớp dữ liệu import (Case 2)
+
+        Returns:
+            Dict[str, Any]: Dictionary chứa config matching
+        """
+        return {
+            # Khớp gần đúng tắt mặc định - khi bật, các cặp fuzzy được liệt kê riêng trong báo cáo
+            'fuzzy_enabled': str(self.get('FUZZY_MATCH_ENABLED', 'false')).lower() == 'true',
+            'fuzzy_threshold': float(self.get('FUZZY_MATCH_THRESHOLD', '0.85')),
+            'fuzzy_require_birth': str(self.get('FUZZY_MATCH_REQUIRE_BIRTH', 'true')).lower() == 'true',
+            'fuzzy_max_block_size': int(self.get('FUZZY_MATCH_MAX_BLOCK_SIZE', '200')),
+            'incremental': str(self.get('INCREMENTAL_MATCHING', 'true')).lower() == 'true',
+            'state_dir': self.get('MATCH_STATE_DIR', 'data/cache/matching')
+        }
+
+    def get_snapshot_config(self) -> Dict[str, Any]:
+        """
+        Lấy cấu hình snapshot store SQLite (dữ liệu GV/HS theo trường và năm học)
+
+        Returns:
+            Dict[str, Any]: Dictionary chứa config snapshot store
+        """
+        return {
+            'enabled': str(self.get('SNAPSHOT_STORE_ENABLED', 'true')).lower() == 'true',
+            'db_path': self.get('SNAPSHOT_DB_PATH', 'data/cache/snapshots.db')
+        }
+
+    def get_delta_sync_config(self) -> Dict[str, Any]:
+        """
+        Lấy cấu hình delta sync (chỉ lấy học sinh tạo sau mốc dateCreate của lần chạy trước)
+
+        Returns:
+            Dict[str, Any]: Dictionary chứa config delta sync
+        """
+        return {
+            'page_size': int(self.get('DELTA_SYNC_PAGE_SIZE', '1000')),
+            # Tham số sắp xếp gửi kèm list-student, vd "sortBy=dateCreate&sortDesc=true" (rỗng = thứ tự mặc định)
+            'sort_params': self.get('DELTA_SYNC_SORT_PARAMS', ''),
+            # Tên tham số lọc theo dateCreate phía server nếu API hỗ trợ (rỗng = lọc phía client)
+            'filter_param': self.get('DELTA_SYNC_FILTER_PARAM', ''),
+            'full_sync_days': int(self.get('DELTA_SYNC_FULL_EVERY_DAYS', '7'))
+        }
+
+    def get_preflight_config(self) -> Dict[str, Any]:
+        """
+        Lấy cấu hình preflight (kiểm tra kết nối/cấu hình chạy song song)
+
+        Returns:
+            Dict[str, Any]: Dictionary chứa config preflight
+        """
+        return {
+            'max_workers': int(self.get('PREFLIGHT_MAX_WORKERS', '8')),
+            'check_timeout': float(self.get('PREFLIGHT_CHECK_TIMEOUT', '15')),
+            'cache_ttl': float(self.get('PREFLIGHT_CACHE_TTL', '60'))
+        }
+
+    def get_http_pool_config(self) -> Dict[str, Any]:
+        """
+        Lấy cấu hình connection pool HTTP dùng chung cho các client OnLuyen
+
+        Returns:
+            Dict[str, Any]: Dictionary chứa config HTTP pool
+        """
+        return {
+            'pool_connections': int(self.get('HTTP_POOL_CONNECTIONS', '8')),
+            # Đủ cho các luồng song song: nhiều năm học (MULTI_YEAR_MAX_WORKERS) và dò endpoint đổi năm (10)
+            'pool_maxsize': int(self.get('HTTP_POOL_MAXSIZE', '16')),
+            'max_retries': int(self.get('HTTP_MAX_RETRIES', '1')),
+            'pool_block': str(self.get('HTTP_POOL_BLOCK', 'false')).lower() == 'true'
+        }
+
+    def get_endpoint_cache_config(self) -> Dict[str, Any]:
+        """
+        Lấy cấu hình cache endpoint đã dò được (vd change-school-year) theo host
+
+        Returns:
+            Dict[str, Any]: Dictionary chứa config endpoint cache
+        """
+        return {
+            'enabled': str(self.get('ENDPOINT_CACHE_ENABLED', 'true')).lower() == 'true',
+            'cache_file': self.get('ENDPOINT_CACHE_FILE', 'data/cache/endpoint_cache.json')
+        }
+
+    def get_multi_year_config(self) -> Dict[str, Any]:
+        """
+        Lấy cấu hình fetch nhiều năm học song song (mỗi năm một access_token riêng)
+
+        Returns:
+            Dict[str, Any]: Dictionary chứa config multi-year
+        """
+        return {
+            # Danh sách năm mặc định, vd "2024,2025" (rỗng = hỏi người dùng)
+            'default_years': self.get('MULTI_YEAR_DEFAULT_YEARS', ''),
+            'max_workers': int(self.get('MULTI_YEAR_MAX_WORKERS', '4'))
+        }
+
+    def get_worker_daemon_config(self) -> Dict[str, Any]:
+        """
+        Lấy cấu hình worker daemon (process chạy nền giữ sẵn client/token, nhận job qua HTTP local)
+
+        Returns:
+            Dict[str, Any]: Dictionary chứa config worker daemon
+        """
+        return {
+            # Bật: console/UI gửi job tới daemon nếu daemon đang chạy, không thì chạy trực tiếp như cũ
+            'enabled': str(self.get('WORKER_DAEMON_ENABLED', 'false')).lower() == 'true',
+            'host': self.get('WORKER_DAEMON_HOST', '127.0.0.1'),
+            'port': int(self.get('WORKER_DAEMON_PORT', '8766')),
+            'max_workers': int(self.get('WORKER_DAEMON_MAX_WORKERS', '2')),
+            # Token dùng chung giữa daemon và client (header X-Worker-Token), rỗng = daemon sinh
+            # token ngẫu nhiên mỗi lần chạy và ghi vào token_file (quyền 0600) cho client đọc
+            'token': self.get('WORKER_DAEMON_TOKEN', ''),
+            'token_file': self.get('WORKER_DAEMON_TOKEN_FILE', 'data/cache/worker_daemon.token'),
+            'event_buffer': int(self.get('WORKER_DAEMON_EVENT_BUFFER', '5000'))
+        }
+
+    def get_job_manager_config(self) -> Dict[str, Any]:
+        """
+        Lấy cấu hình hàng đợi job của UI (mỗi trường được chọn là một job)
+
+        Returns:
+            Dict[str, Any]: Dictionary chứa config job manager
+        """
+        return {
+            # Số trường xử lý song song, các trường còn lại chờ trong hàng đợi
+            'max_workers': int(self.get('JOB_MAX_WORKERS', '3'))
+        }
+
+    def get_ui_log_config(self) -> Dict[str, Any]:
+        """
+        Lấy cấu hình ô log của UI (đổ log theo lô, giới hạn số dòng, ghi toàn bộ log ra file)
+
+        Returns:
+            Dict[str, Any]: Dictionary chứa config log UI
+        """
+        return {
+            # Chu kỳ đổ log từ hàng đợi vào widget (ms) và số dòng tối đa mỗi lần
+            'pump_interval_ms': int(self.get('UI_LOG_PUMP_INTERVAL_MS', '100')),
+            'max_batch': int(self.get('UI_LOG_MAX_BATCH', '1000')),
+            # Số dòng giữ trên widget, dòng cũ hơn chỉ còn trong file log
+            'max_lines': int(self.get('UI_LOG_MAX_LINES', '5000')),
+            # Thư mục file log mỗi phiên UI (rỗng = không ghi file) và số file giữ lại
+            'spool_dir': self.get('UI_LOG_SPOOL_DIR', 'logs'),
+            'keep_files': int(self.get('UI_LOG_KEEP_FILES', '10'))
+        }
+
     def print_config_summary(self) -> None:
         """In tóm tắt cấu hình"""
         print("\n📋 CẤU HÌNH HỆ THỐNG:")
@@ -0,0 +1,1089 @@
+"""
+Fake Google Drive/Sheets Backend
+Giả lập trong process một phần Drive v3 (list, get, get_media, create, resumable upload)
+và Sheets v4 (values get/batchGet/update/batchUpdate, spreadsheets get) mà
+GoogleAPIClient, GoogleOAuthDriveClient và GoogleSheetsExtractor sử dụng -
+dùng cho benchmark/load test offline, không cần credentials thật
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import os
+import re
+import json
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from googleapiclient.errors import HttpError
+except ImportError:
+    HttpError = None
+
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+SPREADSHEET_MIME_TYPE = 'application/vnd.google-apps.spreadsheet'
+
+# Giới hạn "vô hạn" cho range mở (A:A, 1:2...)
+_OPEN_END = 10 ** 9
+
+
+class FakeHttpError(Exception):
+    """Lỗi HTTP giả lập khi googleapiclient không được cài đặt (cùng thuộc tính resp/content)"""
+
+    def __init__(self, resp, content: bytes, uri: str = None):
+        self.resp = resp
+        self.content = content
+        self.uri = uri
+        self.status_code = resp.status
+        super().__init__(f"<HttpError {resp.status} when requesting {uri} returned \"{resp.reason}\">")
+
+
+class FakeResponse(dict):
+    """Response giống httplib2.Response (dict header + status/reason)"""
+
+    def __init__(self, status: int, headers: Dict[str, str] = None, reason: str = None):
+        super().__init__(headers or {})
+        self.status = status
+        self.reason = reason or ('OK' if status < 400 else 'Fake Error')
+        self['status'] = str(status)
+
+
+class FakeCredentials:
+    """Credentials giả - luôn hợp lệ, không refresh"""
+
+    valid = True
+    expired = False
+    refresh_token = None
+    token = 'fake-token'
+
+    def refresh(self, request) -> None:
+        pass
+
+
+class FakeUploadProgress:
+    """Tiến độ upload resumable (cùng interface MediaUploadProgress)"""
+
+    def __init__(self, resumable_progress: int, total_size: int):
+        self.resumable_progress = resumable_progress
+        self.total_size = total_size
+
+    def progress(self) -> float:
+        return float(self.resumable_progress) / float(self.total_size) if self.total_size else 0.0
+
+
+# ----------------------------------------------------------------------
+# A1 notation
+# ----------------------------------------------------------------------
+
+def column_index(letters: str) -> int:
+    """Chuyển ký tự cột thành index 0-based (A -> 0, AA -> 26)"""
+    result = 0
+    for char in letters.upper():
+        result = result * 26 + (ord(char) - 64)
+    return result - 1
+
+
+def parse_a1_range(range_name: str) -> Tuple[Optional[str], int, int, int, int]:
+    """
+    Parse range A1 (Sheet!A1:B2, 'Sheet'!A:A, Sheet!1:2, Sheet)
+
+    Returns:
+        Tuple: (tên sheet hoặc None, row đầu 0-based, col đầu, row cuối (exclusive), col cuối (exclusive))
+    """
+    sheet_name, separator, cells = range_name.rpartition('!')
+    if not separator:
+        # Không có '!': có thể chỉ là tên sheet hoặc chỉ là vùng ô
+        if re.fullmatch(r"[A-Za-z]*\d*(:[A-Za-z]*\d*)?", range_name) and range_name:
+            sheet_name, cells = None, range_name
+        else:
+            sheet_name, cells = range_name, ''
+
+    if sheet_name and sheet_name.startswith("'") and sheet_name.endswith("'"):
+        sheet_name = sheet_name[1:-1].replace("''", "'")
+
+    if not cells:
+        return sheet_name, 0, 0, _OPEN_END, _OPEN_END
+
+    start_ref, _, end_ref = cells.partition(':')
+    start_match = re.fullmatch(r"([A-Za-z]*)(\d*)", start_ref)
+    end_match = re.fullmatch(r"([A-Za-z]*)(\d*)", end_ref or start_ref)
+    if not start_match or not end_match:
+        raise ValueError(f"Unable to parse range: {range_name}")
+
+    start_col = column_index(start_match.group(1)) if start_match.group(1) else 0
+    start_row = int(start_match.group(2)) - 1 if start_match.group(2) else 0
+    end_col = column_index(end_match.group(1)) + 1 if end_match.group(1) else _OPEN_END
+    end_row = int(end_match.group(2)) if end_match.group(2) else _OPEN_END
+
+    return sheet_name, start_row, start_col, end_row, end_col
+
+
+def parse_sheet_range(sheet_titles, range_name: str) -> Tuple[str, int, int, int, int]:
+    """
+    Parse range A1 theo các tab của spreadsheet (tên tab trần như 'Sheet1' được ưu tiên hiểu là tab)
+
+    Returns:
+        Tuple: (tên tab hoặc None nếu không tồn tại, row đầu, col đầu, row cuối, col cuối)
+    """
+    titles = list(sheet_titles)
+    if '!' not in range_name:
+        bare_name = range_name[1:-1].replace("''", "'") if range_name.startswith("'") else range_name
+        if bare_name in titles:
+            return bare_name, 0, 0, _OPEN_END, _OPEN_END
+
+    sheet_name, start_row, start_col, end_row, end_col = parse_a1_range(range_name)
+    if sheet_name is None and titles:
+        sheet_name = titles[0]
+    if sheet_name not in titles:
+        sheet_name = None
+    return sheet_name, start_row, start_col, end_row, end_col
+
+
+# ----------------------------------------------------------------------
+# Drive query (q=...)
+# ----------------------------------------------------------------------
+
+_QUERY_TOKEN = re.compile(r"\s*(\(|\)|'(?:[^'\\]|\\.)*'|!=|=|[A-Za-z_]+)")
+
+
+def _tokenize_query(query: str) -> List[str]:
+    tokens = []
+    position = 0
+    query = query.strip()
+    while position < len(query):
+        match = _QUERY_TOKEN.match(query, position)
+        if not match:
+            raise ValueError(f"Invalid Drive query near: {query[position:]}")
+        tokens.append(match.group(1))
+        position = match.end()
+    return tokens
+
+
+def compile_drive_query(query: str) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Biên dịch Drive query (and/or/not, ngoặc, =, !=, contains, in parents)
+    thành hàm kiểm tra metadata file
+    """
+    if not query:
+        return lambda file_meta: True
+
+    tokens = _tokenize_query(query)
+    position = [0]
+
+    def peek():
+        return tokens[position[0]] if position[0] < len(tokens) else None
+
+    def take():
+        token = peek()
+        position[0] += 1
+        return token
+
+    def literal(token):
+        if token.startswith("'"):
+            return token[1:-1].replace("\\'", "'")
+        if token.lower() in ('true', 'false'):
+            return token.lower() == 'true'
+        return token
+
+    def parse_or():
+        left = parse_and()
+        while peek() and peek().lower() == 'or':
+            take()
+            right = parse_and()
+            left = (lambda l, r: lambda f: l(f) or r(f))(left, right)
+        return left
+
+    def parse_and():
+        left = parse_not()
+        while peek() and peek().lower() == 'and':
+            take()
+            right = parse_not()
+            left = (lambda l, r: lambda f: l(f) and r(f))(left, right)
+        return left
+
+    def parse_not():
+        if peek() and peek().lower() == 'not':
+            take()
+            inner = parse_not()
+            return lambda f: not inner(f)
+        return parse_atom()
+
+    def parse_atom():
+        token = take()
+        if token == '(':
+            inner = parse_or()
+            take()  # ')'
+            return inner
+
+        operator = take()
+        operand = take()
+
+        if token.startswith("'") and operator.lower() == 'in':
+            # 'FOLDER_ID' in parents
+            value = literal(token)
+            return lambda f: value in f.get(operand, [])
+
+        field = token
+        if operator.lower() == 'in':
+            # parents in 'FOLDER_ID'
+            value = literal(operand)
+            return lambda f: value in f.get(field, [])
+
+        value = literal(operand)
+        if operator.lower() == 'contains':
+            return lambda f: str(value).lower() in str(f.get(field, '')).lower()
+        if operator == '!=':
+            return lambda f: f.get(field, False if isinstance(value, bool) else '') != value
+        return lambda f: f.get(field, False if isinstance(value, bool) else '') == value
+
+    return parse_or()
+
+
+# ----------------------------------------------------------------------
+# Backend
+# ----------------------------------------------------------------------
+
+class FakeGoogleBackend:
+    """
+    Trạng thái dùng chung của Drive/Sheets giả lập
+
+    - files: metadata + nội dung file Drive (spreadsheet cũng là một file Drive)
+    - spreadsheets: lưới giá trị + hyperlink theo tab
+    - Mỗi request đi qua _simulate(): thêm latency và lỗi (ngẫu nhiên theo
+      error_rate hoặc theo lịch inject_errors())
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, seed: int = 0, upload_chunk_size: int = 256 * 1024):
+        """
+        Khởi tạo FakeGoogleBackend
+
+        Args:
+            latency (float): Độ trễ cố định mỗi request (giây)
+            jitter (float): Độ trễ ngẫu nhiên thêm tối đa (giây)
+            error_rate (float): Xác suất mỗi request trả lỗi (0-1)
+            error_status (int): HTTP status của lỗi ngẫu nhiên
+            seed (int): Seed cho random (kết quả lặp lại được)
+            upload_chunk_size (int): Kích thước chunk tối đa khi upload resumable
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.upload_chunk_size = upload_chunk_size
+
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._scheduled_errors: Dict[str, List[int]] = {}
+        self._id_counter = 0
+
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.spreadsheets: Dict[str, Dict[str, Any]] = {}
+        self.credentials = FakeCredentials()
+
+        self.stats = {'requests': 0, 'errors': 0, 'bytes_uploaded': 0, 'bytes_downloaded': 0, 'by_operation': {}}
+
+    # ------------------------------------------------------------------
+    # Mô phỏng mạng
+    # ------------------------------------------------------------------
+
+    def inject_errors(self, operation: str, status: int = 503, count: int = 1) -> None:
+        """
+        Lên lịch lỗi cho các request tiếp theo của một operation
+
+        Args:
+            operation (str): Tên operation (vd 'drive.files.create', 'sheets.values.batchGet', '*')
+            status (int): HTTP status trả về
+            count (int): Số request liên tiếp bị lỗi
+        """
+        with self._lock:
+            self._scheduled_errors.setdefault(operation, []).extend([status] * count)
+
+    def _next_error(self, operation: str) -> Optional[int]:
+        with self._lock:
+            for key in (operation, '*'):
+                scheduled = self._scheduled_errors.get(key)
+                if scheduled:
+                    return scheduled.pop(0)
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self.error_status
+        return None
+
+    def _simulate(self, operation: str, uri: str) -> Optional[int]:
+        """
+        Áp dụng latency, đếm request và quyết định lỗi
+
+        Returns:
+            Optional[int]: HTTP status lỗi (None nếu request thành công)
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['by_operation'][operation] = self.stats['by_operation'].get(operation, 0) + 1
+            delay = self.latency + (self._random.random() * self.jitter if self.jitter else 0)
+
+        if delay > 0:
+            time.sleep(delay)
+
+        status = self._next_error(operation)
+        if status:
+            with self._lock:
+                self.stats['errors'] += 1
+        return status
+
+    def make_error(self, status: int, uri: str, message: str = None):
+        """Tạo HttpError (của googleapiclient nếu có) cho status"""
+        reason = message or ('Rate Limit Exceeded' if status == 429 else 'Fake Error')
+        resp = FakeResponse(status, {'content-type': 'application/json'}, reason)
+        content = json.dumps({'error': {'code': status, 'message': reason}}).encode('utf-8')
+        error_class = HttpError or FakeHttpError
+        return error_class(resp, content, uri=uri)
+
+    def call(self, operation: str, uri: str, handler: Callable[[], Any]) -> Any:
+        """Thực thi một request giả lập (latency + lỗi + handler)"""
+        status = self._simulate(operation, uri)
+        if status:
+            raise self.make_error(status, uri)
+        with self._lock:
+            return handler()
+
+    # ------------------------------------------------------------------
+    # Seed dữ liệu
+    # ------------------------------------------------------------------
+
+    def _new_id(self, prefix: str) -> str:
+        with self._lock:
+            self._id_counter += 1
+            return f"fake{prefix}{self._id_counter:06d}"
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+    def _touch(self, file_id: str) -> None:
+        """Tăng version/modifiedTime của file (giống Drive sau mỗi lần ghi)"""
+        file_meta = self.files.get(file_id)
+        if file_meta:
+            file_meta['version'] = str(int(file_meta.get('version', '1')) + 1)
+            file_meta['modifiedTime'] = self._now()
+
+    def add_file(self, name: str, content: bytes = b'', parents: List[str] = None,
+                 mime_type: str = 'application/octet-stream', file_id: str = None) -> str:
+        """
+        Thêm file vào Drive giả lập
+
+        Returns:
+            str: ID file
+        """
+        with self._lock:
+            file_id = file_id or self._new_id('file')
+            self.files[file_id] = {
+                'id': file_id,
+                'name': name,
+                'mimeType': mime_type,
+                'parents': list(parents or []),
+                'trashed': False,
+                'version': '1',
+                'modifiedTime': self._now(),
+                'size': str(len(content)),
+                'webViewLink': f"https://drive.google.com/file/d/{file_id}/view",
+                '_content': content
+            }
+            return file_id
+
+    def add_folder(self, name: str, parents: List[str] = None, folder_id: str = None) -> str:
+        """Thêm folder vào Drive giả lập"""
+        folder_id = self.add_file(name, b'', parents, FOLDER_MIME_TYPE, folder_id)
+        self.files[folder_id]['webViewLink'] = f"https://drive.google.com/drive/folders/{folder_id}"
+        return folder_id
+
+    def add_spreadsheet(self, title: str, sheets: Dict[str, List[List[Any]]], spreadsheet_id: str = None,
+                        hyperlinks: Dict[str, Dict[str, str]] = None, parents: List[str] = None) -> str:
+        """
+        Thêm spreadsheet
+
+        Args:
+            title (str): Tên spreadsheet
+            sheets (Dict[str, List[List]]): {tên tab: lưới giá trị}
+            spreadsheet_id (str): ID cố định (mặc định tự sinh)
+            hyperlinks (Dict[str, Dict[str, str]]): {tên tab: {ô A1: url}}
+            parents (List[str]): Folder chứa
+
+        Returns:
+            str: ID spreadsheet
+        """
+        with self._lock:
+            spreadsheet_id = self.add_file(title, b'', parents, SPREADSHEET_MIME_TYPE, spreadsheet_id)
+            self.files[spreadsheet_id]['webViewLink'] = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/edit"
+
+            tabs = {}
+            for index, (sheet_title, values) in enumerate(sheets.items()):
+                links = {}
+                for cell, url in ((hyperlinks or {}).get(sheet_title) or {}).items():
+                    _, row, col, _, _ = parse_a1_range(cell)
+                    links[(row, col)] = url
+                tabs[sheet_title] = {
+                    'sheetId': index,
+                    'values': [list(row) for row in values],
+                    'hyperlinks': links
+                }
+
+            self.spreadsheets[spreadsheet_id] = {'title': title, 'sheets': tabs}
+            return spreadsheet_id
+
+    def load_fixture(self, fixture_file: str) -> None:
+        """
+        Nạp dữ liệu từ file JSON
+
+        Format: {"spreadsheets": {id: {"title", "sheets": {tab: [[...]]}, "hyperlinks": {tab: {"E3": url}}}},
+                 "folders": [{"id", "name", "parents"}],
+                 "files": [{"id", "name", "parents", "mimeType", "content_path" | "content"}]}
+        """
+        with open(fixture_file, 'r', encoding='utf-8') as f:
+            fixture = json.load(f)
+
+        base_dir = os.path.dirname(os.path.abspath(fixture_file))
+
+        for folder in fixture.get('folders', []):
+            self.add_folder(folder['name'], folder.get('parents'), folder.get('id'))
+
+        for spreadsheet_id, spreadsheet in fixture.get('spreadsheets', {}).items():
+            self.add_spreadsheet(spreadsheet.get('title', spreadsheet_id), spreadsheet.get('sheets', {}),
+                                 spreadsheet_id, spreadsheet.get('hyperlinks'), spreadsheet.get('parents'))
+
+        for file_entry in fixture.get('files', []):
+            if file_entry.get('content_path'):
+                with open(os.path.join(base_dir, file_entry['content_path']), 'rb') as f:
+                    content = f.read()
+            else:
+                content = file_entry.get('content', '').encode('utf-8')
+            self.add_file(file_entry['name'], content, file_entry.get('parents'),
+                          file_entry.get('mimeType', 'application/octet-stream'), file_entry.get('id'))
+
+    # ------------------------------------------------------------------
+    # Services
+    # ------------------------------------------------------------------
+
+    def build(self, api_name: str, api_version: str):
+        """
+        Service giả lập tương ứng build(api_name, api_version)
+
+        Returns:
+            FakeDriveService | FakeSheetsService
+        """
+        if api_name == 'drive':
+            return FakeDriveService(self)
+        if api_name == 'sheets':
+            return FakeSheetsService(self)
+        raise ValueError(f"Fake backend không hỗ trợ API {api_name} {api_version}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Thống kê request giả lập"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['by_operation'] = dict(self.stats['by_operation'])
+            return stats
+
+    def public_file(self, file_meta: Dict[str, Any]) -> Dict[str, Any]:
+        """Metadata file không kèm nội dung"""
+        return {key: value for key, value in file_meta.items() if not key.startswith('_')}
+
+
+# ----------------------------------------------------------------------
+# Request objects
+# ----------------------------------------------------------------------
+
+class FakeRequest:
+    """Request giả lập (cùng interface HttpRequest.execute)"""
+
+    def __init__(self, backend: FakeGoogleBackend, operation: str, uri: str, handler: Callable[[], Any]):
+        self.backend = backend
+        self.operation = operation
+        self.uri = uri
+        self.method = 'GET'
+        self.headers = {}
+        self._handler = handler
+
+    def execute(self, http=None, num_retries: int = 0):
+        """Thực thi request (thử lại num_retries lần với lỗi 429/5xx như googleapiclient)"""
+        for attempt in range(num_retries + 1):
+            try:
+                return self.backend.call(self.operation, self.uri, self._handler)
+            except Exception as e:
+                status = getattr(getattr(e, 'resp', None), 'status', None)
+                if attempt >= num_retries or not status or (status != 429 and status < 500):
+                    raise
+
+
+class FakeMediaHttp:
+    """Transport giả cho MediaIoBaseDownload (request() trả về (response, content))"""
+
+    def __init__(self, backend: FakeGoogleBackend):
+        self.backend = backend
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        file_id = uri.split('/files/', 1)[1].split('?', 1)[0]
+        status = self.backend._simulate('drive.files.get_media', uri)
+        if status:
+            return FakeResponse(status), json.dumps({'error': {'code': status}}).encode('utf-8')
+
+        with self.backend._lock:
+            file_meta = self.backend.files.get(file_id)
+            if not file_meta:
+                return FakeResponse(404), b'{"error": {"code": 404, "message": "File not found"}}'
+            content = file_meta['_content']
+
+        total = len(content)
+        range_header = (headers or {}).get('range') or (headers or {}).get('Range')
+        if range_header:
+            start, _, end = range_header.split('=', 1)[1].partition('-')
+            start, end = int(start), min(int(end) if end else total - 1, total - 1)
+            chunk = content[start:end + 1]
+            response = FakeResponse(206, {'content-range': f"bytes {start}-{start + len(chunk) - 1}/{total}"})
+        else:
+            chunk = content
+            response = FakeResponse(200, {'content-length': str(total)})
+
+        with self.backend._lock:
+            self.backend.stats['bytes_downloaded'] += len(chunk)
+        return response, chunk
+
+
+class FakeMediaRequest(FakeRequest):
+    """Request get_media: dùng được với MediaIoBaseDownload hoặc execute() trả bytes"""
+
+    def __init__(self, backend: FakeGoogleBackend, file_id: str):
+        uri = f"fake://www.googleapis.com/drive/v3/files/{file_id}?alt=media"
+        super().__init__(backend, 'drive.files.get_media', uri, None)
+        self.http = FakeMediaHttp(backend)
+        self.file_id = file_id
+
+    def execute(self, http=None, num_retries: int = 0):
+        response, content = self.http.request(self.uri)
+        if response.status >= 400:
+            raise self.backend.make_error(response.status, self.uri)
+        return content
+
+
+class FakeUploadRequest(FakeRequest):
+    """files().create có media_body: upload một lần hoặc resumable theo chunk (next_chunk)"""
+
+    def __init__(self, backend: FakeGoogleBackend, body: Dict[str, Any], media_body, fields: str = None):
+        super().__init__(backend, 'drive.files.create', 'fake://www.googleapis.com/upload/drive/v3/files', None)
+        self.method = 'POST'
+        self.body = body or {}
+        self.media_body = media_body
+        self.resumable = media_body.resumable() if hasattr(media_body, 'resumable') else False
+        self.resumable_progress = 0
+        self._buffer = bytearray()
+
+    def _total_size(self) -> int:
+        size = self.media_body.size()
+        return size if size is not None else 0
+
+    def next_chunk(self, http=None, num_retries: int = 0):
+        """
+        Upload chunk tiếp theo
+
+        Returns:
+            Tuple: (FakeUploadProgress hoặc None, metadata file khi xong hoặc None)
+        """
+        total = self._total_size()
+        chunk_size = self.backend.upload_chunk_size
+        if hasattr(self.media_body, 'chunksize') and self.media_body.chunksize() > 0:
+            chunk_size = min(chunk_size, self.media_body.chunksize())
+
+        def upload_chunk():
+            data = self.media_body.getbytes(self.resumable_progress, chunk_size)
+            self._buffer.extend(data)
+            self.resumable_progress += len(data)
+            self.backend.stats['bytes_uploaded'] += len(data)
+            if self.resumable_progress >= total:
+                return self._finish()
+            return None
+
+        for attempt in range(num_retries + 1):
+            try:
+                result = self.backend.call('drive.files.upload_chunk', self.uri, upload_chunk)
+                break
+            except Exception as e:
+                status = getattr(getattr(e, 'resp', None), 'status', None)
+                if attempt >= num_retries or not status or (status != 429 and status < 500):
+                    raise
+
+        if result is not None:
+            return None, result
+        return FakeUploadProgress(self.resumable_progress, total), None
+
+    def _finish(self) -> Dict[str, Any]:
+        mime_type = self.body.get('mimeType')
+        if not mime_type and hasattr(self.media_body, 'mimetype'):
+            mime_type = self.media_body.mimetype()
+        file_id = self.backend.add_file(self.body.get('name', 'untitled'), bytes(self._buffer),
+                                        self.body.get('parents'), mime_type or 'application/octet-stream')
+        return self.backend.public_file(self.backend.files[file_id])
+
+    def execute(self, http=None, num_retries: int = 0):
+        if not self.resumable:
+            total = self._total_size()
+
+            def upload_all():
+                self._buffer = bytearray(self.media_body.getbytes(0, total))
+                self.backend.stats['bytes_uploaded'] += total
+                return self._finish()
+
+            return FakeRequest(self.backend, 'drive.files.create', self.uri, upload_all).execute(
+                num_retries=num_retries)
+
+        # Khởi tạo phiên resumable rồi upload từng chunk (giống googleapiclient)
+        self.backend.call('drive.files.create', self.uri, lambda: None)
+        while True:
+            _, response = self.next_chunk(num_retries=num_retries)
+            if response is not None:
+                return response
+
+
+# ----------------------------------------------------------------------
+# Drive v3
+# ----------------------------------------------------------------------
+
+class FakeDriveService:
+    """Drive v3 service giả lập"""
+
+    def __init__(self, backend: FakeGoogleBackend):
+        self._backend = backend
+
+    def files(self):
+        return FakeFilesResource(self._backend)
+
+
+class FakeFilesResource:
+    """Drive v3 files() resource"""
+
+    BASE_URI = 'fake://www.googleapis.com/drive/v3/files'
+
+    def __init__(self, backend: FakeGoogleBackend):
+        self._backend = backend
+
+    def _get_file(self, file_id: str, uri: str) -> Dict[str, Any]:
+        file_meta = self._backend.files.get(file_id)
+        if not file_meta or file_meta.get('trashed'):
+            raise self._backend.make_error(404, uri, f"File not found: {file_id}")
+        return file_meta
+
+    def list(self, q: str = None, pageSize: int = 100, pageToken: str = None, orderBy: str = None,
+             fields: str = None, **kwargs) -> FakeRequest:
+        matcher = compile_drive_query(q)
+        page_size = max(1, min(int(pageSize or 100), 1000))
+        offset = int(pageToken or 0)
+
+        def handler():
+            matched = [f for f in self._backend.files.values() if matcher(f)]
+            if orderBy:
+                for order_field in reversed([part.strip() for part in orderBy.split(',')]):
+                    field_name, _, direction = order_field.partition(' ')
+                    matched.sort(key=lambda f: str(f.get(field_name, '')), reverse=direction.lower() == 'desc')
+
+            page = matched[offset:offset + page_size]
+            result = {'files': [self._backend.public_file(f) for f in page]}
+            if offset + page_size < len(matched):
+                result['nextPageToken'] = str(offset + page_size)
+            return result
+
+        return FakeRequest(self._backend, 'drive.files.list', self.BASE_URI, handler)
+
+    def get(self, fileId: str, fields: str = None, **kwargs) -> FakeRequest:
+        uri = f"{self.BASE_URI}/{fileId}"
+        return FakeRequest(self._backend, 'drive.files.get', uri,
+                           lambda: self._backend.public_file(self._get_file(fileId, uri)))
+
+    def get_media(self, fileId: str, **kwargs) -> FakeMediaRequest:
+        return FakeMediaRequest(self._backend, fileId)
+
+    def create(self, body: Dict[str, Any] = None, media_body=None, fields: str = None, **kwargs) -> FakeRequest:
+        if media_body is not None:
+            return FakeUploadRequest(self._backend, body, media_body, fields)
+
+        body = body or {}
+
+        def handler():
+            if body.get('mimeType') == FOLDER_MIME_TYPE:
+                file_id = self._backend.add_folder(body.get('name', 'untitled'), body.get('parents'))
+            else:
+                file_id = self._backend.add_file(body.get('name', 'untitled'), b'', body.get('parents'),
+                                                 body.get('mimeType', 'application/octet-stream'))
+            return self._backend.public_file(self._backend.files[file_id])
+
+        return FakeRequest(self._backend, 'drive.files.create', self.BASE_URI, handler)
+
+    def delete(self, fileId: str, **kwargs) -> FakeRequest:
+        uri = f"{self.BASE_URI}/{fileId}"
+
+        def handler():
+            self._get_file(fileId, uri)
+            self._backend.files.pop(fileId, None)
+            self._backend.spreadsheets.pop(fileId, None)
+            return ''
+
+        return FakeRequest(self._backend, 'drive.files.delete', uri, handler)
+
+
+# ----------------------------------------------------------------------
+# Sheets v4
+# ----------------------------------------------------------------------
+
+class FakeSheetsService:
+    """Sheets v4 service giả lập"""
+
+    def __init__(self, backend: FakeGoogleBackend):
+        self._backend = backend
+
+    def spreadsheets(self):
+        return FakeSpreadsheetsResource(self._backend)
+
+
+class FakeSpreadsheetsResource:
+    """Sheets v4 spreadsheets() resource"""
+
+    BASE_URI = 'fake://sheets.googleapis.com/v4/spreadsheets'
+
+    def __init__(self, backend: FakeGoogleBackend):
+        self._backend = backend
+
+    def values(self):
+        return FakeValuesResource(self._backend)
+
+    def _get_spreadsheet(self, spreadsheet_id: str) -> Dict[str, Any]:
+        spreadsheet = self._backend.spreadsheets.get(spreadsheet_id)
+        if spreadsheet is None:
+            raise self._backend.make_error(404, f"{self.BASE_URI}/{spreadsheet_id}",
+                                           f"Requested entity was not found: {spreadsheet_id}")
+        return spreadsheet
+
+    def get(self, spreadsheetId: str, ranges: List[str] = None, includeGridData: bool = False,
+            fields: str = None, **kwargs) -> FakeRequest:
+        def handler():
+            spreadsheet = self._get_spreadsheet(spreadsheetId)
+            with_grid = includeGridData or (fields and 'data' in fields and 'rowData' in fields)
+
+            requested = {}
+            for range_name in ranges or []:
+                sheet_name, *bounds = parse_sheet_range(spreadsheet['sheets'], range_name)
+                if sheet_name is None:
+                    raise self._backend.make_error(400, f"{self.BASE_URI}/{spreadsheetId}",
+                                                   f"Unable to parse range: {range_name}")
+                requested.setdefault(sheet_name, []).append(tuple(bounds))
+
+            sheets = []
+            for title, tab in spreadsheet['sheets'].items():
+                if requested and title not in requested:
+                    continue
+
+                values = tab['values']
+                sheet = {'properties': {
+                    'sheetId': tab['sheetId'],
+                    'title': title,
+                    'index': len(sheets),
+                    'gridProperties': {
+                        'rowCount': max(len(values), 1000),
+                        'columnCount': max((len(row) for row in values), default=26)
+                    }
+                }}
+
+                if with_grid:
+                    sheet['data'] = [
+                        self._grid_data(tab, *bounds)
+                        for bounds in requested.get(title, [(0, 0, _OPEN_END, _OPEN_END)])
+                    ]
+                sheets.append(sheet)
+
+            return {
+                'spreadsheetId': spreadsheetId,
+                'properties': {'title': spreadsheet['title']},
+                'sheets': sheets
+            }
+
+        return FakeRequest(self._backend, 'sheets.spreadsheets.get', f"{self.BASE_URI}/{spreadsheetId}", handler)
+
+    @staticmethod
+    def _grid_data(tab: Dict[str, Any], start_row: int, start_col: int, end_row: int, end_col: int) -> Dict[str, Any]:
+        values = tab['values']
+        row_data = []
+        for row_index in range(start_row, min(end_row, len(values))):
+            row = values[row_index]
+            cells = []
+            for col_index in range(start_col, min(end_col, len(row))):
+                cell = {'formattedValue': _format_value(row[col_index])}
+                url = tab['hyperlinks'].get((row_index, col_index))
+                if url:
+                    cell['hyperlink'] = url
+                cells.append(cell)
+            row_data.append({'values': cells})
+        return {'startRow': start_row, 'startColumn': start_col, 'rowData': row_data}
+
+    def batchUpdate(self, spreadsheetId: str, body: Dict[str, Any] = None, **kwargs) -> FakeRequest:
+        def handler():
+            spreadsheet = self._get_spreadsheet(spreadsheetId)
+            replies = []
+            for request in (body or {}).get('requests', []):
+                if 'addSheet' in request:
+                    title = request['addSheet'].get('properties', {}).get('title') or \
+                        f"Sheet{len(spreadsheet['sheets']) + 1}"
+                    sheet_id = max((tab['sheetId'] for tab in spreadsheet['sheets'].values()), default=-1) + 1
+                    spreadsheet['sheets'][title] = {'sheetId': sheet_id, 'values': [], 'hyperlinks': {}}
+                    replies.append({'addSheet': {'properties': {'sheetId': sheet_id, 'title': title}}})
+                else:
+                    # Định dạng (repeatCell, autoResize...) không ảnh hưởng giá trị
+                    replies.append({})
+            self._backend._touch(spreadsheetId)
+            return {'spreadsheetId': spreadsheetId, 'replies': replies}
+
+        return FakeRequest(self._backend, 'sheets.spreadsheets.batchUpdate',
+                           f"{self.BASE_URI}/{spreadsheetId}:batchUpdate", handler)
+
+    def create(self, body: Dict[str, Any] = None, **kwargs) -> FakeRequest:
+        def handler():
+            body_data = body or {}
+            sheet_titles = [s.get('properties', {}).get('title') for s in body_data.get('sheets', [])] or ['Sheet1']
+            spreadsheet_id = self._backend.add_spreadsheet(
+                body_data.get('properties', {}).get('title', 'Untitled spreadsheet'),
+                {title: [] for title in sheet_titles}
+            )
+            return {'spreadsheetId': spreadsheet_id,
+                    'spreadsheetUrl': self._backend.files[spreadsheet_id]['webViewLink']}
+
+        return FakeRequest(self._backend, 'sheets.spreadsheets.create', self.BASE_URI, handler)
+
+
+def _format_value(value: Any) -> str:
+    """Giá trị hiển thị (FORMATTED_VALUE) của một ô"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _input_value(value: Any, value_input_option: str) -> Any:
+    """Giá trị lưu vào ô theo valueInputOption (USER_ENTERED parse số)"""
+    if value_input_option == 'USER_ENTERED' and isinstance(value, str):
+        text = value.strip()
+        if re.fullmatch(r"-?\d+", text):
+            return int(text)
+        if re.fullmatch(r"-?\d+\.\d+", text):
+            return float(text)
+    return value
+
+
+class FakeValuesResource:
+    """Sheets v4 spreadsheets().values() resource"""
+
+    BASE_URI = 'fake://sheets.googleapis.com/v4/spreadsheets'
+
+    def __init__(self, backend: FakeGoogleBackend):
+        self._backend = backend
+
+    def _resolve_tab(self, spreadsheet_id: str, range_name: str):
+        spreadsheet = self._backend.spreadsheets.get(spreadsheet_id)
+        if spreadsheet is None:
+            raise self._backend.make_error(404, f"{self.BASE_URI}/{spreadsheet_id}",
+                                           f"Requested entity was not found: {spreadsheet_id}")
+
+        sheet_name, start_row, start_col, end_row, end_col = parse_sheet_range(spreadsheet['sheets'], range_name)
+        if sheet_name is None:
+            raise self._backend.make_error(400, f"{self.BASE_URI}/{spreadsheet_id}",
+                                           f"Unable to parse range: {range_name}")
+
+        return sheet_name, spreadsheet['sheets'][sheet_name], (start_row, start_col, end_row, end_col)
+
+    def _read_range(self, spreadsheet_id: str, range_name: str, major_dimension: str,
+                    render_option: str) -> Dict[str, Any]:
+        sheet_name, tab, (start_row, start_col, end_row, end_col) = self._resolve_tab(spreadsheet_id, range_name)
+
+        rows = []
+        for row in tab['values'][start_row:min(end_row, len(tab['values']))]:
+            cells = row[start_col:min(end_col, len(row))]
+            if render_option != 'UNFORMATTED_VALUE':
+                cells = [_format_value(value) for value in cells]
+            else:
+                cells = ['' if value is None else value for value in cells]
+            # API bỏ các ô trống ở cuối hàng
+            while cells and cells[-1] == '':
+                cells.pop()
+            rows.append(cells)
+
+        # ... và các hàng trống ở cuối
+        while rows and not rows[-1]:
+            rows.pop()
+
+        if major_dimension == 'COLUMNS':
+            width = max((len(row) for row in rows), default=0)
+            columns = [[row[col] if col < len(row) else '' for row in rows] for col in range(width)]
+            for column in columns:
+                while column and column[-1] == '':
+                    column.pop()
+            rows = columns
+
+        quoted = "'" + sheet_name.replace("'", "''") + "'"
+        result = {'range': f"{quoted}!{range_name.rpartition('!')[2] or 'A1'}", 'majorDimension': major_dimension}
+        if rows:
+            result['values'] = rows
+        return result
+
+    def _write_range(self, spreadsheet_id: str, range_name: str, values: List[List[Any]],
+                     value_input_option: str) -> Dict[str, Any]:
+        sheet_name, tab, (start_row, start_col, _, _) = self._resolve_tab(spreadsheet_id, range_name)
+        grid = tab['values']
+
+        for row_offset, row_values in enumerate(values or []):
+            row_index = start_row + row_offset
+            while len(grid) <= row_index:
+                grid.append([])
+            row = grid[row_index]
+            for col_offset, value in enumerate(row_values):
+                col_index = start_col + col_offset
+                while len(row) <= col_index:
+                    row.append('')
+                row[col_index] = _input_value(value, value_input_option)
+
+        updated_rows = len(values or [])
+        updated_columns = max((len(row) for row in values or []), default=0)
+        return {
+            'spreadsheetId': spreadsheet_id,
+            'updatedRange': range_name,
+            'updatedRows': updated_rows,
+            'updatedColumns': updated_columns,
+            'updatedCells': sum(len(row) for row in values or [])
+        }
+
+    def _clear_range(self, spreadsheet_id: str, range_name: str) -> str:
+        _, tab, (start_row, start_col, end_row, end_col) = self._resolve_tab(spreadsheet_id, range_name)
+        for row in tab['values'][start_row:min(end_row, len(tab['values']))]:
+            for col_index in range(start_col, min(end_col, len(row))):
+                row[col_index] = ''
+        for (row_index, col_index) in list(tab['hyperlinks']):
+            if start_row <= row_index < end_row and start_col <= col_index < end_col:
+                tab['hyperlinks'].pop((row_index, col_index))
+        return range_name
+
+    def get(self, spreadsheetId: str, range: str, majorDimension: str = 'ROWS',
+            valueRenderOption: str = 'FORMATTED_VALUE', **kwargs) -> FakeRequest:
+        return FakeRequest(self._backend, 'sheets.values.get', f"{self.BASE_URI}/{spreadsheetId}/values/{range}",
+                           lambda: self._read_range(spreadsheetId, range, majorDimension, valueRenderOption))
+
+    def batchGet(self, spreadsheetId: str, ranges: List[str] = None, majorDimension: str = 'ROWS',
+                 valueRenderOption: str = 'FORMATTED_VALUE', **kwargs) -> FakeRequest:
+        def handler():
+            return {
+                'spreadsheetId': spreadsheetId,
+                'valueRanges': [self._read_range(spreadsheetId, range_name, majorDimension, valueRenderOption)
+                                for range_name in ranges or []]
+            }
+
+        return FakeRequest(self._backend, 'sheets.values.batchGet',
+                           f"{self.BASE_URI}/{spreadsheetId}/values:batchGet", handler)
+
+    def update(self, spreadsheetId: str, range: str, body: Dict[str, Any] = None,
+               valueInputOption: str = 'RAW', **kwargs) -> FakeRequest:
+        def handler():
+            result = self._write_range(spreadsheetId, range, (body or {}).get('values', []), valueInputOption)
+            self._backend._touch(spreadsheetId)
+            return result
+
+        return FakeRequest(self._backend, 'sheets.values.update',
+                           f"{self.BASE_URI}/{spreadsheetId}/values/{range}", handler)
+
+    def batchUpdate(self, spreadsheetId: str, body: Dict[str, Any] = None, **kwargs) -> FakeRequest:
+        def handler():
+            body_data = body or {}
+            value_input_option = body_data.get('valueInputOption', 'RAW')
+            responses = [self._write_range(spreadsheetId, value_range['range'], value_range.get('values', []),
+                                           value_input_option)
+                         for value_range in body_data.get('data', [])]
+            self._backend._touch(spreadsheetId)
+            return {
+                'spreadsheetId': spreadsheetId,
+                'totalUpdatedRows': sum(r['updatedRows'] for r in responses),
+                'totalUpdatedCells': sum(r['updatedCells'] for r in responses),
+                'responses': responses
+            }
+
+        return FakeRequest(self._backend, 'sheets.values.batchUpdate',
+                           f"{self.BASE_URI}/{spreadsheetId}/values:batchUpdate", handler)
+
+    def clear(self, spreadsheetId: str, range: str, body: Dict[str, Any] = None, **kwargs) -> FakeRequest:
+        def handler():
+            cleared = self._clear_range(spreadsheetId, range)
+            self._backend._touch(spreadsheetId)
+            return {'spreadsheetId': spreadsheetId, 'clearedRange': cleared}
+
+        return FakeRequest(self._backend, 'sheets.values.clear',
+                           f"{self.BASE_URI}/{spreadsheetId}/values/{range}:clear", handler)
+
+    def batchClear(self, spreadsheetId: str, body: Dict[str, Any] = None, **kwargs) -> FakeRequest:
+        def handler():
+            cleared = [self._clear_range(spreadsheetId, range_name) for range_name in (body or {}).get('ranges', [])]
+            self._backend._touch(spreadsheetId)
+            return {'spreadsheetId': spreadsheetId, 'clearedRanges': cleared}
+
+        return FakeRequest(self._backend, 'sheets.values.batchClear',
+                           f"{self.BASE_URI}/{spreadsheetId}/values:batchClear", handler)
+
+
+# Global backend instance (khởi tạo lazy)
+_fake_backend: Optional[FakeGoogleBackend] = None
+_fake_backend_lock = threading.Lock()
+
+
+def is_fake_google_enabled() -> bool:
+    """
+    Kiểm tra config switch GOOGLE_API_BACKEND=fake
+
+    Returns:
+        bool: True nếu dùng backend giả lập
+    """
+    from config.config_manager import get_config
+    return str(get_config().get('GOOGLE_API_BACKEND', 'google')).strip().lower() == 'fake'
+
+
+def get_fake_google_backend() -> FakeGoogleBackend:
+    """
+    Lấy instance FakeGoogleBackend global (cấu hình từ GOOGLE_FAKE_* và nạp fixture nếu có)
+
+    Returns:
+        FakeGoogleBackend: Backend dùng chung toàn process
+    """
+    global _fake_backend
+    with _fake_backend_lock:
+        if _fake_backend is None:
+            from config.config_manager import get_config
+            config = get_config()
+
+            _fake_backend = FakeGoogleBackend(
+                latency=float(config.get('GOOGLE_FAKE_LATENCY_MS', 0)) / 1000,
+                jitter=float(config.get('GOOGLE_FAKE_JITTER_MS', 0)) / 1000,
+                error_rate=float(config.get('GOOGLE_FAKE_ERROR_RATE', 0)),
+                error_status=int(config.get('GOOGLE_FAKE_ERROR_STATUS', 503)),
+                seed=int(config.get('GOOGLE_FAKE_SEED', 0))
+            )
+
+            fixture_file = config.get('GOOGLE_FAKE_FIXTURE')
+            if fixture_file:
+                try:
+                    _fake_backend.load_fixture(fixture_file)
+                    print(f"🧪 Fake Google backend: đã nạp fixture {fixture_file}")
+                except Exception as e:
+                    print(f"⚠️  Không nạp được fixture fake Google: {e}")
+
+        return _fake_backend
+
+
+def reset_fake_google_backend() -> None:
+    """Xóa backend global (benchmark tạo lại dữ liệu sạch)"""
+    global _fake_backend
+    with _fake_backend_lock:
+        _fake_backend = None
@@ -6,16 +6,16 @@ Date: 2025-07-26
 
 import os
 import io
+import json
+import time
+import hashlib
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 from datetime import datetime
 
 try:
-    from google.auth.transport.requests import Request
-    from google.oauth2 import service_account
-    from googleapiclient.discovery import build
     from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
-    import gspread
     from gspread_dataframe import get_as_dataframe, set_with_dataframe
     GOOGLE_LIBS_AVAILABLE = True
 except ImportError:
@@ -25,11 +25,19 @@ except ImportError:
     print("   Chạy: pip install google-api-python-client gspread gspread-dataframe")
 
 from config import config
+from config.google_client_registry import get_google_registry
+from config.sheet_cache import SheetSnapshotCache, get_sheet_cache
+
+# Số hàng tối đa mỗi request batchUpdate khi ghi Google Sheets
+DEFAULT_WRITE_CHUNK_ROWS = 1000
 
 
 class GoogleAPIClient:
     """Client để tương tác với Google Drive và Google Sheets"""
     
+    # Cột phụ trong kết quả projected read: số hàng thực tế (1-based) trên Google Sheets
+    SHEET_ROW_COLUMN = '__sheet_row__'
+    
     def __init__(self):
         """Khởi tạo Google API Client"""
         if not GOOGLE_LIBS_AVAILABLE:
@@ -40,6 +48,8 @@ class GoogleAPIClient:
         self.sheets_service = None
         self.gspread_client = None
         self.service_account_file = config.SERVICE_ACCOUNT_FILE
+        self._header_cache = {}
+        self._write_checkpoints = {}
         
         # Tạo thư mục sync nếu chưa tồn tại
         os.makedirs(config.LOCAL_SYNC_FOLDER, exist_ok=True)
@@ -49,19 +59,13 @@ class GoogleAPIClient:
     def _authenticate(self):
         """Xác thực với Google APIs"""
         try:
-            if not os.path.exists(config.SERVICE_ACCOUNT_FILE):
-                raise FileNotFoundError(f"Service account file không tồn tại: {config.SERVICE_ACCOUNT_FILE}")
-            
-            # Tạo credentials từ service account
-            self.credentials = service_account.Credentials.from_service_account_file(
-                config.SERVICE_ACCOUNT_FILE,
-                scopes=config.SCOPES
-            )
+            # Credentials và các service được build một lần cho cả process
+            registry = get_google_registry()
             
-            # Khởi tạo các service
-            self.drive_service = build('drive', 'v3', credentials=self.credentials)
-            self.sheets_service = build('sheets', 'v4', credentials=self.credentials)
-            self.gspread_client = gspread.authorize(self.credentials)
+            self.credentials = registry.get_service_account_credentials()
+            self.drive_service = registry.get_drive_service()
+            self.sheets_service = registry.get_sheets_service()
+            self.gspread_client = registry.get_gspread_client(self.credentials)
             
             print("✅ Đã xác thực thành công với Google APIs")
             
@@ -212,13 +216,15 @@ class GoogleAPIClient:
         """
         return self._read_sheet_with_fallback(sheet_id, sheet_name)
     
-    def _read_sheet_with_fallback(self, sheet_id: str, sheet_name: str = None) -> pd.DataFrame:
+    def _read_sheet_with_fallback(self, sheet_id: str, sheet_name: str = None,
+                                  with_sheet_row: bool = False) -> pd.DataFrame:
         """
         Đọc Google Sheets với fallback mechanism
         
         Args:
             sheet_id (str): ID của Google Sheets
             sheet_name (str): Tên sheet
+            with_sheet_row (bool): Thêm cột self.SHEET_ROW_COLUMN chứa số hàng thực tế trên sheet
             
         Returns:
             pd.DataFrame: Dữ liệu từ sheet
@@ -226,20 +232,20 @@ class GoogleAPIClient:
         print(f"📊 Đang đọc Google Sheet ID: {sheet_id}")
         
         # Method 1: Thử với gspread (ưu tiên)
-        result = self._try_gspread_read(sheet_id, sheet_name)
+        result = self._try_gspread_read(sheet_id, sheet_name, with_sheet_row)
         if not result.empty:
             return result
         
         # Method 2: Fallback với Sheets API
         print("🔄 Fallback: Sử dụng Sheets API...")
-        result = self._try_sheets_api_read(sheet_id, sheet_name)
+        result = self._try_sheets_api_read(sheet_id, sheet_name, with_sheet_row)
         if not result.empty:
             return result
         
         print(f"❌ Không thể đọc sheet với ID: {sheet_id}")
         return pd.DataFrame()
     
-    def _try_gspread_read(self, sheet_id: str, sheet_name: str = None) -> pd.DataFrame:
+    def _try_gspread_read(self, sheet_id: str, sheet_name: str = None, with_sheet_row: bool = False) -> pd.DataFrame:
         """Thử đọc với gspread"""
         try:
             print("🔍 Thử với gspread...")
@@ -258,7 +264,7 @@ class GoogleAPIClient:
             
             # Đọc dữ liệu
             df = get_as_dataframe(worksheet, header=0, evaluate_formulas=True)
-            df = self._clean_dataframe(df)
+            df = self._clean_dataframe(df, with_sheet_row)
             
             print(f"✅ Gspread success: {worksheet.title} ({len(df)} hàng, {len(df.columns)} cột)")
             return df
@@ -267,7 +273,7 @@ class GoogleAPIClient:
             print(f"❌ Gspread failed: {e}")
             return pd.DataFrame()
     
-    def _try_sheets_api_read(self, sheet_id: str, sheet_name: str = None) -> pd.DataFrame:
+    def _try_sheets_api_read(self, sheet_id: str, sheet_name: str = None, with_sheet_row: bool = False) -> pd.DataFrame:
         """Thử đọc với Sheets API"""
         try:
             print("🔍 Thử với Sheets API...")
@@ -304,7 +310,7 @@ class GoogleAPIClient:
             
             # Tạo DataFrame
             df = self._values_to_dataframe(values)
-            df = self._clean_dataframe(df)
+            df = self._clean_dataframe(df, with_sheet_row)
             
             print(f"✅ Sheets API success: {target_sheet} ({len(df)} hàng, {len(df.columns)} cột)")
             return df
@@ -339,16 +345,21 @@ class GoogleAPIClient:
         df = pd.DataFrame(normalized_rows, columns=headers)
         return df
     
-    def _clean_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Làm sạch DataFrame"""
+    def _clean_dataframe(self, df: pd.DataFrame, with_sheet_row: bool = False) -> pd.DataFrame:
+        """Làm sạch DataFrame (with_sheet_row: giữ số hàng thực tế trước khi bỏ hàng trống)"""
         if df.empty:
             return df
         
         # Bỏ các cột hoàn toàn trống
         df = df.dropna(how='all', axis=1)
         
+        # Header ở hàng 1 nên hàng dữ liệu đầu tiên là hàng 2 trên sheet
+        data_columns = list(df.columns)
+        if with_sheet_row:
+            df[self.SHEET_ROW_COLUMN] = list(range(2, len(df) + 2))
+        
         # Bỏ các hàng hoàn toàn trống
-        df = df.dropna(how='all', axis=0)
+        df = df.dropna(how='all', axis=0, subset=data_columns)
         
         # Reset index
         df = df.reset_index(drop=True)
@@ -359,21 +370,194 @@ class GoogleAPIClient:
         
         return df
     
-    def write_google_sheet(self, sheet_id: str, sheet_name: str, df: pd.DataFrame, clear_first: bool = True) -> bool:
+    def write_google_sheet(self, sheet_id: str, sheet_name: str, df: pd.DataFrame, clear_first: bool = True,
+                           chunk_rows: int = DEFAULT_WRITE_CHUNK_ROWS,
+                           progress_callback: Callable[[int, int], None] = None) -> bool:
         """
         Ghi dữ liệu vào Google Sheets thông qua ID
         
+        Ghi theo từng chunk hàng bằng values().batchUpdate, chỉ gửi các hàng khác
+        với dữ liệu hiện có trên sheet. Nếu lỗi giữa chừng, lần gọi lại với cùng
+        dữ liệu sẽ tiếp tục từ chunk cuối cùng đã ghi thành công.
+        
         Args:
             sheet_id (str): ID của Google Sheets
             sheet_name (str): Tên sheet
             df (pd.DataFrame): Dữ liệu cần ghi
-            clear_first (bool): Xóa dữ liệu cũ trước khi ghi
+            clear_first (bool): Xóa dữ liệu cũ trước khi ghi (phần thừa ngoài df)
+            chunk_rows (int): Số hàng tối đa mỗi request batchUpdate
+            progress_callback (Callable): Hàm nhận (số hàng đã ghi, tổng số hàng cần ghi)
             
         Returns:
             bool: True nếu thành công
         """
+        result = self._try_chunked_write(sheet_id, sheet_name, df, clear_first, chunk_rows, progress_callback)
+        if result is not None:
+            return result
+        
+        # Không chuẩn bị được chunked write (chưa ghi gì) - dùng cách ghi cũ
         return self._write_sheet_with_fallback(sheet_id, sheet_name, df, clear_first)
     
+    def _try_chunked_write(self, sheet_id: str, sheet_name: str, df: pd.DataFrame, clear_first: bool,
+                           chunk_rows: int, progress_callback: Callable[[int, int], None] = None,
+                           max_retries: int = 3) -> Optional[bool]:
+        """
+        Ghi theo chunk với diff và checkpoint
+        
+        Returns:
+            Optional[bool]: True/False nếu đã ghi thành công/thất bại giữa chừng,
+                None nếu lỗi ở bước chuẩn bị (caller có thể fallback)
+        """
+        try:
+            if not self._ensure_sheet_exists(sheet_id, sheet_name):
+                return None
+            
+            quoted_sheet = "'" + sheet_name.replace("'", "''") + "'"
+            target_values = [[self._to_sheet_value(v) for v in df.columns.tolist()]] + \
+                            [[self._to_sheet_value(v) for v in row] for row in df.values.tolist()]
+            width = max((len(row) for row in target_values), default=0)
+            signature = hashlib.md5(json.dumps(target_values, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+            checkpoint_key = (sheet_id, sheet_name)
+            
+            checkpoint = self._write_checkpoints.get(checkpoint_key)
+            if checkpoint and checkpoint['signature'] == signature:
+                # Cùng dữ liệu với lần ghi bị lỗi trước: dùng lại kế hoạch chunk, bỏ qua chunk đã ack
+                chunks = checkpoint['chunks']
+                start_chunk = checkpoint['acked_chunks']
+                print(f"🔁 Tiếp tục ghi từ chunk {start_chunk + 1}/{len(chunks)}")
+            else:
+                existing = self.sheets_service.spreadsheets().values().get(
+                    spreadsheetId=sheet_id,
+                    range=f"{quoted_sheet}!A:ZZ",
+                    valueRenderOption='UNFORMATTED_VALUE'
+                ).execute().get('values', [])
+                
+                changed_rows = [
+                    row_index for row_index, row in enumerate(target_values)
+                    if row_index >= len(existing) or
+                    self._normalize_row(existing[row_index], width) != self._normalize_row(row, width)
+                ]
+                chunks = self._plan_write_chunks(changed_rows, chunk_rows)
+                start_chunk = 0
+                
+                # Xóa phần dữ liệu cũ nằm ngoài vùng df
+                if clear_first and existing:
+                    existing_width = max((len(row) for row in existing), default=0)
+                    clear_ranges = []
+                    if len(existing) > len(target_values):
+                        clear_ranges.append(f"{quoted_sheet}!A{len(target_values) + 1}:ZZ")
+                    if existing_width > width:
+                        clear_ranges.append(f"{quoted_sheet}!{self._column_letter(width)}1:ZZ")
+                    if clear_ranges:
+                        self.sheets_service.spreadsheets().values().batchClear(
+                            spreadsheetId=sheet_id,
+                            body={'ranges': clear_ranges}
+                        ).execute()
+                        print("🧹 Đã xóa dữ liệu cũ ngoài vùng ghi")
+                
+                print(f"🔍 Diff: {len(changed_rows)}/{len(target_values)} hàng thay đổi, {len(chunks)} chunk")
+                
+        except Exception as e:
+            print(f"❌ Không chuẩn bị được chunked write: {e}")
+            return None
+        
+        total_rows = sum(end - start for chunk in chunks for start, end in chunk)
+        written_rows = sum(end - start for chunk in chunks[:start_chunk] for start, end in chunk)
+        
+        for chunk_index in range(start_chunk, len(chunks)):
+            data = [
+                {
+                    'range': f"{quoted_sheet}!A{start + 1}",
+                    'majorDimension': 'ROWS',
+                    'values': [row + [''] * (width - len(row)) for row in target_values[start:end]]
+                }
+                for start, end in chunks[chunk_index]
+            ]
+            
+            for attempt in range(1, max_retries + 1):
+                try:
+                    self.sheets_service.spreadsheets().values().batchUpdate(
+                        spreadsheetId=sheet_id,
+                        body={'valueInputOption': 'RAW', 'data': data}
+                    ).execute()
+                    break
+                except Exception as e:
+                    if attempt == max_retries:
+                        # Lưu checkpoint để lần gọi sau tiếp tục từ chunk này
+                        self._write_checkpoints[checkpoint_key] = {
+                            'signature': signature,
+                            'chunks': chunks,
+                            'acked_chunks': chunk_index
+                        }
+                        print(f"❌ Ghi chunk {chunk_index + 1}/{len(chunks)} thất bại: {e}")
+                        print(f"💾 Đã lưu checkpoint - gọi lại để tiếp tục ({written_rows}/{total_rows} hàng)")
+                        return False
+                    time.sleep(2 ** attempt)
+            
+            written_rows += sum(end - start for start, end in chunks[chunk_index])
+            print(f"📝 Chunk {chunk_index + 1}/{len(chunks)}: {written_rows}/{total_rows} hàng")
+            if progress_callback:
+                progress_callback(written_rows, total_rows)
+        
+        self._write_checkpoints.pop(checkpoint_key, None)
+        get_sheet_cache().invalidate(sheet_id, sheet_name)
+        print(f"✅ Chunked write success: {sheet_name} ({len(df)} hàng, {len(df.columns)} cột, {total_rows} hàng đã gửi)")
+        return True
+    
+    @staticmethod
+    def _plan_write_chunks(changed_rows: List[int], chunk_rows: int) -> List[List[tuple]]:
+        """
+        Gom các hàng thay đổi thành các khoảng liên tiếp rồi chia thành chunk
+        
+        Returns:
+            List[List[tuple]]: Mỗi chunk là danh sách khoảng (start, end) 0-based, end không bao gồm
+        """
+        ranges = []
+        for row_index in changed_rows:
+            if ranges and ranges[-1][1] == row_index:
+                ranges[-1][1] = row_index + 1
+            else:
+                ranges.append([row_index, row_index + 1])
+        
+        chunks, current, current_size = [], [], 0
+        for start, end in ranges:
+            while start < end:
+                take = min(end - start, chunk_rows - current_size)
+                current.append((start, start + take))
+                current_size += take
+                start += take
+                if current_size >= chunk_rows:
+                    chunks.append(current)
+                    current, current_size = [], 0
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    @staticmethod
+    def _to_sheet_value(value: Any) -> Any:
+        """Chuyển giá trị DataFrame thành giá trị JSON hợp lệ cho Sheets API"""
+        if value is None:
+            return ''
+        if isinstance(value, float) and value != value:  # NaN
+            return ''
+        if isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, (str, int, float, bool)):
+            return value
+        return str(value)
+    
+    @staticmethod
+    def _normalize_row(row: list, width: int) -> list:
+        """Chuẩn hóa một hàng để so sánh (bỏ khác biệt 1 với 1.0, None với '')"""
+        normalized = []
+        for value in list(row) + [''] * (width - len(row)):
+            if value is None:
+                value = ''
+            elif isinstance(value, float) and value.is_integer():
+                value = int(value)
+            normalized.append(str(value))
+        return normalized[:width]
+    
     def _write_sheet_with_fallback(self, sheet_id: str, sheet_name: str, df: pd.DataFrame, clear_first: bool = True) -> bool:
         """
         Ghi Google Sheets với fallback mechanism
@@ -673,13 +857,19 @@ class GoogleAPIClient:
             print(f"❌ Lỗi test connection: {e}")
             return False
     
-    def read_shared_google_sheet(self, sheet_url_or_id: str, sheet_name: str = None) -> pd.DataFrame:
+    def read_shared_google_sheet(self, sheet_url_or_id: str, sheet_name: str = None,
+                                 use_cache: bool = True, with_sheet_row: bool = False) -> pd.DataFrame:
         """
         Đọc dữ liệu từ Google Sheets đã được chia sẻ - Version cải thiện
         
+        Nếu use_cache, chỉ gọi một request metadata Drive (version/modifiedTime):
+        sheet chưa thay đổi thì trả về snapshot local thay vì đọc lại toàn bộ.
+        
         Args:
             sheet_url_or_id (str): URL hoặc ID của Google Sheets đã được chia sẻ
             sheet_name (str): Tên sheet (mặc định là sheet đầu tiên)
+            use_cache (bool): Dùng snapshot cache theo revision
+            with_sheet_row (bool): Thêm cột self.SHEET_ROW_COLUMN chứa số hàng thực tế trên sheet
             
         Returns:
             pd.DataFrame: Dữ liệu từ sheet
@@ -692,8 +882,288 @@ class GoogleAPIClient:
         
         print(f"🔍 Đang đọc shared Google Sheet ID: {sheet_id}")
         
+        revision = self.get_sheet_revision(sheet_id) if use_cache else None
+        cache_key = f"{sheet_name or ''}#rows" if with_sheet_row else sheet_name
+        if revision:
+            cached_df = get_sheet_cache().get(sheet_id, cache_key, revision)
+            if cached_df is not None:
+                print(f"⚡ Sheet chưa thay đổi (revision {revision}), dùng snapshot local ({len(cached_df)} hàng)")
+                return cached_df
+        
         # Sử dụng method đọc chung với fallback
-        return self._read_sheet_with_fallback(sheet_id, sheet_name)
+        df = self._read_sheet_with_fallback(sheet_id, sheet_name, with_sheet_row)
+        
+        if revision and not df.empty:
+            get_sheet_cache().put(sheet_id, cache_key, revision, df)
+        
+        return df
+    
+    def read_sheet_columns(self, sheet_url_or_id: str, sheet_name: str = None,
+                           required_columns: List[str] = None, max_header_rows: int = 2,
+                           use_cache: bool = True) -> Optional[pd.DataFrame]:
+        """
+        Đọc chỉ các cột cần thiết (column projection) bằng values().batchGet
+        
+        Header được resolve một lần (đọc tối đa max_header_rows hàng đầu, cache theo
+        revision), sau đó chỉ tải đúng các cột cần thiết thay vì toàn bộ A:ZZ.
+        
+        Args:
+            sheet_url_or_id (str): URL hoặc ID của Google Sheets
+            sheet_name (str): Tên sheet (mặc định là sheet đầu tiên)
+            required_columns (List[str]): Tên các cột cần đọc (khớp exact hoặc partial)
+            max_header_rows (int): Số hàng đầu dùng để tìm header
+            use_cache (bool): Dùng snapshot cache theo revision
+            
+        Returns:
+            Optional[pd.DataFrame]: DataFrame với cột là tên trong required_columns
+                (cột không tìm thấy bị bỏ qua) và cột self.SHEET_ROW_COLUMN chứa số hàng
+                thực tế trên sheet; None nếu không đọc được (caller fallback đọc toàn bộ)
+        """
+        if not required_columns:
+            return None
+        
+        sheet_id = self._extract_sheet_id(sheet_url_or_id)
+        if not sheet_id:
+            return None
+        
+        revision = self.get_sheet_revision(sheet_id) if use_cache else None
+        cache_key = f"{sheet_name or ''}#cols:{'|'.join(required_columns)}"
+        if revision:
+            cached_df = get_sheet_cache().get(sheet_id, cache_key, revision)
+            if cached_df is not None:
+                print(f"⚡ Sheet chưa thay đổi, dùng snapshot local ({len(cached_df)} hàng, {len(required_columns)} cột)")
+                return cached_df
+        
+        try:
+            header_info = self._resolve_sheet_header(sheet_id, sheet_name, required_columns,
+                                                     max_header_rows, revision)
+            if not header_info or not header_info['columns']:
+                return None
+            
+            target_sheet = header_info['sheet_title']
+            first_data_row = header_info['header_row'] + 1
+            quoted_sheet = "'" + target_sheet.replace("'", "''") + "'"
+            
+            matched = list(header_info['columns'].items())
+            ranges = [
+                f"{quoted_sheet}!{self._column_letter(col_index)}{first_data_row}:{self._column_letter(col_index)}"
+                for _, col_index in matched
+            ]
+            
+            result = self.sheets_service.spreadsheets().values().batchGet(
+                spreadsheetId=sheet_id,
+                ranges=ranges,
+                majorDimension='COLUMNS',
+                valueRenderOption='UNFORMATTED_VALUE'
+            ).execute()
+            
+            value_ranges = result.get('valueRanges', [])
+            columns_data = {}
+            for (required_col, _), value_range in zip(matched, value_ranges):
+                values = value_range.get('values', [])
+                columns_data[required_col] = values[0] if values else []
+            
+            row_count = max((len(values) for values in columns_data.values()), default=0)
+            for required_col, values in columns_data.items():
+                columns_data[required_col] = [
+                    None if value == '' else value for value in values
+                ] + [None] * (row_count - len(values))
+            
+            df = pd.DataFrame(columns_data, columns=[col for col, _ in matched])
+            df[self.SHEET_ROW_COLUMN] = list(range(first_data_row, first_data_row + row_count))
+            
+            print(f"✅ Projected read: {target_sheet} ({row_count} hàng, {len(matched)}/{len(required_columns)} cột)")
+            
+            if revision and not df.empty:
+                get_sheet_cache().put(sheet_id, cache_key, revision, df)
+            
+            return df
+            
+        except Exception as e:
+            print(f"⚠️  Projected read thất bại, fallback đọc toàn bộ sheet: {e}")
+            return None
+    
+    def get_column_hyperlinks(self, sheet_url_or_id: str, sheet_name: str, column_name: str,
+                              max_header_rows: int = 2) -> Dict[int, str]:
+        """
+        Lấy hyperlink của toàn bộ một cột bằng một request spreadsheets().get
+        
+        Dùng includeGridData với fields mask chỉ gồm hyperlink/formattedValue nên
+        response nhỏ, thay cho việc gọi 3 request cho từng cell.
+        
+        Args:
+            sheet_url_or_id (str): URL hoặc ID của Google Sheets
+            sheet_name (str): Tên sheet
+            column_name (str): Tên cột chứa hyperlink (khớp exact hoặc partial)
+            max_header_rows (int): Số hàng đầu dùng để tìm header
+            
+        Returns:
+            Dict[int, str]: {số hàng trên sheet (1-based): URL}, rỗng nếu lỗi
+        """
+        sheet_id = self._extract_sheet_id(sheet_url_or_id)
+        if not sheet_id:
+            return {}
+        
+        try:
+            header_info = self._resolve_sheet_header(sheet_id, sheet_name, [column_name], max_header_rows,
+                                                     self.get_sheet_revision(sheet_id))
+            if not header_info or column_name not in header_info['columns']:
+                print(f"⚠️  Không tìm thấy cột '{column_name}' để lấy hyperlink")
+                return {}
+            
+            column_letter = self._column_letter(header_info['columns'][column_name])
+            first_data_row = header_info['header_row'] + 1
+            quoted_sheet = "'" + header_info['sheet_title'].replace("'", "''") + "'"
+            
+            result = self.sheets_service.spreadsheets().get(
+                spreadsheetId=sheet_id,
+                ranges=[f"{quoted_sheet}!{column_letter}{first_data_row}:{column_letter}"],
+                includeGridData=True,
+                fields='sheets(data(startRow,rowData(values(hyperlink,formattedValue))))'
+            ).execute()
+            
+            hyperlinks = {}
+            for sheet in result.get('sheets', []):
+                for grid_data in sheet.get('data', []):
+                    start_row = grid_data.get('startRow', first_data_row - 1) + 1
+                    for offset, row_data in enumerate(grid_data.get('rowData', [])):
+                        values = row_data.get('values', [])
+                        if not values:
+                            continue
+                        
+                        cell = values[0]
+                        url = cell.get('hyperlink')
+                        if not url:
+                            # Cell chỉ chứa text URL (không phải hyperlink)
+                            text = str(cell.get('formattedValue', '')).strip()
+                            if text.startswith(('http://', 'https://')):
+                                url = text
+                        
+                        if url:
+                            hyperlinks[start_row + offset] = url
+            
+            print(f"🔗 Đã lấy {len(hyperlinks)} hyperlink từ cột '{column_name}' (1 request)")
+            return hyperlinks
+            
+        except Exception as e:
+            print(f"❌ Lỗi lấy hyperlink cột '{column_name}': {e}")
+            return {}
+    
+    def _resolve_sheet_header(self, sheet_id: str, sheet_name: str, required_columns: List[str],
+                              max_header_rows: int = 2, revision: str = None,
+                              exact_sheet: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Tìm hàng header và vị trí các cột cần thiết (cache theo revision)
+        
+        Args:
+            exact_sheet (bool): Dùng cho đường ghi - tab phải trùng đúng tên, không fallback sang tab đầu
+        
+        Returns:
+            Optional[Dict]: {'sheet_title', 'header_row' (1-based), 'columns': {tên cột: index 0-based}}
+        """
+        cache_key = (sheet_id, sheet_name or '', tuple(required_columns))
+        cached = self._header_cache.get(cache_key)
+        if cached and revision and cached['revision'] == revision and \
+                (not exact_sheet or not sheet_name or cached['sheet_title'] == sheet_name):
+            return cached
+        
+        sheet_metadata = self.sheets_service.spreadsheets().get(
+            spreadsheetId=sheet_id,
+            fields='sheets.properties.title'
+        ).execute()
+        available_sheets = [s['properties']['title'] for s in sheet_metadata.get('sheets', [])]
+        if not available_sheets:
+            return None
+        
+        if exact_sheet and sheet_name and sheet_name not in available_sheets:
+            print(f"⚠️  Sheet '{sheet_name}' không tồn tại (có thể đã đổi tên hoặc bị xóa)")
+            return None
+        
+        target_sheet = sheet_name if sheet_name in available_sheets else available_sheets[0]
+        if sheet_name and sheet_name != target_sheet:
+            print(f"⚠️  Sheet '{sheet_name}' không tồn tại, dùng '{target_sheet}'")
+        
+        quoted_sheet = "'" + target_sheet.replace("'", "''") + "'"
+        header_result = self.sheets_service.spreadsheets().values().get(
+            spreadsheetId=sheet_id,
+            range=f"{quoted_sheet}!1:{max_header_rows}",
+            valueRenderOption='FORMATTED_VALUE'
+        ).execute()
+        header_rows = header_result.get('values', [])
+        
+        # Chọn hàng khớp được nhiều cột cần thiết nhất làm header
+        best = None
+        for row_offset, header_values in enumerate(header_rows):
+            columns = self._match_header_columns(header_values, required_columns)
+            if columns and (best is None or len(columns) > len(best[1])):
+                best = (row_offset + 1, columns)
+        
+        if best is None:
+            return None
+        
+        header_info = {
+            'sheet_title': target_sheet,
+            'header_row': best[0],
+            'columns': best[1],
+            'revision': revision
+        }
+        self._header_cache[cache_key] = header_info
+        return header_info
+    
+    def _match_header_columns(self, header_values: list, required_columns: List[str]) -> Dict[str, int]:
+        """
+        Khớp tên cột cần thiết với header (exact trước, sau đó partial không phân biệt hoa thường)
+        
+        Returns:
+            Dict[str, int]: {tên cột cần thiết: index cột 0-based}
+        """
+        headers = [str(value).strip() for value in header_values]
+        matched = {}
+        
+        for required_col in required_columns:
+            if required_col in headers:
+                matched[required_col] = headers.index(required_col)
+                continue
+            
+            for col_index, header in enumerate(headers):
+                header_lower = header.lower()
+                if header_lower and (header_lower in required_col.lower() or
+                                     required_col.lower() in header_lower):
+                    matched[required_col] = col_index
+                    break
+        
+        return matched
+    
+    @staticmethod
+    def _column_letter(col_index: int) -> str:
+        """Chuyển index cột 0-based thành ký tự cột (0 -> A, 26 -> AA)"""
+        result = ""
+        col_index += 1
+        while col_index > 0:
+            col_index, remainder = divmod(col_index - 1, 26)
+            result = chr(65 + remainder) + result
+        return result
+    
+    def get_sheet_revision(self, sheet_id: str) -> Optional[str]:
+        """
+        Lấy revision hiện tại của Google Sheets qua Drive metadata (request nhẹ)
+        
+        Args:
+            sheet_id (str): ID của Google Sheets
+            
+        Returns:
+            Optional[str]: Revision key ("version@modifiedTime") hoặc None nếu lỗi
+        """
+        try:
+            file_metadata = self.drive_service.files().get(
+                fileId=sheet_id,
+                fields='version,modifiedTime',
+                supportsAllDrives=True
+            ).execute()
+            return SheetSnapshotCache.make_revision(file_metadata)
+        except Exception as e:
+            print(f"⚠️  Không lấy được revision sheet, bỏ qua cache: {e}")
+            return None
     
     def _extract_sheet_id(self, sheet_url_or_id: str) -> str:
         """
@@ -0,0 +1,305 @@
+"""
+Google Client Registry
+Registry dùng chung toàn process cho credentials và các Google API service
+(Drive v3, Sheets v4, gspread) - mỗi service chỉ build một lần
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import os
+import json
+import threading
+from typing import Any, Dict, Optional
+
+from config import config
+
+
+class GoogleClientRegistry:
+    """
+    Registry lazy cho Google API clients
+
+    - Credentials service account được load một lần
+    - Service được build từ discovery document cache local (không gọi mạng)
+    - Mỗi thread dùng lại một AuthorizedHttp (keep-alive), dùng chung credentials
+    - gspread client được authorize một lần
+    - GOOGLE_API_BACKEND=fake: trả về Drive/Sheets giả lập (config/fake_google.py)
+    Không import thư viện Google cho đến khi service đầu tiên được yêu cầu.
+    """
+
+    def __init__(self, discovery_cache_dir: str = None, timeout: int = None):
+        """
+        Khởi tạo GoogleClientRegistry
+
+        Args:
+            discovery_cache_dir (str): Thư mục lưu discovery documents
+            timeout (int): Timeout (giây) cho HTTP transport
+        """
+        self.discovery_cache_dir = discovery_cache_dir or config.DISCOVERY_CACHE_DIR
+        self.timeout = timeout or config.API_TIMEOUT
+
+        self._lock = threading.RLock()
+        self._services: Dict[str, Dict[str, Any]] = {}
+        self._gspread_clients: Dict[str, Dict[str, Any]] = {}
+        self._service_account_credentials = None
+        self._oauth_credentials = None
+        self._thread_local = threading.local()
+        self._fake_backend = None
+
+        self.stats = {
+            'service_builds': 0,
+            'service_cache_hits': 0,
+            'discovery_cache_hits': 0,
+            'discovery_downloads': 0,
+            'http_transports': 0
+        }
+
+    def get_fake_backend(self):
+        """
+        Backend giả lập khi GOOGLE_API_BACKEND=fake (benchmark/CI offline)
+
+        Returns:
+            Optional[FakeGoogleBackend]: Backend giả lập hoặc None nếu dùng Google thật
+        """
+        with self._lock:
+            if self._fake_backend is None:
+                from config.fake_google import is_fake_google_enabled, get_fake_google_backend
+                self._fake_backend = get_fake_google_backend() if is_fake_google_enabled() else False
+            return self._fake_backend or None
+
+    # ------------------------------------------------------------------
+    # Credentials
+    # ------------------------------------------------------------------
+
+    def get_service_account_credentials(self):
+        """
+        Lấy credentials service account (load từ file một lần)
+
+        Returns:
+            service_account.Credentials: Credentials dùng chung
+        """
+        fake_backend = self.get_fake_backend()
+        if fake_backend:
+            return fake_backend.credentials
+
+        with self._lock:
+            if self._service_account_credentials is None:
+                from google.oauth2 import service_account
+
+                if not os.path.exists(config.SERVICE_ACCOUNT_FILE):
+                    raise FileNotFoundError(f"Service account file không tồn tại: {config.SERVICE_ACCOUNT_FILE}")
+
+                self._service_account_credentials = service_account.Credentials.from_service_account_file(
+                    config.SERVICE_ACCOUNT_FILE,
+                    scopes=config.SCOPES
+                )
+            return self._service_account_credentials
+
+    def get_oauth_credentials(self):
+        """Lấy OAuth credentials đã load trong process (None nếu chưa có)"""
+        fake_backend = self.get_fake_backend()
+        with self._lock:
+            if self._oauth_credentials is None and fake_backend:
+                return fake_backend.credentials
+            return self._oauth_credentials
+
+    def set_oauth_credentials(self, credentials) -> None:
+        """
+        Lưu OAuth credentials để các GoogleOAuthDriveClient sau dùng lại
+
+        Args:
+            credentials: OAuth credentials (None để xóa, ví dụ khi revoke)
+        """
+        with self._lock:
+            if credentials is not self._oauth_credentials:
+                self._services.pop('oauth:drive:v3', None)
+            self._oauth_credentials = credentials
+
+    # ------------------------------------------------------------------
+    # Services
+    # ------------------------------------------------------------------
+
+    def get_drive_service(self):
+        """Drive v3 service dùng service account"""
+        return self.get_service('drive', 'v3', self.get_service_account_credentials(), 'service_account')
+
+    def get_sheets_service(self):
+        """Sheets v4 service dùng service account"""
+        return self.get_service('sheets', 'v4', self.get_service_account_credentials(), 'service_account')
+
+    def get_oauth_drive_service(self, credentials):
+        """
+        Drive v3 service dùng OAuth credentials
+
+        Args:
+            credentials: OAuth credentials của user
+        """
+        self.set_oauth_credentials(credentials)
+        return self.get_service('drive', 'v3', credentials, 'oauth')
+
+    def get_gspread_client(self, credentials=None, owner: str = 'service_account'):
+        """
+        gspread client đã authorize (một lần cho mỗi loại credentials)
+
+        Args:
+            credentials: Credentials (mặc định service account)
+            owner (str): Loại credentials dùng làm cache key
+        """
+        if self.get_fake_backend():
+            # Fake backend chỉ giả lập Sheets API - các đường gspread sẽ fallback sang Sheets API
+            return None
+
+        credentials = credentials or self.get_service_account_credentials()
+
+        with self._lock:
+            cached = self._gspread_clients.get(owner)
+            if cached and cached['credentials'] is credentials:
+                self.stats['service_cache_hits'] += 1
+                return cached['client']
+
+            import gspread
+            client = gspread.authorize(credentials)
+            self._gspread_clients[owner] = {'credentials': credentials, 'client': client}
+            self.stats['service_builds'] += 1
+            return client
+
+    def get_service(self, api_name: str, api_version: str, credentials, owner: str):
+        """
+        Lấy (hoặc build lần đầu) Google API service
+
+        Args:
+            api_name (str): Tên API (drive, sheets)
+            api_version (str): Version API (v3, v4)
+            credentials: Credentials dùng cho service
+            owner (str): Loại credentials (service_account, oauth) - dùng làm cache key
+
+        Returns:
+            Resource: Google API service
+        """
+        key = f"{owner}:{api_name}:{api_version}"
+        fake_backend = self.get_fake_backend()
+
+        with self._lock:
+            cached = self._services.get(key)
+            if cached and cached['credentials'] is credentials:
+                self.stats['service_cache_hits'] += 1
+                return cached['service']
+
+            if fake_backend:
+                service = fake_backend.build(api_name, api_version)
+                self._services[key] = {'credentials': credentials, 'service': service}
+                self.stats['service_builds'] += 1
+                return service
+
+            from googleapiclient.discovery import build_from_document
+            from googleapiclient.http import HttpRequest
+
+            document = self._load_discovery_document(api_name, api_version, credentials)
+
+            def build_request(http, *args, **kwargs):
+                # Thay http mặc định bằng transport của thread hiện tại
+                return HttpRequest(self._get_thread_http(owner, credentials), *args, **kwargs)
+
+            service = build_from_document(
+                document,
+                http=self._get_thread_http(owner, credentials),
+                requestBuilder=build_request
+            )
+
+            self._services[key] = {'credentials': credentials, 'service': service}
+            self.stats['service_builds'] += 1
+            return service
+
+    def _get_thread_http(self, owner: str, credentials):
+        """
+        AuthorizedHttp của thread hiện tại cho credentials
+
+        httplib2.Http không thread-safe nên mỗi thread giữ một transport riêng
+        (giữ kết nối keep-alive), còn credentials và token refresh dùng chung.
+        """
+        transports = getattr(self._thread_local, 'transports', None)
+        if transports is None:
+            transports = self._thread_local.transports = {}
+
+        cached = transports.get(owner)
+        if cached and cached[0] is credentials:
+            return cached[1]
+
+        import httplib2
+        import google_auth_httplib2
+
+        http = google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http(timeout=self.timeout))
+        transports[owner] = (credentials, http)
+        with self._lock:
+            self.stats['http_transports'] += 1
+        return http
+
+    def _load_discovery_document(self, api_name: str, api_version: str, credentials) -> str:
+        """
+        Đọc discovery document từ cache local, tải và lưu lại nếu chưa có
+
+        Returns:
+            str: Discovery document (JSON)
+        """
+        cache_file = os.path.join(self.discovery_cache_dir, f"{api_name}.{api_version}.json")
+
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    document = f.read()
+                json.loads(document)
+                self.stats['discovery_cache_hits'] += 1
+                return document
+            except Exception as e:
+                print(f"⚠️  Discovery cache lỗi, tải lại {api_name} {api_version}: {e}")
+
+        from googleapiclient.discovery import build
+
+        # Build một lần để lấy discovery document (static docs kèm thư viện hoặc tải từ Google)
+        service = build(api_name, api_version, credentials=credentials, cache_discovery=False)
+        document = json.dumps(service._rootDesc)
+        self.stats['discovery_downloads'] += 1
+
+        try:
+            os.makedirs(self.discovery_cache_dir, exist_ok=True)
+            tmp_file = cache_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(document)
+            os.replace(tmp_file, cache_file)
+        except Exception as e:
+            print(f"⚠️  Không lưu được discovery cache: {e}")
+
+        return document
+
+    def reset(self) -> None:
+        """Xóa toàn bộ service/credentials đã cache (ví dụ sau khi đổi service account)"""
+        with self._lock:
+            self._services.clear()
+            self._gspread_clients.clear()
+            self._service_account_credentials = None
+            self._oauth_credentials = None
+            self._thread_local = threading.local()
+            self._fake_backend = None
+
+    def get_stats(self) -> Dict[str, int]:
+        """Thống kê build/cache của registry"""
+        with self._lock:
+            return dict(self.stats)
+
+
+# Global registry instance (khởi tạo lazy)
+_registry: Optional[GoogleClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_google_registry() -> GoogleClientRegistry:
+    """
+    Lấy instance GoogleClientRegistry global
+
+    Returns:
+        GoogleClientRegistry: Registry dùng chung toàn process
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = GoogleClientRegistry()
+        return _registry
@@ -13,16 +13,14 @@ from typing import Optional
 
 try:
     from google.auth.transport.requests import Request
-    from google.oauth2.credentials import Credentials
     from google_auth_oauthlib.flow import InstalledAppFlow
-    from googleapiclient.discovery import build
     from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
-    import io
     GOOGLE_OAUTH_AVAILABLE = True
 except ImportError:
     GOOGLE_OAUTH_AVAILABLE = False
 
 from utils.menu_utils import print_status
+from config.google_client_registry import get_google_registry
 
 
 class GoogleOAuthDriveClient:
@@ -54,8 +52,11 @@ class GoogleOAuthDriveClient:
     
     def _load_credentials(self):
         """Load OAuth credentials từ file"""
+        # Dùng lại credentials đã load trong process nếu có
+        self.credentials = get_google_registry().get_oauth_credentials()
+        
         # Load từ token file nếu có
-        if os.path.exists(self.token_file):
+        if self.credentials is None and os.path.exists(self.token_file):
             try:
                 with open(self.token_file, 'rb') as token:
                     self.credentials = pickle.load(token)
@@ -125,7 +126,8 @@ class GoogleOAuthDriveClient:
     def _build_drive_service(self):
         """Tạo Google Drive service"""
         try:
-            self.drive_service = build('drive', 'v3', credentials=self.credentials)
+            # Drive service được build một lần và dùng chung cho cả process
+            self.drive_service = get_google_registry().get_oauth_drive_service(self.credentials)
             print_status("✅ Đã kết nối Google Drive API với OAuth", "success")
             return True
         except Exception as e:
@@ -338,6 +340,7 @@ class GoogleOAuthDriveClient:
             
             self.credentials = None
             self.drive_service = None
+            get_google_registry().set_oauth_credentials(None)
             
         except Exception as e:
             print_status(f"⚠️ Lỗi thu hồi credentials: {e}", "warning")
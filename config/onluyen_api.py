@@ -9,8 +9,132 @@ from typing import Dict, Any, Optional
 import requests
 from dataclasses import dataclass
 from urllib.parse import urljoin
+from contextlib import contextmanager
+import threading
 import json
+import time
+import uuid
+import glob
+import re
 import os
+from datetime import datetime
+
+from utils.http_transport import get_http_transport
+from utils.job_manager import check_cancelled
+
+
+# Số endpoint GET change-school-year dò song song mỗi đợt (POST luôn dò lần lượt từng endpoint)
+CHANGE_YEAR_PROBE_WAVE = 3
+
+# Thư mục chứa file login (onluyen_login_<tài khoản>_<thời gian>_<ngẫu nhiên>.json)
+LOGIN_OUTPUT_DIR = os.path.join('data', 'output')
+
+# Khóa file login theo đường dẫn - các luồng đổi năm học song song không ghi đè lẫn nhau
+_LOGIN_FILE_LOCKS: Dict[str, threading.Lock] = {}
+_LOGIN_FILE_LOCKS_GUARD = threading.Lock()
+
+
+@contextmanager
+def login_file_lock(login_file_path: str, timeout: float = 30.0, stale_after: float = 120.0):
+    """
+    Khóa đọc-sửa-ghi file login giữa các luồng (threading.Lock) và giữa các tiến trình (file .lock)
+    
+    Args:
+        login_file_path (str): Đường dẫn file login JSON
+        timeout (float): Thời gian chờ tối đa để lấy khóa (giây)
+        stale_after (float): File .lock cũ hơn số giây này được coi là bị bỏ lại và xóa
+    """
+    key = os.path.abspath(login_file_path)
+    with _LOGIN_FILE_LOCKS_GUARD:
+        thread_lock = _LOGIN_FILE_LOCKS.setdefault(key, threading.Lock())
+    
+    if not thread_lock.acquire(timeout=timeout):
+        raise TimeoutError(f"Không lấy được khóa file login: {login_file_path}")
+    
+    lock_path = f"{key}.lock"
+    fd = None
+    try:
+        deadline = time.monotonic() + timeout
+        while fd is None:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > stale_after:
+                        os.remove(lock_path)
+                        continue
+                except OSError:
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"File login đang bị khóa bởi tiến trình khác: {lock_path}")
+                time.sleep(0.05)
+        yield
+    finally:
+        if fd is not None:
+            os.close(fd)
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+        thread_lock.release()
+
+
+def write_json_atomic(file_path: str, data: Dict[str, Any]):
+    """Ghi JSON ra file tạm rồi os.replace - người đọc không bao giờ thấy file ghi dở"""
+    tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def new_login_file_path(admin_email: str, output_dir: str = LOGIN_OUTPUT_DIR) -> str:
+    """
+    Tạo đường dẫn file login mới cho một trường
+
+    Tên file gồm tài khoản admin và hậu tố ngẫu nhiên nên các trường login cùng
+    một giây (nhiều job song song) không ghi đè file của nhau
+
+    Args:
+        admin_email (str): Email admin của trường
+        output_dir (str): Thư mục lưu file login
+
+    Returns:
+        str: Đường dẫn file login
+    """
+    account = re.sub(r'[^a-z0-9]+', '_', (admin_email or '').lower()).strip('_') or 'unknown'
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return os.path.join(output_dir, f"onluyen_login_{account}_{stamp}_{uuid.uuid4().hex[:8]}.json")
+
+
+def find_login_file(admin_email: str, output_dir: str = LOGIN_OUTPUT_DIR) -> Optional[str]:
+    """
+    Tìm file login mới nhất của đúng tài khoản admin (so với admin_email trong file)
+
+    Args:
+        admin_email (str): Email admin của trường
+        output_dir (str): Thư mục chứa file login
+
+    Returns:
+        Optional[str]: Đường dẫn file login hoặc None nếu trường chưa login lần nào
+    """
+    account = (admin_email or '').lower().strip()
+    if not account:
+        return None
+
+    login_files = glob.glob(os.path.join(output_dir, 'onluyen_login_*.json'))
+    for login_file in sorted(login_files, key=os.path.getmtime, reverse=True):
+        try:
+            with open(login_file, 'r', encoding='utf-8') as f:
+                login_data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if (login_data.get('admin_email') or '').lower().strip() == account:
+            return login_file
+    return None
 
 
 @dataclass
@@ -40,6 +164,11 @@ class OnLuyenAPIConfig:
         """Lấy School API Base URL từ environment"""
         return os.getenv('ONLUYEN_SCHOOL_API_BASE_URL')
     
+    @classmethod
+    def get_change_year_base_url(cls) -> str:
+        """Lấy Base URL của endpoint change-school-year (khác auth base trên production)"""
+        return os.getenv('ONLUYEN_CHANGE_YEAR_BASE_URL', 'https://oauth.onluyen.vn')
+    
     @classmethod
     def _build_endpoints(cls) -> Dict[str, 'APIEndpoint']:
         """Build endpoints với URLs từ environment"""
@@ -167,16 +296,18 @@ class OnLuyenAPIClient:
         Khởi tạo API client
         
         Args:
-            session (requests.Session, optional): Session để sử dụng
+            session (requests.Session, optional): Session riêng để sử dụng. Mặc định dùng
+                                                  session chung theo host (utils.http_transport)
         """
-        self.session = session or requests.Session()
-        self.session.headers.update(OnLuyenAPIConfig.DEFAULT_HEADERS)
-        # Tạm thời bỏ qua SSL verification cho testing
-        self.session.verify = False
+        self.session = session
+        # Headers theo từng client (token khác nhau) - gửi kèm mỗi request, không gắn vào session chung
+        self.headers = dict(OnLuyenAPIConfig.DEFAULT_HEADERS)
         # Tắt cảnh báo SSL
         import urllib3
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
         self.auth_token = None
+        # File login của trường mà token hiện tại thuộc về (đọc/ghi year_tokens)
+        self.login_file_path = None
         
         # Đảm bảo environment variables được load
         self._ensure_env_loaded()
@@ -226,7 +357,35 @@ class OnLuyenAPIClient:
             token (str): Auth token
         """
         self.auth_token = token
-        self.session.headers["Authorization"] = f"Bearer {token}"
+        self.headers["Authorization"] = f"Bearer {token}"
+    
+    def clear_auth_token(self):
+        """Xóa auth token khỏi client"""
+        self.auth_token = None
+        self.headers.pop("Authorization", None)
+    
+    def _send(self, method: str, url: str, headers: Dict[str, str] = None, **kwargs) -> requests.Response:
+        """
+        Gửi request qua session chung của host (tái sử dụng kết nối keep-alive)
+        
+        Args:
+            method (str): HTTP method
+            url (str): URL
+            headers (Dict[str, str], optional): Headers bổ sung/ghi đè headers của client
+            **kwargs: Tham số khác của requests (params, json, timeout...)
+            
+        Returns:
+            requests.Response: Response từ server
+        """
+        # Điểm kiểm tra hủy trước mỗi request: job bị dừng không gửi thêm trang nào nữa
+        check_cancelled()
+        session = self.session or get_http_transport().get_session(url)
+        request_headers = dict(self.headers)
+        if headers:
+            request_headers.update(headers)
+        kwargs.setdefault('timeout', OnLuyenAPIConfig.DEFAULT_TIMEOUT)
+        # Tạm thời bỏ qua SSL verification cho testing
+        return session.request(method, url, headers=request_headers, verify=False, **kwargs)
     
     def login(self, username: str, password: str) -> Dict[str, Any]:
         """
@@ -253,16 +412,11 @@ class OnLuyenAPIClient:
             method=endpoint.method,
             url=endpoint.url,
             payload=payload,
-            headers=self.session.headers
+            headers=self.headers
         )
         
         try:
-            response = self.session.request(
-                method=endpoint.method,
-                url=endpoint.url,
-                json=payload,
-                timeout=OnLuyenAPIConfig.DEFAULT_TIMEOUT
-            )
+            response = self._send(endpoint.method, endpoint.url, json=payload)
             
             print(f"\n📡 RESPONSE DEBUG:")
             print(f"   Status Code: {response.status_code}")
@@ -357,7 +511,7 @@ class OnLuyenAPIClient:
             }
         
         # Sử dụng endpoint chính xác từ browser headers
-        url = f"https://oauth.onluyen.vn/api/account/change-school-year/{year}"
+        url = f"{OnLuyenAPIConfig.get_change_year_base_url()}/api/account/change-school-year/{year}"
         params = {'codeApp': 'SCHOOL'}
         
         headers = {
@@ -375,7 +529,7 @@ class OnLuyenAPIClient:
         print(f"   🔐 Headers: {list(headers.keys())}")
         
         try:
-            response = requests.post(url, headers=headers, params=params, timeout=30)
+            response = self._send('POST', url, headers=headers, params=params, timeout=30)
             result = self._process_response(response)
             
             # Nếu thành công và có access_token mới, lưu vào file login
@@ -392,9 +546,83 @@ class OnLuyenAPIClient:
                 "data": None
             }
 
+    def _change_year_candidates(self) -> list:
+        """
+        Danh sách (url, method) có thể là endpoint change-school-year, theo thứ tự ưu tiên
+        
+        Returns:
+            list: [(url, method), ...] - url chưa gồm /{year}
+        """
+        school_api_base = OnLuyenAPIConfig.get_school_api_base_url()
+        auth_base = OnLuyenAPIConfig.get_auth_base_url()
+        
+        return [
+            # Thử với GET method
+            (f"{school_api_base}/api/account/change-school-year", "GET"),
+            (f"{auth_base}/api/account/change-school-year", "GET"),
+            (f"{school_api_base}/account/change-school-year", "GET"),
+            (f"{auth_base}/account/change-school-year", "GET"),
+            (f"{school_api_base}/api/change-school-year", "GET"),
+            (f"{auth_base}/api/change-school-year", "GET"),
+            # Thử với POST method
+            (f"{school_api_base}/api/account/change-school-year", "POST"),
+            (f"{auth_base}/api/account/change-school-year", "POST"),
+            (f"{school_api_base}/account/change-school-year", "POST"),
+            (f"{auth_base}/account/change-school-year", "POST"),
+        ]
+    
+    @staticmethod
+    def _change_year_probe_waves(candidates: list) -> list:
+        """
+        Chia ứng viên change-school-year thành các đợt dò theo đúng thứ tự ưu tiên
+        
+        GET liên tiếp được gom thành đợt tối đa CHANGE_YEAR_PROBE_WAVE endpoint (gọi song song);
+        POST có thể đổi trạng thái phía server nên mỗi POST là một đợt riêng
+        
+        Args:
+            candidates (list): [(url, method), ...] theo thứ tự ưu tiên
+            
+        Returns:
+            list: [[(url, method), ...], ...]
+        """
+        waves = []
+        for candidate in candidates:
+            if (candidate[1] == "GET" and waves and waves[-1][-1][1] == "GET"
+                    and len(waves[-1]) < CHANGE_YEAR_PROBE_WAVE):
+                waves[-1].append(candidate)
+            else:
+                waves.append([candidate])
+        return waves
+    
+    def _probe_change_year(self, url: str, method: str, year: int) -> Dict[str, Any]:
+        """
+        Gọi thử một endpoint change-school-year (an toàn khi chạy song song nhiều luồng)
+        
+        Args:
+            url (str): URL endpoint (chưa gồm /{year})
+            method (str): HTTP method
+            year (int): Năm học mới
+            
+        Returns:
+            Dict[str, Any]: Kết quả API call (status_code None nếu lỗi kết nối)
+        """
+        try:
+            response = self._send(method, f"{url}/{year}", params={"codeApp": "SCHOOL"})
+            return self._process_response(response)
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Lỗi khi thay đổi năm học: {str(e)}",
+                "status_code": None,
+                "data": None
+            }
+    
     def change_year(self, year: int, save_to_login_file: bool = True, login_file_path: str = None) -> Dict[str, Any]:
         """
-        Thay đổi năm học sử dụng access_token để xác thực
+        Thay đổi năm học sử dụng access_token để xác thực.
+        Endpoint đúng được dò một lần theo thứ tự ưu tiên (GET từng đợt nhỏ song song, POST lần lượt),
+        dừng ở ứng viên đầu tiên không trả về 404 và lưu vào endpoint cache theo host;
+        lần sau gọi thẳng endpoint đã lưu, dò lại nếu endpoint trả về 404
         
         Args:
             year (int): Năm học mới (ví dụ: 2024, 2025)
@@ -412,153 +640,139 @@ class OnLuyenAPIClient:
                 "data": None
             }
         
-        # Thử nhiều endpoint URLs và methods khác nhau
-        possible_configs = [
-            # Thử với GET method
-            {"url": f"{self.get_school_api_base_url()}/api/account/change-school-year", "method": "GET"},
-            {"url": f"{self.get_auth_base_url()}/api/account/change-school-year", "method": "GET"},
-            {"url": f"{self.get_school_api_base_url()}/account/change-school-year", "method": "GET"},
-            {"url": f"{self.get_auth_base_url()}/account/change-school-year", "method": "GET"},
-            {"url": f"{self.get_school_api_base_url()}/api/change-school-year", "method": "GET"},
-            {"url": f"{self.get_auth_base_url()}/api/change-school-year", "method": "GET"},
-            # Thử với POST method
-            {"url": f"{self.get_school_api_base_url()}/api/account/change-school-year", "method": "POST"},
-            {"url": f"{self.get_auth_base_url()}/api/account/change-school-year", "method": "POST"},
-            {"url": f"{self.get_school_api_base_url()}/account/change-school-year", "method": "POST"},
-            {"url": f"{self.get_auth_base_url()}/account/change-school-year", "method": "POST"},
-        ]
+        from urllib.parse import urlparse
+        from concurrent.futures import ThreadPoolExecutor
+        from utils.endpoint_cache import get_endpoint_cache
         
         print(f"\n📅 Trying to change school year to: {year}")
         
-        for i, config in enumerate(possible_configs, 1):
-            print(f"\n🔄 Attempt {i}/{len(possible_configs)}")
-            
-            # Tạo URL với year parameter
-            url_with_year = f"{config['url']}/{year}"
-            
-            # Tạo endpoint tạm thời với URL đã có year
-            temp_endpoint = APIEndpoint(
-                name="change_school_year",
-                method="GET",
-                url=url_with_year,
-                default_params={"codeApp": "SCHOOL"},
-                description="Thay đổi năm học"
-            )
-            
-            # Gọi API với codeApp parameter
-            params = {"codeApp": "SCHOOL"}
-            
-            print(f"   📍 URL: {url_with_year}")
-            print(f"   📋 Params: {params}")
-            
-            result = self._make_request(temp_endpoint, params=params)
-            
-            # Nếu không phải lỗi 404, return kết quả (dù thành công hay thất bại)
-            if result.get("status_code") != 404:
-                print(f"   ✅ Found working endpoint: {config['url']}")
-                
-                # Nếu thành công và có access_token mới, lưu vào file login
-                if result["success"] and save_to_login_file and result.get("data"):
-                    self._update_login_file_with_new_token(result["data"], login_file_path, year)
-                
-                return result
+        possible_configs = self._change_year_candidates()
+        cache = get_endpoint_cache()
+        cache_host = urlparse(OnLuyenAPIConfig.get_auth_base_url() or '').netloc or 'default'
+        result = None
+        
+        # Endpoint đã dò được từ trước - một round-trip
+        cached = cache.get(cache_host, "change_school_year") if cache else None
+        if cached and (cached.get("url"), cached.get("method")) in possible_configs:
+            print(f"   ⚡ Cached endpoint: {cached['method']} {cached['url']}")
+            result = self._probe_change_year(cached["url"], cached["method"], year)
+            if result.get("status_code") == 404:
+                print(f"   ❌ 404 - Cached endpoint không còn hoạt động, dò lại")
+                cache.invalidate(cache_host, "change_school_year")
+                result = None
             else:
-                print(f"   ❌ 404 - Endpoint not found")
+                cache.record_hit(cache_host, "change_school_year")
         
-        # Nếu tất cả endpoints đều trả về 404
-        return {
-            "success": False,
-            "error": f"Không tìm thấy endpoint thay đổi năm học. Đã thử {len(possible_configs)} URLs khác nhau.",
-            "status_code": 404,
-            "data": None
-        }
+        if result is None:
+            # Dò theo thứ tự ưu tiên, không gửi đợt sau khi đã có endpoint không trả về 404
+            print(f"   🔄 Probing {len(possible_configs)} endpoints in priority order...")
+            errors = []
+            for wave in self._change_year_probe_waves(possible_configs):
+                if len(wave) > 1:
+                    with ThreadPoolExecutor(max_workers=len(wave)) as executor:
+                        probe_results = list(executor.map(
+                            lambda config: self._probe_change_year(config[0], config[1], year), wave
+                        ))
+                else:
+                    probe_results = [self._probe_change_year(wave[0][0], wave[0][1], year)]
+                
+                for (url, method), probe_result in zip(wave, probe_results):
+                    status_code = probe_result.get("status_code")
+                    if status_code is None:
+                        errors.append(probe_result)
+                    elif status_code != 404:
+                        print(f"   ✅ Found working endpoint: {method} {url}")
+                        if cache:
+                            cache.set(cache_host, "change_school_year", url, method)
+                        result = probe_result
+                        break
+                if result is not None:
+                    break
+            
+            if result is None:
+                # Không endpoint nào trả lời: ưu tiên báo lỗi kết nối thay vì 404
+                if errors:
+                    return errors[0]
+                return {
+                    "success": False,
+                    "error": f"Không tìm thấy endpoint thay đổi năm học. Đã thử {len(possible_configs)} URLs khác nhau.",
+                    "status_code": 404,
+                    "data": None
+                }
+        
+        # Nếu thành công và có access_token mới, lưu vào file login
+        if result["success"] and save_to_login_file and result.get("data"):
+            self._update_login_file_with_new_token(result["data"], login_file_path, year)
+        
+        return result
     
     def _update_login_file_with_new_token(self, response_data: Dict[str, Any], 
-                                        login_file_path: str = None, year: int = None):
+                                        login_file_path: str = None, year: int = None,
+                                        update_primary: bool = True):
         """
         Cập nhật file login JSON với access_token mới sau khi thay đổi năm học
         
         Args:
             response_data (Dict): Response data từ API change_year
-            login_file_path (str, optional): Đường dẫn file login cụ thể
+            login_file_path (str, optional): Đường dẫn file login cụ thể (mặc định
+                                             self.login_file_path hoặc file login của tài khoản trong token)
             year (int, optional): Năm học đã thay đổi
+            update_primary (bool): Ghi đè tokens chính của file login. False khi lấy token
+                                   theo năm để fetch song song - chỉ lưu vào year_tokens[year]
         """
         try:
-            # Tìm file login gần nhất nếu không chỉ định
+            # Không chỉ định thì dùng file login của chính tài khoản này (không lấy file mới nhất)
+            login_file_path = login_file_path or self.login_file_path
             if not login_file_path:
-                login_file_path = self._find_latest_login_file()
+                login_file_path = find_login_file(self._token_account(self.auth_token))
             
             if not login_file_path:
-                print("❌ Không tìm thấy file login để cập nhật")
+                print("❌ Không tìm thấy file login của tài khoản hiện tại để cập nhật")
                 return
             
-            # Đọc file login hiện tại
-            with open(login_file_path, 'r', encoding='utf-8') as f:
-                login_data = json.load(f)
-            
-            # Cập nhật tokens nếu có trong response
-            if "access_token" in response_data:
-                login_data["tokens"]["access_token"] = response_data["access_token"]
-                print(f"✅ Updated access_token in login file")
-            
-            if "refresh_token" in response_data:
-                login_data["tokens"]["refresh_token"] = response_data["refresh_token"]
-                print(f"✅ Updated refresh_token in login file")
-            
-            if "expires_in" in response_data:
-                login_data["tokens"]["expires_in"] = response_data["expires_in"]
-                print(f"✅ Updated expires_in in login file")
-            
-            if "expires_at" in response_data:
-                login_data["tokens"]["expires_at"] = response_data["expires_at"]
-                print(f"✅ Updated expires_at in login file")
-            
-            # Thêm thông tin về việc thay đổi năm học
-            if year:
-                login_data["last_year_change"] = {
-                    "year": year,
-                    "timestamp": self._get_current_timestamp(),
-                    "status": "success"
-                }
-                print(f"✅ Added year change info: {year}")
-            
-            # Lưu lại file
-            with open(login_file_path, 'w', encoding='utf-8') as f:
-                json.dump(login_data, f, indent=2, ensure_ascii=False)
+            # Đọc - sửa - ghi trong khóa để các lần đổi năm song song không ghi đè lẫn nhau
+            with login_file_lock(login_file_path):
+                with open(login_file_path, 'r', encoding='utf-8') as f:
+                    login_data = json.load(f)
+                
+                token_fields = ["access_token", "refresh_token", "expires_in", "expires_at"]
+                
+                if update_primary:
+                    # Cập nhật tokens nếu có trong response
+                    tokens = login_data.setdefault("tokens", {})
+                    for field in token_fields:
+                        if field in response_data:
+                            tokens[field] = response_data[field]
+                            print(f"✅ Updated {field} in login file")
+                
+                if year:
+                    # Token theo từng tài khoản và năm học - dùng lại cho lần fetch nhiều năm sau
+                    account = (self._token_account(response_data.get("access_token"))
+                               or self._token_account(self.auth_token))
+                    if "access_token" in response_data and account:
+                        account_tokens = login_data.setdefault("year_tokens", {}).setdefault(account, {})
+                        account_tokens[str(year)] = {
+                            field: response_data[field] for field in token_fields if field in response_data
+                        }
+                        account_tokens[str(year)]["updated_at"] = self._get_current_timestamp()
+                    
+                    # Thêm thông tin về việc thay đổi năm học
+                    if update_primary:
+                        login_data["last_year_change"] = {
+                            "year": year,
+                            "timestamp": self._get_current_timestamp(),
+                            "status": "success"
+                        }
+                    print(f"✅ Added year change info: {year}")
+                
+                # Lưu lại file (ghi file tạm rồi thay thế)
+                write_json_atomic(login_file_path, login_data)
             
             print(f"✅ Login file updated successfully: {login_file_path}")
             
         except Exception as e:
             print(f"❌ Error updating login file: {e}")
     
-    def _find_latest_login_file(self) -> str:
-        """
-        Tìm file login gần nhất trong thư mục output
-        
-        Returns:
-            str: Đường dẫn file login gần nhất hoặc None
-        """
-        try:
-            import glob
-            from pathlib import Path
-            
-            # Tìm tất cả file login trong thư mục output
-            output_dir = Path("data/output")
-            login_pattern = output_dir / "onluyen_login_*.json"
-            login_files = glob.glob(str(login_pattern))
-            
-            if not login_files:
-                return None
-            
-            # Sắp xếp theo thời gian modified và lấy file mới nhất
-            latest_file = max(login_files, key=os.path.getmtime)
-            print(f"📁 Found latest login file: {latest_file}")
-            return latest_file
-            
-        except Exception as e:
-            print(f"❌ Error finding login file: {e}")
-            return None
-    
     def _get_current_timestamp(self) -> str:
         """
         Lấy timestamp hiện tại theo format của hệ thống
@@ -574,19 +788,16 @@ class OnLuyenAPIClient:
         Load access_token từ file login JSON
         
         Args:
-            login_file_path (str, optional): Đường dẫn file login cụ thể.
-                                           Nếu None, sẽ tìm file login gần nhất
+            login_file_path (str, optional): Đường dẫn file login của trường
+                                           (find_login_file). Nếu None, dùng self.login_file_path
             
         Returns:
             bool: True nếu load thành công, False nếu thất bại
         """
         try:
-            # Tìm file login gần nhất nếu không chỉ định
+            login_file_path = login_file_path or self.login_file_path
             if not login_file_path:
-                login_file_path = self._find_latest_login_file()
-            
-            if not login_file_path:
-                print("❌ Không tìm thấy file login để load token")
+                print("❌ Chưa chỉ định file login để load token")
                 return False
             
             # Đọc file login
@@ -597,6 +808,7 @@ class OnLuyenAPIClient:
             access_token = login_data.get("tokens", {}).get("access_token")
             if access_token:
                 self.set_auth_token(access_token)
+                self.login_file_path = login_file_path
                 print(f"✅ Access token loaded from: {login_file_path}")
                 print(f"   Token: {access_token[:20]}...")
                 return True
@@ -617,25 +829,12 @@ class OnLuyenAPIClient:
         """
         try:
             if not self.auth_token:
-                # Thử load token từ file login
+                # Thử load token từ file login của client (self.login_file_path)
                 if not self.load_token_from_login_file():
                     return {"success": False, "error": "Không có access token"}
             
-            # Decode JWT token manually (chỉ lấy payload, không verify)
-            parts = self.auth_token.split('.')
-            if len(parts) >= 2:
-                # Decode payload (part 1)
-                payload = parts[1]
-                # Thêm padding nếu cần
-                padding = len(payload) % 4
-                if padding:
-                    payload += '=' * (4 - padding)
-                
-                import base64
-                import json
-                decoded_bytes = base64.b64decode(payload)
-                decoded = json.loads(decoded_bytes.decode('utf-8'))
-                
+            decoded = self._decode_token_payload(self.auth_token)
+            if decoded is not None:
                 school_year = decoded.get('SchoolYear')
                 display_name = decoded.get('DisplayName', '')
                 email = decoded.get('Email', '')
@@ -653,6 +852,42 @@ class OnLuyenAPIClient:
         except Exception as e:
             return {"success": False, "error": f"Lỗi decode token: {str(e)}"}
     
+    @staticmethod
+    def _decode_token_payload(token: str) -> Optional[Dict[str, Any]]:
+        """
+        Decode payload của JWT access_token (không verify chữ ký)
+        
+        Args:
+            token (str): Access token dạng JWT
+            
+        Returns:
+            Optional[Dict[str, Any]]: Payload đã decode hoặc None nếu token sai định dạng
+        """
+        import base64
+        
+        parts = (token or '').split('.')
+        if len(parts) < 2:
+            return None
+        
+        # Decode payload (part 1), thêm padding nếu cần
+        payload = parts[1]
+        padding = len(payload) % 4
+        if padding:
+            payload += '=' * (4 - padding)
+        
+        decoded_bytes = base64.urlsafe_b64decode(payload)
+        return json.loads(decoded_bytes.decode('utf-8'))
+    
+    @classmethod
+    def _token_account(cls, token: str) -> Optional[str]:
+        """Email (viết thường) của tài khoản trong access_token, None nếu không decode được"""
+        try:
+            payload = cls._decode_token_payload(token) if token else None
+        except Exception:
+            return None
+        email = (payload or {}).get('Email')
+        return str(email).strip().lower() if email else None
+    
     def print_current_school_year_info(self):
         """In thông tin năm học hiện tại"""
         info = self.get_current_school_year_info()
@@ -697,6 +932,107 @@ class OnLuyenAPIClient:
         
         return self.change_year(target_year, save_to_login_file, login_file_path)
 
+    def _load_year_token(self, year: int, login_file_path: str = None) -> Optional[str]:
+        """
+        Lấy access_token đã lưu cho năm học `year` của tài khoản hiện tại trong file login
+        (year_tokens[email][năm]) nếu còn hạn
+        
+        Args:
+            year (int): Năm học
+            login_file_path (str): Đường dẫn file login JSON của trường hiện tại - không tự tìm
+                                   file mới nhất vì có thể là file của trường khác đang chạy song song
+            
+        Returns:
+            Optional[str]: Access token hoặc None nếu chưa có / đã hết hạn / thuộc tài khoản khác
+        """
+        try:
+            account = self._token_account(self.auth_token)
+            if not login_file_path or not account:
+                return None
+            
+            with open(login_file_path, 'r', encoding='utf-8') as f:
+                login_data = json.load(f)
+            
+            token = login_data.get("year_tokens", {}).get(account, {}).get(str(year), {}).get("access_token")
+            payload = self._decode_token_payload(token) if token else None
+            if not payload or str(payload.get('SchoolYear')) != str(year):
+                return None
+            
+            # Token phải cùng tài khoản với token hiện tại (không lấy nhầm dữ liệu trường khác)
+            if self._token_account(token) != account:
+                return None
+            
+            # Chừa 60 giây để token không hết hạn giữa chừng khi fetch
+            expires = payload.get('exp')
+            if expires and float(expires) < time.time() + 60:
+                return None
+            
+            return token
+            
+        except Exception:
+            return None
+    
+    def get_year_client(self, year: int, login_file_path: str = None) -> Dict[str, Any]:
+        """
+        Tạo client riêng mang access_token của năm học `year` để fetch song song nhiều năm.
+        Client hiện tại giữ nguyên token; token năm mới chỉ lưu vào year_tokens của file login.
+        
+        Args:
+            year (int): Năm học cần lấy dữ liệu
+            login_file_path (str, optional): Đường dẫn file login JSON của trường để đọc/lưu token
+                                             theo năm (mặc định file đã load token hiện tại)
+            
+        Returns:
+            Dict[str, Any]: {"success", "client", "year", "source", "error"}
+                            source: current_token | login_file | change_year
+        """
+        login_file_path = login_file_path or self.login_file_path
+        if not self.auth_token:
+            return {
+                "success": False,
+                "client": None,
+                "year": year,
+                "source": None,
+                "error": "Chưa có access_token. Vui lòng đăng nhập trước khi thay đổi năm học"
+            }
+        
+        year_client = OnLuyenAPIClient()
+        
+        # Token hiện tại đã đúng năm học - dùng luôn
+        current_info = self.get_current_school_year_info()
+        if current_info.get("success") and str(current_info.get("school_year")) == str(year):
+            year_client.set_auth_token(self.auth_token)
+            year_client.login_file_path = login_file_path
+            return {"success": True, "client": year_client, "year": year, "source": "current_token", "error": None}
+        
+        # Token của năm này đã lưu từ lần trước và còn hạn
+        cached_token = self._load_year_token(year, login_file_path)
+        if cached_token:
+            year_client.set_auth_token(cached_token)
+            year_client.login_file_path = login_file_path
+            return {"success": True, "client": year_client, "year": year, "source": "login_file", "error": None}
+        
+        # Đổi năm học trên client riêng - không đụng vào token của client hiện tại
+        year_client.set_auth_token(self.auth_token)
+        result = year_client.change_year_v2(year, save_to_login_file=False)
+        new_token = (result.get("data") or {}).get("access_token") if result.get("success") else None
+        
+        if not new_token:
+            return {
+                "success": False,
+                "client": None,
+                "year": year,
+                "source": "change_year",
+                "error": result.get("error") or f"Không nhận được access_token cho năm học {year}"
+            }
+        
+        year_client.set_auth_token(new_token)
+        year_client.login_file_path = login_file_path
+        if login_file_path:
+            self._update_login_file_with_new_token(result["data"], login_file_path, year, update_primary=False)
+        
+        return {"success": True, "client": year_client, "year": year, "source": "change_year", "error": None}
+
     def get_teachers(self, page_size: int = 10, **kwargs) -> Dict[str, Any]:
         """
         Lấy danh sách giáo viên
@@ -736,6 +1072,179 @@ class OnLuyenAPIClient:
         params.update(kwargs)
         
         return self._make_request(endpoint, params=params)
+
+    @staticmethod
+    def date_create_key(record: Dict[str, Any]) -> str:
+        """Key so sánh dateCreate đến giây (bỏ phần thập phân/timezone để so sánh chuỗi ổn định)"""
+        value = str(record.get('dateCreate') or '').replace(' ', 'T')
+        return value[:19]
+
+    @classmethod
+    def _page_order(cls, keys: list) -> Optional[str]:
+        """Thứ tự dateCreate trong một trang: 'desc', 'asc' hoặc None nếu không sắp xếp"""
+        if all(a >= b for a, b in zip(keys, keys[1:])):
+            return 'desc'
+        if all(a <= b for a, b in zip(keys, keys[1:])):
+            return 'asc'
+        return None
+
+    def get_students_since(self, since: str, page_size: int = 1000, sort_params: Dict[str, Any] = None,
+                           filter_param: str = None) -> Dict[str, Any]:
+        """
+        Lấy học sinh có dateCreate >= since, dừng phân trang sớm khi đã đi qua mốc
+
+        Thứ tự trang được kiểm tra thực tế (không tin tham số sắp xếp): danh sách giảm dần
+        theo dateCreate → đọc từ trang đầu; tăng dần → đọc ngược từ trang cuối; không sắp xếp
+        hoặc thứ tự bị phá vỡ giữa các trang → lấy toàn bộ và lọc phía client.
+
+        Args:
+            since (str): Mốc dateCreate (ISO) - lấy record có dateCreate >= since
+            page_size (int): Số lượng records mỗi page
+            sort_params (Dict): Tham số sắp xếp gửi kèm request (nếu API hỗ trợ)
+            filter_param (str): Tên tham số lọc dateCreate phía server (nếu API hỗ trợ)
+
+        Returns:
+            Dict[str, Any]: Kết quả giống get_students ({'data': {'data', 'totalCount'}}) kèm
+                'mode', 'pages_fetched', 'total_pages', 'high_water_mark'
+        """
+        since_key = (since or '').replace(' ', 'T')[:19]
+        extra_params = dict(sort_params or {})
+        if filter_param:
+            extra_params[filter_param] = since
+
+        pages = {}
+
+        def fetch(page_index):
+            result = self.get_students(page_index=page_index, page_size=page_size, **extra_params)
+            data = result.get('data')
+            if not result.get('success') or not isinstance(data, dict) or 'data' not in data:
+                return result, None
+            pages[page_index] = data['data'] or []
+            return result, data
+
+        first_result, first_data = fetch(1)
+        if first_data is None:
+            return first_result
+
+        total_count = first_data.get('totalCount', len(pages[1]))
+        total_pages = max(1, (total_count + page_size - 1) // page_size)
+        keys = [self.date_create_key(record) for record in pages[1]]
+        order = self._page_order(keys)
+
+        if filter_param:
+            mode = 'server_filter'
+        elif total_pages == 1:
+            mode = 'single_page'
+        elif order == 'desc':
+            mode = 'descending'
+        elif order == 'asc':
+            mode = 'ascending'
+        else:
+            mode = 'full'
+
+        def page_keys(page_index):
+            return [self.date_create_key(record) for record in pages[page_index]]
+
+        if mode == 'descending':
+            # Trang đầu mới nhất: dừng khi trang chứa record cũ hơn mốc
+            previous_last = keys[-1] if keys else ''
+            page_index = 1
+            while page_index < total_pages and (not keys or min(keys) >= since_key):
+                page_index += 1
+                result, data = fetch(page_index)
+                if data is None:
+                    return result
+                keys = page_keys(page_index)
+                if keys and (self._page_order(keys) != 'desc' or keys[0] > previous_last):
+                    mode = 'full'
+                    break
+                previous_last = keys[-1] if keys else previous_last
+        elif mode == 'ascending':
+            # Trang cuối mới nhất: đọc ngược, dừng khi trang chứa record cũ hơn mốc
+            next_first = None
+            page_index = total_pages + 1
+            while page_index > 1:
+                page_index -= 1
+                if page_index not in pages:
+                    result, data = fetch(page_index)
+                    if data is None:
+                        return result
+                keys = page_keys(page_index)
+                ascending = len(set(keys)) <= 1 or self._page_order(keys) == 'asc'
+                if keys and (not ascending or next_first is not None and keys[-1] > next_first):
+                    mode = 'full'
+                    break
+                next_first = keys[0] if keys else next_first
+                if keys and keys[0] < since_key:
+                    break
+
+        if mode in ('full', 'server_filter'):
+            for page_index in range(1, total_pages + 1):
+                if page_index not in pages:
+                    result, data = fetch(page_index)
+                    if data is None:
+                        return result
+
+        records = []
+        seen_ids = set()
+        high_water_mark = since_key
+        for page_index in sorted(pages):
+            for record in pages[page_index]:
+                key = self.date_create_key(record)
+                if key > high_water_mark:
+                    high_water_mark = key
+                if key < since_key:
+                    continue
+                record_id = record.get('studentId') or record.get('id') or record.get('account')
+                if record_id in seen_ids:
+                    continue
+                seen_ids.add(record_id)
+                records.append(record)
+
+        return {
+            "success": True,
+            "status_code": first_result.get('status_code'),
+            "data": {'data': records, 'totalCount': total_count},
+            "error": None,
+            "mode": mode,
+            "pages_fetched": len(pages),
+            "total_pages": total_pages,
+            "high_water_mark": high_water_mark
+        }
+
+    def _process_response(self, response: requests.Response) -> Dict[str, Any]:
+        """
+        Chuyển response thành kết quả chuẩn (giải nén Brotli nếu requests chưa tự xử lý)
+        
+        Args:
+            response (requests.Response): Response từ server
+            
+        Returns:
+            Dict[str, Any]: Kết quả API call
+        """
+        response_data = None
+        if response.content:
+            content_encoding = response.headers.get('content-encoding', '').lower()
+            try:
+                if content_encoding == 'br':
+                    try:
+                        import brotli
+                        response_text = brotli.decompress(response.content).decode('utf-8')
+                    except Exception:
+                        # urllib3 đã tự giải nén Brotli
+                        response_text = response.text
+                else:
+                    response_text = response.text
+                response_data = json.loads(response_text)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                print(f"   JSON Parse Error: {e}")
+        
+        return {
+            "success": response.status_code == 200,
+            "status_code": response.status_code,
+            "data": response_data,
+            "error": None if response.status_code == 200 else f"HTTP {response.status_code}"
+        }
     
     def _make_request(self, endpoint: APIEndpoint, params: Dict = None, 
                      json_data: Dict = None) -> Dict[str, Any]:
@@ -757,13 +1266,7 @@ class OnLuyenAPIClient:
             print(f"   Params: {params}")
             print(f"   Auth Token: {'Set' if self.auth_token else 'Not set'}")
             
-            response = self.session.request(
-                method=endpoint.method,
-                url=endpoint.url,
-                params=params,
-                json=json_data,
-                timeout=OnLuyenAPIConfig.DEFAULT_TIMEOUT
-            )
+            response = self._send(endpoint.method, endpoint.url, params=params, json=json_data)
             
             print(f"\n📡 API RESPONSE DEBUG:")
             print(f"   Status Code: {response.status_code}")
@@ -835,34 +1338,46 @@ class OnLuyenAPIClient:
                 "endpoint": endpoint.name
             }
     
-    def test_connectivity(self) -> Dict[str, Any]:
+    def test_connectivity(self, use_cache: bool = True) -> Dict[str, Any]:
         """
-        Test kết nối đến các endpoints
+        Test kết nối đến các endpoints (HEAD song song, timeout riêng mỗi endpoint,
+        kết quả được cache ngắn hạn trong preflight runner)
         
+        Args:
+            use_cache (bool): Dùng lại kết quả còn hạn trong cache
+            
         Returns:
             Dict[str, Any]: Kết quả test
         """
-        results = {}
+        from utils.preflight import PreflightCheck, get_preflight_runner
+        
+        def head(url):
+            response = self._send('HEAD', url, timeout=10)
+            return {
+                "status": "success" if response.status_code < 500 else "error",
+                "status_code": response.status_code
+            }
         
+        results = {}
+        checks = []
         for name, endpoint in OnLuyenAPIConfig.get_all_endpoints().items():
             if name == "login":
                 # Skip login test vì cần credentials
                 results[name] = {"status": "skipped", "reason": "requires_credentials"}
                 continue
-            
-            try:
-                response = self.session.head(
-                    url=endpoint.url,
-                    timeout=10
-                )
-                results[name] = {
-                    "status": "success" if response.status_code < 500 else "error",
-                    "status_code": response.status_code
-                }
-            except Exception as e:
+            checks.append(PreflightCheck(f"onluyen:{name}:{endpoint.url}",
+                                         lambda url=endpoint.url: head(url), timeout=10))
+        
+        outcomes = get_preflight_runner().run(checks, use_cache=use_cache)
+        for check in checks:
+            name = check.name.split(':')[1]
+            outcome = outcomes[check.name]
+            if outcome["status"] == "ok":
+                results[name] = outcome["result"]
+            else:
                 results[name] = {
                     "status": "error",
-                    "error": str(e)
+                    "error": outcome["error"]
                 }
         
         return results
@@ -892,6 +1407,7 @@ def print_api_config_summary():
     print(f"\n🔧 Environment Variables Used:")
     print(f"   ONLUYEN_AUTH_BASE_URL = {os.getenv('ONLUYEN_AUTH_BASE_URL', 'default: https://auth.onluyen.vn')}")
     print(f"   ONLUYEN_SCHOOL_API_BASE_URL = {os.getenv('ONLUYEN_SCHOOL_API_BASE_URL', 'default: https://school-api.onluyen.vn')}")
+    print(f"   ONLUYEN_CHANGE_YEAR_BASE_URL = {OnLuyenAPIConfig.get_change_year_base_url()}")
 
 
 if __name__ == "__main__":
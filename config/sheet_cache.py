@@ -0,0 +1,168 @@
+"""
+Google Sheets Snapshot Cache
+Cache dữ liệu Google Sheets theo spreadsheet ID, tên tab và revision
+(Drive version/modifiedTime) - sheet chưa đổi thì đọc từ snapshot local
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import os
+import json
+import hashlib
+import threading
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from config import config
+
+
+class SheetSnapshotCache:
+    """Cache snapshot DataFrame của Google Sheets (bộ nhớ + file)"""
+
+    def __init__(self, cache_dir: str = None):
+        """
+        Khởi tạo SheetSnapshotCache
+
+        Args:
+            cache_dir (str): Thư mục lưu snapshot
+        """
+        self.cache_dir = cache_dir or config.SHEET_CACHE_DIR
+        self._memory: Dict[Tuple[str, str], Tuple[str, pd.DataFrame]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0}
+
+    @staticmethod
+    def make_revision(file_metadata: Dict[str, str]) -> Optional[str]:
+        """
+        Tạo revision key từ metadata Drive
+
+        Args:
+            file_metadata (Dict): Kết quả files().get(fields='version,modifiedTime')
+
+        Returns:
+            Optional[str]: Revision key hoặc None nếu thiếu thông tin
+        """
+        version = file_metadata.get('version')
+        modified_time = file_metadata.get('modifiedTime')
+        if not version and not modified_time:
+            return None
+        return f"{version or ''}@{modified_time or ''}"
+
+    def _cache_file(self, sheet_id: str, sheet_name: str) -> str:
+        """Đường dẫn file snapshot cho (sheet_id, sheet_name)"""
+        digest = hashlib.md5(f"{sheet_id}|{sheet_name}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, sheet_id: str, sheet_name: Optional[str], revision: str) -> Optional[pd.DataFrame]:
+        """
+        Lấy snapshot nếu revision còn khớp
+
+        Args:
+            sheet_id (str): ID Google Sheets
+            sheet_name (str): Tên tab (None = tab đầu tiên)
+            revision (str): Revision hiện tại của file
+
+        Returns:
+            Optional[pd.DataFrame]: Bản sao DataFrame hoặc None nếu không có/đã cũ
+        """
+        key = (sheet_id, sheet_name or '')
+
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached and cached[0] == revision:
+                self.stats['hits'] += 1
+                return cached[1].copy()
+
+        cache_file = self._cache_file(*key)
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+
+                if snapshot.get('revision') == revision:
+                    df = pd.DataFrame(snapshot.get('values', []), columns=snapshot.get('columns', []))
+                    with self._lock:
+                        self._memory[key] = (revision, df)
+                        self.stats['hits'] += 1
+                    return df.copy()
+
+            except Exception as e:
+                print(f"⚠️  Lỗi đọc sheet cache: {e}")
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def put(self, sheet_id: str, sheet_name: Optional[str], revision: str, df: pd.DataFrame) -> None:
+        """
+        Lưu snapshot cho revision hiện tại
+
+        Args:
+            sheet_id (str): ID Google Sheets
+            sheet_name (str): Tên tab
+            revision (str): Revision của file lúc đọc
+            df (pd.DataFrame): Dữ liệu đã đọc
+        """
+        key = (sheet_id, sheet_name or '')
+        snapshot_df = df.copy()
+
+        with self._lock:
+            self._memory[key] = (revision, snapshot_df)
+            self.stats['stores'] += 1
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            cache_file = self._cache_file(*key)
+            tmp_file = cache_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'sheet_id': sheet_id,
+                    'sheet_name': sheet_name,
+                    'revision': revision,
+                    'cached_at': datetime.now().isoformat(),
+                    'columns': [str(col) if not isinstance(col, (int, float)) else col for col in snapshot_df.columns],
+                    'values': snapshot_df.astype(object).where(snapshot_df.notna(), None).values.tolist()
+                }, f, ensure_ascii=False, default=str)
+            os.replace(tmp_file, cache_file)
+        except Exception as e:
+            print(f"⚠️  Không lưu được sheet cache: {e}")
+
+    def invalidate(self, sheet_id: str, sheet_name: Optional[str] = None) -> None:
+        """
+        Xóa snapshot (ví dụ sau khi chính ứng dụng ghi vào sheet)
+
+        Args:
+            sheet_id (str): ID Google Sheets
+            sheet_name (str): Tên tab
+        """
+        key = (sheet_id, sheet_name or '')
+
+        with self._lock:
+            self._memory.pop(key, None)
+
+        cache_file = self._cache_file(*key)
+        try:
+            if os.path.exists(cache_file):
+                os.remove(cache_file)
+        except OSError as e:
+            print(f"⚠️  Không xóa được sheet cache: {e}")
+
+
+# Global cache instance (khởi tạo lazy)
+_sheet_cache: Optional[SheetSnapshotCache] = None
+_sheet_cache_lock = threading.Lock()
+
+
+def get_sheet_cache() -> SheetSnapshotCache:
+    """
+    Lấy instance SheetSnapshotCache global (dùng chung giữa UI và console)
+
+    Returns:
+        SheetSnapshotCache: Sheet cache
+    """
+    global _sheet_cache
+    with _sheet_cache_lock:
+        if _sheet_cache is None:
+            _sheet_cache = SheetSnapshotCache()
+        return _sheet_cache
@@ -0,0 +1,391 @@
+"""
+Google Sheets Write-Back Service
+Gom các cập nhật "Số lượng GV nạp"/"Số lượng HS nạp" theo tab và hàng của sheet tổng
+và ghi về Google Sheets bằng một values().batchUpdate duy nhất mỗi lần flush
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config_manager import get_config
+
+
+# Tên cột trên sheet tổng (ED-2025)
+COLUMN_TEACHERS_LOADED = 'Số lượng GV nạp'
+COLUMN_STUDENTS_LOADED = 'Số lượng HS nạp'
+WRITEBACK_COLUMNS = [COLUMN_TEACHERS_LOADED, COLUMN_STUDENTS_LOADED]
+
+
+class SheetWriteBackService:
+    """
+    Hàng đợi ghi ngược kết quả xử lý về sheet tổng
+
+    - Mỗi hàng được xác định bằng tab (sheet_name của dữ liệu, mặc định self.sheet_name)
+      và sheet_row (1-based) nếu biết, ngược lại bằng row_index (0-based, tính từ
+      hàng dữ liệu đầu tiên) như extractor trả về
+    - Nhiều lần ghi cùng một ô được gộp lại, giá trị sau cùng thắng
+    - Flush gửi một values().batchUpdate cho toàn bộ ô đang chờ
+    - Flush nền theo chu kỳ, có giới hạn số request/phút (quota Sheets API)
+      và giãn chu kỳ khi bị 429
+    """
+
+    def __init__(self, sheet_id: str = None, sheet_name: str = 'ED-2025',
+                 flush_interval: float = 30.0, max_writes_per_minute: int = 30,
+                 max_interval: float = 300.0, google_client=None):
+        """
+        Khởi tạo SheetWriteBackService
+
+        Args:
+            sheet_id (str): ID Google Sheets tổng (mặc định GOOGLE_TEST_SHEET_ID)
+            sheet_name (str): Tên tab mặc định (khi dữ liệu không ghi rõ tab)
+            flush_interval (float): Chu kỳ flush nền (giây)
+            max_writes_per_minute (int): Số batchUpdate tối đa mỗi phút
+            max_interval (float): Chu kỳ tối đa khi bị giới hạn tốc độ
+            google_client: GoogleAPIClient (mặc định tạo lazy khi flush lần đầu)
+        """
+        self.sheet_id = sheet_id or get_config().get_google_config().get('test_sheet_id')
+        self.sheet_name = sheet_name
+        self.flush_interval = flush_interval
+        self.max_writes_per_minute = max_writes_per_minute
+        self.max_interval = max_interval
+        self._google_client = google_client
+
+        # (tab, loại key, giá trị key) -> {tên cột: giá trị}
+        self._pending: Dict[Tuple[str, str, int], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._write_times = deque()
+        self._current_interval = flush_interval
+
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._worker = None
+
+        self.stats = {'recorded': 0, 'coalesced': 0, 'flushes': 0, 'cells_written': 0, 'errors': 0}
+
+    # ------------------------------------------------------------------
+    # Ghi nhận cập nhật
+    # ------------------------------------------------------------------
+
+    def record(self, values: Dict[str, Any], row_index: int = None, sheet_row: int = None,
+               sheet_name: str = None) -> bool:
+        """
+        Ghi nhận giá trị cần ghi cho một hàng (chưa gọi API)
+
+        Args:
+            values (Dict[str, Any]): {tên cột: giá trị}
+            row_index (int): Index hàng dữ liệu 0-based (như extractor trả về)
+            sheet_row (int): Số hàng thực tế trên sheet (1-based), ưu tiên nếu có
+            sheet_name (str): Tab chứa hàng (mặc định self.sheet_name)
+
+        Returns:
+            bool: True nếu đã đưa vào hàng đợi
+        """
+        sheet_name = sheet_name or self.sheet_name
+        if sheet_row is not None:
+            row_key = (sheet_name, 'sheet_row', int(sheet_row))
+        elif row_index is not None:
+            row_key = (sheet_name, 'row_index', int(row_index))
+        else:
+            return False
+
+        values = {column: value for column, value in values.items()
+                  if column in WRITEBACK_COLUMNS and value is not None}
+        if not values:
+            return False
+
+        with self._lock:
+            pending = self._pending.setdefault(row_key, {})
+            self.stats['coalesced'] += sum(1 for column in values if column in pending)
+            pending.update(values)
+            self.stats['recorded'] += len(values)
+
+        return True
+
+    def record_school_result(self, school_data: Dict[str, Any], teachers_count: int = None,
+                             students_count: int = None) -> bool:
+        """
+        Ghi nhận số lượng GV/HS đã nạp cho trường (school_data từ extractor/viewer)
+
+        Args:
+            school_data (Dict): Dữ liệu hàng, cần có 'sheet_row' hoặc 'row_index'
+                (và 'sheet_name' nếu không thuộc tab mặc định)
+            teachers_count (int): Số lượng GV nạp
+            students_count (int): Số lượng HS nạp
+
+        Returns:
+            bool: True nếu đã đưa vào hàng đợi
+        """
+        if not school_data:
+            return False
+
+        values = {}
+        if teachers_count is not None:
+            values[COLUMN_TEACHERS_LOADED] = teachers_count
+        if students_count is not None:
+            values[COLUMN_STUDENTS_LOADED] = students_count
+
+        recorded = self.record(values, row_index=school_data.get('row_index'),
+                               sheet_row=school_data.get('sheet_row'),
+                               sheet_name=school_data.get('sheet_name'))
+        if recorded:
+            self._wake_event.set()
+        return recorded
+
+    def get_pending_count(self) -> int:
+        """Số ô đang chờ ghi"""
+        with self._lock:
+            return sum(len(values) for values in self._pending.values())
+
+    # ------------------------------------------------------------------
+    # Flush
+    # ------------------------------------------------------------------
+
+    def _get_google_client(self):
+        """GoogleAPIClient dùng để ghi (tạo lazy, service lấy từ registry)"""
+        if self._google_client is None:
+            from config.google_api import GoogleAPIClient
+            self._google_client = GoogleAPIClient()
+        return self._google_client
+
+    def _build_value_ranges(self, pending: Dict[Tuple[str, int], Dict[str, Any]],
+                            header_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Chuyển các ô đang chờ của một tab thành data cho batchUpdate
+
+        Các cột liền kề trên cùng một hàng được gộp thành một range.
+        """
+        google_client = self._get_google_client()
+        quoted_sheet = "'" + header_info['sheet_title'].replace("'", "''") + "'"
+        first_data_row = header_info['header_row'] + 1
+        value_ranges = []
+
+        for (key_type, key_value), values in sorted(pending.items()):
+            row_number = key_value if key_type == 'sheet_row' else first_data_row + key_value
+
+            cells = sorted((header_info['columns'][column], value)
+                           for column, value in values.items()
+                           if column in header_info['columns'])
+
+            start = 0
+            while start < len(cells):
+                end = start
+                while end + 1 < len(cells) and cells[end + 1][0] == cells[end][0] + 1:
+                    end += 1
+
+                start_letter = google_client._column_letter(cells[start][0])
+                end_letter = google_client._column_letter(cells[end][0])
+                cell_range = f"{quoted_sheet}!{start_letter}{row_number}"
+                if end > start:
+                    cell_range += f":{end_letter}{row_number}"
+
+                value_ranges.append({
+                    'range': cell_range,
+                    'values': [[cells[i][1] for i in range(start, end + 1)]]
+                })
+                start = end + 1
+
+        return value_ranges
+
+    def _acquire_write_slot(self) -> float:
+        """
+        Kiểm tra quota request/phút
+
+        Returns:
+            float: 0 nếu được ghi ngay, ngược lại số giây cần chờ
+        """
+        now = time.monotonic()
+        while self._write_times and now - self._write_times[0] >= 60:
+            self._write_times.popleft()
+
+        if len(self._write_times) >= self.max_writes_per_minute:
+            return 60 - (now - self._write_times[0])
+
+        self._write_times.append(now)
+        return 0
+
+    def _requeue(self, pending: Dict[Tuple[str, str, int], Dict[str, Any]]) -> None:
+        """Trả lại các ô chưa ghi (không đè giá trị mới hơn đã ghi nhận trong lúc flush)"""
+        with self._lock:
+            for row_key, values in pending.items():
+                merged = dict(values)
+                merged.update(self._pending.get(row_key, {}))
+                self._pending[row_key] = merged
+            self.stats['errors'] += 1
+
+    def flush(self) -> Dict[str, Any]:
+        """
+        Ghi toàn bộ ô đang chờ bằng một values().batchUpdate
+
+        Returns:
+            Dict: {'success', 'cells', 'rows', 'error'}
+        """
+        result = {'success': True, 'cells': 0, 'rows': 0, 'error': None}
+
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+
+            if not pending:
+                return result
+
+            try:
+                if not self.sheet_id:
+                    raise ValueError("Không có sheet ID để ghi ngược dữ liệu")
+
+                wait_seconds = self._acquire_write_slot()
+                if wait_seconds > 0:
+                    raise RuntimeError(f"Vượt quota ghi, thử lại sau {wait_seconds:.0f}s")
+
+                google_client = self._get_google_client()
+                if not google_client.sheets_service:
+                    raise RuntimeError("Sheets service chưa được khởi tạo")
+
+                # Mỗi tab resolve header riêng, tất cả range vẫn gửi trong một batchUpdate
+                pending_by_tab: Dict[str, Dict[Tuple[str, int], Dict[str, Any]]] = {}
+                for (sheet_name, key_type, key_value), values in pending.items():
+                    pending_by_tab.setdefault(sheet_name, {})[(key_type, key_value)] = values
+
+                # Tab phải trùng đúng tên: tab bị đổi tên/xóa thì giữ ô lại kèm lỗi, không ghi nhầm sang tab khác
+                value_ranges = []
+                failed_tabs = {}
+                for sheet_name, tab_pending in sorted(pending_by_tab.items()):
+                    header_info = google_client._resolve_sheet_header(
+                        self.sheet_id, sheet_name, WRITEBACK_COLUMNS, exact_sheet=True
+                    )
+                    if not header_info:
+                        failed_tabs[sheet_name] = (f"Không tìm thấy tab '{sheet_name}' hoặc cột "
+                                                   f"{', '.join(WRITEBACK_COLUMNS)} trên tab")
+                        continue
+                    value_ranges.extend(self._build_value_ranges(tab_pending, header_info))
+
+                if value_ranges:
+                    google_client.sheets_service.spreadsheets().values().batchUpdate(
+                        spreadsheetId=self.sheet_id,
+                        body={'valueInputOption': 'USER_ENTERED', 'data': value_ranges}
+                    ).execute()
+
+                    from config.sheet_cache import get_sheet_cache
+                    for sheet_name in pending_by_tab:
+                        if sheet_name not in failed_tabs:
+                            get_sheet_cache().invalidate(self.sheet_id, sheet_name)
+                    get_sheet_cache().invalidate(self.sheet_id, None)
+
+                result['cells'] = sum(len(vr['values'][0]) for vr in value_ranges)
+                result['rows'] = len(pending) - sum(len(pending_by_tab[sheet_name]) for sheet_name in failed_tabs)
+
+                with self._lock:
+                    self.stats['flushes'] += 1
+                    self.stats['cells_written'] += result['cells']
+                self._current_interval = self.flush_interval
+
+                written_tabs = sorted(set(pending_by_tab) - set(failed_tabs))
+                if written_tabs:
+                    print(f"📝 Đã ghi {result['cells']} ô ({result['rows']} trường) về tab "
+                          f"{', '.join(repr(sheet_name) for sheet_name in written_tabs)}")
+
+                if failed_tabs:
+                    self._requeue({row_key: values for row_key, values in pending.items()
+                                   if row_key[0] in failed_tabs})
+                    result['success'] = False
+                    result['error'] = '; '.join(failed_tabs.values())
+                    print(f"⚠️  Giữ lại ô chưa ghi để thử lại: {result['error']}")
+
+            except Exception as e:
+                self._requeue(pending)
+
+                if '429' in str(e) or 'quota' in str(e).lower():
+                    self._current_interval = min(self._current_interval * 2, self.max_interval)
+
+                result['success'] = False
+                result['error'] = str(e)
+                print(f"⚠️  Ghi ngược sheet thất bại, giữ lại để thử lại: {e}")
+
+        return result
+
+    # ------------------------------------------------------------------
+    # Flush nền
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Khởi động thread flush nền (idempotent)"""
+        if self._worker and self._worker.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._worker = threading.Thread(target=self._run, name='SheetWriteBack', daemon=True)
+        self._worker.start()
+
+    def stop(self, flush: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Dừng thread flush nền
+
+        Args:
+            flush (bool): Ghi nốt các ô đang chờ trước khi dừng
+
+        Returns:
+            Optional[Dict]: Kết quả flush cuối (nếu có)
+        """
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._worker:
+            self._worker.join(timeout=5)
+            self._worker = None
+
+        if flush and self.get_pending_count():
+            return self.flush()
+        return None
+
+    def _run(self) -> None:
+        """Vòng lặp flush: gom cập nhật trong một chu kỳ rồi ghi một lần"""
+        while not self._stop_event.is_set():
+            self._wake_event.wait()
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                break
+
+            # Chờ hết chu kỳ để gom thêm cập nhật của các trường khác
+            if self._stop_event.wait(self._current_interval):
+                break
+
+            if self.get_pending_count():
+                result = self.flush()
+                if not result['success']:
+                    self._wake_event.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Thống kê write-back"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['pending_cells'] = self.get_pending_count()
+        stats['current_interval'] = self._current_interval
+        return stats
+
+
+# Global service instance (khởi tạo lazy)
+_sheet_writeback: Optional[SheetWriteBackService] = None
+_sheet_writeback_lock = threading.Lock()
+
+
+def get_sheet_writeback() -> SheetWriteBackService:
+    """
+    Lấy instance SheetWriteBackService global (đã khởi động flush nền)
+
+    Returns:
+        SheetWriteBackService: Write-back service dùng chung
+    """
+    global _sheet_writeback
+    with _sheet_writeback_lock:
+        if _sheet_writeback is None:
+            config = get_config()
+            _sheet_writeback = SheetWriteBackService(
+                flush_interval=float(config.get('SHEETS_WRITEBACK_INTERVAL', '30')),
+                max_writes_per_minute=int(config.get('SHEETS_WRITEBACK_MAX_PER_MINUTE', '30'))
+            )
+            _sheet_writeback.start()
+        return _sheet_writeback
@@ -18,6 +18,7 @@ class GoogleSheetsExtractor:
         """Khởi tạo extractor"""
         self.config = get_config()
         self.processor = None
+        self._hyperlink_cache = {}
         self._init_processor()
     
     def _init_processor(self) -> None:
@@ -34,7 +35,8 @@ class GoogleSheetsExtractor:
             self.processor = None
     
     def extract_required_columns(self, sheet_id: str = None, sheet_name: str = 'ED-2025', 
-                                required_columns: List[str] = None) -> Optional[Dict[str, Any]]:
+                                required_columns: List[str] = None,
+                                hyperlink_columns: List[str] = None) -> Optional[Dict[str, Any]]:
         """
         Trích xuất các cột cần thiết từ Google Sheets
         
@@ -42,6 +44,8 @@ class GoogleSheetsExtractor:
             sheet_id (str): Sheet ID hoặc URL
             sheet_name (str): Tên sheet cụ thể
             required_columns (List[str]): Danh sách tên cột cần trích xuất
+            hyperlink_columns (List[str]): Các cột lấy URL hyperlink thay cho text
+                (ví dụ 'Link driver dữ liệu'), mỗi cột chỉ tốn một request
             
         Returns:
             Optional[Dict[str, Any]]: Dictionary chứa dữ liệu đã trích xuất
@@ -67,9 +71,16 @@ class GoogleSheetsExtractor:
         print()
         
         try:
-            # Đọc dữ liệu từ sheet
+            # Đọc dữ liệu từ sheet - ưu tiên chỉ tải các cột cần thiết (batchGet)
             print("🔄 Đang đọc dữ liệu...")
-            df = self.processor.google_client.read_shared_google_sheet(sheet_id, sheet_name)
+            google_client = self.processor.google_client
+            sheet_row_column = google_client.SHEET_ROW_COLUMN
+            df = google_client.read_sheet_columns(sheet_id, sheet_name, required_columns)
+            read_mode = 'projected'
+            
+            if df is None or df.empty:
+                df = google_client.read_shared_google_sheet(sheet_id, sheet_name, with_sheet_row=True)
+                read_mode = 'full'
             
             if df is None or df.empty:
                 print("❌ Không đọc được dữ liệu hoặc sheet trống")
@@ -78,9 +89,10 @@ class GoogleSheetsExtractor:
             print(f"✅ Đã đọc {len(df)} hàng, {len(df.columns)} cột")
             
             # Xử lý header - thử cả hàng 1 và hàng 2
-            if all(isinstance(col, (int, float)) for col in df.columns) or \
-               any('Unnamed:' in str(col) for col in df.columns) or \
-               any('#REF!' in str(col) for col in df.columns):
+            data_columns = [col for col in df.columns if col != sheet_row_column]
+            if all(isinstance(col, (int, float)) for col in data_columns) or \
+               any('Unnamed:' in str(col) for col in data_columns) or \
+               any('#REF!' in str(col) for col in data_columns):
                 
                 # Kiểm tra cả hàng 1 và hàng 2 để tìm header thực tế
                 header_found = False
@@ -110,7 +122,9 @@ class GoogleSheetsExtractor:
                 # Áp dụng header đã tìm được
                 if header_found:
                     header_row = df.iloc[header_row_index].tolist()
-                    df.columns = header_row
+                    # Giữ tên cột số hàng trên sheet (không lấy giá trị của hàng header)
+                    df.columns = [sheet_row_column if col == sheet_row_column else header
+                                  for col, header in zip(df.columns, header_row)]
                     df = df.iloc[header_row_index + 1:].reset_index(drop=True)
                     # print(f"📋 Đã chuyển đổi header từ hàng {header_row_index + 1}")
                 else:
@@ -156,13 +170,24 @@ class GoogleSheetsExtractor:
                     'sheet_id': sheet_id,
                     'sheet_name': sheet_name,
                     'total_rows': len(df),
-                    'total_columns': len(df.columns),
+                    'total_columns': len([col for col in df.columns if col != sheet_row_column]),
                     'found_columns': found_columns,
-                    'missing_columns': missing_columns
+                    'missing_columns': missing_columns,
+                    'read_mode': read_mode
                 },
                 'data': []
             }
             
+            # Hyperlink mode: lấy URL của cả cột trong một request
+            column_hyperlinks = {}
+            wanted_hyperlinks = [col for col in hyperlink_columns or [] if col in found_columns]
+            if wanted_hyperlinks:
+                revision = google_client.get_sheet_revision(google_client._extract_sheet_id(sheet_id))
+                for column_name in wanted_hyperlinks:
+                    column_hyperlinks[column_name] = self._extract_hyperlinks_from_column(
+                        sheet_id, sheet_name, column_name, revision
+                    )
+            
             # Lấy dữ liệu từ các cột tìm được
             for index, row in df.iterrows():
                 row_data = {}
@@ -184,9 +209,19 @@ class GoogleSheetsExtractor:
                     
                     row_data[req_col] = value
                 
+                # Thay text bằng URL hyperlink (nếu có), theo số hàng thực tế trên sheet
+                if column_hyperlinks and sheet_row_column in df.columns:
+                    target_row = int(row[sheet_row_column])
+                    for column_name, hyperlinks in column_hyperlinks.items():
+                        if hyperlinks.get(target_row):
+                            row_data[column_name] = hyperlinks[target_row]
+                
                 # Chỉ thêm hàng có ít nhất 1 giá trị không null
                 if any(v is not None for v in row_data.values()):
                     row_data['row_index'] = index
+                    if sheet_row_column in df.columns:
+                        row_data['sheet_row'] = int(row[sheet_row_column])
+                        row_data['sheet_name'] = sheet_name
                     extracted_data['data'].append(row_data)
             
             print(f"\n📊 ĐÃ TRÍCH XUẤT:")
@@ -226,7 +261,12 @@ class GoogleSheetsExtractor:
         """
         required_columns = ['Tên trường', 'Admin', 'Mật khẩu', 'Link driver dữ liệu']
         
-        extracted = self.extract_required_columns(sheet_id, sheet_name, required_columns)
+        # Hyperlink mode (bật qua .env): lấy URL thật của cột Drive link thay cho text hiển thị
+        hyperlink_columns = None
+        if str(self.config.get('GOOGLE_SHEETS_EXTRACT_HYPERLINKS', 'false')).lower() == 'true':
+            hyperlink_columns = ['Link driver dữ liệu']
+        
+        extracted = self.extract_required_columns(sheet_id, sheet_name, required_columns, hyperlink_columns)
         
         if extracted and extracted['data']:
             # Trả về chỉ dữ liệu, bỏ qua metadata
@@ -277,29 +317,42 @@ class GoogleSheetsExtractor:
         
         return summary
     
-    def _extract_hyperlinks_from_column(self, sheet_id: str, sheet_name: str, column_name: str) -> dict:
+    def _extract_hyperlinks_from_column(self, sheet_id: str, sheet_name: str, column_name: str,
+                                        revision: str = None) -> dict:
         """
-        [DEPRECATED] Trích xuất tất cả hyperlinks từ một cột trong Google Sheets
-        NOTE: Method này đã được disable theo yêu cầu không trích xuất hyperlinks
+        Trích xuất tất cả hyperlinks từ một cột trong Google Sheets
+        
+        Chỉ tốn một request cho cả cột; kết quả được cache theo revision của sheet
+        (Drive version/modifiedTime) nên sheet bị sửa thì lần trích xuất sau đọc lại.
         
         Args:
             sheet_id (str): ID của Google Sheet
             sheet_name (str): Tên sheet
             column_name (str): Tên cột cần extract hyperlinks
+            revision (str): Revision hiện tại của sheet (None = không dùng cache)
             
         Returns:
-            dict: Empty dict (không còn extract hyperlinks)
+            dict: {số hàng trên sheet (1-based): URL}
         """
-        print(f"      ℹ️ Hyperlink extraction disabled for column '{column_name}'")
-        print(f"      📝 Using direct text values instead of hyperlinks")
-        return {}
+        cache_key = (sheet_id, sheet_name, column_name)
+        cached = self._hyperlink_cache.get(cache_key)
+        if revision and cached and cached[0] == revision:
+            return cached[1]
+        
+        hyperlinks = self.processor.google_client.get_column_hyperlinks(sheet_id, sheet_name, column_name)
+        if revision:
+            self._hyperlink_cache[cache_key] = (revision, hyperlinks)
+        else:
+            self._hyperlink_cache.pop(cache_key, None)
+        return hyperlinks
     
-    def _extract_hyperlink_url(self, row_index: int, column_name: str, sheet_id: str, sheet_name: str = None) -> str:
+    def _extract_hyperlink_url(self, sheet_row: int, column_name: str, sheet_id: str,
+                               sheet_name: str = None) -> str:
         """
         Trích xuất URL thực tế từ hyperlink trong Google Sheets cell
         
         Args:
-            row_index (int): Index của hàng (0-based)
+            sheet_row (int): Số hàng thực tế trên sheet (1-based, cột sheet_row của dữ liệu đã trích xuất)
             column_name (str): Tên cột 
             sheet_id (str): ID của Google Sheet
             sheet_name (str): Tên sheet
@@ -308,127 +361,13 @@ class GoogleSheetsExtractor:
             str: URL thực tế hoặc None nếu không có hyperlink
         """
         try:
-            print(f"      🔍 Extracting hyperlink for row {row_index}, column '{column_name}'")
-            
-            # Lấy service từ processor
-            sheets_service = self.processor.google_client.sheets_service
-            
-            # Lấy metadata để tìm sheet ID
-            sheet_metadata = sheets_service.spreadsheets().get(
-                spreadsheetId=sheet_id
-            ).execute()
-            
-            # Tìm sheet ID từ tên
-            target_sheet_id = None
-            available_sheets = []
-            for sheet in sheet_metadata['sheets']:
-                sheet_title = sheet['properties']['title']
-                available_sheets.append(sheet_title)
-                if sheet_name and sheet_title == sheet_name:
-                    target_sheet_id = sheet['properties']['sheetId']
-                    break
-                elif not sheet_name and sheet['properties']['index'] == 0:
-                    target_sheet_id = sheet['properties']['sheetId']
-                    break
-            
-            print(f"      📋 Available sheets: {available_sheets}")
-            print(f"      🎯 Target sheet: {sheet_name}, ID: {target_sheet_id}")
-            
-            if target_sheet_id is None:
-                print(f"      ❌ Could not find sheet ID")
-                return None
-            
-            # Tìm column index từ tên cột
-            # Đọc header để map column name → index
-            range_name = f"{sheet_name}!1:1" if sheet_name else "A1:ZZ1"
-            header_result = sheets_service.spreadsheets().values().get(
-                spreadsheetId=sheet_id,
-                range=range_name
-            ).execute()
-            
-            header_values = header_result.get('values', [[]])[0] if header_result.get('values') else []
-            print(f"      📋 Header values: {header_values}")
-            
-            column_index = None
-            for i, header in enumerate(header_values):
-                if str(header).strip() == column_name:
-                    column_index = i
-                    break
-            
-            print(f"      📊 Column '{column_name}' found at index: {column_index}")
-            
-            if column_index is None:
-                print(f"      ❌ Column not found in header")
-                return None
-            
-            # Chuyển đổi column index thành A1 notation
-            def col_index_to_letter(index):
-                """Convert 0-based column index to letter (A, B, C, ...)"""
-                result = ""
-                while index >= 0:
-                    result = chr(index % 26 + ord('A')) + result
-                    index = index // 26 - 1
-                return result
-            
-            column_letter = col_index_to_letter(column_index)
-            cell_address = f"{column_letter}{row_index + 2}"  # +2 vì row_index 0-based và có header
-            
-            print(f"      📍 Cell address: {cell_address}")
-            
-            # Lấy cell data với hyperlink information
-            range_name = f"{sheet_name}!{cell_address}" if sheet_name else cell_address
-            
-            print(f"      🔍 Getting cell data for range: {range_name}")
-            
-            result = sheets_service.spreadsheets().get(
-                spreadsheetId=sheet_id,
-                ranges=[range_name],
-                includeGridData=True
-            ).execute()
-            
-            print(f"      📄 Response keys: {result.keys()}")
-            
-            # Extract hyperlink URL từ response
-            sheets = result.get('sheets', [])
-            print(f"      📊 Number of sheets in response: {len(sheets)}")
-            
-            if sheets:
-                data = sheets[0].get('data', [])
-                print(f"      📊 Number of data sections: {len(data)}")
-                
-                if data:
-                    row_data = data[0].get('rowData', [])
-                    print(f"      📊 Number of rows: {len(row_data)}")
-                    
-                    if row_data:
-                        values = row_data[0].get('values', [])
-                        print(f"      📊 Number of values: {len(values)}")
-                        
-                        if values:
-                            cell_data = values[0]
-                            print(f"      📊 Cell data keys: {cell_data.keys()}")
-                            
-                            hyperlink = cell_data.get('hyperlink')
-                            if hyperlink:
-                                print(f"      ✅ Found hyperlink: {hyperlink}")
-                                return hyperlink
-                            else:
-                                print(f"      ❌ No hyperlink in cell data")
-                        else:
-                            print(f"      ❌ No values in row data")
-                    else:
-                        print(f"      ❌ No row data")
-                else:
-                    print(f"      ❌ No data sections")
-            else:
-                print(f"      ❌ No sheets in response")
-            
-            return None
+            google_client = self.processor.google_client
+            revision = google_client.get_sheet_revision(google_client._extract_sheet_id(sheet_id))
+            hyperlinks = self._extract_hyperlinks_from_column(sheet_id, sheet_name, column_name, revision)
+            return hyperlinks.get(sheet_row)
             
         except Exception as e:
             print(f"      ❌ Error extracting hyperlink: {e}")
-            import traceback
-            print(f"      🔍 Traceback: {traceback.format_exc()}")
             return None
 
 
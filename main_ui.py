@@ -8,7 +8,6 @@ from tkinter import ttk, messagebox
 import sys
 import os
 from pathlib import Path
-import time
 
 # Thêm project root vào Python path
 project_root = Path(__file__).parent
@@ -125,12 +124,13 @@ def check_dependencies():
     
     missing_modules = []
     
-    for package_name, import_name in required_modules.items():
-        try:
-            __import__(import_name)
+    # find_spec chỉ tìm module, không import (googleapiclient, pandas... import rất chậm)
+    from utils.preflight import check_modules
+    for package_name, found in check_modules(required_modules).items():
+        if found:
             print(f"✅ {package_name} - OK")
-        except ImportError as e:
-            print(f"❌ {package_name} - Missing: {e}")
+        else:
+            print(f"❌ {package_name} - Missing")
             missing_modules.append(package_name)
             
     return missing_modules
@@ -203,9 +203,6 @@ def load_app_with_splash():
         splash.update_progress(100, "Hoàn tất!")
         print("🎉 Sẵn sàng hiển thị UI...")
         
-        # Wait a moment
-        time.sleep(0.5)
-        
         # Close splash
         splash.close()
         print("✅ Splash screen đã đóng")
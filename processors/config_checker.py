@@ -10,6 +10,8 @@ import pandas as pd
 from typing import Dict, List, Tuple
 import json
 
+from utils.preflight import PreflightCheck, check_modules, get_preflight_runner
+
 
 class ConfigChecker:
     """Class kiểm tra cấu hình hệ thống"""
@@ -315,22 +317,23 @@ class ConfigChecker:
             'gspread': 'gspread'
         }
         
-        results = {}
+        # find_spec chỉ tìm module, không import các package nặng như googleapiclient
+        results = check_modules(required_packages)
         
-        for package_name, import_name in required_packages.items():
-            try:
-                __import__(import_name)
-                results[package_name] = True
+        for package_name, installed in results.items():
+            if installed:
                 print(f"   {package_name}: ✅ Đã cài đặt")
-            except ImportError:
-                results[package_name] = False
+            else:
                 print(f"   {package_name}: ❌ Chưa cài đặt")
         
         return results
     
-    def run_full_check(self) -> Dict[str, any]:
+    def run_full_check(self, use_cache: bool = True) -> Dict[str, any]:
         """
-        Chạy kiểm tra toàn diện hệ thống
+        Chạy kiểm tra toàn diện hệ thống (các bước độc lập chạy song song, có timeout riêng)
+        
+        Args:
+            use_cache (bool): Dùng lại kết quả các bước còn hạn trong cache preflight
         
         Returns:
             Dict: Kết quả kiểm tra tổng hợp
@@ -338,14 +341,56 @@ class ConfigChecker:
         print("\n🔍 KIỂM TRA TOÀN DIỆN HỆ THỐNG")
         print("=" * 60)
         
-        results = {
-            "file_system": self.check_file_system(),
-            "google_api": self.check_google_api_config(),
-            "data_integrity": self.check_data_integrity(),
-            "python_dependencies": self.check_python_dependencies(),
-            "overall_status": "unknown"
+        # Kết quả mặc định khi một bước lỗi/quá thời gian - giữ nguyên cấu trúc để đánh giá bên dưới
+        fallbacks = {
+            "file_system": lambda: {
+                "directories": {"Input Folder": {"path": self.input_folder, "exists": False}},
+                "input_files": {},
+                "config_files": {},
+                "template_files": {"Template Excel": {"path": self.template_file, "exists": False, "size": 0}}
+            },
+            "google_api": lambda: {
+                "service_account_valid": False,
+                "google_api_module": False,
+                "config_module": False,
+                "connection_test": False,
+                "errors": []
+            },
+            "data_integrity": lambda: {
+                "students": {"count": 0, "valid": False, "errors": []},
+                "teachers": {"count": 0, "valid": False, "errors": []},
+                "template": {"valid": False, "sheets": [], "errors": []}
+            },
+            "python_dependencies": lambda: {"pandas": False, "openpyxl": False}
         }
         
+        # Cache theo thư mục đang kiểm tra để không dùng nhầm kết quả của cấu hình khác
+        cache_scope = f"{self.input_folder}|{self.temp_folder}|{self.config_folder}"
+        checks = [
+            PreflightCheck(f"config:file_system:{cache_scope}", self.check_file_system),
+            PreflightCheck(f"config:google_api:{cache_scope}", self.check_google_api_config),
+            PreflightCheck(f"config:data_integrity:{cache_scope}", self.check_data_integrity),
+            PreflightCheck(f"config:python_dependencies:{cache_scope}", self.check_python_dependencies)
+        ]
+        outcomes = get_preflight_runner().run(checks, use_cache=use_cache, capture_output=True)
+        
+        results = {"overall_status": "unknown", "check_timings": {}}
+        for check in checks:
+            key = check.name.split(':')[1]
+            outcome = outcomes[check.name]
+            results["check_timings"][key] = {
+                "status": outcome["status"],
+                "elapsed": outcome["elapsed"],
+                "cached": outcome["cached"]
+            }
+            if outcome["status"] == "ok":
+                results[key] = outcome["result"]
+            else:
+                print(f"   ⚠️  {key}: {outcome['status']} - {outcome['error']}")
+                results[key] = fallbacks[key]()
+                if key == "google_api":
+                    results[key]["errors"].append(outcome["error"])
+        
         # Đánh giá trạng thái tổng thể
         critical_issues = []
         
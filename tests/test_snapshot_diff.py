@@ -0,0 +1,91 @@
+"""
+Test đọc JSON dạng stream của utils.snapshot_diff
+Kiểm tra _JSONStream cho kết quả giống json.load khi chunk cắt ngang giá trị (đặc biệt là số)
+"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from utils.snapshot_diff import _JSONStream, iter_workflow_records, read_workflow_metadata
+
+CHUNK_SIZES = (1, 2, 3, 7)
+
+SAMPLE_DOCUMENTS = [
+    '{"metadata": -15000000000.0, "students": [1]}',
+    '{"a": 1.5e-10, "b": [-0, 12, 3.25E+3, 1e5], "c": {"d": -7}, "e": 42}',
+    '{"text": "dấu \\"ngoặc\\" và \\\\ gạch", "flags": [true, false, null], "n": 100}',
+    '[10, -20.75, "x", {"y": [1, 2, 3]}, 6.02e23]',
+    '  {"nested": {"deep": [[1, [2.0]], {"k": -3e-2}]}, "last": 0}  ',
+]
+
+
+def _decode_stream(text, chunk_size):
+    """Decode toàn bộ document bằng _JSONStream (đi qua iter_object_keys/iter_array)"""
+    stream = _JSONStream(io.StringIO(text), chunk_size=chunk_size)
+    if stream.peek() == '[':
+        return list(stream.iter_array())
+    return {key: stream.decode() for key in stream.iter_object_keys()}
+
+
+class JSONStreamDecodeTest(unittest.TestCase):
+
+    def test_matches_json_load_at_small_chunk_sizes(self):
+        for text in SAMPLE_DOCUMENTS:
+            expected = json.load(io.StringIO(text))
+            for chunk_size in CHUNK_SIZES:
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    self.assertEqual(_decode_stream(text, chunk_size), expected)
+
+    def test_number_split_across_chunks(self):
+        text = '{"metadata": -15000000000.0, "students": [1]}'
+        for chunk_size in (1, 2):
+            with self.subTest(chunk_size=chunk_size):
+                result = _decode_stream(text, chunk_size)
+                self.assertEqual(result['metadata'], -15000000000.0)
+                self.assertIsInstance(result['metadata'], float)
+                self.assertEqual(result['students'], [1])
+
+    def test_skip_then_decode(self):
+        text = '{"skip": {"a": [1, "}]", -2.5e3]}, "keep": -123.456}'
+        for chunk_size in CHUNK_SIZES:
+            with self.subTest(chunk_size=chunk_size):
+                stream = _JSONStream(io.StringIO(text), chunk_size=chunk_size)
+                result = {}
+                for key in stream.iter_object_keys():
+                    if key == 'skip':
+                        stream.skip()
+                    else:
+                        result[key] = stream.decode()
+                self.assertEqual(result, {'keep': -123.456})
+
+
+class WorkflowFileTest(unittest.TestCase):
+
+    def setUp(self):
+        payload = {
+            'metadata': {'school_year': 2025, 'total': -15000000000.0},
+            'school_info': {'name': 'THCS Test'},
+            'teachers': {'success': True, 'data': [{'teacherInfo': {'userName': 'gv1'}}]},
+            'students': [{'account': 'hs1', 'grade': 6}, {'account': 'hs2', 'grade': 7}]
+        }
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(handle, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+        self.payload = payload
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_records_and_metadata(self):
+        self.assertEqual(list(iter_workflow_records(self.path, 'teachers')), self.payload['teachers']['data'])
+        self.assertEqual(list(iter_workflow_records(self.path, 'students')), self.payload['students'])
+        info = read_workflow_metadata(self.path)
+        self.assertEqual(info['metadata'], self.payload['metadata'])
+        self.assertEqual(info['school_info'], self.payload['school_info'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+"""
+Log Pump cho ô log của UI
+Gom log từ mọi luồng vào hàng đợi và đổ vào Text widget theo lô trên một nhịp cố định
+(một lần insert/see/cập nhật status mỗi nhịp thay vì mỗi dòng), giới hạn số dòng trên
+widget (ring buffer) và ghi toàn bộ log ra file
+"""
+
+import os
+import glob
+import queue
+import tkinter as tk
+from datetime import datetime
+
+# Mức log theo độ ưu tiên hiển thị trên status bar (lô có lỗi thì status là lỗi)
+LEVEL_PRIORITY = {'info': 0, 'header': 0, 'success': 1, 'warning': 2, 'error': 3}
+
+
+class LogPump:
+    """Đổ log từ hàng đợi vào Text widget theo lô, giữ tối đa max_lines dòng"""
+
+    def __init__(self, root, text_widget, on_status=None, interval_ms=100, max_batch=1000,
+                 max_lines=5000, spool_dir='logs', keep_files=10):
+        """
+        Khởi tạo LogPump
+
+        Args:
+            root: Tk root (dùng root.after cho nhịp đổ log)
+            text_widget: tk.Text hiển thị log
+            on_status: Hàm (level) gọi một lần mỗi lô với mức log cao nhất trong lô
+            interval_ms: Chu kỳ đổ log (ms)
+            max_batch: Số dòng tối đa đổ mỗi nhịp (phần còn lại để nhịp sau)
+            max_lines: Số dòng tối đa giữ trên widget, dòng cũ hơn chỉ còn trong file
+            spool_dir: Thư mục ghi toàn bộ log (rỗng = không ghi file)
+            keep_files: Số file log phiên gần nhất được giữ lại
+        """
+        self.root = root
+        self.text_widget = text_widget
+        self.on_status = on_status
+        self.interval_ms = interval_ms
+        self.max_batch = max_batch
+        self.max_lines = max_lines
+
+        self.queue = queue.SimpleQueue()
+        self.spool_path = None
+        self._spool = None
+        self._after_id = None
+
+        if spool_dir:
+            self._open_spool(spool_dir, keep_files)
+
+    def _open_spool(self, spool_dir, keep_files):
+        """Mở file log của phiên và xóa bớt file của các phiên cũ"""
+        try:
+            os.makedirs(spool_dir, exist_ok=True)
+            old_files = sorted(glob.glob(os.path.join(spool_dir, 'ui_*.log')))
+            for old_file in old_files[:max(len(old_files) - keep_files + 1, 0)]:
+                os.remove(old_file)
+
+            self.spool_path = os.path.join(spool_dir, f"ui_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+            self._spool = open(self.spool_path, 'a', encoding='utf-8')
+        except OSError as e:
+            print(f"⚠️ Không thể ghi file log UI: {e}")
+            self.spool_path = None
+            self._spool = None
+
+    def put(self, message, level='info'):
+        """
+        Thêm một dòng log (gọi được từ mọi luồng)
+
+        Args:
+            message: Nội dung log
+            level: success, error, warning, info, header
+        """
+        self.queue.put((datetime.now().strftime('%H:%M:%S'), message, level))
+
+    def start(self):
+        """Bắt đầu nhịp đổ log"""
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        """Dừng nhịp, ghi nốt log còn trong hàng đợi ra file và đóng file"""
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+
+        self._write_spool(self._drain(limit=None))
+        if self._spool:
+            self._spool.close()
+            self._spool = None
+
+    def clear(self):
+        """Xóa log trên widget (file log giữ nguyên)"""
+        self.text_widget.delete('1.0', tk.END)
+
+    def _drain(self, limit):
+        """Lấy tối đa limit dòng trong hàng đợi (None = tất cả)"""
+        items = []
+        while limit is None or len(items) < limit:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _write_spool(self, items):
+        if not self._spool or not items:
+            return
+        try:
+            self._spool.write(''.join(f"[{timestamp}] [{level}] {message}\n"
+                                      for timestamp, message, level in items))
+            self._spool.flush()
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ngừng ghi file log UI: {e}")
+            self._spool = None
+
+    def _tick(self):
+        """Một nhịp: đổ một lô log vào widget rồi hẹn nhịp sau"""
+        self._after_id = None
+        items = self._drain(self.max_batch)
+        if items:
+            self._write_spool(items)
+            try:
+                self._render(items)
+            except tk.TclError:
+                # Widget đã bị hủy (đang đóng cửa sổ)
+                return
+            if self.on_status:
+                self.on_status(max((level for _, _, level in items), key=lambda level: LEVEL_PRIORITY.get(level, 0)))
+        self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def _render(self, items):
+        """Insert cả lô bằng một lệnh, cắt dòng cũ và cuộn xuống một lần"""
+        # Chỉ tự cuộn khi người dùng đang ở cuối log (không kéo họ khỏi chỗ đang đọc)
+        at_bottom = self.text_widget.yview()[1] >= 0.999
+
+        # Gộp các dòng liên tiếp cùng mức thành một đoạn: insert(END, text1, tag1, text2, tag2, ...)
+        chunks = []
+        for timestamp, message, level in items:
+            line = f"[{timestamp}] {message}\n"
+            if chunks and chunks[-1][1] == level:
+                chunks[-1][0].append(line)
+            else:
+                chunks.append(([line], level))
+        args = []
+        for lines, level in chunks:
+            args.extend((''.join(lines), level))
+        self.text_widget.insert(tk.END, *args)
+
+        # Text luôn kết thúc bằng '\n' nên dòng của 'end-1c' là dòng trống cuối
+        line_count = int(self.text_widget.index('end-1c').split('.')[0]) - 1
+        if line_count > self.max_lines:
+            self.text_widget.delete('1.0', f"{line_count - self.max_lines + 1}.0")
+
+        if at_bottom:
+            self.text_widget.see(tk.END)
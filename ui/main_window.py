@@ -24,9 +24,35 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from config.config_manager import get_config
-from config.onluyen_api import OnLuyenAPIClient
-from extractors import GoogleSheetsExtractor
-from converters import JSONToExcelTemplateConverter
+from utils.lazy_import import lazy_attr
+from utils.upload_queue import get_upload_queue
+from utils.preflight import PreflightCheck, get_preflight_runner
+from utils.worker_client import run_with_worker
+from utils.job_manager import (
+    JobManager, report_progress, JOB_PENDING, JOB_RUNNING, JOB_DONE, JOB_FAILED, JOB_CANCELLED
+)
+from config.sheet_writeback import get_sheet_writeback
+from ui.log_pump import LogPump
+
+# Import khi dùng lần đầu để cửa sổ chính hiện ngay (requests, Google API, openpyxl rất chậm)
+OnLuyenAPIClient = lazy_attr('config.onluyen_api', 'OnLuyenAPIClient')
+find_login_file = lazy_attr('config.onluyen_api', 'find_login_file')
+GoogleSheetsExtractor = lazy_attr('extractors', 'GoogleSheetsExtractor')
+JSONToExcelTemplateConverter = lazy_attr('converters', 'JSONToExcelTemplateConverter')
+
+# Nhãn hiển thị trên bảng hàng đợi job
+JOB_TYPE_LABELS = {
+    'case_1': 'Case 1',
+    'case_1_multi_year': 'Case 1 nhiều năm',
+    'case_2': 'Case 2'
+}
+JOB_STATUS_LABELS = {
+    JOB_PENDING: '⏳ Đang chờ',
+    JOB_RUNNING: '🔄 Đang chạy',
+    JOB_DONE: '✅ Hoàn thành',
+    JOB_FAILED: '❌ Lỗi',
+    JOB_CANCELLED: '⏹️ Đã dừng'
+}
 
 class SchoolProcessMainWindow:
     """Main Window cho School Process Application"""
@@ -127,6 +153,20 @@ class SchoolProcessMainWindow:
         self.current_workflow = None
         self.client = None
         
+        # Hàng đợi upload Drive chạy nền (tiếp tục các job còn dở từ lần trước)
+        self.upload_queue = get_upload_queue()
+        self.upload_queue.add_listener(self._on_upload_job_update)
+        
+        # Hàng đợi workflow: mỗi trường được chọn là một job, chạy tối đa JOB_MAX_WORKERS trường cùng lúc
+        self.job_manager = JobManager(max_workers=self.config.get_job_manager_config()['max_workers'])
+        self.job_manager.add_listener(self._queue_job_update)
+        self.export_dialog_job_id = None
+        
+        # Cập nhật job gom theo nhịp log pump: mỗi nhịp chỉ vẽ trạng thái mới nhất của mỗi job
+        self._pending_job_updates = {}
+        self._job_updates_lock = threading.Lock()
+        self._last_status = None
+        
     def setup_ui(self):
         """Thiết lập giao diện người dùng"""
         # Main container
@@ -205,7 +245,21 @@ class SchoolProcessMainWindow:
                                    text="Export toàn bộ dữ liệu",
                                    style='Primary.TButton',
                                    command=self.start_workflow_case1)
-        self.btn_case1.pack(fill='x', pady=(0, 5))
+        self.btn_case1.pack(fill='x', pady=(0, 2))
+        
+        # Delta sync: chỉ lấy/xuất tài khoản mới từ lần chạy trước (dựa trên snapshot store)
+        self.delta_sync_var = tk.BooleanVar(value=False)
+        self.chk_delta_sync = ttk.Checkbutton(left_frame,
+                                              text="Chỉ tài khoản mới từ lần chạy trước",
+                                              variable=self.delta_sync_var)
+        self.chk_delta_sync.pack(anchor='w', pady=(0, 2))
+        
+        # Nhiều năm học: nhập "2024,2025" để lấy song song các năm vào một file JSON
+        years_frame = ttk.Frame(left_frame)
+        years_frame.pack(fill='x', pady=(0, 5))
+        ttk.Label(years_frame, text="Năm học:").pack(side='left')
+        self.school_years_var = tk.StringVar(value=get_config().get_multi_year_config()['default_years'])
+        ttk.Entry(years_frame, textvariable=self.school_years_var, width=14).pack(side='left', padx=(5, 0))
         
         self.btn_case2 = ttk.Button(left_frame,
                                    text="Export theo dữ liệu file import",
@@ -312,7 +366,7 @@ class SchoolProcessMainWindow:
         log_frame = ttk.Frame(self.notebook)
         self.notebook.add(log_frame, text="📋 Log & Tiến trình")
         
-        log_frame.rowconfigure(1, weight=1)
+        log_frame.rowconfigure(2, weight=1)
         log_frame.columnconfigure(0, weight=1)
         
         # Progress section
@@ -335,7 +389,7 @@ class SchoolProcessMainWindow:
         control_frame.grid(row=2, column=0, sticky=(tk.W, tk.E))
         
         self.btn_stop = ttk.Button(control_frame,
-                                  text="⏹️ Dừng",
+                                  text="⏹️ Dừng tất cả",
                                   state='disabled',
                                   command=self.stop_processing)
         self.btn_stop.pack(side='left', padx=(0, 5))
@@ -345,9 +399,12 @@ class SchoolProcessMainWindow:
                                        command=self.clear_log)
         self.btn_clear_log.pack(side='left')
         
+        # Job queue section
+        self.create_jobs_panel(log_frame)
+        
         # Log output
         log_output_frame = ttk.LabelFrame(log_frame, text="Log Output", padding="10")
-        log_output_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        log_output_frame.grid(row=2, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         log_output_frame.rowconfigure(0, weight=1)
         log_output_frame.columnconfigure(0, weight=1)
         
@@ -373,6 +430,47 @@ class SchoolProcessMainWindow:
         # Configure text tags for colored output
         self.setup_log_tags()
         
+        # Log pump cần có widget trước khi các tab khác ghi log
+        self.setup_log_pump()
+        
+    def create_jobs_panel(self, parent):
+        """Tạo bảng hàng đợi xử lý (mỗi trường một dòng với trạng thái và tiến độ riêng)"""
+        jobs_frame = ttk.LabelFrame(parent, text="Hàng đợi xử lý", padding="10")
+        jobs_frame.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
+        jobs_frame.columnconfigure(0, weight=1)
+        
+        self.jobs_tree = ttk.Treeview(jobs_frame, columns=('Type', 'Status', 'Progress', 'Message'),
+                                      show='tree headings', height=5)
+        self.jobs_tree.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        
+        self.jobs_tree.heading('#0', text='Trường')
+        self.jobs_tree.heading('Type', text='Loại')
+        self.jobs_tree.heading('Status', text='Trạng thái')
+        self.jobs_tree.heading('Progress', text='Tiến độ')
+        self.jobs_tree.heading('Message', text='Thông tin')
+        self.jobs_tree.column('#0', width=220)
+        self.jobs_tree.column('Type', width=110, stretch=False)
+        self.jobs_tree.column('Status', width=110, stretch=False)
+        self.jobs_tree.column('Progress', width=70, stretch=False, anchor='e')
+        self.jobs_tree.column('Message', width=360)
+        
+        jobs_scrollbar = ttk.Scrollbar(jobs_frame, orient='vertical', command=self.jobs_tree.yview)
+        jobs_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.jobs_tree.configure(yscrollcommand=jobs_scrollbar.set)
+        
+        jobs_control_frame = ttk.Frame(jobs_frame)
+        jobs_control_frame.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        
+        ttk.Button(jobs_control_frame,
+                  text="⏹️ Dừng job đã chọn",
+                  command=self.stop_selected_jobs).pack(side='left', padx=(0, 5))
+        ttk.Button(jobs_control_frame,
+                  text="🧹 Xóa job đã xong",
+                  command=self.clear_finished_jobs).pack(side='left', padx=(0, 5))
+        ttk.Button(jobs_control_frame,
+                  text="🔁 Thử lại upload lỗi",
+                  command=self.retry_failed_uploads).pack(side='left')
+        
     def create_config_tab(self):
         """Tạo tab cấu hình"""
         config_frame = ttk.Frame(self.notebook)
@@ -558,20 +656,30 @@ class SchoolProcessMainWindow:
         
         self.files_tree.bind("<Button-3>", self.show_files_context_menu)
         
+    def setup_log_pump(self):
+        """Khởi tạo log pump: đổ log theo lô vào ô log, giới hạn số dòng và ghi toàn bộ ra file"""
+        log_config = self.config.get_ui_log_config()
+        self.log_pump = LogPump(self.root, self.log_text_widget,
+                                on_status=self._update_status_from_log,
+                                interval_ms=log_config['pump_interval_ms'],
+                                max_batch=log_config['max_batch'],
+                                max_lines=log_config['max_lines'],
+                                spool_dir=log_config['spool_dir'],
+                                keep_files=log_config['keep_files'])
+        self.log_pump.start()
+        
     def setup_bindings(self):
         """Thiết lập keyboard bindings"""
         self.root.bind('<Control-q>', lambda e: self.root.quit())
         self.root.bind('<F5>', lambda e: self.refresh_ui())
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
     def log_message(self, message, level="info"):
-        """Thêm message vào log với màu sắc tương ứng"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        full_message = f"[{timestamp}] {message}\n"
+        """Thêm message vào log với màu sắc tương ứng (hiển thị ở nhịp kế tiếp của log pump)"""
+        self.log_pump.put(message, level)
         
-        self.log_text_widget.insert(tk.END, full_message, level)
-        self.log_text_widget.see(tk.END)
-        
-        # Update status
+    def _update_status_from_log(self, level):
+        """Cập nhật status bar một lần cho mỗi lô log theo mức log cao nhất trong lô"""
         if level == "error":
             self.update_status("Lỗi", "error")
         elif level == "success":
@@ -582,8 +690,8 @@ class SchoolProcessMainWindow:
             self.update_status("Đang xử lý...", "info")
             
     def log_message_safe(self, message, level="info"):
-        """Thread-safe version của log_message"""
-        self.root.after(0, lambda: self.log_message(message, level))
+        """Thread-safe version của log_message (log pump nhận log từ mọi luồng)"""
+        self.log_pump.put(message, level)
         
     def update_progress_safe(self, value, status=""):
         """Thread-safe version của update_progress"""
@@ -602,6 +710,11 @@ class SchoolProcessMainWindow:
             "info": self.colors['primary']
         }
         
+        # Bỏ qua khi status không đổi (mỗi lô log đều gọi tới đây)
+        if self._last_status == (message, level):
+            return
+        self._last_status = (message, level)
+        
         self.status_text.config(text=message)
         self.status_icon.config(foreground=color_map.get(level, self.colors['primary']))
         
@@ -612,151 +725,262 @@ class SchoolProcessMainWindow:
             self.current_task.set(task)
             
     def clear_log(self):
-        """Xóa log output"""
-        self.log_text_widget.delete(1.0, tk.END)
+        """Xóa log output (file log của phiên giữ nguyên)"""
+        self.log_pump.clear()
         
-    def start_workflow_case1(self):
-        """Bắt đầu workflow Case 1"""
-        if self.is_processing:
-            messagebox.showwarning("Cảnh báo", "Hệ thống đang xử lý. Vui lòng đợi.")
-            return
-            
+    def _get_selected_schools(self):
+        """Lấy các trường (row) đang chọn trong Google Sheets, báo lỗi nếu chưa chọn"""
         # Kiểm tra xem có sheets_viewer và có row được chọn không
         if not hasattr(self, 'sheets_viewer'):
             messagebox.showerror("Lỗi", "Google Sheets viewer chưa được khởi tạo.")
-            return
+            return []
             
-        selected_row_data = self.sheets_viewer.get_selected_row_data()
-        if not selected_row_data:
+        selected_rows = self.sheets_viewer.get_selected_rows_data()
+        if not selected_rows:
             messagebox.showwarning("Cảnh báo", 
-                                 "Vui lòng chọn một row (trường học) trong Google Sheets để xử lý.\n\n" +
-                                 "Click vào số thứ tự hàng bên trái để chọn row.")
+                                 "Vui lòng chọn một hoặc nhiều row (trường học) trong Google Sheets để xử lý.\n\n" +
+                                 "Click vào số thứ tự hàng bên trái để chọn row, giữ Ctrl/Shift để chọn nhiều row.")
+        return selected_rows
+        
+    def _enqueue_schools(self, job_type, selected_rows, func, *args):
+        """Đưa mỗi trường được chọn vào hàng đợi thành một job"""
+        stats = self.job_manager.get_stats()
+        single_job = len(selected_rows) == 1 and not stats[JOB_PENDING] and not stats[JOB_RUNNING]
+        for school_data in selected_rows:
+            school_name = school_data.get('Tên trường') or 'N/A'
+            job_id = self.job_manager.submit(school_name, job_type, func, school_data, *args)
+            self.log_message(f"📋 Đã đưa vào hàng đợi: {school_name} ({school_data.get('Admin', '')})", "info")
+        
+        # Chỉ xử lý một trường: mở dialog xem file export khi xong như trước
+        self.export_dialog_job_id = job_id if single_job else None
+        
+        stats = self.job_manager.get_stats()
+        if stats[JOB_PENDING]:
+            self.log_message(f"⏳ {stats[JOB_PENDING]} trường đang chờ - xử lý tối đa "
+                             f"{self.job_manager.max_workers} trường cùng lúc", "info")
+        
+    def start_workflow_case1(self):
+        """Bắt đầu workflow Case 1 cho các trường được chọn"""
+        selected_rows = self._get_selected_schools()
+        if not selected_rows:
             return
-
-        # Hiển thị thông tin row được chọn
-        row_info = self.sheets_viewer.get_selected_row_info()
-        self.log_message(f"Bắt đầu Workflow Case 1: Toàn bộ dữ liệu", "header")
-        self.log_message(f"📋 Xử lý trường: {row_info}", "info")
         
-        # Run in thread to prevent UI blocking
-        thread = threading.Thread(target=self._execute_workflow_case1, args=(selected_row_data,))
-        thread.daemon = True
-        thread.start()
+        # Từ 2 năm học trở lên: lấy song song các năm vào một file JSON
+        school_years = SchoolProcessApp._parse_school_years(self.school_years_var.get())
+        if len(school_years) > 1:
+            self.log_message(f"Bắt đầu Workflow Case 1: Nhiều năm học ({', '.join(map(str, school_years))})", "header")
+            self._enqueue_schools('case_1_multi_year', selected_rows,
+                                  self._execute_workflow_case1_multi_year, school_years)
+            return
+        
+        delta_sync = self.delta_sync_var.get()
+        if delta_sync:
+            self.log_message("Bắt đầu Workflow Case 1: Chỉ tài khoản mới (delta sync)", "header")
+        else:
+            self.log_message(f"Bắt đầu Workflow Case 1: Toàn bộ dữ liệu", "header")
+        self._enqueue_schools('case_1', selected_rows, self._execute_workflow_case1, delta_sync)
         
     def start_workflow_case2(self):
-        """Bắt đầu workflow Case 2"""
-        if self.is_processing:
-            messagebox.showwarning("Cảnh báo", "Hệ thống đang xử lý. Vui lòng đợi.")
+        """Bắt đầu workflow Case 2 cho các trường được chọn"""
+        selected_rows = self._get_selected_schools()
+        if not selected_rows:
             return
             
-        # Kiểm tra xem có sheets_viewer và có row được chọn không
-        if not hasattr(self, 'sheets_viewer'):
-            messagebox.showerror("Lỗi", "Google Sheets viewer chưa được khởi tạo.")
-            return
-            
-        selected_row_data = self.sheets_viewer.get_selected_row_data()
-        if not selected_row_data:
-            messagebox.showwarning("Cảnh báo", 
-                                 "Vui lòng chọn một row (trường học) trong Google Sheets để xử lý.\n\n" +
-                                 "Click vào số thứ tự hàng bên trái để chọn row.")
-            return
-            
-        # Hiển thị thông tin row được chọn
-        row_info = self.sheets_viewer.get_selected_row_info()
         self.log_message(f"Bắt đầu Workflow Case 2: Dữ liệu theo file import", "header")
-        self.log_message(f"📋 Xử lý trường: {row_info}", "info")
+        self._enqueue_schools('case_2', selected_rows, self._execute_workflow_case2)
         
-        # Run in thread to prevent UI blocking
-        thread = threading.Thread(target=self._execute_workflow_case2, args=(selected_row_data,))
-        thread.daemon = True
-        thread.start()
+    def _execute_workflow_case1(self, selected_school_data, delta_sync=False):
+        """
+        Execute workflow case 1 (chạy trong worker của job manager)
         
-    def _execute_workflow_case1(self, selected_school_data):
-        """Execute workflow case 1 trong thread"""
+        Returns:
+            dict: workflow_results hoặc None nếu lỗi
+        """
         try:
-            self.is_processing = True
-            self.update_button_state_safe(self.btn_stop, 'normal')
-            
-            self.log_message_safe("Đang thực hiện workflow case 1...", "info")
-            self.update_progress_safe(10, "Khởi tạo...")
+            report_progress(5, "Khởi tạo...")
             
             # Import and execute workflow
             console_app = SchoolProcessApp()
             
-            self.update_progress_safe(20, "Bắt đầu xử lý...")
+            # Execute actual workflow với selected school data (trên worker daemon nếu đang chạy)
+            workflow_results = self._run_job(
+                'case_1', {'school_data': selected_school_data, 'delta_sync': delta_sync},
+                lambda: console_app._execute_workflow_case_1(selected_school_data, ui_mode=True,
+                                                             delta_sync=delta_sync)
+            )
+            return workflow_results
             
-            # Execute actual workflow với selected school data
-            workflow_results = console_app._execute_workflow_case_1(selected_school_data, ui_mode=True)
+        except Exception as e:
+            self.log_message_safe(f"Lỗi trong workflow Case 1: {str(e)}", "error")
+            traceback.print_exc()
+            return None
             
-            self.update_progress_safe(90, "Xử lý hoàn thành")
-            self.log_message_safe("Workflow Case 1 hoàn thành!", "success")
+    def _execute_workflow_case1_multi_year(self, selected_school_data, school_years):
+        """
+        Execute workflow case 1 nhiều năm học (chạy trong worker của job manager)
+        
+        Returns:
+            dict: workflow_results hoặc None nếu lỗi
+        """
+        try:
+            report_progress(5, "Khởi tạo...")
             
-            # Hiển thị dialog xem file export nếu có kết quả
-            if workflow_results and workflow_results.get('excel_file_path'):
-                self.update_progress_safe(100, "Hiển thị kết quả")
-                
-                export_results = {
-                    'json_file_path': workflow_results.get('json_file_path', ''),
-                    'excel_file_path': workflow_results.get('excel_file_path', ''),
-                    'school_name': workflow_results.get('school_info', {}).get('name', 'N/A'),
-                    'drive_link': workflow_results.get('school_info', {}).get('drive_link', '')
-                }
-                
-                # Hiển thị dialog trong main thread
-                self.root.after(0, lambda: self.show_export_dialog(export_results))
-            else:
-                self.update_progress_safe(100, "Hoàn thành")
+            console_app = SchoolProcessApp()
+            
+            workflow_results = self._run_job(
+                'case_1_multi_year', {'school_data': selected_school_data, 'school_years': school_years},
+                lambda: console_app._execute_workflow_case_1_multi_year(selected_school_data, school_years,
+                                                                        ui_mode=True)
+            )
+            
+            if workflow_results and not workflow_results.get('json_file_path'):
+                self.log_message_safe(f"Workflow Case 1 nhiều năm học không có dữ liệu: "
+                                      f"{selected_school_data.get('Tên trường', 'N/A')}", "warning")
+            return workflow_results
             
         except Exception as e:
-            self.log_message_safe(f"Lỗi trong workflow Case 1: {str(e)}", "error")
+            self.log_message_safe(f"Lỗi trong workflow Case 1 nhiều năm học: {str(e)}", "error")
             traceback.print_exc()
-        finally:
-            self.is_processing = False
-            self.update_button_state_safe(self.btn_stop, 'disabled')
+            return None
             
     def _execute_workflow_case2(self, selected_school_data):
-        """Execute workflow case 2 trong thread"""
+        """
+        Execute workflow case 2 (chạy trong worker của job manager)
+        
+        Returns:
+            dict: workflow_results hoặc None nếu lỗi
+        """
         try:
-            self.is_processing = True
-            self.update_button_state_safe(self.btn_stop, 'normal')
-            
-            self.log_message_safe("Đang thực hiện workflow case 2...", "info")
-            self.update_progress_safe(10, "Khởi tạo...")
+            report_progress(5, "Khởi tạo...")
             
             # Import and execute workflow
             console_app = SchoolProcessApp()
             
-            self.update_progress_safe(20, "Bắt đầu xử lý...")
-            
-            # Execute actual workflow với selected school data
-            workflow_results = console_app._execute_workflow_case_2(selected_school_data, ui_mode=True)
-            
-            self.update_progress_safe(90, "Xử lý hoàn thành")
-            self.log_message_safe("Workflow Case 2 hoàn thành!", "success")
+            # Execute actual workflow với selected school data (trên worker daemon nếu đang chạy)
+            workflow_results = self._run_job(
+                'case_2', {'school_data': selected_school_data},
+                lambda: console_app._execute_workflow_case_2(selected_school_data, ui_mode=True)
+            )
+            return workflow_results
             
-            # Hiển thị dialog xem file export nếu có kết quả
-            if workflow_results and workflow_results.get('excel_file_path'):
-                self.update_progress_safe(100, "Hiển thị kết quả")
-                
+        except Exception as e:
+            self.log_message_safe(f"Lỗi trong workflow Case 2: {str(e)}", "error")
+            traceback.print_exc()
+            return None
+            
+    def _queue_job_update(self, job):
+        """Nhận thay đổi job (chạy trong worker thread), gom lại để vẽ một lần mỗi nhịp"""
+        with self._job_updates_lock:
+            schedule = not self._pending_job_updates
+            self._pending_job_updates[job['id']] = job
+        if schedule:
+            self.root.after(self.log_pump.interval_ms, self._flush_job_updates)
+        
+    def _flush_job_updates(self):
+        """Vẽ trạng thái mới nhất của các job đã thay đổi (chạy trong main thread)"""
+        with self._job_updates_lock:
+            jobs = list(self._pending_job_updates.values())
+            self._pending_job_updates.clear()
+        for job in jobs:
+            self._on_job_update(job, refresh_summary=False)
+        self._refresh_job_summary()
+        
+    def _on_job_update(self, job, refresh_summary=True):
+        """Cập nhật dòng của job trên bảng hàng đợi (chạy trong main thread)"""
+        values = (
+            JOB_TYPE_LABELS.get(job['type'], job['type']),
+            JOB_STATUS_LABELS.get(job['status'], job['status']),
+            f"{job['progress']:.0f}%",
+            job['error'] if job['status'] == JOB_FAILED else job['message']
+        )
+        if not self.jobs_tree.exists(job['id']) and self.job_manager.get_job(job['id']) is None:
+            # Thông báo đến muộn của job đã xóa khỏi bảng
+            return
+        if self.jobs_tree.exists(job['id']):
+            previous_status = self.jobs_tree.set(job['id'], 'Status')
+            self.jobs_tree.item(job['id'], values=values)
+        else:
+            previous_status = None
+            self.jobs_tree.insert('', 'end', iid=job['id'], text=job['name'], values=values)
+        
+        # Chỉ log một lần khi job vừa kết thúc
+        if previous_status != values[1]:
+            self._log_job_finished(job)
+        if refresh_summary:
+            self._refresh_job_summary()
+        
+    def _log_job_finished(self, job):
+        """Log kết quả job vừa kết thúc, hiển thị dialog export khi chỉ xử lý một trường"""
+        label = JOB_TYPE_LABELS.get(job['type'], job['type'])
+        if job['status'] == JOB_FAILED:
+            self.log_message(f"Workflow {label} - {job['name']}: {job['error']}", "error")
+        elif job['status'] == JOB_CANCELLED:
+            self.log_message(f"Workflow {label} - {job['name']}: đã dừng bởi người dùng", "warning")
+        elif job['status'] == JOB_DONE:
+            self.log_message(f"Workflow {label} hoàn thành: {job['name']}", "success")
+            workflow_results = job['result'] or {}
+            if workflow_results.get('excel_file_path'):
                 export_results = {
                     'json_file_path': workflow_results.get('json_file_path', ''),
                     'excel_file_path': workflow_results.get('excel_file_path', ''),
                     'school_name': workflow_results.get('school_info', {}).get('name', 'N/A'),
                     'drive_link': workflow_results.get('school_info', {}).get('drive_link', '')
                 }
+                self.add_result_file(export_results['excel_file_path'], "Excel")
                 
-                # Hiển thị dialog trong main thread
-                self.root.after(0, lambda: self.show_export_dialog(export_results))
-            else:
-                self.update_progress_safe(100, "Hoàn thành")
-            
-        except Exception as e:
-            self.log_message_safe(f"Lỗi trong workflow Case 2: {str(e)}", "error")
-            traceback.print_exc()
-        finally:
-            self.is_processing = False
-            self.update_button_state_safe(self.btn_stop, 'disabled')
-            
+                # Xử lý nhiều trường: không mở dialog cho từng trường, file có trong tab Kết quả
+                if job['id'] == self.export_dialog_job_id:
+                    self.show_export_dialog(export_results)
+            elif workflow_results.get('json_file_path'):
+                self.log_message(f"📄 File JSON: {workflow_results['json_file_path']}", "info")
+        
+    def _refresh_job_summary(self):
+        """Tiến trình tổng: trung bình tiến độ các job và số job theo trạng thái"""
+        jobs = self.job_manager.list_jobs()
+        stats = self.job_manager.get_stats()
+        active = stats[JOB_PENDING] + stats[JOB_RUNNING]
+        self.btn_stop.config(state='normal' if active else 'disabled')
+        
+        if not jobs:
+            self.update_progress(0, "Sẵn sàng")
+            return
+        
+        overall = sum(100 if job['status'] in (JOB_DONE, JOB_FAILED, JOB_CANCELLED) else job['progress']
+                      for job in jobs) / len(jobs)
+        summary = (f"Đang chạy {stats[JOB_RUNNING]} · Chờ {stats[JOB_PENDING]} · Xong {stats[JOB_DONE]} · "
+                   f"Lỗi {stats[JOB_FAILED]} · Đã dừng {stats[JOB_CANCELLED]}")
+        if len(jobs) == 1 and active:
+            summary = f"{jobs[0]['name']}: {jobs[0]['message']}"
+        self.update_progress(overall, summary)
+        
+    def stop_selected_jobs(self):
+        """Dừng các job đang chọn trên bảng hàng đợi"""
+        selection = self.jobs_tree.selection()
+        if not selection:
+            messagebox.showinfo("Thông báo", "Vui lòng chọn job cần dừng trong bảng hàng đợi.")
+            return
+        
+        cancelled = sum(1 for job_id in selection if self.job_manager.cancel(job_id))
+        if cancelled:
+            self.log_message(f"⏹️ Đã yêu cầu dừng {cancelled} job - job đang chạy dừng sau bước/trang hiện tại", "warning")
+        
+    def clear_finished_jobs(self):
+        """Xóa các job đã kết thúc khỏi bảng hàng đợi (cả job upload Drive đã xong)"""
+        for job_id in self.job_manager.clear_finished():
+            if self.jobs_tree.exists(job_id):
+                self.jobs_tree.delete(job_id)
+        self.upload_queue.clear_finished()
+        self._refresh_job_summary()
+        
+    def retry_failed_uploads(self):
+        """Đưa các file upload Drive thất bại trở lại hàng đợi"""
+        count = self.upload_queue.retry_failed()
+        if count:
+            self.log_message(f"🔁 Đã đưa {count} file upload lỗi trở lại hàng đợi", "info")
+        else:
+            self.log_message("Không có file upload lỗi nào cần thử lại", "info")
+        
+
     def show_export_dialog(self, export_results):
         """Hiển thị dialog xem file export"""
         try:
@@ -774,19 +998,45 @@ class SchoolProcessMainWindow:
             self.log_message(f"Lỗi hiển thị dialog export: {str(e)}", "error")
             traceback.print_exc()
             
+    def _get_selected_login_file(self):
+        """
+        File login của trường đang chọn trong Google Sheets (mỗi trường một file login)
+        
+        Returns:
+            str: Đường dẫn file login hoặc None (đã báo lỗi cho người dùng)
+        """
+        selected_rows = self._get_selected_schools()
+        if not selected_rows:
+            return None
+        if len(selected_rows) > 1:
+            messagebox.showwarning("Cảnh báo", "Chức năng này chỉ dùng cho một trường - vui lòng chọn một row.")
+            return None
+        
+        school_data = selected_rows[0]
+        login_file_path = find_login_file(school_data.get('Admin', ''))
+        if not login_file_path:
+            messagebox.showwarning("Cảnh báo",
+                                 f"Trường {school_data.get('Tên trường', 'N/A')} chưa có access token.\n"
+                                 "Vui lòng chạy workflow cho trường này trước.")
+        return login_file_path
+        
     def get_teachers_data(self):
         """Lấy dữ liệu giáo viên"""
         if self.is_processing:
             messagebox.showwarning("Cảnh báo", "Hệ thống đang xử lý. Vui lòng đợi.")
             return
             
+        login_file_path = self._get_selected_login_file()
+        if not login_file_path:
+            return
+            
         self.log_message("Bắt đầu lấy dữ liệu giáo viên...", "info")
         
-        thread = threading.Thread(target=self._get_teachers_data_thread)
+        thread = threading.Thread(target=self._get_teachers_data_thread, args=(login_file_path,))
         thread.daemon = True
         thread.start()
         
-    def _get_teachers_data_thread(self):
+    def _get_teachers_data_thread(self, login_file_path):
         """Lấy dữ liệu giáo viên trong thread"""
         try:
             self.is_processing = True
@@ -794,9 +1044,9 @@ class SchoolProcessMainWindow:
             
             client = OnLuyenAPIClient()
             
-            # Load access_token từ file login
+            # Load access_token từ file login của trường đang chọn
             self.update_progress_safe(20, "Đang load access token...")
-            if not client.load_token_from_login_file():
+            if not client.load_token_from_login_file(login_file_path):
                 self.log_message_safe("Không tìm thấy access token. Vui lòng login trước.", "error")
                 return
             
@@ -812,7 +1062,7 @@ class SchoolProcessMainWindow:
                 self.log_message_safe(f"✅ Lấy thành công {len(teachers_list)} giáo viên", "success")
                 
                 # Hiển thị thông tin năm học từ token nếu có
-                self.root.after(0, self._log_current_school_year_info)
+                self.root.after(0, lambda: self._log_current_school_year_info(login_file_path))
                 
             else:
                 error_msg = result.get('error', 'Unknown error')
@@ -832,13 +1082,17 @@ class SchoolProcessMainWindow:
             messagebox.showwarning("Cảnh báo", "Hệ thống đang xử lý. Vui lòng đợi.")
             return
             
+        login_file_path = self._get_selected_login_file()
+        if not login_file_path:
+            return
+            
         self.log_message("Bắt đầu lấy dữ liệu học sinh...", "info")
         
-        thread = threading.Thread(target=self._get_students_data_thread)
+        thread = threading.Thread(target=self._get_students_data_thread, args=(login_file_path,))
         thread.daemon = True
         thread.start()
         
-    def _get_students_data_thread(self):
+    def _get_students_data_thread(self, login_file_path):
         """Lấy dữ liệu học sinh trong thread"""
         try:
             self.is_processing = True
@@ -846,9 +1100,9 @@ class SchoolProcessMainWindow:
             
             client = OnLuyenAPIClient()
             
-            # Load access_token từ file login
+            # Load access_token từ file login của trường đang chọn
             self.update_progress_safe(20, "Đang load access token...")
-            if not client.load_token_from_login_file():
+            if not client.load_token_from_login_file(login_file_path):
                 self.log_message_safe("Không tìm thấy access token. Vui lòng login trước.", "error")
                 return
             
@@ -864,7 +1118,7 @@ class SchoolProcessMainWindow:
                 self.log_message_safe(f"✅ Lấy thành công {len(students_list)} học sinh", "success")
                 
                 # Hiển thị thông tin năm học từ token nếu có
-                self.root.after(0, self._log_current_school_year_info)
+                self.root.after(0, lambda: self._log_current_school_year_info(login_file_path))
                 
             else:
                 error_msg = result.get('error', 'Unknown error')
@@ -878,22 +1132,10 @@ class SchoolProcessMainWindow:
         finally:
             self.is_processing = False
             
-    def _log_current_school_year_info(self):
-        """Hiển thị thông tin năm học hiện tại từ access token"""
+    def _log_current_school_year_info(self, login_file_path):
+        """Hiển thị thông tin năm học hiện tại từ access token trong file login của trường"""
         try:
-            from pathlib import Path
-            
-            # Tìm file login gần nhất
-            pattern = "data/output/onluyen_login_*.json"
-            files = glob.glob(pattern)
-            
-            if not files:
-                return
-            
-            # Lấy file mới nhất
-            latest_file = max(files, key=lambda f: Path(f).stat().st_mtime)
-            
-            with open(latest_file, 'r', encoding='utf-8') as f:
+            with open(login_file_path, 'r', encoding='utf-8') as f:
                 login_data = json.load(f)
             
             access_token = login_data.get('tokens', {}).get('access_token')
@@ -924,27 +1166,14 @@ class SchoolProcessMainWindow:
             pass
     
     def _show_initial_school_year_info(self):
-        """Hiển thị thông tin năm học khi khởi động ứng dụng"""
+        """Thông báo khi khởi động ứng dụng nếu đã có phiên đăng nhập trước"""
         try:
-            from pathlib import Path
-            
-            # Tìm file login gần nhất
-            pattern = "data/output/onluyen_login_*.json"
-            files = glob.glob(pattern)
+            # Mỗi trường một file login - không đoán trường theo file mới nhất
+            files = glob.glob("data/output/onluyen_login_*.json")
             
             if files:
-                # Lấy file mới nhất
-                latest_file = max(files, key=lambda f: Path(f).stat().st_mtime)
-                
-                with open(latest_file, 'r', encoding='utf-8') as f:
-                    login_data = json.load(f)
-                
-                tokens = login_data.get('tokens', {})
-                if tokens.get('access_token'):
-                    self.log_message("🔑 Tìm thấy access token từ phiên đăng nhập trước", "info")
-                    self._log_current_school_year_info()
-                else:
-                    self.log_message("ℹ️ Chưa có access token. Vui lòng login hoặc thực hiện workflow để lấy dữ liệu.", "info")
+                self.log_message("🔑 Tìm thấy access token từ phiên đăng nhập trước - "
+                                 "chọn trường trong Google Sheets để dùng lại token của trường đó", "info")
             else:
                 self.log_message("ℹ️ Chưa có phiên đăng nhập nào. Vui lòng thực hiện workflow để bắt đầu.", "info")
                 
@@ -958,13 +1187,17 @@ class SchoolProcessMainWindow:
             messagebox.showwarning("Cảnh báo", "Hệ thống đang xử lý. Vui lòng đợi.")
             return
             
+        login_file_path = self._get_selected_login_file()
+        if not login_file_path:
+            return
+            
         self.log_message(f"Bắt đầu thay đổi năm học sang {year}...", "info")
         
-        thread = threading.Thread(target=self._change_school_year_thread, args=(year,))
+        thread = threading.Thread(target=self._change_school_year_thread, args=(year, login_file_path))
         thread.daemon = True
         thread.start()
         
-    def _change_school_year_thread(self, year):
+    def _change_school_year_thread(self, year, login_file_path):
         """Thay đổi năm học trong thread"""
         try:
             self.is_processing = True
@@ -972,9 +1205,9 @@ class SchoolProcessMainWindow:
             
             client = OnLuyenAPIClient()
             
-            # Load access_token từ file login
+            # Load access_token từ file login của trường đang chọn
             self.update_progress_safe(20, "Đang load access token...")
-            if not client.load_token_from_login_file():
+            if not client.load_token_from_login_file(login_file_path):
                 self.log_message_safe("Không tìm thấy access token. Vui lòng login trước.", "error")
                 return
             
@@ -987,7 +1220,7 @@ class SchoolProcessMainWindow:
                 self.log_message_safe(f"✅ Đã thay đổi năm học sang {year} thành công!", "success")
                 
                 # Hiển thị thông tin token mới
-                self.root.after(0, self._log_current_school_year_info)
+                self.root.after(0, lambda: self._log_current_school_year_info(login_file_path))
                 
                 self.update_progress_safe(100, "Hoàn thành")
                 
@@ -1030,70 +1263,129 @@ class SchoolProcessMainWindow:
         thread.daemon = True
         thread.start()
         
+    def _run_job(self, job_type, params, local_runner):
+        """
+        Chạy job trên worker daemon nếu đang chạy (log tiến trình vào ô log), không thì chạy trực tiếp
+        
+        Args:
+            job_type (str): Loại job của worker daemon
+            params (dict): Tham số job
+            local_runner (Callable): Hàm chạy trực tiếp trong process UI
+            
+        Returns:
+            Kết quả job
+        """
+        def on_event(event):
+            if event['type'] == 'log':
+                self.log_message_safe(event['message'], event['level'])
+        
+        return run_with_worker(job_type, params, local_runner, on_event=on_event)
+        
+    def _convert_json_to_excel_local(self, json_file):
+        """Chuyển đổi JSON sang Excel trong process UI, trả về đường dẫn file Excel"""
+        self.update_progress_safe(10, "Đang tải JSON...")
+        
+        converter = JSONToExcelTemplateConverter(json_file)
+        
+        self.update_progress_safe(30, "Đang load dữ liệu...")
+        if not converter.load_json_data():
+            self.log_message_safe("Lỗi load dữ liệu JSON", "error")
+            return None
+            
+        self.update_progress_safe(50, "Đang trích xuất dữ liệu...")
+        teachers_extracted = converter.extract_teachers_data()
+        students_extracted = converter.extract_students_data()
+        
+        if not teachers_extracted and not students_extracted:
+            self.log_message_safe("Không có dữ liệu để chuyển đổi", "warning")
+            return None
+            
+        self.update_progress_safe(80, "Đang tạo file Excel...")
+        return converter.convert()
+        
     def _convert_json_to_excel_thread(self, json_file):
         """Chuyển đổi JSON sang Excel trong thread"""
         try:
             self.is_processing = True
-            self.update_progress(10, "Đang tải JSON...")
             
-            converter = JSONToExcelTemplateConverter(json_file)
-            
-            self.update_progress(30, "Đang load dữ liệu...")
-            if not converter.load_json_data():
-                self.log_message("Lỗi load dữ liệu JSON", "error")
-                return
-                
-            self.update_progress(50, "Đang trích xuất dữ liệu...")
-            teachers_extracted = converter.extract_teachers_data()
-            students_extracted = converter.extract_students_data()
-            
-            if not teachers_extracted and not students_extracted:
-                self.log_message("Không có dữ liệu để chuyển đổi", "warning")
-                return
-                
-            self.update_progress(80, "Đang tạo file Excel...")
-            output_path = converter.convert()
+            convert_result = self._run_job(
+                'convert', {'json_file_path': os.path.abspath(json_file)},
+                lambda: {'excel_file_path': self._convert_json_to_excel_local(json_file)}
+            ) or {}
+            output_path = convert_result.get('excel_file_path')
             
             if output_path:
-                self.update_progress(100, "Hoàn thành")
-                self.log_message(f"Đã tạo file Excel: {output_path}", "success")
-                self.add_result_file(output_path, "Excel")
+                self.update_progress_safe(100, "Hoàn thành")
+                self.log_message_safe(f"Đã tạo file Excel: {output_path}", "success")
+                self.root.after(0, lambda: self.add_result_file(output_path, "Excel"))
             else:
-                self.log_message("Lỗi tạo file Excel", "error")
+                self.log_message_safe("Lỗi tạo file Excel", "error")
                 
         except Exception as e:
-            self.log_message(f"Lỗi chuyển đổi: {str(e)}", "error")
+            self.log_message_safe(f"Lỗi chuyển đổi: {str(e)}", "error")
         finally:
             self.is_processing = False
             
     def stop_processing(self):
-        """Dừng xử lý hiện tại"""
-        if messagebox.askyesno("Xác nhận", "Bạn có chắc muốn dừng xử lý?"):
-            self.is_processing = False
-            self.update_progress(0, "Đã dừng")
-            self.log_message("Xử lý đã bị dừng bởi người dùng", "warning")
+        """Dừng tất cả job đang chạy và đang chờ"""
+        stats = self.job_manager.get_stats()
+        active = stats[JOB_PENDING] + stats[JOB_RUNNING]
+        if not active:
+            return
+        if messagebox.askyesno("Xác nhận", f"Bạn có chắc muốn dừng {active} job đang chạy/đang chờ?"):
+            cancelled = self.job_manager.cancel_all()
+            self.log_message(f"⏹️ Đã yêu cầu dừng {cancelled} job - job đang chạy dừng sau bước/trang hiện tại", "warning")
+            
+    def on_close(self):
+        """Đóng cửa sổ: hỏi xác nhận nếu còn job, hủy các job còn lại"""
+        stats = self.job_manager.get_stats()
+        active = stats[JOB_PENDING] + stats[JOB_RUNNING]
+        if active and not messagebox.askyesno("Xác nhận", f"Còn {active} job chưa xong. Dừng và thoát?"):
+            return
+        self.job_manager.shutdown()
+        self.root.destroy()
 
     def test_onluyen_connection(self):
-        """Test kết nối OnLuyen API"""
+        """Test kết nối OnLuyen API (chạy nền, kết quả được cache ngắn hạn)"""
         self.log_message("Đang test kết nối OnLuyen API...", "info")
+        threading.Thread(target=self._run_onluyen_connection_test, daemon=True).start()
         
+    def _run_onluyen_connection_test(self):
+        """HEAD song song các endpoint OnLuyen và ghi kết quả ra log"""
         try:
-            client = OnLuyenAPIClient()
-            # Test basic connection
-            self.log_message("Kết nối OnLuyen API thành công", "success")
+            results = OnLuyenAPIClient().test_connectivity()
+            failed = []
+            for name, result in results.items():
+                if result.get('status') == 'skipped':
+                    continue
+                if result.get('status') == 'success':
+                    self.log_message_safe(f"   {name}: HTTP {result.get('status_code')}", "info")
+                else:
+                    failed.append(name)
+                    self.log_message_safe(f"   {name}: {result.get('error') or result.get('status_code')}", "warning")
+            
+            if failed:
+                self.log_message_safe(f"Lỗi kết nối OnLuyen API: {', '.join(failed)}", "error")
+            else:
+                self.log_message_safe("Kết nối OnLuyen API thành công", "success")
         except Exception as e:
-            self.log_message(f"Lỗi kết nối OnLuyen API: {str(e)}", "error")
+            self.log_message_safe(f"Lỗi kết nối OnLuyen API: {str(e)}", "error")
             
     def test_sheets_connection(self):
-        """Test kết nối Google Sheets"""
+        """Test kết nối Google Sheets (chạy nền, kết quả được cache ngắn hạn)"""
         self.log_message("Đang test kết nối Google Sheets...", "info")
+        threading.Thread(target=self._run_sheets_connection_test, daemon=True).start()
         
-        try:
-            extractor = GoogleSheetsExtractor()
-            # Test connection
-            self.log_message("Kết nối Google Sheets thành công", "success")
-        except Exception as e:
-            self.log_message(f"Lỗi kết nối Google Sheets: {str(e)}", "error")
+    def _run_sheets_connection_test(self):
+        """Khởi tạo GoogleSheetsExtractor trong preflight runner (có timeout) và ghi kết quả ra log"""
+        check = PreflightCheck("google_sheets:extractor", lambda: GoogleSheetsExtractor() is not None)
+        outcome = get_preflight_runner().run([check])[check.name]
+        
+        if outcome['status'] == 'ok':
+            cached_note = " (kết quả gần nhất)" if outcome['cached'] else ""
+            self.log_message_safe(f"Kết nối Google Sheets thành công{cached_note}", "success")
+        else:
+            self.log_message_safe(f"Lỗi kết nối Google Sheets: {outcome['error']}", "error")
                     
     def browse_directory(self, var):
         """Browse và chọn thư mục"""
@@ -1174,48 +1466,60 @@ Ngày: 2025-07-29
         self.log_message("Đang refresh UI...", "info")
         
     def upload_files_to_drive(self, export_results):
-        """Upload file Excel to Google Drive"""
+        """Đưa file Excel vào hàng đợi upload Google Drive chạy nền"""
         try:
-            self.log_message("Đang đẩy file Excel lên Google Drive...", "info")
-            
-            # Tạo thread riêng để upload
-            def upload_thread():
-                try:
-                    # Import and execute upload
-                    console_app = SchoolProcessApp()
-                    
-                    # Gọi hàm upload của console app (chỉ upload file Excel)
-                    upload_result = console_app.upload_to_drive(
-                        export_results.get('json_file_path', ''),
-                        export_results.get('excel_file_path', ''),
-                        export_results.get('drive_link', ''),
-                        export_results.get('school_name', '')
-                    )
-                    
-                    if upload_result.get('success', False):
-                        self.log_message_safe("✅ Đã đẩy file Excel lên Google Drive thành công!", "success")
-                        messagebox.showinfo("Thành công", "Đã đẩy file Excel lên Google Drive thành công!")
-                    else:
-                        error_msg = upload_result.get('error', 'Unknown error')
-                        self.log_message_safe(f"❌ Lỗi khi đẩy lên Drive: {error_msg}", "error")
-                        messagebox.showerror("Lỗi", f"Không thể đẩy lên Drive: {error_msg}")
-                        
-                except Exception as e:
-                    self.log_message_safe(f"❌ Lỗi upload: {str(e)}", "error")
-                    messagebox.showerror("Lỗi", f"Lỗi khi upload: {str(e)}")
-            
-            thread = threading.Thread(target=upload_thread)
-            thread.daemon = True
-            thread.start()
-            
+            self.log_message("Đang đưa file Excel vào hàng đợi upload Google Drive...", "info")
+            
+            enqueue_result = self.upload_queue.enqueue(
+                export_results.get('excel_file_path', ''),
+                export_results.get('drive_link', ''),
+                export_results.get('school_name', '')
+            )
+            
+            if enqueue_result['success']:
+                stats = self.upload_queue.get_stats()
+                waiting = stats['pending'] + stats['uploading']
+                self.log_message(f"📥 Đã thêm vào hàng đợi upload ({waiting} file đang chờ)", "info")
+            else:
+                error_msg = enqueue_result.get('error', 'Unknown error')
+                self.log_message(f"❌ Không thể đẩy lên Drive: {error_msg}", "error")
+                messagebox.showerror("Lỗi", f"Không thể đẩy lên Drive: {error_msg}")
+                
         except Exception as e:
             self.log_message(f"Lỗi upload files: {str(e)}", "error")
             messagebox.showerror("Lỗi", f"Lỗi upload: {str(e)}")
     
+    def _on_upload_job_update(self, job):
+        """Nhận thông báo từ upload queue (chạy trong worker thread)"""
+        file_name = job.get('file_name', '')
+        status = job.get('status')
+        
+        if status == 'uploading':
+            self.log_message_safe(f"📤 Đang upload: {file_name} (lần {job.get('attempts', 1)})", "info")
+        elif status == 'done':
+            self.log_message_safe(f"✅ Đã đẩy file Excel lên Google Drive: {file_name}", "success")
+            if job.get('url'):
+                self.log_message_safe(f"🔗 {job['url']}", "info")
+        elif status == 'failed':
+            error_msg = job.get('last_error') or 'Unknown error'
+            self.log_message_safe(f"❌ Lỗi khi đẩy lên Drive: {error_msg}", "error")
+            self.root.after(0, lambda: messagebox.showerror("Lỗi", f"Không thể đẩy {file_name} lên Drive:\n{error_msg}"))
+        elif status == 'pending' and job.get('last_error'):
+            self.log_message_safe(f"⚠️ {job['last_error']} - sẽ thử lại", "warning")
+    
     def run(self):
         """Chạy ứng dụng"""
         self.log_message("School Process Application đã khởi động", "success")
+        if self.log_pump.spool_path:
+            self.log_message(f"📄 Log đầy đủ của phiên: {self.log_pump.spool_path}", "info")
         self.root.mainloop()
+        
+        # Ctrl+Q thoát mainloop mà không qua on_close: job còn lại dừng ở điểm kiểm tra kế tiếp
+        self.job_manager.shutdown()
+        self.log_pump.stop()
+        
+        # Ghi nốt số lượng GV/HS đang chờ về sheet tổng trước khi thoát
+        get_sheet_writeback().stop()
 
 
 class ExportViewDialog:
@@ -6,6 +6,7 @@ Hiển thị dữ liệu từ Google Sheets với giao diện giống Google She
 import tkinter as tk
 from tkinter import ttk, messagebox
 import sys
+import threading
 from pathlib import Path
 
 # Thêm project root vào Python path
@@ -22,7 +23,11 @@ except ImportError:
     print("⚠️ Module tksheet chưa được cài đặt. Chạy: pip install tksheet")
 
 from config.config_manager import get_config
-from extractors.sheets_extractor import GoogleSheetsExtractor
+from config.sheet_writeback import get_sheet_writeback
+from utils.lazy_import import lazy_attr
+
+# Google API client chỉ import khi tải sheet lần đầu
+GoogleSheetsExtractor = lazy_attr('extractors.sheets_extractor', 'GoogleSheetsExtractor')
 
 
 class GoogleSheetsViewer:
@@ -35,6 +40,8 @@ class GoogleSheetsViewer:
         self.data = []
         self.sheet_widget = None
         self.filtered_data = []
+        # STT -> vị trí hàng trên sheet gốc + giá trị GV/HS lúc tải (dùng cho ghi ngược)
+        self.row_sources = {}
         
         # Định nghĩa màu sắc cho từng người xử lý
         self.person_colors = {
@@ -287,6 +294,8 @@ class GoogleSheetsViewer:
         self.sheet_widget.enable_bindings([
             "single_select",
             "row_select", 
+            "ctrl_select",
+            "drag_select",
             "column_select",
             "column_width_resize",
             "row_height_resize",
@@ -502,8 +511,10 @@ class GoogleSheetsViewer:
                 messagebox.showerror("Lỗi", "Không tìm thấy SHEET_ID trong config!")
                 return
                 
-            # Initialize extractor
-            self.extractor = GoogleSheetsExtractor()
+            # Initialize extractor (dùng lại giữa các lần refresh, dữ liệu sheet
+            # chưa thay đổi được phục vụ từ sheet cache)
+            if self.extractor is None:
+                self.extractor = GoogleSheetsExtractor()
             
             # Định nghĩa columns cần extract
             required_columns = [
@@ -567,6 +578,7 @@ class GoogleSheetsViewer:
         # Convert data to table format
         table_data = []
         self.data = []
+        self.row_sources = {}
         
         for i, row in enumerate(rows):
             row_data = [
@@ -582,6 +594,12 @@ class GoogleSheetsViewer:
             ]
             table_data.append(row_data)
             self.data.append(row_data)
+            self.row_sources[i + 1] = {
+                'row_index': row.get('row_index'),
+                'sheet_row': row.get('sheet_row'),
+                'sheet_name': row.get('sheet_name'),
+                'loaded': {'Số lượng GV nạp': row_data[6], 'Số lượng HS nạp': row_data[7]}
+            }
         
         # Set data to sheet
         self.sheet_widget.set_sheet_data(table_data)
@@ -711,20 +729,65 @@ class GoogleSheetsViewer:
         self.sheet_widget.see(row=new_row_index, column=0)
         
     def save_changes(self):
-        """Lưu thay đổi"""
+        """
+        Ghi các thay đổi cột "Số lượng GV nạp"/"Số lượng HS nạp" về Google Sheets (1 batchUpdate)
+        
+        Việc gọi API chạy ở worker thread, kết quả được báo lại trên main thread
+        """
         if not self.sheet_widget:
             return
             
         try:
             # Get current data from sheet
             current_data = self.sheet_widget.get_sheet_data()
+            writeback = get_sheet_writeback()
+            changed_rows = 0
+            
+            for row_data in current_data:
+                if not row_data:
+                    continue
+                source = self.row_sources.get(row_data[0])
+                if not source:
+                    continue
+                
+                values = {}
+                for col, column_name in ((6, 'Số lượng GV nạp'), (7, 'Số lượng HS nạp')):
+                    value = row_data[col] if len(row_data) > col else ''
+                    if str(value) != str(source['loaded'].get(column_name, '')):
+                        values[column_name] = value
+                
+                if values and writeback.record(values, row_index=source['row_index'],
+                                               sheet_row=source['sheet_row'],
+                                               sheet_name=source['sheet_name']):
+                    source['loaded'].update(values)
+                    changed_rows += 1
+            
+            if not changed_rows and not writeback.get_pending_count():
+                messagebox.showinfo("Lưu thay đổi", "Không có thay đổi số lượng GV/HS cần lưu.")
+                return
+            
+            self.status_var.set("🔄 Đang ghi thay đổi về Google Sheets...")
+            
+            def flush_worker():
+                result = writeback.flush()
+                self.parent_frame.after(0, lambda: self._on_save_finished(result))
             
-            messagebox.showinfo("Lưu thay đổi", 
-                              f"Đã lưu {len(current_data)} rows.\n\n"
-                              "Lưu ý: Đây là demo - dữ liệu chưa được đồng bộ về Google Sheets.")
+            threading.Thread(target=flush_worker, name='SheetsViewerSave', daemon=True).start()
                               
         except Exception as e:
             messagebox.showerror("Lỗi", f"Không thể lưu thay đổi:\n{str(e)}")
+    
+    def _on_save_finished(self, result):
+        """Hiển thị kết quả ghi Google Sheets (chạy trên main thread)"""
+        if result['success']:
+            self.status_var.set(f"✅ Đã ghi {result['cells']} ô ({result['rows']} hàng) về Google Sheets")
+            messagebox.showinfo("Lưu thay đổi",
+                              f"Đã ghi {result['cells']} ô của {result['rows']} hàng về Google Sheets.")
+        else:
+            self.status_var.set("⚠️ Ghi Google Sheets thất bại, sẽ tự thử lại")
+            messagebox.showwarning("Lưu thay đổi",
+                                 f"Chưa ghi được về Google Sheets:\n{result['error']}\n\n"
+                                 "Thay đổi được giữ lại và sẽ tự động thử lại.")
             
     def export_data(self):
         """Export dữ liệu"""
@@ -1007,19 +1070,7 @@ class GoogleSheetsViewer:
             row_data = current_data[row_index]
             print(f"   Row {row_index} data: {row_data}")
             
-            # Convert sang dictionary format như extractor trả về
-            school_data = {
-                'STT': row_data[0] if len(row_data) > 0 else '',
-                'Tên trường': row_data[1] if len(row_data) > 1 else '',
-                'Admin': row_data[2] if len(row_data) > 2 else '',
-                'Mật khẩu': row_data[3] if len(row_data) > 3 else '',
-                'Link driver dữ liệu': row_data[4] if len(row_data) > 4 else '',
-                'Người xử lý': row_data[5] if len(row_data) > 5 else '',
-                'Số lượng GV nạp': row_data[6] if len(row_data) > 6 else '',
-                'Số lượng HS nạp': row_data[7] if len(row_data) > 7 else '',
-                'Notes': row_data[8] if len(row_data) > 8 else ''
-            }
-            
+            school_data = self._row_to_school_data(row_data)
             print(f"   Converted to school_data: {school_data}")
             return school_data
             
@@ -1028,6 +1079,52 @@ class GoogleSheetsViewer:
             import traceback
             traceback.print_exc()
             return None
+    
+    def get_selected_rows_data(self):
+        """
+        Lấy dữ liệu tất cả các row được chọn (Ctrl/Shift/kéo chọn) để đưa vào hàng đợi xử lý
+        
+        Returns:
+            list: Danh sách school_data theo thứ tự row, rỗng nếu chưa chọn
+        """
+        try:
+            if not self.sheet_widget:
+                return []
+            
+            self.sheet_widget.refresh()
+            row_indexes = set(self.sheet_widget.get_selected_rows())
+            if not row_indexes:
+                row_indexes = {cell[0] for cell in self.sheet_widget.get_selected_cells()}
+            
+            current_data = self.sheet_widget.get_sheet_data()
+            return [self._row_to_school_data(current_data[row_index])
+                    for row_index in sorted(row_indexes) if row_index < len(current_data)]
+            
+        except Exception as e:
+            print(f"❌ Error getting selected rows data: {e}")
+            return []
+    
+    def _row_to_school_data(self, row_data):
+        """Convert một row của sheet sang dictionary format như extractor trả về"""
+        school_data = {
+            'STT': row_data[0] if len(row_data) > 0 else '',
+            'Tên trường': row_data[1] if len(row_data) > 1 else '',
+            'Admin': row_data[2] if len(row_data) > 2 else '',
+            'Mật khẩu': row_data[3] if len(row_data) > 3 else '',
+            'Link driver dữ liệu': row_data[4] if len(row_data) > 4 else '',
+            'Người xử lý': row_data[5] if len(row_data) > 5 else '',
+            'Số lượng GV nạp': row_data[6] if len(row_data) > 6 else '',
+            'Số lượng HS nạp': row_data[7] if len(row_data) > 7 else '',
+            'Notes': row_data[8] if len(row_data) > 8 else ''
+        }
+        
+        # Giữ vị trí hàng trên sheet gốc để ghi ngược kết quả xử lý
+        source = self.row_sources.get(school_data['STT'])
+        if source:
+            school_data['row_index'] = source['row_index']
+            school_data['sheet_row'] = source['sheet_row']
+            school_data['sheet_name'] = source['sheet_name']
+        return school_data
             
     def get_selected_row_info(self):
         """Lấy thông tin về row được chọn (cho hiển thị)"""
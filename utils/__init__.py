@@ -3,9 +3,28 @@ Utils Package
 Các tiện ích chung cho ứng dụng School Process
 """
 
+import importlib
+
 from .menu_utils import *
 from .file_utils import *
-from .excel_analyzer import analyze_excel_structure, find_import_files
+
+# Các module nặng (pandas, http.server...) chỉ import khi được dùng lần đầu
+_LAZY_EXPORTS = {
+    'analyze_excel_structure': '.excel_analyzer',
+    'find_import_files': '.excel_analyzer',
+    'DriveUploadQueue': '.upload_queue',
+    'get_upload_queue': '.upload_queue',
+    'extract_drive_folder_id': '.upload_queue',
+    'OnLuyenSimulator': '.onluyen_simulator',
+    'SyntheticSchool': '.onluyen_simulator'
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        return getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     'print_header', 'print_menu', 'get_user_choice', 'get_user_input',
@@ -14,5 +33,7 @@ __all__ = [
     'get_file_timestamp', 'get_file_size', 'format_file_size',
     'list_files_with_pattern', 'get_latest_file', 'backup_file',
     'clean_old_files', 'create_timestamped_filename', 'validate_file_access',
-    'get_directory_info', 'analyze_excel_structure', 'find_import_files'
+    'get_directory_info', 'analyze_excel_structure', 'find_import_files',
+    'DriveUploadQueue', 'get_upload_queue', 'extract_drive_folder_id',
+    'OnLuyenSimulator', 'SyntheticSchool'
 ]
@@ -0,0 +1,128 @@
+"""
+Endpoint Cache
+Ghi nhớ endpoint đã dò được (URL + method) theo từng host vào file JSON để các lần
+gọi sau đi thẳng tới endpoint đúng; tự xóa khi endpoint trả về 404 trở lại
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+class EndpointCache:
+    """Cache endpoint đã dò được, lưu theo host: {host: {tên endpoint: {url, method, ...}}}"""
+
+    def __init__(self, cache_path: str):
+        """
+        Khởi tạo EndpointCache
+
+        Args:
+            cache_path (str): Đường dẫn file JSON lưu cache
+        """
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        """Đọc cache từ file (lazy, một lần)"""
+        if self._data is None:
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def _save(self) -> None:
+        """Ghi cache ra file tạm rồi thay thế để không để lại file ghi dở"""
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"⚠️ Không ghi được endpoint cache: {e}")
+
+    def get(self, host: str, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Lấy endpoint đã dò được
+
+        Args:
+            host (str): Host của API (vd auth.onluyen.vn)
+            name (str): Tên endpoint (vd change_school_year)
+
+        Returns:
+            Optional[Dict[str, Any]]: {url, method, discovered_at, hits} hoặc None
+        """
+        with self._lock:
+            entry = self._load().get(host, {}).get(name)
+            return dict(entry) if entry else None
+
+    def set(self, host: str, name: str, url: str, method: str) -> None:
+        """
+        Lưu endpoint vừa dò được
+
+        Args:
+            host (str): Host của API
+            name (str): Tên endpoint
+            url (str): URL endpoint (không gồm tham số động như năm học)
+            method (str): HTTP method
+        """
+        with self._lock:
+            self._load().setdefault(host, {})[name] = {
+                'url': url,
+                'method': method,
+                'discovered_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'hits': 0
+            }
+            self._save()
+
+    def record_hit(self, host: str, name: str) -> None:
+        """Đếm số lần dùng lại endpoint từ cache"""
+        with self._lock:
+            entry = self._load().get(host, {}).get(name)
+            if entry:
+                entry['hits'] = entry.get('hits', 0) + 1
+                entry['last_used_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                self._save()
+
+    def invalidate(self, host: str, name: str) -> None:
+        """
+        Xóa endpoint khỏi cache (khi endpoint trả về 404)
+
+        Args:
+            host (str): Host của API
+            name (str): Tên endpoint
+        """
+        with self._lock:
+            host_entries = self._load().get(host, {})
+            if host_entries.pop(name, None) is not None:
+                if not host_entries:
+                    self._data.pop(host, None)
+                self._save()
+
+
+_endpoint_cache = None
+
+
+def get_endpoint_cache() -> Optional[EndpointCache]:
+    """
+    Lấy EndpointCache global theo cấu hình (ENDPOINT_CACHE_ENABLED, ENDPOINT_CACHE_FILE)
+
+    Returns:
+        Optional[EndpointCache]: Cache hoặc None nếu tắt endpoint cache
+    """
+    global _endpoint_cache
+    from config.config_manager import get_config
+
+    cache_config = get_config().get_endpoint_cache_config()
+    if not cache_config['enabled']:
+        return None
+    if _endpoint_cache is None or _endpoint_cache.cache_path != cache_config['cache_file']:
+        _endpoint_cache = EndpointCache(cache_config['cache_file'])
+    return _endpoint_cache
@@ -0,0 +1,294 @@
+"""
+Fuzzy Name Matcher
+Tier so khớp gần đúng cho tên bị gõ sai hoặc đảo tên đệm: chỉ so sánh các cặp
+cùng blocking key (tên + ngày sinh, họ + ngày sinh, n-gram hiếm) nên giữ được
+độ phức tạp gần tuyến tính thay vì O(n×m)
+Author: Assistant
+Date: 2025-07-26
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    from rapidfuzz.distance import OSA as _RapidOSA
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_MAX_BLOCK_SIZE = 200
+
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Khoảng cách chỉnh sửa OSA (Levenshtein + đảo 2 ký tự liền kề) có giới hạn,
+    dừng sớm khi vượt max_distance
+
+    Args:
+        a (str): Chuỗi thứ nhất
+        b (str): Chuỗi thứ hai
+        max_distance (int): Khoảng cách tối đa cần quan tâm
+
+    Returns:
+        int: Khoảng cách, hoặc max_distance + 1 nếu vượt ngưỡng
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if RAPIDFUZZ_AVAILABLE:
+        return _RapidOSA.distance(a, b, score_cutoff=max_distance)
+
+    # DP giới hạn trong dải chéo rộng max_distance: O(len × max_distance)
+    if len(a) > len(b):
+        a, b = b, a
+    infinity = max_distance + 1
+    size = len(a)
+    before_previous = None
+    previous = [i if i <= max_distance else infinity for i in range(size + 1)]
+    for j in range(1, len(b) + 1):
+        char_b = b[j - 1]
+        current = [infinity] * (size + 1)
+        if j <= max_distance:
+            current[0] = j
+        row_min = current[0]
+        for i in range(max(1, j - max_distance), min(size, j + max_distance) + 1):
+            char_a = a[i - 1]
+            value = min(previous[i] + 1, current[i - 1] + 1, previous[i - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                value = min(value, before_previous[i - 2] + 1)
+            current[i] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return infinity
+        before_previous, previous = previous, current
+    return min(previous[size], infinity)
+
+
+def birth_block_key(birthdate: str) -> str:
+    """
+    Key ngày sinh không phân biệt DD/MM và MM/DD ('2008-05-06' và '2008-06-05' cùng key)
+
+    Args:
+        birthdate (str): Ngày sinh đã chuẩn hóa YYYY-MM-DD
+
+    Returns:
+        str: Key hoặc chuỗi rỗng nếu không có ngày sinh hợp lệ
+    """
+    parts = (birthdate or '').split('-')
+    if len(parts) != 3:
+        return ''
+    return f"{parts[0]}-{'-'.join(sorted(parts[1:]))}"
+
+
+class FuzzyNameMatcher:
+    """Ghép cặp 1-1 giữa hai danh sách theo tên gần đúng, sinh ứng viên bằng blocking key"""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, require_birth_match: bool = True,
+                 max_block_size: int = DEFAULT_MAX_BLOCK_SIZE, ngram_size: int = 3, ngram_probes: int = 3):
+        """
+        Khởi tạo FuzzyNameMatcher
+
+        Args:
+            threshold (float): Độ tương đồng tối thiểu (0-1) để chấp nhận cặp
+            require_birth_match (bool): Hai bên phải có ngày sinh trùng nhau (cho phép đảo ngày/tháng);
+                tắt đi sẽ so khớp cả dòng thiếu ngày sinh - chậm hơn và dễ ghép nhầm tên gần giống
+            max_block_size (int): Bỏ qua block lớn hơn ngưỡng này (tránh bùng nổ so sánh)
+            ngram_size (int): Độ dài n-gram ký tự
+            ngram_probes (int): Số n-gram hiếm nhất của mỗi tên dùng để tìm ứng viên
+        """
+        self.threshold = threshold
+        self.require_birth_match = require_birth_match
+        self.max_block_size = max_block_size
+        self.ngram_size = ngram_size
+        self.ngram_probes = ngram_probes
+        self.stats = {'queries': 0, 'candidates': 0, 'comparisons': 0, 'matches': 0}
+
+    # ------------------------------------------------------------------
+    # Blocking
+    # ------------------------------------------------------------------
+
+    def _blocking_keys(self, name: str, birthdate: str) -> List[Tuple[str, ...]]:
+        tokens = name.split()
+        if not tokens:
+            return []
+        family, given = tokens[0], tokens[-1]
+        birth_key = birth_block_key(birthdate)
+        if birth_key:
+            return [('given_birth', given, birth_key), ('family_birth', family, birth_key)]
+        return [('family_given', family, given)]
+
+    def _ngrams(self, name: str) -> Set[str]:
+        compact = name.replace(' ', '')
+        size = self.ngram_size
+        if len(compact) <= size:
+            return {compact} if compact else set()
+        return {compact[i:i + size] for i in range(len(compact) - size + 1)}
+
+    def _build_index(self, items: List[Dict[str, Any]]) -> Tuple[Dict, Dict, Dict]:
+        key_index = defaultdict(list)
+        ngram_index = defaultdict(list)
+        # N-gram theo từng ngày sinh: với require_birth_match, block nhỏ hơn rất nhiều
+        scoped_ngram_index = defaultdict(list)
+        for index, item in enumerate(items):
+            name = item.get('name') or ''
+            birthdate = item.get('birthdate') or ''
+            birth_key = birth_block_key(birthdate)
+            for key in self._blocking_keys(name, birthdate):
+                key_index[key].append(index)
+            for ngram in self._ngrams(name):
+                ngram_index[ngram].append(index)
+                scoped_ngram_index[(ngram, birth_key)].append(index)
+        return key_index, ngram_index, scoped_ngram_index
+
+    def _candidates(self, name: str, birthdate: str, indexes: Tuple[Dict, Dict, Dict]) -> Set[int]:
+        key_index, ngram_index, scoped_ngram_index = indexes
+        birth_key = birth_block_key(birthdate)
+        if self.require_birth_match and not birth_key:
+            return set()
+
+        candidates = set()
+        for key in self._blocking_keys(name, birthdate):
+            block = key_index.get(key, [])
+            if len(block) <= self.max_block_size:
+                candidates.update(block)
+
+        if self.require_birth_match:
+            # Chỉ cần xét dòng cùng ngày sinh
+            buckets = [(scoped_ngram_index, lambda ngram: [(ngram, birth_key)])]
+        else:
+            buckets = [(ngram_index, lambda ngram: [ngram])]
+
+        # Prefix filtering: chỉ dùng các n-gram hiếm nhất của tên
+        for index, keys_for in buckets:
+            probes = []
+            for ngram in self._ngrams(name):
+                for key in keys_for(ngram):
+                    block = index.get(key)
+                    if block:
+                        probes.append(block)
+            probes.sort(key=len)
+            for block in probes[:self.ngram_probes]:
+                if len(block) <= self.max_block_size:
+                    candidates.update(block)
+        return candidates
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def similarity(self, a: str, b: str) -> float:
+        """
+        Độ tương đồng tên (0-1): max của so sánh trực tiếp và so sánh sau khi sắp xếp token
+        (bắt trường hợp đảo tên đệm)
+
+        Returns:
+            float: 0 nếu dưới ngưỡng threshold
+        """
+        if a == b:
+            return 1.0
+        max_len = max(len(a), len(b))
+        if not max_len:
+            return 0.0
+
+        max_distance = int((1 - self.threshold) * max_len)
+        self.stats['comparisons'] += 1
+        distance = bounded_edit_distance(a, b, max_distance)
+        if distance > max_distance:
+            # Thử lại sau khi sắp xếp token (đảo tên đệm)
+            sorted_a, sorted_b = ' '.join(sorted(a.split())), ' '.join(sorted(b.split()))
+            if (sorted_a, sorted_b) == (a, b):
+                return 0.0
+            self.stats['comparisons'] += 1
+            distance = bounded_edit_distance(sorted_a, sorted_b, max_distance)
+            if distance > max_distance:
+                return 0.0
+            # Đảo thứ tự token tính như một lỗi chỉnh sửa
+            distance += 1
+
+        score = 1 - distance / max_len
+        return score if score >= self.threshold else 0.0
+
+    def _birth_compatible(self, left: str, right: str) -> bool:
+        if not self.require_birth_match:
+            return True
+        return birth_block_key(left) == birth_block_key(right) != ''
+
+    # ------------------------------------------------------------------
+    # Matching
+    # ------------------------------------------------------------------
+
+    def match(self, left_items: List[Dict[str, Any]], right_items: List[Dict[str, Any]]) -> List[Tuple[int, int, float]]:
+        """
+        Ghép cặp 1-1 giữa hai danh sách {'name', 'birthdate'} (tên đã chuẩn hóa)
+
+        Args:
+            left_items (List[Dict]): Danh sách cần tìm cặp (vd record OnLuyen chưa khớp)
+            right_items (List[Dict]): Danh sách được index (vd dòng import chưa khớp)
+
+        Returns:
+            List[Tuple[int, int, float]]: (index trái, index phải, điểm) - điểm cao được ghép trước
+        """
+        if not left_items or not right_items:
+            return []
+
+        indexes = self._build_index(right_items)
+        scored_pairs = []
+
+        for left_index, item in enumerate(left_items):
+            name = item.get('name') or ''
+            if not name:
+                continue
+            birthdate = item.get('birthdate') or ''
+            candidates = self._candidates(name, birthdate, indexes)
+            self.stats['queries'] += 1
+            self.stats['candidates'] += len(candidates)
+
+            for right_index in candidates:
+                right = right_items[right_index]
+                if not self._birth_compatible(birthdate, right.get('birthdate') or ''):
+                    continue
+                score = self.similarity(name, right.get('name') or '')
+                if score:
+                    scored_pairs.append((score, left_index, right_index))
+
+        # Gán tham lam theo điểm giảm dần, mỗi phần tử chỉ được ghép một lần
+        scored_pairs.sort(key=lambda pair: (-pair[0], pair[1], pair[2]))
+        used_left, used_right = set(), set()
+        matches = []
+        for score, left_index, right_index in scored_pairs:
+            if left_index in used_left or right_index in used_right:
+                continue
+            used_left.add(left_index)
+            used_right.add(right_index)
+            matches.append((left_index, right_index, round(score, 4)))
+
+        self.stats['matches'] += len(matches)
+        return matches
+
+
+def create_fuzzy_matcher(config=None) -> Optional[FuzzyNameMatcher]:
+    """
+    Tạo FuzzyNameMatcher theo cấu hình (FUZZY_MATCH_*)
+
+    Args:
+        config (ConfigManager): Config manager (mặc định get_config())
+
+    Returns:
+        Optional[FuzzyNameMatcher]: Matcher hoặc None nếu tier fuzzy bị tắt (mặc định tắt,
+            bật bằng FUZZY_MATCH_ENABLED=true)
+    """
+    if config is None:
+        from config.config_manager import get_config
+        config = get_config()
+
+    matching_config = config.get_matching_config()
+    if not matching_config['fuzzy_enabled']:
+        return None
+    return FuzzyNameMatcher(
+        threshold=matching_config['fuzzy_threshold'],
+        require_birth_match=matching_config['fuzzy_require_birth'],
+        max_block_size=matching_config['fuzzy_max_block_size']
+    )
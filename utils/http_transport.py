@@ -0,0 +1,150 @@
+"""
+HTTP Transport
+Session requests dùng chung theo host với HTTPAdapter có pool kết nối cấu hình được
+và keep-alive, để các OnLuyenAPIClient (kể cả client theo năm học chạy song song)
+tái sử dụng kết nối TLS thay vì mở kết nối mới mỗi lần gọi
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import threading
+from typing import TYPE_CHECKING, Any, Dict
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:
+    import requests
+
+
+class HTTPTransport:
+    """Quản lý requests.Session dùng chung theo host và thống kê tái sử dụng kết nối"""
+
+    def __init__(self, pool_connections: int = 8, pool_maxsize: int = 16, max_retries: int = 1,
+                 pool_block: bool = False):
+        """
+        Khởi tạo HTTPTransport
+
+        Args:
+            pool_connections (int): Số connection pool (theo host) mỗi adapter giữ lại
+            pool_maxsize (int): Số kết nối tối đa giữ lại cho mỗi host - nên >= số luồng gọi song song
+            max_retries (int): Số lần thử lại khi lỗi kết nối (không thử lại khi đã gửi request)
+            pool_block (bool): Chờ kết nối rảnh thay vì mở kết nối tạm khi pool đầy
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.pool_block = pool_block
+        self._sessions: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _create_session(self) -> 'requests.Session':
+        """Tạo session mới với HTTPAdapter đã cấu hình pool"""
+        # Import khi tạo session đầu tiên - requests/urllib3 không nằm trên đường khởi động
+        import requests
+        from requests.adapters import HTTPAdapter
+        from http.cookiejar import DefaultCookiePolicy
+
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=self.max_retries,
+            pool_block=self.pool_block
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        # Session dùng chung giữa nhiều client/trường: không giữ cookie để tránh lẫn phiên đăng nhập
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+    def get_session(self, url: str) -> 'requests.Session':
+        """
+        Lấy session dùng chung cho host của URL
+
+        Args:
+            url (str): URL sắp gọi
+
+        Returns:
+            requests.Session: Session của host
+        """
+        host = urlparse(url).netloc or url
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._sessions[host] = self._create_session()
+            return session
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Thống kê tái sử dụng kết nối theo host (đọc từ connection pool của urllib3)
+
+        Returns:
+            Dict[str, Dict[str, Any]]: {host: {requests, new_connections, reused, reuse_ratio}}
+        """
+        with self._lock:
+            sessions = dict(self._sessions)
+
+        stats = {}
+        for host, session in sessions.items():
+            total_requests = 0
+            new_connections = 0
+            for adapter in {id(a): a for a in session.adapters.values()}.values():
+                pools = getattr(getattr(adapter, 'poolmanager', None), 'pools', None)
+                if pools is None:
+                    continue
+                for key in pools.keys():
+                    pool = pools.get(key)
+                    if pool is not None:
+                        total_requests += getattr(pool, 'num_requests', 0)
+                        new_connections += getattr(pool, 'num_connections', 0)
+            reused = max(total_requests - new_connections, 0)
+            stats[host] = {
+                'requests': total_requests,
+                'new_connections': new_connections,
+                'reused': reused,
+                'reuse_ratio': round(reused / total_requests, 3) if total_requests else 0.0
+            }
+        return stats
+
+    def print_stats(self) -> None:
+        """In thống kê tái sử dụng kết nối"""
+        stats = self.get_stats()
+        if not stats:
+            return
+        print(f"\n🔌 KẾT NỐI HTTP (pool {self.pool_maxsize}/host):")
+        for host, host_stats in stats.items():
+            print(f"   🌐 {host}: {host_stats['requests']} requests, "
+                  f"{host_stats['new_connections']} kết nối mới, "
+                  f"tái sử dụng {host_stats['reuse_ratio']:.0%}")
+
+    def close(self) -> None:
+        """Đóng tất cả session và kết nối đang giữ"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_http_transport = None
+_http_transport_lock = threading.Lock()
+
+
+def get_http_transport() -> HTTPTransport:
+    """
+    Lấy HTTPTransport global theo cấu hình (HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_MAX_RETRIES)
+
+    Returns:
+        HTTPTransport: Transport dùng chung
+    """
+    global _http_transport
+    with _http_transport_lock:
+        if _http_transport is None:
+            from config.config_manager import get_config
+
+            pool_config = get_config().get_http_pool_config()
+            _http_transport = HTTPTransport(
+                pool_connections=pool_config['pool_connections'],
+                pool_maxsize=pool_config['pool_maxsize'],
+                max_retries=pool_config['max_retries'],
+                pool_block=pool_config['pool_block']
+            )
+        return _http_transport
@@ -0,0 +1,316 @@
+"""
+Job Manager
+Chạy nhiều job (mỗi trường một job) trên worker pool giới hạn kèm hàng đợi, token hủy
+được kiểm tra giữa các bước và giữa các trang API (check_cancelled) và tiến độ riêng
+của từng job (report_progress) để UI hiển thị mỗi job một dòng
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import uuid
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Trạng thái của một job
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+FINISHED_STATUSES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class JobCancelled(BaseException):
+    """
+    Job đã bị hủy
+
+    Kế thừa BaseException (giống asyncio.CancelledError) để đi xuyên qua các khối
+    `except Exception` của workflow thay vì bị ghi nhận thành lỗi thông thường.
+    """
+
+
+class CancellationToken:
+    """Token hủy dùng chung giữa người hủy (UI/daemon) và luồng đang chạy job"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        """Yêu cầu hủy - job dừng ở điểm kiểm tra kế tiếp"""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Đã yêu cầu hủy chưa"""
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        """Raise JobCancelled nếu đã yêu cầu hủy"""
+        if self._event.is_set():
+            raise JobCancelled()
+
+
+class JobContext:
+    """Ngữ cảnh của job đang chạy: token hủy và hàm nhận tiến độ"""
+
+    def __init__(self, token: CancellationToken = None,
+                 on_progress: Callable[[float, str], None] = None):
+        """
+        Khởi tạo JobContext
+
+        Args:
+            token (CancellationToken): Token hủy (mặc định tạo mới)
+            on_progress (Callable): Hàm (percent, message) nhận tiến độ
+        """
+        self.token = token or CancellationToken()
+        self.on_progress = on_progress
+
+
+_current_job: contextvars.ContextVar = contextvars.ContextVar('current_job', default=None)
+
+
+def get_current_job() -> Optional[JobContext]:
+    """JobContext của luồng hiện tại (None khi không chạy trong job)"""
+    return _current_job.get()
+
+
+def check_cancelled() -> None:
+    """Điểm kiểm tra hủy: raise JobCancelled nếu job hiện tại đã bị hủy (không làm gì ngoài job)"""
+    context = _current_job.get()
+    if context is not None:
+        context.token.raise_if_cancelled()
+
+
+def report_progress(percent: float, message: str = '') -> None:
+    """
+    Báo tiến độ của job hiện tại (không làm gì ngoài job)
+
+    Args:
+        percent (float): Tiến độ 0-100
+        message (str): Bước đang chạy
+    """
+    context = _current_job.get()
+    if context is not None and context.on_progress:
+        try:
+            context.on_progress(percent, message)
+        except Exception:
+            # Lỗi hiển thị tiến độ không được làm hỏng job
+            pass
+
+
+def run_in_job_context(context: JobContext, func: Callable, *args, **kwargs) -> Any:
+    """Chạy func với JobContext là job hiện tại"""
+    reset_token = _current_job.set(context)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _current_job.reset(reset_token)
+
+
+def submit_in_context(executor, func: Callable, *args, **kwargs):
+    """
+    executor.submit giữ JobContext hiện tại cho luồng con (vd các năm học chạy song song)
+
+    Returns:
+        Future: Future của func
+    """
+    return executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+
+class JobManager:
+    """Hàng đợi job với worker pool giới hạn, hủy được và theo dõi tiến độ từng job"""
+
+    def __init__(self, max_workers: int = 3):
+        """
+        Khởi tạo JobManager
+
+        Args:
+            max_workers (int): Số job chạy song song, các job còn lại chờ trong hàng đợi
+        """
+        self.max_workers = max_workers
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+        self._contexts: Dict[str, JobContext] = {}
+        self._futures: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Đăng ký hàm nhận thay đổi của job (gọi từ luồng worker - UI phải tự chuyển về main thread)
+
+        Args:
+            listener (Callable): Hàm nhận bản sao job
+        """
+        self.listeners.append(listener)
+
+    def _notify(self, job_id: str) -> None:
+        job = self.get_job(job_id)
+        if job is None:
+            return
+        for listener in list(self.listeners):
+            try:
+                listener(job)
+            except Exception as e:
+                print(f"⚠️ Lỗi listener job: {e}")
+
+    def _update(self, job_id: str, **changes) -> None:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job.update(changes)
+        self._notify(job_id)
+
+    def submit(self, name: str, job_type: str, func: Callable, *args, **kwargs) -> str:
+        """
+        Đưa job vào hàng đợi
+
+        Args:
+            name (str): Tên hiển thị (vd tên trường)
+            job_type (str): Loại job (vd case_1, case_2)
+            func (Callable): Hàm chạy job, trả về None khi thất bại
+            *args, **kwargs: Tham số của func
+
+        Returns:
+            str: ID job
+        """
+        job_id = uuid.uuid4().hex[:12]
+        context = JobContext(on_progress=lambda percent, message: self._update(
+            job_id, progress=max(0.0, min(float(percent), 100.0)), message=message))
+
+        with self._lock:
+            self.jobs[job_id] = {
+                'id': job_id,
+                'name': name,
+                'type': job_type,
+                'status': JOB_PENDING,
+                'progress': 0.0,
+                'message': 'Đang chờ',
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'started_at': None,
+                'finished_at': None,
+                'result': None,
+                'error': None
+            }
+            self._contexts[job_id] = context
+        self._notify(job_id)
+
+        future = self._futures[job_id] = self._executor.submit(self._run, job_id, func, args, kwargs)
+        future.add_done_callback(lambda _: self._futures.pop(job_id, None))
+        return job_id
+
+    def _run(self, job_id: str, func: Callable, args: tuple, kwargs: Dict[str, Any]) -> None:
+        """Chạy job trong luồng worker"""
+        # Chuyển pending -> running nguyên tử với cancel(): job đã bị hủy khi còn chờ thì bỏ qua
+        with self._lock:
+            job = self.jobs.get(job_id)
+            context = self._contexts.get(job_id)
+            if job is None or context is None or job['status'] != JOB_PENDING:
+                return
+            job.update(status=JOB_RUNNING, message='Đang chạy',
+                       started_at=datetime.now().isoformat(timespec='seconds'))
+        self._notify(job_id)
+
+        changes = {}
+        try:
+            result = run_in_job_context(context, func, *args, **kwargs)
+            changes['result'] = result
+            if result is None or (isinstance(result, dict) and result.get('success') is False):
+                changes.update(status=JOB_FAILED, message='Thất bại',
+                               error=(result or {}).get('error') or 'Không có kết quả')
+            else:
+                changes.update(status=JOB_DONE, progress=100.0, message='Hoàn thành')
+        except JobCancelled:
+            changes.update(status=JOB_CANCELLED, message='Đã dừng')
+        except Exception as e:
+            changes.update(status=JOB_FAILED, message='Lỗi', error=str(e))
+
+        changes['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        self._update(job_id, **changes)
+        with self._lock:
+            self._contexts.pop(job_id, None)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Hủy job: job đang chờ bị bỏ khỏi hàng đợi, job đang chạy dừng ở điểm kiểm tra kế tiếp
+
+        Args:
+            job_id (str): ID job
+
+        Returns:
+            bool: True nếu đã gửi yêu cầu hủy
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            context = self._contexts.get(job_id)
+            if job is None or context is None or job['status'] in FINISHED_STATUSES:
+                return False
+            context.token.cancel()
+            pending = job['status'] == JOB_PENDING
+            if pending:
+                # Job chưa chạy: kết thúc ngay trong lock, _run sẽ thấy trạng thái và bỏ qua
+                job.update(status=JOB_CANCELLED, message='Đã hủy',
+                           finished_at=datetime.now().isoformat(timespec='seconds'))
+                self._contexts.pop(job_id, None)
+            else:
+                job['message'] = 'Đang dừng...'
+
+        future = self._futures.get(job_id)
+        if pending and future is not None:
+            future.cancel()
+        self._notify(job_id)
+        return True
+
+    def cancel_all(self) -> int:
+        """
+        Hủy tất cả job chưa kết thúc
+
+        Returns:
+            int: Số job đã gửi yêu cầu hủy
+        """
+        with self._lock:
+            job_ids = [job_id for job_id, job in self.jobs.items() if job['status'] not in FINISHED_STATUSES]
+        return sum(1 for job_id in job_ids if self.cancel(job_id))
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Bản sao thông tin job"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Bản sao danh sách job theo thứ tự đưa vào"""
+        with self._lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Số job theo trạng thái"""
+        stats = {status: 0 for status in (JOB_PENDING, JOB_RUNNING) + FINISHED_STATUSES}
+        with self._lock:
+            for job in self.jobs.values():
+                stats[job['status']] += 1
+        return stats
+
+    def clear_finished(self) -> List[str]:
+        """
+        Xóa các job đã kết thúc khỏi danh sách
+
+        Returns:
+            List[str]: ID các job đã xóa
+        """
+        with self._lock:
+            finished = [job_id for job_id, job in self.jobs.items() if job['status'] in FINISHED_STATUSES]
+            for job_id in finished:
+                self.jobs.pop(job_id, None)
+        return finished
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Hủy các job còn lại và dừng worker pool"""
+        self.cancel_all()
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,99 @@
+"""
+Lazy Import
+Proxy cho module/class nặng (pandas, Google API client, converter...) - chỉ import
+thật ở lần dùng đầu tiên để app.py và main_ui.py hiện menu/cửa sổ ngay khi khởi động
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import importlib
+from typing import Any
+
+
+class LazyModule:
+    """Proxy module: import module thật ở lần truy cập thuộc tính đầu tiên"""
+
+    def __init__(self, module_name: str):
+        """
+        Khởi tạo LazyModule
+
+        Args:
+            module_name (str): Tên module, vd "pandas"
+        """
+        self._module_name = module_name
+        self._module = None
+
+    def _load(self):
+        """Import module thật (một lần)"""
+        if self._module is None:
+            self._module = importlib.import_module(self._module_name)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._module_name}' ({state})>"
+
+
+class LazyAttr:
+    """Proxy class/hàm trong module nặng: gọi hoặc truy cập thuộc tính sẽ import module"""
+
+    def __init__(self, module_name: str, attr_name: str):
+        """
+        Khởi tạo LazyAttr
+
+        Args:
+            module_name (str): Tên module chứa class/hàm
+            attr_name (str): Tên class/hàm
+        """
+        self._module_name = module_name
+        self._attr_name = attr_name
+        self._target = None
+
+    def resolve(self) -> Any:
+        """Import module và trả về class/hàm thật"""
+        if self._target is None:
+            self._target = getattr(importlib.import_module(self._module_name), self._attr_name)
+        return self._target
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.resolve(), attr)
+
+    def __instancecheck__(self, instance) -> bool:
+        return isinstance(instance, self.resolve())
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self._target is not None else 'not loaded'
+        return f"<lazy {self._module_name}.{self._attr_name} ({state})>"
+
+
+def lazy_module(module_name: str) -> LazyModule:
+    """
+    Tạo proxy module nạp khi dùng lần đầu
+
+    Args:
+        module_name (str): Tên module
+
+    Returns:
+        LazyModule: Proxy module
+    """
+    return LazyModule(module_name)
+
+
+def lazy_attr(module_name: str, attr_name: str) -> LazyAttr:
+    """
+    Tạo proxy class/hàm nạp khi dùng lần đầu
+
+    Args:
+        module_name (str): Tên module chứa class/hàm
+        attr_name (str): Tên class/hàm
+
+    Returns:
+        LazyAttr: Proxy class/hàm
+    """
+    return LazyAttr(module_name, attr_name)
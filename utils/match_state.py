@@ -0,0 +1,268 @@
+"""
+Match State Store
+Lưu trạng thái so khớp Case 2 theo từng trường (dòng import theo row hash, key đã
+chuẩn hóa của record OnLuyen và quyết định khớp lần trước) để lần chạy sau chỉ
+đánh giá lại các dòng import thêm/sửa và record OnLuyen mới/thay đổi
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+STATE_VERSION = 1
+DEFAULT_STATE_DIR = os.path.join('data', 'cache', 'matching')
+
+# Các field thô của record OnLuyen ảnh hưởng tới kết quả so khớp
+_RECORD_FIELDS = ('fullName', 'birthDate', 'account', 'dateCreate')
+_INFO_FIELDS = ('displayName', 'userBirthday', 'account')
+
+
+def import_row_hash(item: Dict[str, Any]) -> str:
+    """
+    Hash của một dòng import đã parse (theo giá trị đã chuẩn hóa dùng để so khớp)
+
+    Args:
+        item (Dict): {'name', 'birthdate', 'username'}
+
+    Returns:
+        str: Hash hex
+    """
+    raw = '\x1f'.join(str(item.get(field) or '') for field in ('name', 'birthdate', 'username'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def record_identity(record: Dict[str, Any]) -> str:
+    """ID ổn định của record OnLuyen (studentId/teacherId/id, fallback account)"""
+    for field in ('studentId', 'teacherId', 'id', 'userId'):
+        if record.get(field):
+            return str(record[field])
+    info = record.get('userInfo') or record.get('teacherInfo') or {}
+    return str(record.get('account') or info.get('userName') or info.get('account') or '')
+
+
+def record_fingerprint(record: Dict[str, Any]) -> str:
+    """Fingerprint các field thô ảnh hưởng tới so khớp của record OnLuyen"""
+    info = record.get('userInfo') or record.get('teacherInfo') or {}
+    values = [str(record.get(field) or '') for field in _RECORD_FIELDS]
+    values += [str(info.get(field) or '') for field in _INFO_FIELDS]
+    return hashlib.sha1('\x1f'.join(values).encode('utf-8')).hexdigest()
+
+
+class MatchState:
+    """Trạng thái so khớp của một trường cho một loại dữ liệu (students/teachers)"""
+
+    def __init__(self, school_key: str, record_type: str, data: Dict[str, Any] = None):
+        data = data or {}
+        self.school_key = school_key
+        self.record_type = record_type
+        self.import_rows: Dict[str, Dict[str, str]] = data.get('import_rows', {})
+        self.records: Dict[str, Dict[str, str]] = data.get('records', {})
+        self.decisions: Dict[str, Optional[str]] = data.get('decisions', {})
+        self.updated_at: Optional[str] = data.get('updated_at')
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.records and not self.import_rows
+
+    def days_since_update(self) -> int:
+        """Số ngày từ lần lưu state trước (0 nếu chưa có)"""
+        if not self.updated_at:
+            return 0
+        try:
+            return max(0, (datetime.now() - datetime.fromisoformat(self.updated_at)).days)
+        except ValueError:
+            return 0
+
+    def get_record_keys(self, record_id: str, fingerprint: str) -> Optional[Tuple[str, str, str]]:
+        """
+        Key đã chuẩn hóa (name, birth, username) của record nếu record không đổi từ lần trước
+
+        Args:
+            record_id (str): ID record
+            fingerprint (str): record_fingerprint() của record hiện tại
+
+        Returns:
+            Optional[Tuple]: Key đã lưu hoặc None nếu record mới/đã thay đổi
+        """
+        cached = self.records.get(record_id)
+        if cached and cached.get('fingerprint') == fingerprint:
+            return cached['name'], cached['birth'], cached['username']
+        return None
+
+    def diff_import(self, current_rows: Dict[str, Dict[str, str]]) -> Tuple[Set[str], Set[str]]:
+        """
+        So sánh dòng import hiện tại với lần trước
+
+        Args:
+            current_rows (Dict): {row_hash: item}
+
+        Returns:
+            Tuple[Set[str], Set[str]]: (hash thêm mới, hash bị xóa/sửa)
+        """
+        current = set(current_rows)
+        previous = set(self.import_rows)
+        return current - previous, previous - current
+
+    def affected_names(self, current_rows: Dict[str, Dict[str, str]], changed_records: Iterable[str],
+                       present_records: Set[str]) -> Set[str]:
+        """
+        Tên chuẩn hóa cần đánh giá lại: tên của dòng import thêm/sửa/xóa, record OnLuyen
+        mới/thay đổi (cả tên cũ) và record đã biến mất khỏi OnLuyen
+
+        Args:
+            current_rows (Dict): {row_hash: item} của lần chạy này
+            changed_records (Iterable[str]): ID record mới hoặc thay đổi
+            present_records (Set[str]): ID tất cả record hiện có
+
+        Returns:
+            Set[str]: Tập tên cần đánh giá lại
+        """
+        added, removed = self.diff_import(current_rows)
+        names = {current_rows[row_hash]['name'] for row_hash in added}
+        names.update(self.import_rows[row_hash]['name'] for row_hash in removed)
+
+        for record_id in changed_records:
+            if record_id in self.records:
+                names.add(self.records[record_id]['name'])
+        for record_id, cached in self.records.items():
+            if record_id not in present_records:
+                names.add(cached['name'])
+        return names
+
+    def update(self, current_rows: Dict[str, Dict[str, str]],
+               record_keys: Dict[str, Tuple[str, str, str, str]], decisions: Dict[str, Optional[str]]) -> None:
+        """
+        Ghi nhận trạng thái của lần chạy hiện tại
+
+        Args:
+            current_rows (Dict): {row_hash: item}
+            record_keys (Dict): {record_id: (fingerprint, name, birth, username)}
+            decisions (Dict): {record_id: phương thức khớp hoặc None}
+        """
+        self.import_rows = {
+            row_hash: {'name': item.get('name', ''), 'birthdate': item.get('birthdate', ''),
+                       'username': item.get('username', '')}
+            for row_hash, item in current_rows.items()
+        }
+        self.records = {
+            record_id: {'fingerprint': fingerprint, 'name': name, 'birth': birth, 'username': username}
+            for record_id, (fingerprint, name, birth, username) in record_keys.items()
+        }
+        self.decisions = dict(decisions)
+        self.updated_at = datetime.now().isoformat(timespec='seconds')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'version': STATE_VERSION,
+            'school_key': self.school_key,
+            'record_type': self.record_type,
+            'updated_at': self.updated_at,
+            'import_rows': self.import_rows,
+            'records': self.records,
+            'decisions': self.decisions
+        }
+
+
+class MatchStateStore:
+    """Lưu/đọc MatchState dạng JSON trong data/cache/matching (mỗi trường, mỗi loại một file)"""
+
+    def __init__(self, state_dir: str = DEFAULT_STATE_DIR):
+        """
+        Khởi tạo MatchStateStore
+
+        Args:
+            state_dir (str): Thư mục lưu state
+        """
+        self.state_dir = state_dir
+        self._lock = threading.Lock()
+
+    def _state_path(self, school_key: str, record_type: str) -> str:
+        safe_key = re.sub(r'[^\w.@-]+', '_', school_key.strip().lower())
+        return os.path.join(self.state_dir, f"{safe_key}_{record_type}.json")
+
+    def load(self, school_key: str, record_type: str) -> MatchState:
+        """
+        Đọc state của trường (state rỗng nếu chưa có hoặc file hỏng/khác version)
+
+        Returns:
+            MatchState: State của trường
+        """
+        path = self._state_path(school_key, record_type)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == STATE_VERSION and data.get('record_type') == record_type:
+                return MatchState(school_key, record_type, data)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Không đọc được match state {path}: {e}")
+        return MatchState(school_key, record_type)
+
+    def save(self, state: MatchState) -> bool:
+        """
+        Ghi state (atomic)
+
+        Returns:
+            bool: True nếu ghi thành công
+        """
+        path = self._state_path(state.school_key, state.record_type)
+        try:
+            with self._lock:
+                os.makedirs(self.state_dir, exist_ok=True)
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(state.to_dict(), f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            return True
+        except Exception as e:
+            print(f"⚠️ Không lưu được match state {path}: {e}")
+            return False
+
+    def clear(self, school_key: str = None) -> int:
+        """
+        Xóa state (của một trường hoặc toàn bộ)
+
+        Returns:
+            int: Số file đã xóa
+        """
+        if not os.path.isdir(self.state_dir):
+            return 0
+        removed = 0
+        paths: List[str] = []
+        if school_key:
+            paths = [self._state_path(school_key, record_type) for record_type in ('students', 'teachers')]
+        else:
+            paths = [os.path.join(self.state_dir, name) for name in os.listdir(self.state_dir) if name.endswith('.json')]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+_match_state_store = None
+
+
+def get_match_state_store() -> Optional[MatchStateStore]:
+    """
+    Lấy MatchStateStore global theo cấu hình (INCREMENTAL_MATCHING, MATCH_STATE_DIR)
+
+    Returns:
+        Optional[MatchStateStore]: Store hoặc None nếu tắt so khớp incremental
+    """
+    global _match_state_store
+    from config.config_manager import get_config
+
+    matching_config = get_config().get_matching_config()
+    if not matching_config['incremental']:
+        return None
+    if _match_state_store is None or _match_state_store.state_dir != matching_config['state_dir']:
+        _match_state_store = MatchStateStore(matching_config['state_dir'])
+    return _match_state_store
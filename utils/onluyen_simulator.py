@@ -0,0 +1,626 @@
+"""
+OnLuyen API Simulator
+Server HTTP local giả lập login, change-school-year, list-teacher và list-student
+của OnLuyen với dữ liệu trường học tổng hợp (tên tiếng Việt, deterministic theo seed)
+- dùng để tune pagination, concurrency và retry mà không gọi production
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import os
+import json
+import gzip
+import time
+import base64
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs, unquote
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+
+HO = ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Huỳnh', 'Phan', 'Vũ', 'Võ', 'Đặng',
+      'Bùi', 'Đỗ', 'Hồ', 'Ngô', 'Dương', 'Lý', 'Đinh', 'Trịnh', 'Mai', 'Tạ']
+TEN_DEM_NAM = ['Văn', 'Đức', 'Minh', 'Quang', 'Hữu', 'Thành', 'Công', 'Gia', 'Tuấn', 'Hoàng', 'Anh', 'Đình']
+TEN_DEM_NU = ['Thị', 'Ngọc', 'Thu', 'Thanh', 'Phương', 'Minh', 'Hải', 'Kim', 'Diệu', 'Bảo', 'Khánh', 'Mai']
+TEN_NAM = ['An', 'Bình', 'Cường', 'Dũng', 'Đạt', 'Hải', 'Hiếu', 'Hoàng', 'Huy', 'Khang', 'Khoa', 'Kiên',
+           'Long', 'Minh', 'Nam', 'Nghĩa', 'Phong', 'Phúc', 'Quân', 'Sơn', 'Tài', 'Thắng', 'Trung', 'Tú', 'Vinh']
+TEN_NU = ['Anh', 'Chi', 'Diệp', 'Giang', 'Hà', 'Hạnh', 'Hằng', 'Hoa', 'Hương', 'Lan', 'Linh', 'Loan',
+          'Mai', 'My', 'Nga', 'Ngân', 'Nhung', 'Oanh', 'Phương', 'Quyên', 'Thảo', 'Trang', 'Uyên', 'Vy', 'Yến']
+LOAI_TRUONG = {
+    'THPT': [10, 11, 12],
+    'THCS': [6, 7, 8, 9],
+    'TH': [1, 2, 3, 4, 5]
+}
+TEN_TRUONG = ['Nguyễn Du', 'Lê Quý Đôn', 'Trần Phú', 'Chu Văn An', 'Lý Thường Kiệt', 'Nguyễn Trãi',
+              'Hoàng Hoa Thám', 'Phan Bội Châu', 'Quang Trung', 'Lê Lợi', 'Võ Thị Sáu', 'Kim Đồng']
+
+DEFAULT_SCHOOL_YEAR = 2025
+
+_ASCII_MAP = str.maketrans(
+    'àáảãạăằắẳẵặâầấẩẫậèéẻẽẹêềếểễệìíỉĩịòóỏõọôồốổỗộơờớởỡợùúủũụưừứửữựỳýỷỹỵđ',
+    'aaaaaaaaaaaaaaaaaeeeeeeeeeeeiiiiiooooooooooooooooouuuuuuuuuuuyyyyyd'
+)
+
+
+def _slug(text: str) -> str:
+    """Bỏ dấu tiếng Việt, viết thường, bỏ khoảng trắng"""
+    return text.lower().translate(_ASCII_MAP).replace(' ', '')
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+class SyntheticSchool:
+    """Dữ liệu giáo viên/học sinh tổng hợp của một trường (sinh lazy, cache theo năm học)"""
+
+    def __init__(self, account: str, password: str, teachers: int, students: int, seed: int = 0,
+                 school_type: str = None, name: str = None):
+        """
+        Khởi tạo SyntheticSchool
+
+        Args:
+            account (str): Tài khoản admin của trường
+            password (str): Mật khẩu admin (None = chấp nhận mọi mật khẩu)
+            teachers (int): Số giáo viên
+            students (int): Số học sinh
+            seed (int): Seed sinh dữ liệu
+            school_type (str): THPT/THCS/TH (mặc định chọn theo seed)
+            name (str): Tên trường (mặc định sinh theo seed)
+        """
+        rng = random.Random(f"{seed}:{account}")
+        self.account = account
+        self.password = password
+        self.teachers = teachers
+        self.students = students
+        self.seed = seed
+        self.school_type = school_type or rng.choice(list(LOAI_TRUONG))
+        self.name = name or f"Trường {self.school_type} {rng.choice(TEN_TRUONG)}"
+        self._cache: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _person_name(rng: random.Random) -> str:
+        if rng.random() < 0.5:
+            return f"{rng.choice(HO)} {rng.choice(TEN_DEM_NAM)} {rng.choice(TEN_NAM)}"
+        return f"{rng.choice(HO)} {rng.choice(TEN_DEM_NU)} {rng.choice(TEN_NU)}"
+
+    @staticmethod
+    def _date_create(rng: random.Random, year: int) -> str:
+        # Phần lớn tài khoản tạo đầu năm học, một phần tạo gần đây (để test logic dateCreate)
+        start = datetime(year, 8, 1)
+        if rng.random() < 0.1:
+            created = datetime.now() - timedelta(days=rng.randint(0, 29), seconds=rng.randint(0, 86399))
+        else:
+            created = start + timedelta(days=rng.randint(0, 60), seconds=rng.randint(0, 86399))
+        return created.strftime('%Y-%m-%dT%H:%M:%S')
+
+    def get_teachers(self, year: int) -> List[Dict[str, Any]]:
+        """Danh sách giáo viên của năm học (cấu trúc giống list-teacher)"""
+        with self._lock:
+            key = ('teachers', year)
+            if key not in self._cache:
+                self._cache[key] = self._generate_teachers(year)
+            return self._cache[key]
+
+    def get_students(self, year: int) -> List[Dict[str, Any]]:
+        """Danh sách học sinh của năm học (cấu trúc giống list-student)"""
+        with self._lock:
+            key = ('students', year)
+            if key not in self._cache:
+                self._cache[key] = self._generate_students(year)
+            return self._cache[key]
+
+    def _generate_teachers(self, year: int) -> List[Dict[str, Any]]:
+        rng = random.Random(f"{self.seed}:{self.account}:teachers:{year}")
+        school_slug = _slug(self.account.split('@')[0])
+        teachers = []
+
+        for index in range(self.teachers):
+            full_name = self._person_name(rng)
+            birth = datetime(rng.randint(1965, 1998), rng.randint(1, 12), rng.randint(1, 28))
+            roles = ['GV']
+            if index == 0:
+                roles = ['HT']
+            elif index in (1, 2):
+                roles = ['HP']
+
+            user_name = f"gv.{_slug(full_name.split()[-1])}{index + 1}.{school_slug}"
+            teacher_info = {
+                'displayName': full_name,
+                'userName': user_name,
+                'pwd': f"{rng.randint(0, 999999):06d}",
+                'userBirthday': birth.strftime('%d/%m/%Y'),
+                'roles': roles
+            }
+            teachers.append({
+                'teacherId': f"T{year}{index + 1:06d}",
+                'fullName': full_name,
+                'birthDate': birth.strftime('%Y-%m-%dT00:00:00'),
+                'account': user_name,
+                'roles': roles,
+                'dateCreate': self._date_create(rng, year),
+                'teacherInfo': teacher_info
+            })
+
+        return teachers
+
+    def _generate_students(self, year: int) -> List[Dict[str, Any]]:
+        rng = random.Random(f"{self.seed}:{self.account}:students:{year}")
+        school_slug = _slug(self.account.split('@')[0])
+        grades = LOAI_TRUONG[self.school_type]
+        class_size = 40
+        students = []
+
+        for index in range(self.students):
+            grade = grades[(index // class_size) % len(grades)]
+            class_number = index // (class_size * len(grades)) + 1
+            class_name = f"{grade}A{class_number}"
+            full_name = self._person_name(rng)
+            birth_year = year - 5 - grade
+            birth = datetime(birth_year, rng.randint(1, 12), rng.randint(1, 28))
+
+            user_name = f"hs.{_slug(full_name.split()[-1])}{index + 1}.{school_slug}"
+            user_info = {
+                'displayName': full_name,
+                'userName': user_name,
+                'account': user_name,
+                'pwd': f"{rng.randint(0, 999999):06d}",
+                'userBirthday': birth.strftime('%d/%m/%Y'),
+                'codePin': f"{rng.randint(0, 99999999):08d}"
+            }
+            students.append({
+                'studentId': f"S{year}{index + 1:07d}",
+                'fullName': full_name,
+                'birthDate': birth.strftime('%Y-%m-%dT00:00:00'),
+                'account': user_name,
+                'grade': grade,
+                'groupClass': [{'className': class_name, 'grade': grade}],
+                'dateCreate': self._date_create(rng, year),
+                'userInfo': user_info
+            })
+
+        return students
+
+
+class OnLuyenSimulator:
+    """
+    Server giả lập OnLuyen API (chạy trong thread nền)
+
+    Endpoints (cùng path với production):
+    - POST /api/account/login
+    - GET|POST /api/account/change-school-year/{year}
+    - GET /school/list-teacher/%20/{pageIndex}?pageSize=
+    - GET /school/list-student?pageIndex=&pageSize=
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, teachers: int = 60, students: int = 1000,
+                 seed: int = 0, default_password: str = None, latency: float = 0.0, jitter: float = 0.0,
+                 rate_429: float = 0.0, rate_5xx: float = 0.0, compression: str = 'auto',
+                 school_year: int = DEFAULT_SCHOOL_YEAR):
+        """
+        Khởi tạo OnLuyenSimulator
+
+        Args:
+            host (str): Địa chỉ bind
+            port (int): Cổng (0 = tự chọn cổng trống)
+            teachers (int): Số giáo viên mặc định cho trường tự sinh
+            students (int): Số học sinh mặc định cho trường tự sinh
+            seed (int): Seed cho dữ liệu và lỗi ngẫu nhiên
+            default_password (str): Mật khẩu cho trường tự sinh (None = chấp nhận mọi mật khẩu)
+            latency (float): Độ trễ cố định mỗi request (giây)
+            jitter (float): Độ trễ ngẫu nhiên thêm tối đa (giây)
+            rate_429 (float): Xác suất trả 429 (0-1)
+            rate_5xx (float): Xác suất trả 5xx (0-1)
+            compression (str): auto (theo Accept-Encoding) | br | gzip | none
+            school_year (int): Năm học mặc định trong token sau login
+        """
+        self.host = host
+        self.port = port
+        self.default_teachers = teachers
+        self.default_students = students
+        self.seed = seed
+        self.default_password = default_password
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.compression = compression
+        self.school_year = school_year
+
+        self.schools: Dict[str, SyntheticSchool] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._scheduled_errors: Dict[str, List[int]] = {}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {'requests': 0, 'errors': 0, 'bytes_sent': 0, 'by_endpoint': {}}
+
+    # ------------------------------------------------------------------
+    # Cấu hình dữ liệu và lỗi
+    # ------------------------------------------------------------------
+
+    def add_school(self, account: str, password: str = None, teachers: int = None, students: int = None,
+                   school_type: str = None, name: str = None) -> SyntheticSchool:
+        """
+        Đăng ký trường với quy mô cụ thể
+
+        Returns:
+            SyntheticSchool: Trường đã đăng ký
+        """
+        school = SyntheticSchool(
+            account=account.lower().strip(),
+            password=password,
+            teachers=self.default_teachers if teachers is None else teachers,
+            students=self.default_students if students is None else students,
+            seed=self.seed,
+            school_type=school_type,
+            name=name
+        )
+        with self._lock:
+            self.schools[school.account] = school
+        return school
+
+    def get_school(self, account: str) -> SyntheticSchool:
+        """Lấy trường theo tài khoản admin (tự sinh với quy mô mặc định nếu chưa có)"""
+        account = account.lower().strip()
+        with self._lock:
+            school = self.schools.get(account)
+        return school or self.add_school(account, self.default_password)
+
+    def inject_errors(self, endpoint: str, status: int = 503, count: int = 1) -> None:
+        """
+        Lên lịch lỗi cho các request tiếp theo của endpoint
+
+        Args:
+            endpoint (str): login | change_school_year | list_teacher | list_student | *
+            status (int): HTTP status trả về
+            count (int): Số request liên tiếp bị lỗi
+        """
+        with self._lock:
+            self._scheduled_errors.setdefault(endpoint, []).extend([status] * count)
+
+    def _next_error(self, endpoint: str) -> Optional[int]:
+        with self._lock:
+            for key in (endpoint, '*'):
+                scheduled = self._scheduled_errors.get(key)
+                if scheduled:
+                    return scheduled.pop(0)
+            roll = self._random.random()
+            if roll < self.rate_429:
+                return 429
+            if roll < self.rate_429 + self.rate_5xx:
+                return self._random.choice([500, 502, 503, 504])
+        return None
+
+    # ------------------------------------------------------------------
+    # Token
+    # ------------------------------------------------------------------
+
+    def issue_token(self, school: SyntheticSchool, year: int) -> str:
+        """Tạo JWT (không ký thật) chứa SchoolYear/Email/DisplayName như production"""
+        header = {'alg': 'HS256', 'typ': 'JWT'}
+        payload = {
+            'Email': school.account,
+            'DisplayName': f"Admin {school.name}",
+            'SchoolYear': year,
+            'SchoolName': school.name,
+            'exp': int(time.time()) + 3600
+        }
+        signing_input = f"{_b64url(json.dumps(header).encode())}.{_b64url(json.dumps(payload).encode())}"
+        signature = hashlib.sha256(f"{signing_input}:{self.seed}".encode()).digest()
+        return f"{signing_input}.{_b64url(signature)}"
+
+    def decode_token(self, authorization: str) -> Optional[Dict[str, Any]]:
+        """Giải mã Bearer token do simulator cấp (None nếu không hợp lệ)"""
+        if not authorization or not authorization.lower().startswith('bearer '):
+            return None
+        parts = authorization.split(' ', 1)[1].strip().split('.')
+        if len(parts) != 3:
+            return None
+
+        signing_input = f"{parts[0]}.{parts[1]}"
+        expected = _b64url(hashlib.sha256(f"{signing_input}:{self.seed}".encode()).digest())
+        if parts[2] != expected:
+            return None
+
+        try:
+            payload = parts[1] + '=' * (-len(parts[1]) % 4)
+            return json.loads(base64.urlsafe_b64decode(payload))
+        except Exception:
+            return None
+
+    # ------------------------------------------------------------------
+    # Xử lý request
+    # ------------------------------------------------------------------
+
+    def handle(self, method: str, path: str, query: Dict[str, List[str]], headers, body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        """
+        Xử lý một request (không phụ thuộc HTTP server)
+
+        Returns:
+            Tuple: (status, payload JSON, headers bổ sung)
+        """
+        endpoint = self._route(method, path)
+
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['by_endpoint'][endpoint] = self.stats['by_endpoint'].get(endpoint, 0) + 1
+
+        delay = self.latency + (self._random.random() * self.jitter if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+
+        status = self._next_error(endpoint)
+        if status:
+            with self._lock:
+                self.stats['errors'] += 1
+            extra_headers = {'Retry-After': '1'} if status == 429 else {}
+            message = 'Too Many Requests' if status == 429 else 'Internal Server Error'
+            return status, {'success': False, 'message': message}, extra_headers
+
+        if endpoint == 'login':
+            return self._handle_login(body)
+        if endpoint == 'change_school_year':
+            return self._handle_change_year(path, headers)
+        if endpoint in ('list_teacher', 'list_student'):
+            return self._handle_list(endpoint, path, query, headers)
+        return 404, {'success': False, 'message': f"Not found: {path}"}, {}
+
+    @staticmethod
+    def _route(method: str, path: str) -> str:
+        if path.rstrip('/') == '/api/account/login' and method == 'POST':
+            return 'login'
+        if '/change-school-year' in path:
+            return 'change_school_year'
+        if path.startswith('/school/list-teacher'):
+            return 'list_teacher'
+        if path.startswith('/school/list-student'):
+            return 'list_student'
+        return 'unknown'
+
+    def _handle_login(self, body: bytes) -> Tuple[int, Any, Dict[str, str]]:
+        try:
+            payload = json.loads(body.decode('utf-8') or '{}')
+        except ValueError:
+            return 400, {'success': False, 'message': 'Invalid JSON'}, {}
+
+        user_name = str(payload.get('userName', '')).strip()
+        if not user_name:
+            return 400, {'success': False, 'message': 'userName is required'}, {}
+
+        school = self.get_school(user_name)
+        if school.password is not None and payload.get('password') != school.password:
+            return 401, {'success': False, 'message': 'Tài khoản hoặc mật khẩu không đúng'}, {}
+
+        return 200, {
+            'access_token': self.issue_token(school, self.school_year),
+            'refresh_token': _b64url(hashlib.sha256(f"refresh:{school.account}:{self.seed}".encode()).digest()),
+            'token_type': 'Bearer',
+            'expires_in': 3600,
+            'account': school.account,
+            'displayName': f"Admin {school.name}",
+            'schoolName': school.name
+        }, {}
+
+    def _handle_change_year(self, path: str, headers) -> Tuple[int, Any, Dict[str, str]]:
+        claims = self.decode_token(headers.get('Authorization'))
+        if not claims:
+            return 401, {'success': False, 'message': 'Unauthorized'}, {}
+
+        try:
+            year = int(path.rstrip('/').rsplit('/', 1)[1])
+        except (ValueError, IndexError):
+            return 400, {'success': False, 'message': 'Năm học không hợp lệ'}, {}
+
+        school = self.get_school(claims['Email'])
+        return 200, {
+            'access_token': self.issue_token(school, year),
+            'refresh_token': _b64url(hashlib.sha256(f"refresh:{school.account}:{year}".encode()).digest()),
+            'schoolYear': year
+        }, {}
+
+    def _handle_list(self, endpoint: str, path: str, query: Dict[str, List[str]],
+                     headers) -> Tuple[int, Any, Dict[str, str]]:
+        claims = self.decode_token(headers.get('Authorization'))
+        if not claims:
+            return 401, {'success': False, 'message': 'Unauthorized'}, {}
+
+        school = self.get_school(claims['Email'])
+        year = int(claims.get('SchoolYear') or self.school_year)
+
+        if endpoint == 'list_teacher':
+            records = school.get_teachers(year)
+            # /school/list-teacher/%20/{pageIndex}
+            path_index = unquote(path).rstrip('/').rsplit('/', 1)[-1]
+            default_index = int(path_index) if path_index.isdigit() else 1
+        else:
+            records = school.get_students(year)
+            default_index = 1
+
+        try:
+            page_index = max(1, int(query.get('pageIndex', [default_index])[0]))
+            page_size = max(1, int(query.get('pageSize', [15])[0]))
+        except ValueError:
+            return 400, {'success': False, 'message': 'pageIndex/pageSize không hợp lệ'}, {}
+
+        start = (page_index - 1) * page_size
+        return 200, {
+            'data': records[start:start + page_size],
+            'totalCount': len(records),
+            'pageIndex': page_index,
+            'pageSize': page_size
+        }, {}
+
+    def encode_body(self, payload: Any, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+        """
+        Serialize và nén response theo cấu hình/Accept-Encoding
+
+        Returns:
+            Tuple: (body, content-encoding hoặc None)
+        """
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        accepted = [part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')]
+
+        encoding = self.compression
+        if encoding == 'auto':
+            if 'br' in accepted and BROTLI_AVAILABLE:
+                encoding = 'br'
+            elif 'gzip' in accepted:
+                encoding = 'gzip'
+            else:
+                encoding = 'none'
+
+        if encoding == 'br' and BROTLI_AVAILABLE:
+            return brotli.compress(body), 'br'
+        if encoding == 'gzip':
+            return gzip.compress(body), 'gzip'
+        return body, None
+
+    # ------------------------------------------------------------------
+    # HTTP server
+    # ------------------------------------------------------------------
+
+    @property
+    def base_url(self) -> str:
+        """URL gốc của simulator"""
+        host, port = self._server.server_address[:2] if self._server else (self.host, self.port)
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """
+        Khởi động server trong thread nền
+
+        Returns:
+            str: Base URL (vd http://127.0.0.1:54321)
+        """
+        if self._server:
+            return self.base_url
+
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _dispatch(self):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+
+                status, payload, extra_headers = simulator.handle(
+                    self.command, parsed.path, parse_qs(parsed.query), self.headers, body
+                )
+                content, content_encoding = simulator.encode_body(payload, self.headers.get('Accept-Encoding'))
+
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(content)))
+                if content_encoding:
+                    self.send_header('Content-Encoding', content_encoding)
+                for key, value in extra_headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(content)
+
+                with simulator._lock:
+                    simulator.stats['bytes_sent'] += len(content)
+
+            do_GET = _dispatch
+            do_POST = _dispatch
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='OnLuyenSimulator', daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self) -> None:
+        """Dừng server"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+    def env(self) -> Dict[str, str]:
+        """Biến môi trường trỏ OnLuyenAPIClient vào simulator"""
+        base_url = self.base_url
+        return {
+            'ONLUYEN_AUTH_BASE_URL': base_url,
+            'ONLUYEN_SCHOOL_API_BASE_URL': base_url,
+            'ONLUYEN_CHANGE_YEAR_BASE_URL': base_url
+        }
+
+    def activate(self) -> Dict[str, str]:
+        """
+        Đặt biến môi trường cho process hiện tại (gọi trước khi tạo OnLuyenAPIClient)
+
+        Returns:
+            Dict[str, str]: Các biến môi trường đã đặt
+        """
+        env = self.env()
+        os.environ.update(env)
+        return env
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Thống kê request của simulator"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['by_endpoint'] = dict(self.stats['by_endpoint'])
+            return stats
+
+
+def main():
+    """Chạy simulator độc lập: python -m utils.onluyen_simulator --port 8765 --students 5000"""
+    parser = argparse.ArgumentParser(description='OnLuyen API simulator')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--teachers', type=int, default=60)
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--password', default=None, help='Mật khẩu bắt buộc (mặc định chấp nhận mọi mật khẩu)')
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--rate-429', type=float, default=0)
+    parser.add_argument('--rate-5xx', type=float, default=0)
+    parser.add_argument('--compression', choices=['auto', 'br', 'gzip', 'none'], default='auto')
+    parser.add_argument('--school-year', type=int, default=DEFAULT_SCHOOL_YEAR)
+    args = parser.parse_args()
+
+    simulator = OnLuyenSimulator(
+        host=args.host, port=args.port, teachers=args.teachers, students=args.students, seed=args.seed,
+        default_password=args.password, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+        rate_429=args.rate_429, rate_5xx=args.rate_5xx, compression=args.compression,
+        school_year=args.school_year
+    )
+    simulator.start()
+
+    print(f"🧪 OnLuyen simulator đang chạy tại {simulator.base_url}")
+    for key, value in simulator.env().items():
+        print(f"   {key}={value}")
+    print("   Nhấn Ctrl+C để dừng")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        simulator.stop()
+        print(f"\n📊 {simulator.get_stats()}")
+
+
+if __name__ == '__main__':
+    main()
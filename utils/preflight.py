@@ -0,0 +1,235 @@
+"""
+Preflight
+Chạy song song các bước kiểm tra độc lập (kết nối API, cấu hình, dependencies) với
+timeout riêng cho từng bước và cache kết quả trong thời gian ngắn (TTL) để các nút
+"Test Connection" trên UI phản hồi ngay
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import io
+import sys
+import time
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+
+def is_module_available(import_name: str) -> bool:
+    """
+    Kiểm tra module đã cài đặt chưa bằng importlib.util.find_spec (không import module)
+
+    Args:
+        import_name (str): Tên import, vd "googleapiclient" hoặc "google.auth"
+
+    Returns:
+        bool: True nếu tìm thấy module
+    """
+    try:
+        return importlib.util.find_spec(import_name) is not None
+    except (ImportError, ValueError):
+        # Package cha không tồn tại (vd "google" khi kiểm tra "google.auth")
+        return False
+    except Exception:
+        # Package cha hỏng / không phải package thật
+        return False
+
+
+def check_modules(modules: Dict[str, str]) -> Dict[str, bool]:
+    """
+    Kiểm tra nhiều module cùng lúc
+
+    Args:
+        modules (Dict[str, str]): {tên package pip: tên import}
+
+    Returns:
+        Dict[str, bool]: {tên package pip: đã cài đặt}
+    """
+    return {package_name: is_module_available(import_name) for package_name, import_name in modules.items()}
+
+
+@dataclass
+class PreflightCheck:
+    """Một bước kiểm tra preflight"""
+    name: str
+    func: Callable[[], Any]
+    timeout: Optional[float] = None
+    cache_ttl: Optional[float] = None
+
+
+class _ThreadOutputRouter(io.TextIOBase):
+    """stdout thay thế: luồng đã đăng ký ghi vào buffer riêng, các luồng khác ghi ra stdout gốc"""
+
+    def __init__(self, original):
+        self.original = original
+        self.buffers: Dict[int, io.StringIO] = {}
+
+    def write(self, text):
+        buffer = self.buffers.get(threading.get_ident())
+        return (buffer or self.original).write(text)
+
+    def flush(self):
+        self.original.flush()
+
+
+class PreflightRunner:
+    """Chạy các PreflightCheck song song với timeout và cache TTL"""
+
+    def __init__(self, max_workers: int = 8, default_timeout: float = 15.0, default_cache_ttl: float = 60.0):
+        """
+        Khởi tạo PreflightRunner
+
+        Args:
+            max_workers (int): Số luồng chạy check song song
+            default_timeout (float): Timeout mặc định mỗi check (giây)
+            default_cache_ttl (float): Thời gian giữ kết quả trong cache (giây), 0 = không cache
+        """
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self.default_cache_ttl = default_cache_ttl
+        self._cache: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._output_lock = threading.Lock()
+
+    def _get_cached(self, name: str) -> Optional[Dict[str, Any]]:
+        """Lấy kết quả còn hạn trong cache"""
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached and cached[0] > time.monotonic():
+                return dict(cached[1], cached=True)
+            self._cache.pop(name, None)
+            return None
+
+    def invalidate(self, name: str = None) -> None:
+        """
+        Xóa kết quả trong cache
+
+        Args:
+            name (str, optional): Tên check cần xóa. None = xóa tất cả
+        """
+        with self._lock:
+            if name is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(name, None)
+
+    def run(self, checks: List[PreflightCheck], use_cache: bool = True,
+            capture_output: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Chạy các check song song
+
+        Args:
+            checks (List[PreflightCheck]): Danh sách check
+            use_cache (bool): Dùng kết quả còn hạn trong cache nếu có
+            capture_output (bool): Gom output print của từng check và in lần lượt theo thứ tự
+                                   danh sách check (tránh output các luồng xen lẫn nhau)
+
+        Returns:
+            Dict[str, Dict[str, Any]]: {tên check: {status, result, error, elapsed, cached}}
+                                       status: ok | error | timeout
+        """
+        outcomes = {}
+        pending = []
+        for check in checks:
+            cached = self._get_cached(check.name) if use_cache else None
+            if cached:
+                outcomes[check.name] = cached
+            else:
+                pending.append(check)
+
+        if pending:
+            router = None
+            if capture_output:
+                self._output_lock.acquire()
+                router = _ThreadOutputRouter(sys.stdout)
+                sys.stdout = router
+
+            # Không dùng "with": check quá timeout không được chặn việc trả kết quả
+            executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending)),
+                                          thread_name_prefix="preflight")
+            try:
+                started = time.monotonic()
+                futures = {check.name: executor.submit(self._run_check, check, router) for check in pending}
+                for check in pending:
+                    # Timeout tính từ lúc bắt đầu chạy, không cộng dồn thời gian chờ các check trước
+                    timeout = check.timeout if check.timeout is not None else self.default_timeout
+                    remaining = max(started + timeout - time.monotonic(), 0)
+                    outcomes[check.name] = self._wait(futures[check.name], remaining, timeout)
+            finally:
+                executor.shutdown(wait=False)
+                if router is not None:
+                    sys.stdout = router.original
+                    self._output_lock.release()
+
+            if router is not None:
+                # In output theo thứ tự check (check quá timeout chạy tiếp sẽ in thẳng ra stdout)
+                for check in pending:
+                    buffer = outcomes[check.name].pop('_output', None)
+                    if buffer:
+                        sys.stdout.write(buffer)
+
+        return {check.name: outcomes[check.name] for check in checks}
+
+    def _run_check(self, check: PreflightCheck, router: Optional[_ThreadOutputRouter]) -> Dict[str, Any]:
+        """Chạy một check trong luồng worker"""
+        buffer = None
+        if router is not None:
+            buffer = router.buffers[threading.get_ident()] = io.StringIO()
+
+        started = time.monotonic()
+        try:
+            outcome = {'status': 'ok', 'result': check.func(), 'error': None}
+        except Exception as e:
+            outcome = {'status': 'error', 'result': None, 'error': str(e)}
+        outcome['elapsed'] = round(time.monotonic() - started, 3)
+        outcome['cached'] = False
+
+        if router is not None:
+            router.buffers.pop(threading.get_ident(), None)
+            outcome['_output'] = buffer.getvalue()
+
+        # Chỉ cache kết quả thành công - lỗi sẽ được kiểm tra lại ở lần sau
+        cache_ttl = check.cache_ttl if check.cache_ttl is not None else self.default_cache_ttl
+        if outcome['status'] == 'ok' and cache_ttl > 0:
+            with self._lock:
+                self._cache[check.name] = (time.monotonic() + cache_ttl,
+                                           {k: v for k, v in outcome.items() if k != '_output'})
+        return outcome
+
+    def _wait(self, future, remaining: float, timeout: float) -> Dict[str, Any]:
+        """Chờ kết quả check thêm tối đa `remaining` giây (timeout gốc của check là `timeout`)"""
+        try:
+            return future.result(timeout=remaining)
+        except FutureTimeoutError:
+            return {
+                'status': 'timeout',
+                'result': None,
+                'error': f"Quá thời gian {timeout:g}s",
+                'elapsed': timeout,
+                'cached': False
+            }
+
+
+_preflight_runner = None
+
+
+def get_preflight_runner() -> PreflightRunner:
+    """
+    Lấy PreflightRunner global theo cấu hình (PREFLIGHT_MAX_WORKERS, PREFLIGHT_CHECK_TIMEOUT, PREFLIGHT_CACHE_TTL)
+
+    Returns:
+        PreflightRunner: Runner dùng chung (cache TTL dùng chung giữa UI và console)
+    """
+    global _preflight_runner
+    if _preflight_runner is None:
+        from config.config_manager import get_config
+
+        preflight_config = get_config().get_preflight_config()
+        _preflight_runner = PreflightRunner(
+            max_workers=preflight_config['max_workers'],
+            default_timeout=preflight_config['check_timeout'],
+            default_cache_ttl=preflight_config['cache_ttl']
+        )
+    return _preflight_runner
@@ -0,0 +1,506 @@
+"""
+Snapshot Diff
+So sánh hai lần lấy dữ liệu của cùng một trường (file unified_workflow_*.json hoặc
+snapshot store) theo tài khoản trong thời gian tuyến tính: thêm mới, bị xóa và thay
+đổi (họ tên, ngày sinh, lớp, reset mật khẩu...). Record được đọc dạng stream và báo
+cáo được ghi dần ra JSON/Excel, không nạp toàn bộ hai payload vào bộ nhớ
+
+Cách chạy:
+    python -m utils.snapshot_diff OLD NEW --output data/output/diff.xlsx
+    (OLD/NEW: đường dẫn unified_workflow_*.json hoặc snapshot:<admin_email>[:<năm học>])
+
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import os
+import re
+import sys
+import json
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.match_state import record_identity
+
+RECORD_TYPES = ('teachers', 'students')
+CHANGE_ADDED = 'added'
+CHANGE_REMOVED = 'removed'
+CHANGE_MODIFIED = 'modified'
+
+# Field so sánh: (key, nhãn hiển thị)
+DIFF_FIELDS = {
+    'teachers': [('name', 'Họ tên'), ('birthdate', 'Ngày sinh'), ('roles', 'Vai trò'), ('password', 'Mật khẩu')],
+    'students': [('name', 'Họ tên'), ('birthdate', 'Ngày sinh'), ('grade', 'Khối'), ('class_name', 'Lớp'),
+                 ('password', 'Mật khẩu')]
+}
+CHANGE_LABELS = {CHANGE_ADDED: 'Thêm mới', CHANGE_REMOVED: 'Bị xóa', CHANGE_MODIFIED: 'Thay đổi'}
+TYPE_LABELS = {'teachers': 'Giáo viên', 'students': 'Học sinh'}
+
+
+# ----------------------------------------------------------------------
+# Streaming JSON reader
+# ----------------------------------------------------------------------
+
+class _JSONStream:
+    """Đọc một file JSON theo từng phần (chunk), chỉ decode những giá trị cần thiết"""
+
+    _SPECIAL_CHARS = re.compile(r'["\\{}\[\]]')
+    _STRING_CHARS = re.compile(r'["\\]')
+    _WHITESPACE = re.compile(r'[ \t\r\n]*')
+    _NUMBER_CHARS = frozenset('.eE+-0123456789')
+
+    def __init__(self, file_obj, chunk_size: int = 1 << 20):
+        self.file = file_obj
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Ký tự khác khoảng trắng tiếp theo (không tiêu thụ), '' nếu hết file"""
+        while True:
+            self.pos = self._WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"JSON không hợp lệ: cần '{char}' tại vị trí {self.pos}")
+        self.pos += 1
+
+    def decode(self) -> Any:
+        """Decode giá trị tiếp theo (đọc thêm chunk khi giá trị bị cắt ngang)"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # Số ở cuối buffer (hoặc dừng trước '.', 'e', chữ số...) có thể còn tiếp
+                # trong chunk sau: "-15" + "000.0" không được decode thành -15
+                if self.eof or (end < len(self.buffer) and self.buffer[end] not in self._NUMBER_CHARS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self._fill():
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                self.pos = end
+                return value
+
+    def skip(self) -> None:
+        """Bỏ qua giá trị tiếp theo mà không dựng object Python"""
+        first = self.peek()
+        if first not in '{["':
+            self.decode()
+            return
+        depth = 0
+        in_string = False
+        while True:
+            if self.pos >= len(self.buffer) and not self._fill():
+                raise ValueError("JSON không hợp lệ: kết thúc file giữa giá trị")
+            if in_string:
+                match = self._STRING_CHARS.search(self.buffer, self.pos)
+                if not match:
+                    self.pos = len(self.buffer)
+                    continue
+                if match.group() == '\\':
+                    if match.end() >= len(self.buffer):
+                        # Ký tự được escape nằm ở chunk sau
+                        self.pos = match.start()
+                        if not self._fill():
+                            raise ValueError("JSON không hợp lệ: escape ở cuối file")
+                        continue
+                    self.pos = match.end() + 1
+                    continue
+                self.pos = match.end()
+                in_string = False
+                if depth == 0:
+                    return
+                continue
+            match = self._SPECIAL_CHARS.search(self.buffer, self.pos)
+            if not match:
+                self.pos = len(self.buffer)
+                continue
+            char = match.group()
+            self.pos = match.end()
+            if char == '"':
+                in_string = True
+            elif char in '{[':
+                depth += 1
+            elif char in '}]':
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def iter_object_keys(self) -> Iterator[str]:
+        """Duyệt key của object hiện tại; sau mỗi key phải decode() hoặc skip() giá trị"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.decode()
+            self.expect(':')
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError(f"JSON không hợp lệ tại vị trí {self.pos}")
+
+    def iter_array(self) -> Iterator[Any]:
+        """Decode lần lượt từng phần tử của array hiện tại"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.decode()
+            char = self.peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"JSON không hợp lệ tại vị trí {self.pos}")
+
+
+def iter_workflow_records(json_path: str, record_type: str) -> Iterator[Dict[str, Any]]:
+    """
+    Đọc dạng stream record teachers/students trong file unified_workflow_*.json
+
+    Args:
+        json_path (str): Đường dẫn file JSON
+        record_type (str): "teachers" hoặc "students"
+
+    Yields:
+        Dict: Record OnLuyen (đúng cấu trúc API)
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        stream = _JSONStream(f)
+        for key in stream.iter_object_keys():
+            if key != record_type:
+                stream.skip()
+                continue
+            if stream.peek() == '[':
+                # Format filtered: list trực tiếp
+                yield from stream.iter_array()
+            elif stream.peek() == '{':
+                for section_key in stream.iter_object_keys():
+                    if section_key == 'data':
+                        yield from stream.iter_array()
+                    else:
+                        stream.skip()
+            else:
+                stream.skip()
+            return
+
+
+def read_workflow_metadata(json_path: str) -> Dict[str, Any]:
+    """Đọc metadata/school_info của file workflow (dừng trước phần dữ liệu lớn)"""
+    info = {}
+    with open(json_path, 'r', encoding='utf-8') as f:
+        stream = _JSONStream(f)
+        for key in stream.iter_object_keys():
+            if key in ('metadata', 'school_info'):
+                info[key] = stream.decode()
+                if len(info) == 2:
+                    break
+            else:
+                stream.skip()
+    return info
+
+
+# ----------------------------------------------------------------------
+# Diff engine
+# ----------------------------------------------------------------------
+
+def record_key(record: Dict[str, Any]) -> str:
+    """Key ổn định để so sánh: tài khoản/userName (fallback ID record)"""
+    info = record.get('userInfo') or record.get('teacherInfo') or {}
+    account = record.get('account') or info.get('userName') or info.get('account') or ''
+    return account.lower().strip() or record_identity(record)
+
+
+def extract_diff_fields(record: Dict[str, Any], record_type: str) -> Tuple[str, ...]:
+    """
+    Các giá trị dùng để so sánh của một record (theo thứ tự DIFF_FIELDS)
+
+    Returns:
+        Tuple[str, ...]: Giá trị dạng chuỗi
+    """
+    info = record.get('userInfo') or record.get('teacherInfo') or {}
+    birth = record.get('birthDate') or ''
+    birth = birth[:10] if birth else (info.get('userBirthday') or '')
+    values = {
+        'name': (record.get('fullName') or info.get('displayName') or '').strip(),
+        'birthdate': birth,
+        'password': str(info.get('pwd') or record.get('pwd') or '')
+    }
+    if record_type == 'students':
+        group_class = record.get('groupClass') or []
+        values['class_name'] = group_class[0].get('className', '') if group_class and isinstance(group_class[0], dict) else ''
+        values['grade'] = str(record.get('grade') or '')
+    else:
+        roles = record.get('roles') or info.get('roles') or []
+        values['roles'] = ','.join(sorted(str(role) for role in roles)) if isinstance(roles, list) else str(roles)
+    return tuple(values[field] for field, _ in DIFF_FIELDS[record_type])
+
+
+class SnapshotDiff:
+    """So sánh hai nguồn record theo tài khoản: O(n + m), chỉ giữ index gọn của bên cũ"""
+
+    def __init__(self, record_type: str):
+        """
+        Khởi tạo SnapshotDiff
+
+        Args:
+            record_type (str): "teachers" hoặc "students"
+        """
+        if record_type not in RECORD_TYPES:
+            raise ValueError(f"record_type không hợp lệ: {record_type}")
+        self.record_type = record_type
+        self.fields = DIFF_FIELDS[record_type]
+        self.summary = {CHANGE_ADDED: 0, CHANGE_REMOVED: 0, CHANGE_MODIFIED: 0, 'unchanged': 0,
+                        'old_total': 0, 'new_total': 0}
+
+    def diff(self, old_records: Iterable[Dict[str, Any]],
+             new_records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Sinh danh sách thay đổi (generator - ghi báo cáo dần trong khi đọc bên mới)
+
+        Args:
+            old_records (Iterable[Dict]): Record lần trước
+            new_records (Iterable[Dict]): Record lần này
+
+        Yields:
+            Dict: {'record_type', 'change', 'key', 'name', 'changes': [{'field', 'label', 'old', 'new'}]}
+        """
+        old_index = {}
+        for record in old_records:
+            key = record_key(record)
+            if key:
+                old_index[key] = extract_diff_fields(record, self.record_type)
+        self.summary['old_total'] = len(old_index)
+
+        seen = set()
+        for record in new_records:
+            key = record_key(record)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            self.summary['new_total'] += 1
+            new_values = extract_diff_fields(record, self.record_type)
+            old_values = old_index.pop(key, None)
+
+            if old_values is None:
+                self.summary[CHANGE_ADDED] += 1
+                yield self._change(CHANGE_ADDED, key, new_values[0], None, new_values)
+            elif old_values != new_values:
+                self.summary[CHANGE_MODIFIED] += 1
+                yield self._change(CHANGE_MODIFIED, key, new_values[0], old_values, new_values)
+            else:
+                self.summary['unchanged'] += 1
+
+        for key, old_values in old_index.items():
+            self.summary[CHANGE_REMOVED] += 1
+            yield self._change(CHANGE_REMOVED, key, old_values[0], old_values, None)
+
+    def _change(self, change: str, key: str, name: str, old_values: Optional[Tuple[str, ...]],
+                new_values: Optional[Tuple[str, ...]]) -> Dict[str, Any]:
+        changes = []
+        for index, (field, label) in enumerate(self.fields):
+            old_value = old_values[index] if old_values else None
+            new_value = new_values[index] if new_values else None
+            if change == CHANGE_MODIFIED and old_value == new_value:
+                continue
+            if change != CHANGE_MODIFIED and not (old_value or new_value):
+                continue
+            changes.append({'field': field, 'label': label, 'old': old_value, 'new': new_value})
+        return {'record_type': self.record_type, 'change': change, 'key': key, 'name': name, 'changes': changes}
+
+
+# ----------------------------------------------------------------------
+# Sources & report writers
+# ----------------------------------------------------------------------
+
+def open_source(source: str, record_type: str) -> Iterator[Dict[str, Any]]:
+    """
+    Mở nguồn record: đường dẫn file workflow JSON hoặc 'snapshot:<school_key>[:<năm học>]'
+
+    Yields:
+        Dict: Record OnLuyen
+    """
+    if source.startswith('snapshot:'):
+        from utils.snapshot_store import get_snapshot_store
+
+        parts = source.split(':')
+        school_key = parts[1]
+        snapshot_store = get_snapshot_store()
+        if not snapshot_store:
+            raise ValueError("Snapshot store đang tắt (SNAPSHOT_STORE_ENABLED=false)")
+        school_year = int(parts[2]) if len(parts) > 2 and parts[2] else snapshot_store.get_latest_year(school_key)
+        if school_year is None:
+            raise ValueError(f"Không có snapshot cho {school_key}")
+        return snapshot_store.iter_records(school_key, school_year, record_type)
+    return iter_workflow_records(source, record_type)
+
+
+def _describe_source(source: str) -> Dict[str, Any]:
+    if source.startswith('snapshot:'):
+        return {'source': source}
+    metadata = read_workflow_metadata(source)
+    return {
+        'source': source,
+        'school_name': metadata.get('school_info', {}).get('name'),
+        'processed_at': metadata.get('metadata', {}).get('processed_at'),
+        'workflow_type': metadata.get('metadata', {}).get('workflow_type')
+    }
+
+
+class _JSONReportWriter:
+    """Ghi báo cáo JSON dần: {'old', 'new', 'changes': [...], 'summary'}"""
+
+    def __init__(self, path: str, header: Dict[str, Any]):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.file.write(json.dumps(header, ensure_ascii=False)[:-1] + ', "changes": [\n')
+        self.count = 0
+
+    def write(self, change: Dict[str, Any]) -> None:
+        if self.count:
+            self.file.write(',\n')
+        json.dump(change, self.file, ensure_ascii=False)
+        self.count += 1
+
+    def close(self, summary: Dict[str, Any]) -> None:
+        self.file.write('\n], "summary": ' + json.dumps(summary, ensure_ascii=False) + '}\n')
+        self.file.close()
+
+
+class _ExcelReportWriter:
+    """Ghi báo cáo Excel ở chế độ write-only (từng dòng, không giữ workbook trong bộ nhớ)"""
+
+    HEADERS = ['Loại', 'Thay đổi', 'Tài khoản', 'Họ và tên', 'Trường thông tin', 'Giá trị cũ', 'Giá trị mới']
+
+    def __init__(self, path: str, header: Dict[str, Any]):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.summary_sheet = self.workbook.create_sheet('TONG-HOP')
+        self.sheets = {}
+        for record_type in RECORD_TYPES:
+            sheet = self.workbook.create_sheet('GIAO-VIEN' if record_type == 'teachers' else 'HOC-SINH')
+            sheet.append(self.HEADERS)
+            self.sheets[record_type] = sheet
+        for label, source in (('Lần trước', header['old']), ('Lần này', header['new'])):
+            self.summary_sheet.append([label, source.get('source'), source.get('processed_at') or ''])
+        self.summary_sheet.append([])
+
+    def write(self, change: Dict[str, Any]) -> None:
+        sheet = self.sheets[change['record_type']]
+        type_label = TYPE_LABELS[change['record_type']]
+        change_label = CHANGE_LABELS[change['change']]
+        if change['change'] != CHANGE_MODIFIED:
+            sheet.append([type_label, change_label, change['key'], change['name'], '', '', ''])
+            return
+        for field_change in change['changes']:
+            sheet.append([type_label, change_label, change['key'], change['name'], field_change['label'],
+                          field_change['old'], field_change['new']])
+
+    def close(self, summary: Dict[str, Any]) -> None:
+        self.summary_sheet.append(['Loại', 'Thêm mới', 'Bị xóa', 'Thay đổi', 'Không đổi', 'Tổng lần trước', 'Tổng lần này'])
+        for record_type, counts in summary.items():
+            self.summary_sheet.append([
+                TYPE_LABELS[record_type], counts[CHANGE_ADDED], counts[CHANGE_REMOVED], counts[CHANGE_MODIFIED],
+                counts['unchanged'], counts['old_total'], counts['new_total']
+            ])
+        self.workbook.save(self.path)
+
+
+def write_diff_report(old_source: str, new_source: str, output_path: str,
+                      record_types: Iterable[str] = RECORD_TYPES) -> Dict[str, Any]:
+    """
+    So sánh hai nguồn và ghi báo cáo (.json và/hoặc .xlsx theo đuôi file output_path)
+
+    Args:
+        old_source (str): File workflow JSON hoặc 'snapshot:<school_key>[:<năm học>]' của lần trước
+        new_source (str): Nguồn của lần này
+        output_path (str): File báo cáo .xlsx hoặc .json
+        record_types (Iterable[str]): Loại dữ liệu cần so sánh
+
+    Returns:
+        Dict[str, Any]: {'success', 'output_path', 'summary'} hoặc {'success': False, 'error'}
+    """
+    try:
+        header = {
+            'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'old': _describe_source(old_source),
+            'new': _describe_source(new_source)
+        }
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if output_path.lower().endswith('.json'):
+            writer = _JSONReportWriter(output_path, header)
+        else:
+            writer = _ExcelReportWriter(output_path, header)
+
+        summary = {}
+        for record_type in record_types:
+            engine = SnapshotDiff(record_type)
+            for change in engine.diff(open_source(old_source, record_type), open_source(new_source, record_type)):
+                writer.write(change)
+            summary[record_type] = engine.summary
+        writer.close(summary)
+        return {'success': True, 'output_path': output_path, 'summary': summary}
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+def print_diff_summary(summary: Dict[str, Dict[str, int]]) -> None:
+    """In tóm tắt thay đổi"""
+    for record_type, counts in summary.items():
+        print(f"   {'👨‍🏫' if record_type == 'teachers' else '👨‍🎓'} {TYPE_LABELS[record_type]}: "
+              f"+{counts[CHANGE_ADDED]} mới, -{counts[CHANGE_REMOVED]} xóa, "
+              f"~{counts[CHANGE_MODIFIED]} thay đổi, {counts['unchanged']} không đổi "
+              f"({counts['old_total']} → {counts['new_total']})")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='So sánh dữ liệu GV/HS giữa hai lần chạy')
+    parser.add_argument('old', help='File workflow JSON hoặc snapshot:<admin_email>[:<năm học>] của lần trước')
+    parser.add_argument('new', help='Nguồn của lần này')
+    parser.add_argument('--output', default=None, help='File báo cáo .xlsx hoặc .json')
+    parser.add_argument('--type', choices=RECORD_TYPES, default=None, help='Chỉ so sánh một loại dữ liệu')
+    args = parser.parse_args(argv)
+
+    output_path = args.output or os.path.join(
+        'data', 'output', f"diff_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
+    result = write_diff_report(args.old, args.new, output_path, [args.type] if args.type else RECORD_TYPES)
+    if not result['success']:
+        print(f"❌ Lỗi so sánh: {result['error']}")
+        return 1
+    print(f"✅ Đã ghi báo cáo: {result['output_path']}")
+    print_diff_summary(result['summary'])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
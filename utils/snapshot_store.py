@@ -0,0 +1,531 @@
+"""
+Snapshot Store
+Lưu dữ liệu giáo viên/học sinh OnLuyen của từng trường theo năm học vào SQLite
+(WAL) để so khớp, so sánh giữa các lần chạy và xuất lại Excel mà không phải
+parse lại các file unified_workflow_*.json lớn
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.match_state import record_identity, record_fingerprint
+
+DEFAULT_DB_PATH = os.path.join('data', 'cache', 'snapshots.db')
+RECORD_TYPES = ('teachers', 'students')
+
+_RECORD_COLUMNS = """
+    school_key TEXT NOT NULL,
+    school_year INTEGER NOT NULL,
+    record_id TEXT NOT NULL,
+    account TEXT,
+    full_name TEXT,
+    name_norm TEXT,
+    birth_norm TEXT,
+    match_account TEXT,
+    date_create TEXT,
+    class_name TEXT,
+    fingerprint TEXT,
+    content_hash TEXT,
+    data TEXT NOT NULL,
+    fetched_at TEXT,
+    PRIMARY KEY (school_key, school_year, record_id)
+"""
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS schools (
+        school_key TEXT NOT NULL,
+        school_year INTEGER NOT NULL,
+        school_name TEXT,
+        teachers_count INTEGER DEFAULT 0,
+        students_count INTEGER DEFAULT 0,
+        last_fetch_at TEXT,
+        PRIMARY KEY (school_key, school_year)
+    )""",
+    """CREATE TABLE IF NOT EXISTS sync_state (
+        school_key TEXT NOT NULL,
+        school_year INTEGER NOT NULL,
+        record_type TEXT NOT NULL,
+        high_water_mark TEXT,
+        last_sync_at TEXT,
+        last_full_sync_at TEXT,
+        PRIMARY KEY (school_key, school_year, record_type)
+    )""",
+] + [
+    statement
+    for table in RECORD_TYPES
+    for statement in (
+        f"CREATE TABLE IF NOT EXISTS {table} ({_RECORD_COLUMNS})",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_name ON {table} (school_key, school_year, name_norm)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_birth ON {table} (school_key, school_year, birth_norm)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_account ON {table} (account)",
+    )
+]
+
+
+def record_content_hash(record: Dict[str, Any]) -> str:
+    """Hash toàn bộ nội dung record (phát hiện cả thay đổi lớp, mật khẩu... ngoài các field so khớp)"""
+    raw = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _record_account(record: Dict[str, Any]) -> str:
+    info = record.get('userInfo') or record.get('teacherInfo') or {}
+    return (record.get('account') or info.get('userName') or info.get('account') or '').lower().strip()
+
+
+def _record_class_name(record: Dict[str, Any]) -> str:
+    group_class = record.get('groupClass') or []
+    if group_class and isinstance(group_class[0], dict):
+        return group_class[0].get('className', '') or ''
+    return ''
+
+
+class SnapshotStore:
+    """Kho snapshot SQLite: mỗi trường + năm học giữ bản mới nhất của GV/HS"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        """
+        Khởi tạo SnapshotStore
+
+        Args:
+            db_path (str): Đường dẫn file SQLite
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._initialized = False
+
+    # ------------------------------------------------------------------
+    # Connection
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection riêng cho từng thread (sqlite3 không chia sẻ connection giữa thread)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            self._local.conn = conn
+            with self._lock:
+                if not self._initialized:
+                    with conn:
+                        for statement in _SCHEMA:
+                            conn.execute(statement)
+                    self._initialized = True
+        return conn
+
+    def close(self) -> None:
+        """Đóng connection của thread hiện tại"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _table(record_type: str) -> str:
+        if record_type not in RECORD_TYPES:
+            raise ValueError(f"record_type không hợp lệ: {record_type}")
+        return record_type
+
+    # ------------------------------------------------------------------
+    # Write
+    # ------------------------------------------------------------------
+
+    def upsert_records(self, school_key: str, school_year: int, record_type: str,
+                       records: List[Dict[str, Any]],
+                       key_func: Callable[[Dict[str, Any]], Tuple[str, str, str]] = None,
+                       full_snapshot: bool = True, school_name: str = None) -> Dict[str, int]:
+        """
+        Ghi danh sách record của một lần fetch (một transaction, executemany)
+
+        Record có nội dung không đổi được bỏ qua (không tính lại key chuẩn hóa,
+        không ghi lại JSON) nên lần fetch thứ hai của 50k dòng gần như chỉ tốn thời gian hash.
+
+        Args:
+            school_key (str): Key của trường (admin email)
+            school_year (int): Năm học
+            record_type (str): "teachers" hoặc "students"
+            records (List[Dict]): Record thô từ OnLuyen API
+            key_func (Callable): record -> (name_norm, birth_norm, account) dùng để so khớp, lưu nguyên giá trị
+                trả về (cột account riêng luôn là tài khoản hiển thị của record)
+            full_snapshot (bool): True nếu records là toàn bộ dữ liệu → xóa record không còn trên OnLuyen;
+                False khi chỉ ghi thêm phần delta
+            school_name (str): Tên trường (lưu vào bảng schools)
+
+        Returns:
+            Dict[str, int]: {'inserted', 'updated', 'unchanged', 'removed'}
+        """
+        table = self._table(record_type)
+        school_year = int(school_year or 0)
+        conn = self._connect()
+        fetched_at = datetime.now().isoformat(timespec='seconds')
+
+        existing = dict(conn.execute(
+            f"SELECT record_id, content_hash FROM {table} WHERE school_key = ? AND school_year = ?",
+            (school_key, school_year)
+        ))
+
+        rows = []
+        seen = set()
+        stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'removed': 0}
+        for record in records:
+            record_id = record_identity(record)
+            if not record_id or record_id in seen:
+                continue
+            seen.add(record_id)
+            content_hash = record_content_hash(record)
+            previous = existing.get(record_id, False)
+            if previous == content_hash:
+                stats['unchanged'] += 1
+                continue
+            stats['updated' if previous is not False else 'inserted'] += 1
+
+            # Không có key_func thì để NULL: get_match_keys bỏ qua, phía so khớp tự tính lại key
+            name_norm, birth_norm, match_account = key_func(record) if key_func else (None, None, None)
+            info = record.get('userInfo') or record.get('teacherInfo') or {}
+            rows.append((
+                school_key, school_year, record_id, _record_account(record),
+                record.get('fullName') or info.get('displayName', ''), name_norm, birth_norm, match_account,
+                record.get('dateCreate') or '', _record_class_name(record), record_fingerprint(record),
+                content_hash, json.dumps(record, ensure_ascii=False, separators=(',', ':')), fetched_at
+            ))
+
+        removed_ids = [(school_key, school_year, record_id) for record_id in existing if record_id not in seen] \
+            if full_snapshot else []
+
+        with self._lock, conn:
+            conn.executemany(
+                f"""INSERT INTO {table} (school_key, school_year, record_id, account, full_name, name_norm,
+                        birth_norm, match_account, date_create, class_name, fingerprint, content_hash, data,
+                        fetched_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (school_key, school_year, record_id) DO UPDATE SET
+                        account = excluded.account, full_name = excluded.full_name,
+                        name_norm = excluded.name_norm, birth_norm = excluded.birth_norm,
+                        match_account = excluded.match_account,
+                        date_create = excluded.date_create, class_name = excluded.class_name,
+                        fingerprint = excluded.fingerprint, content_hash = excluded.content_hash,
+                        data = excluded.data,
+                        fetched_at = excluded.fetched_at""",
+                rows
+            )
+            if removed_ids:
+                conn.executemany(
+                    f"DELETE FROM {table} WHERE school_key = ? AND school_year = ? AND record_id = ?",
+                    removed_ids
+                )
+            stats['removed'] = len(removed_ids)
+
+            count = conn.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE school_key = ? AND school_year = ?",
+                (school_key, school_year)
+            ).fetchone()[0]
+            conn.execute(
+                """INSERT INTO schools (school_key, school_year, school_name, last_fetch_at)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT (school_key, school_year) DO UPDATE SET
+                       school_name = COALESCE(excluded.school_name, schools.school_name),
+                       last_fetch_at = excluded.last_fetch_at""",
+                (school_key, school_year, school_name, fetched_at)
+            )
+            conn.execute(
+                f"UPDATE schools SET {record_type}_count = ? WHERE school_key = ? AND school_year = ?",
+                (count, school_key, school_year)
+            )
+
+        return stats
+
+    def update_sync_state(self, school_key: str, school_year: int, record_type: str,
+                          high_water_mark: str = None, full_sync: bool = False,
+                          reset_full_sync: bool = False) -> None:
+        """
+        Ghi mốc đồng bộ (high-water mark dateCreate) sau một lần fetch
+
+        Args:
+            school_key (str): Key của trường
+            school_year (int): Năm học
+            record_type (str): "teachers" hoặc "students"
+            high_water_mark (str): dateCreate lớn nhất đã lưu (không lùi mốc cũ)
+            full_sync (bool): Lần fetch này lấy toàn bộ dữ liệu
+            reset_full_sync (bool): Xóa mốc full sync để lần sau bắt buộc lấy toàn bộ
+        """
+        self._table(record_type)
+        conn = self._connect()
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock, conn:
+            conn.execute(
+                """INSERT INTO sync_state (school_key, school_year, record_type, high_water_mark,
+                        last_sync_at, last_full_sync_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (school_key, school_year, record_type) DO UPDATE SET
+                       high_water_mark = CASE
+                           WHEN sync_state.high_water_mark IS NULL THEN excluded.high_water_mark
+                           WHEN excluded.high_water_mark IS NULL THEN sync_state.high_water_mark
+                           ELSE MAX(sync_state.high_water_mark, excluded.high_water_mark) END,
+                       last_sync_at = excluded.last_sync_at,
+                       last_full_sync_at = COALESCE(excluded.last_full_sync_at, sync_state.last_full_sync_at)""",
+                (school_key, int(school_year), record_type, high_water_mark or None, now, now if full_sync else None)
+            )
+            if reset_full_sync:
+                conn.execute(
+                    """UPDATE sync_state SET last_full_sync_at = NULL
+                       WHERE school_key = ? AND school_year = ? AND record_type = ?""",
+                    (school_key, int(school_year), record_type)
+                )
+
+    def get_sync_state(self, school_key: str, school_year: int, record_type: str) -> Optional[Dict[str, Any]]:
+        """
+        Mốc đồng bộ của trường/năm học
+
+        Returns:
+            Optional[Dict]: {'high_water_mark', 'last_sync_at', 'last_full_sync_at'} hoặc None
+        """
+        row = self._connect().execute(
+            """SELECT high_water_mark, last_sync_at, last_full_sync_at FROM sync_state
+               WHERE school_key = ? AND school_year = ? AND record_type = ?""",
+            (school_key, int(school_year), record_type)
+        ).fetchone()
+        if not row:
+            return None
+        return {'high_water_mark': row[0], 'last_sync_at': row[1], 'last_full_sync_at': row[2]}
+
+    def delete_school(self, school_key: str, school_year: int = None) -> int:
+        """
+        Xóa snapshot của một trường (một năm học hoặc tất cả)
+
+        Returns:
+            int: Số record đã xóa
+        """
+        conn = self._connect()
+        where = "school_key = ?" + (" AND school_year = ?" if school_year is not None else "")
+        params = (school_key,) + ((int(school_year),) if school_year is not None else ())
+        removed = 0
+        with self._lock, conn:
+            for table in RECORD_TYPES:
+                removed += conn.execute(f"DELETE FROM {table} WHERE {where}", params).rowcount
+            conn.execute(f"DELETE FROM schools WHERE {where}", params)
+            conn.execute(f"DELETE FROM sync_state WHERE {where}", params)
+        return removed
+
+    # ------------------------------------------------------------------
+    # Read
+    # ------------------------------------------------------------------
+
+    def list_schools(self) -> List[Dict[str, Any]]:
+        """
+        Danh sách trường/năm học đã có snapshot (mới nhất trước)
+
+        Returns:
+            List[Dict]: {'school_key', 'school_year', 'school_name', 'teachers_count', 'students_count', 'last_fetch_at'}
+        """
+        conn = self._connect()
+        cursor = conn.execute(
+            """SELECT school_key, school_year, school_name, teachers_count, students_count, last_fetch_at
+               FROM schools ORDER BY last_fetch_at DESC"""
+        )
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def get_latest_year(self, school_key: str) -> Optional[int]:
+        """Năm học mới nhất đã lưu của trường"""
+        row = self._connect().execute(
+            "SELECT MAX(school_year) FROM schools WHERE school_key = ?", (school_key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def iter_records(self, school_key: str, school_year: int, record_type: str,
+                     batch_size: int = 2000) -> Iterator[Dict[str, Any]]:
+        """
+        Đọc record thô theo lô (không nạp toàn bộ vào bộ nhớ)
+
+        Yields:
+            Dict: Record OnLuyen (đúng cấu trúc API)
+        """
+        table = self._table(record_type)
+        cursor = self._connect().execute(
+            f"SELECT data FROM {table} WHERE school_key = ? AND school_year = ? ORDER BY rowid",
+            (school_key, int(school_year))
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for (data,) in rows:
+                yield json.loads(data)
+
+    def get_records(self, school_key: str, school_year: int, record_type: str) -> List[Dict[str, Any]]:
+        """Toàn bộ record thô của trường/năm học"""
+        return list(self.iter_records(school_key, school_year, record_type))
+
+    def count_records(self, school_key: str, school_year: int, record_type: str) -> int:
+        """Số record của trường/năm học"""
+        table = self._table(record_type)
+        return self._connect().execute(
+            f"SELECT COUNT(*) FROM {table} WHERE school_key = ? AND school_year = ?",
+            (school_key, int(school_year))
+        ).fetchone()[0]
+
+    def get_record_ids(self, school_key: str, school_year: int, record_type: str) -> set:
+        """Tập record_id đã lưu của trường/năm học"""
+        table = self._table(record_type)
+        cursor = self._connect().execute(
+            f"SELECT record_id FROM {table} WHERE school_key = ? AND school_year = ?",
+            (school_key, int(school_year))
+        )
+        return {row[0] for row in cursor}
+
+    def get_match_keys(self, school_key: str, school_year: int,
+                       record_type: str) -> Dict[str, Tuple[str, str, str, str]]:
+        """
+        Key so khớp đã chuẩn hóa của các record (không parse JSON), đúng như key_func trả về lúc ghi
+
+        Returns:
+            Dict[str, Tuple]: {record_id: (fingerprint, name_norm, birth_norm, match_account)}
+        """
+        table = self._table(record_type)
+        cursor = self._connect().execute(
+            f"""SELECT record_id, fingerprint, name_norm, birth_norm, match_account FROM {table}
+                WHERE school_key = ? AND school_year = ? AND match_account IS NOT NULL""",
+            (school_key, int(school_year))
+        )
+        return {row[0]: (row[1], row[2], row[3], row[4]) for row in cursor}
+
+    def find_by_name(self, name_norm: str, record_type: str, school_key: str = None,
+                     school_year: int = None, birth_norm: str = None) -> List[Dict[str, Any]]:
+        """
+        Tìm record theo tên đã chuẩn hóa (qua index), có thể giới hạn trường/năm/ngày sinh
+
+        Returns:
+            List[Dict]: {'school_key', 'school_year', 'record_id', 'account', 'full_name', 'birth_norm', 'class_name'}
+        """
+        table = self._table(record_type)
+        conditions, params = ["name_norm = ?"], [name_norm]
+        for column, value in (('school_key', school_key), ('school_year', school_year), ('birth_norm', birth_norm)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        cursor = self._connect().execute(
+            f"""SELECT school_key, school_year, record_id, account, full_name, birth_norm, class_name
+                FROM {table} WHERE {' AND '.join(conditions)}""",
+            params
+        )
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor]
+
+    def find_by_account(self, account: str, record_type: str = None) -> List[Dict[str, Any]]:
+        """
+        Tìm record theo tài khoản trên mọi trường/năm học
+
+        Returns:
+            List[Dict]: {'record_type', 'school_key', 'school_year', 'record_id', 'full_name', 'class_name'}
+        """
+        results = []
+        for table in ([self._table(record_type)] if record_type else RECORD_TYPES):
+            cursor = self._connect().execute(
+                f"""SELECT school_key, school_year, record_id, full_name, class_name FROM {table}
+                    WHERE account = ?""",
+                (account.lower().strip(),)
+            )
+            for row in cursor:
+                results.append(dict(zip(('school_key', 'school_year', 'record_id', 'full_name', 'class_name'), row),
+                                    record_type=table))
+        return results
+
+    def build_unified_section(self, school_key: str, school_year: int, record_type: str) -> Dict[str, Any]:
+        """
+        Phần 'teachers'/'students' của unified workflow JSON dựng từ snapshot
+
+        Returns:
+            Dict[str, Any]: {'success', 'total_count', 'retrieved_count', 'data'}
+        """
+        records = self.get_records(school_key, school_year, record_type)
+        return {
+            'success': bool(records),
+            'total_count': len(records),
+            'retrieved_count': len(records),
+            'data': records
+        }
+
+    def export_workflow_json(self, school_key: str, school_year: int, output_path: str,
+                             school_info: Dict[str, Any] = None, ht_hp_info: Dict[str, Any] = None) -> Optional[str]:
+        """
+        Ghi unified workflow JSON (case_1) từ snapshot, ghi từng record ra file thay vì dựng
+        toàn bộ payload trong bộ nhớ
+
+        Args:
+            school_key (str): Key của trường
+            school_year (int): Năm học
+            output_path (str): File JSON đích
+            school_info (Dict): {'name', 'admin_email', 'drive_link', 'admin_password'}
+            ht_hp_info (Dict): Thông tin HT/HP cho sheet ADMIN
+
+        Returns:
+            Optional[str]: Đường dẫn file hoặc None nếu lỗi
+        """
+        try:
+            now = datetime.now()
+            header = {
+                'metadata': {
+                    'workflow_type': 'case_1',
+                    'timestamp': now.strftime('%Y%m%d_%H%M%S'),
+                    'processed_at': now.strftime('%Y-%m-%d %H:%M:%S'),
+                    'version': '1.0',
+                    'source': 'snapshot_store',
+                    'school_year': school_year
+                },
+                'school_info': school_info or {'name': school_key, 'admin_email': school_key},
+                'ht_hp_info': ht_hp_info or {}
+            }
+            directory = os.path.dirname(output_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(header, ensure_ascii=False)[:-1])
+                for record_type in RECORD_TYPES:
+                    count = self.count_records(school_key, school_year, record_type)
+                    f.write(f', "{record_type}": {{"success": {"true" if count else "false"}, '
+                            f'"total_count": {count}, "retrieved_count": {count}, "data": [')
+                    for index, record in enumerate(self.iter_records(school_key, school_year, record_type)):
+                        if index:
+                            f.write(',')
+                        json.dump(record, f, ensure_ascii=False)
+                    f.write(']}')
+                f.write('}')
+            return output_path
+        except Exception as e:
+            print(f"❌ Lỗi xuất snapshot {school_key} ({school_year}): {e}")
+            return None
+
+
+_snapshot_store = None
+
+
+def get_snapshot_store() -> Optional[SnapshotStore]:
+    """
+    Lấy SnapshotStore global theo cấu hình (SNAPSHOT_STORE_ENABLED, SNAPSHOT_DB_PATH)
+
+    Returns:
+        Optional[SnapshotStore]: Store hoặc None nếu tắt snapshot store
+    """
+    global _snapshot_store
+    from config.config_manager import get_config
+
+    snapshot_config = get_config().get_snapshot_config()
+    if not snapshot_config['enabled']:
+        return None
+    if _snapshot_store is None or _snapshot_store.db_path != snapshot_config['db_path']:
+        _snapshot_store = SnapshotStore(snapshot_config['db_path'])
+    return _snapshot_store
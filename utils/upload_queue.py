@@ -0,0 +1,465 @@
+"""
+Drive Upload Queue
+Hàng đợi upload file Excel lên Google Drive chạy nền, lưu trạng thái ra file
+để không mất job khi khởi động lại, tự retry với backoff khi lỗi
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import os
+import re
+import json
+import uuid
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .menu_utils import print_status
+
+
+# Trạng thái của một upload job
+JOB_PENDING = 'pending'
+JOB_UPLOADING = 'uploading'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+DEFAULT_QUEUE_FILE = os.path.join('data', 'temp', 'upload_queue.json')
+
+DRIVE_FOLDER_PATTERNS = [
+    r'drive\.google\.com/drive/folders/([a-zA-Z0-9-_]+)',
+    r'drive\.google\.com/drive/u/\d+/folders/([a-zA-Z0-9-_]+)',
+    r'drive\.google\.com/open\?id=([a-zA-Z0-9-_]+)',
+    r'/folders/([a-zA-Z0-9-_]+)',
+    r'id=([a-zA-Z0-9-_]+)'
+]
+
+
+def extract_drive_folder_id(drive_link: str) -> Optional[str]:
+    """
+    Extract folder ID từ Google Drive link
+
+    Args:
+        drive_link (str): Link Google Drive folder
+
+    Returns:
+        Optional[str]: Folder ID hoặc None nếu link không hợp lệ
+    """
+    if not drive_link or drive_link == 'N/A':
+        return None
+
+    for pattern in DRIVE_FOLDER_PATTERNS:
+        match = re.search(pattern, drive_link)
+        if match:
+            return match.group(1)
+
+    return None
+
+
+def _default_drive_uploader() -> Callable[[str, str, str], Optional[str]]:
+    """
+    Tạo hàm upload mặc định dùng GoogleOAuthDriveClient
+
+    Client chỉ được khởi tạo khi worker upload job đầu tiên và được dùng lại
+    cho các job sau, thay vì tạo client mới cho mỗi file.
+
+    Returns:
+        Callable: Hàm (local_path, folder_id, filename) -> URL hoặc None
+    """
+    state = {'client': None}
+
+    def upload(local_path: str, folder_id: str, filename: str) -> Optional[str]:
+        if state['client'] is None:
+            from config.google_oauth_drive import GoogleOAuthDriveClient
+            client = GoogleOAuthDriveClient()
+            if not client.is_authenticated():
+                raise RuntimeError("OAuth chưa được setup hoặc token hết hạn")
+            state['client'] = client
+
+        return state['client'].upload_file_to_folder_id(
+            local_path=local_path,
+            folder_id=folder_id,
+            filename=filename
+        )
+
+    return upload
+
+
+class DriveUploadQueue:
+    """Hàng đợi upload Google Drive bền vững với background worker"""
+
+    def __init__(self, queue_file: str = DEFAULT_QUEUE_FILE,
+                 uploader: Optional[Callable[[str, str, str], Optional[str]]] = None,
+                 max_attempts: int = 5, base_delay: float = 5.0, max_delay: float = 300.0):
+        """
+        Khởi tạo DriveUploadQueue
+
+        Args:
+            queue_file (str): File JSON lưu trạng thái hàng đợi
+            uploader (Callable): Hàm upload (local_path, folder_id, filename) -> URL,
+                mặc định dùng GoogleOAuthDriveClient
+            max_attempts (int): Số lần thử tối đa trước khi đánh dấu thất bại
+            base_delay (float): Thời gian chờ (giây) trước lần retry đầu tiên
+            max_delay (float): Thời gian chờ tối đa giữa các lần retry
+        """
+        self.queue_file = queue_file
+        self.uploader = uploader or _default_drive_uploader()
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.jobs: List[Dict[str, Any]] = []
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+        self._condition = threading.Condition()
+        self._worker = None
+        self._stop_requested = False
+
+        self._load_state()
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _load_state(self) -> None:
+        """Đọc trạng thái hàng đợi từ file, khôi phục các job đang dở"""
+        path = Path(self.queue_file)
+        if not path.exists():
+            return
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+
+            # Job đã upload xong không cần khôi phục (file cũ có thể còn giữ chúng)
+            self.jobs = [job for job in data.get('jobs', []) if job.get('status') != JOB_DONE]
+
+            # Job đang upload khi tắt ứng dụng được đưa về pending để chạy lại
+            restored = 0
+            for job in self.jobs:
+                if job.get('status') == JOB_UPLOADING:
+                    job['status'] = JOB_PENDING
+                    restored += 1
+
+            pending = sum(1 for job in self.jobs if job.get('status') == JOB_PENDING)
+            if pending:
+                print_status(f"📤 Khôi phục {pending} file chờ upload ({restored} job đang dở)", "info")
+
+        except Exception as e:
+            print_status(f"⚠️ Không đọc được upload queue {self.queue_file}: {e}", "warning")
+            self.jobs = []
+
+    def _save_state(self) -> None:
+        """
+        Ghi trạng thái hàng đợi ra file (atomic), gọi khi đang giữ lock
+
+        Chỉ lưu job chưa upload xong: job done vẫn giữ trong bộ nhớ cho get_job()
+        nhưng không làm file trạng thái phình ra theo thời gian
+        """
+        try:
+            path = Path(self.queue_file)
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+            tmp_path = path.with_suffix(path.suffix + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'updated_at': datetime.now().isoformat(),
+                    'jobs': [job for job in self.jobs if job.get('status') != JOB_DONE]
+                }, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+
+        except Exception as e:
+            print_status(f"⚠️ Không lưu được upload queue: {e}", "warning")
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def add_listener(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Đăng ký callback nhận thông báo khi job thay đổi trạng thái
+
+        Args:
+            callback (Callable): Hàm nhận bản sao dict của job, được gọi từ worker thread
+        """
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Hủy đăng ký callback"""
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def enqueue(self, file_path: str, drive_link: str, school_name: str = '') -> Dict[str, Any]:
+        """
+        Thêm file vào hàng đợi upload và khởi động worker nếu cần
+
+        Args:
+            file_path (str): Đường dẫn file cần upload
+            drive_link (str): Link Google Drive folder đích
+            school_name (str): Tên trường (để hiển thị)
+
+        Returns:
+            Dict[str, Any]: {'success': bool, 'job_id': str, 'error': str}
+        """
+        if not file_path or not os.path.exists(file_path):
+            return {'success': False, 'job_id': None, 'error': f'File không tồn tại: {file_path}'}
+
+        if not drive_link or 'drive.google.com' not in drive_link:
+            return {'success': False, 'job_id': None, 'error': 'Drive link không hợp lệ'}
+
+        folder_id = extract_drive_folder_id(drive_link)
+        if not folder_id:
+            return {'success': False, 'job_id': None, 'error': 'Không thể extract folder ID từ Drive link'}
+
+        now = datetime.now().isoformat()
+        job = {
+            'id': uuid.uuid4().hex[:12],
+            'file_path': os.path.abspath(file_path),
+            'file_name': os.path.basename(file_path),
+            'drive_link': drive_link,
+            'folder_id': folder_id,
+            'school_name': school_name,
+            'status': JOB_PENDING,
+            'attempts': 0,
+            'next_attempt_at': 0.0,
+            'last_error': None,
+            'url': None,
+            'created_at': now,
+            'updated_at': now
+        }
+
+        with self._condition:
+            self.jobs.append(job)
+            self._save_state()
+            self._condition.notify_all()
+
+        print_status(f"📥 Đã đưa vào hàng đợi upload: {job['file_name']}", "info")
+        self._notify(job)
+        self.start()
+
+        return {'success': True, 'job_id': job['id'], 'error': None}
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Lấy bản sao thông tin job theo ID"""
+        with self._condition:
+            for job in self.jobs:
+                if job['id'] == job_id:
+                    return dict(job)
+        return None
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Thống kê số job theo trạng thái
+
+        Returns:
+            Dict[str, int]: Số job pending/uploading/done/failed
+        """
+        stats = {JOB_PENDING: 0, JOB_UPLOADING: 0, JOB_DONE: 0, JOB_FAILED: 0}
+        with self._condition:
+            for job in self.jobs:
+                stats[job.get('status', JOB_PENDING)] = stats.get(job.get('status', JOB_PENDING), 0) + 1
+        return stats
+
+    def retry_failed(self) -> int:
+        """
+        Đưa các job thất bại về hàng đợi để thử lại
+
+        Returns:
+            int: Số job được đưa lại vào hàng đợi
+        """
+        count = 0
+        with self._condition:
+            for job in self.jobs:
+                if job.get('status') == JOB_FAILED:
+                    job['status'] = JOB_PENDING
+                    job['attempts'] = 0
+                    job['next_attempt_at'] = 0.0
+                    count += 1
+            if count:
+                self._save_state()
+                self._condition.notify_all()
+
+        if count:
+            self.start()
+        return count
+
+    def clear_finished(self) -> int:
+        """
+        Xóa các job đã upload xong khỏi hàng đợi trong bộ nhớ
+
+        Returns:
+            int: Số job đã xóa
+        """
+        with self._condition:
+            before = len(self.jobs)
+            self.jobs = [job for job in self.jobs if job.get('status') != JOB_DONE]
+            removed = before - len(self.jobs)
+        return removed
+
+    def start(self) -> None:
+        """Khởi động background worker (nếu chưa chạy)"""
+        with self._condition:
+            # _worker chỉ được đặt về None dưới lock khi worker thoát, nên không có khoảng
+            # hở giữa lúc worker quyết định thoát và lúc thread thực sự kết thúc
+            self._stop_requested = False
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._worker_loop, name='DriveUploadWorker')
+            self._worker.daemon = True
+            self._worker.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Dừng worker sau khi job hiện tại kết thúc
+
+        Args:
+            timeout (float): Thời gian chờ worker dừng (giây)
+        """
+        with self._condition:
+            self._stop_requested = True
+            worker = self._worker
+            self._condition.notify_all()
+
+        if worker:
+            worker.join(timeout)
+
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Chờ đến khi không còn job pending/uploading
+
+        Args:
+            timeout (float): Thời gian chờ tối đa (giây), None = chờ vô hạn
+
+        Returns:
+            bool: True nếu hàng đợi đã rỗng
+        """
+        deadline = None if timeout is None else datetime.now().timestamp() + timeout
+
+        with self._condition:
+            while self._has_active_jobs():
+                remaining = None if deadline is None else deadline - datetime.now().timestamp()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _has_active_jobs(self) -> bool:
+        """Kiểm tra còn job chưa xử lý xong, gọi khi đang giữ lock"""
+        return any(job.get('status') in (JOB_PENDING, JOB_UPLOADING) for job in self.jobs)
+
+    def _next_job(self) -> Optional[Dict[str, Any]]:
+        """
+        Chờ và lấy job tiếp theo đến hạn chạy
+
+        Returns:
+            Optional[Dict[str, Any]]: Job cần upload hoặc None nếu worker dừng
+        """
+        with self._condition:
+            while not self._stop_requested:
+                now = datetime.now().timestamp()
+                pending = [job for job in self.jobs if job.get('status') == JOB_PENDING]
+
+                if not pending:
+                    # Hết việc - worker thoát, enqueue() sẽ khởi động lại khi cần
+                    self._worker = None
+                    self._condition.notify_all()
+                    return None
+
+                due = min(pending, key=lambda job: job.get('next_attempt_at', 0.0))
+                wait_time = due.get('next_attempt_at', 0.0) - now
+
+                if wait_time <= 0:
+                    due['status'] = JOB_UPLOADING
+                    due['attempts'] = due.get('attempts', 0) + 1
+                    due['updated_at'] = datetime.now().isoformat()
+                    self._save_state()
+                    return due
+
+                self._condition.wait(wait_time)
+
+            self._worker = None
+            return None
+
+    def _worker_loop(self) -> None:
+        """Vòng lặp của background worker"""
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            self._notify(job)
+
+            url = None
+            error = None
+            try:
+                if not os.path.exists(job['file_path']):
+                    raise FileNotFoundError(f"File không tồn tại: {job['file_path']}")
+                url = self.uploader(job['file_path'], job['folder_id'], job['file_name'])
+                if not url:
+                    error = f"Upload thất bại cho {job['file_name']}"
+            except FileNotFoundError as e:
+                # File đã bị xóa - retry không có ý nghĩa
+                error = str(e)
+                job['attempts'] = self.max_attempts
+            except Exception as e:
+                error = f"Lỗi upload {job['file_name']}: {e}"
+
+            with self._condition:
+                job['updated_at'] = datetime.now().isoformat()
+                if url:
+                    job['status'] = JOB_DONE
+                    job['url'] = url
+                    job['last_error'] = None
+                elif job['attempts'] >= self.max_attempts:
+                    job['status'] = JOB_FAILED
+                    job['last_error'] = error
+                else:
+                    delay = min(self.base_delay * (2 ** (job['attempts'] - 1)), self.max_delay)
+                    job['status'] = JOB_PENDING
+                    job['last_error'] = error
+                    job['next_attempt_at'] = datetime.now().timestamp() + delay
+                self._save_state()
+                self._condition.notify_all()
+
+            if job['status'] == JOB_DONE:
+                print_status(f"✅ Upload nền thành công: {job['file_name']}", "success")
+            elif job['status'] == JOB_FAILED:
+                print_status(f"❌ Upload nền thất bại sau {job['attempts']} lần: {error}", "error")
+            else:
+                print_status(f"⚠️ {error} - thử lại lần {job['attempts'] + 1}/{self.max_attempts}", "warning")
+
+            self._notify(job)
+
+    def _notify(self, job: Dict[str, Any]) -> None:
+        """Gửi thông báo thay đổi trạng thái job cho các listener"""
+        snapshot = dict(job)
+        for callback in list(self.listeners):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print_status(f"⚠️ Lỗi listener upload queue: {e}", "warning")
+
+
+# Global upload queue instance (khởi tạo lazy)
+_upload_queue = None
+_upload_queue_lock = threading.Lock()
+
+
+def get_upload_queue() -> DriveUploadQueue:
+    """
+    Lấy instance DriveUploadQueue global, tự động chạy lại các job còn dở
+
+    Returns:
+        DriveUploadQueue: Instance upload queue
+    """
+    global _upload_queue
+    with _upload_queue_lock:
+        if _upload_queue is None:
+            _upload_queue = DriveUploadQueue()
+            if _upload_queue.get_stats()[JOB_PENDING]:
+                _upload_queue.start()
+        return _upload_queue
@@ -0,0 +1,231 @@
+"""
+Worker Client
+Client HTTP (chỉ dùng thư viện chuẩn) cho worker daemon: gửi job, nhận event tiến trình
+dạng stream và lấy kết quả. Console và UI dùng run_with_worker() để chuyển job sang
+daemon khi daemon đang chạy, không thì chạy trực tiếp trong process như cũ
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import json
+from typing import Any, Callable, Dict, Optional
+
+from utils.job_manager import JobCancelled, check_cancelled, report_progress
+
+_opener = None
+
+
+def _get_opener():
+    """Opener urllib không đi qua proxy hệ thống (daemon luôn ở localhost), import khi dùng lần đầu"""
+    global _opener
+    if _opener is None:
+        import urllib.request
+        _opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+    return _opener
+
+
+class WorkerClient:
+    """Client của worker daemon"""
+
+    def __init__(self, base_url: str, token: str = '', timeout: float = 10.0):
+        """
+        Khởi tạo WorkerClient
+
+        Args:
+            base_url (str): URL daemon, vd http://127.0.0.1:8766
+            token (str): Giá trị header X-Worker-Token
+            timeout (float): Timeout (giây) cho các request thường
+        """
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    def _open(self, method: str, path: str, payload: Dict[str, Any] = None, timeout: float = None):
+        """Gửi request, trả về response (lỗi HTTP cũng trả về response để đọc body JSON)"""
+        import urllib.error
+        import urllib.request
+
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(f"{self.base_url}{path}", data=data, method=method)
+        request.add_header('Content-Type', 'application/json; charset=utf-8')
+        if self.token:
+            request.add_header('X-Worker-Token', self.token)
+        try:
+            return _get_opener().open(request, timeout=timeout or self.timeout)
+        except urllib.error.HTTPError as e:
+            return e
+
+    def _request(self, method: str, path: str, payload: Dict[str, Any] = None,
+                 timeout: float = None) -> Dict[str, Any]:
+        """
+        Gửi request và đọc JSON
+
+        Returns:
+            Dict[str, Any]: Body JSON hoặc {'success': False, 'error': ...} khi không kết nối được
+        """
+        try:
+            with self._open(method, path, payload, timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except (OSError, ValueError) as e:
+            return {'success': False, 'error': f"Không kết nối được worker daemon: {e}"}
+
+    def is_available(self, timeout: float = 0.5) -> bool:
+        """Daemon có đang chạy và nhận request không"""
+        return bool(self._request('GET', '/health', timeout=timeout).get('success'))
+
+    def get_health(self) -> Dict[str, Any]:
+        """Trạng thái daemon"""
+        return self._request('GET', '/health')
+
+    def submit(self, job_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Gửi job
+
+        Args:
+            job_type (str): case_1, case_1_multi_year, case_2, convert, upload
+            params (Dict[str, Any]): Tham số job
+
+        Returns:
+            Dict[str, Any]: {'success': bool, 'job_id': str, 'error': str}
+        """
+        return self._request('POST', '/jobs', {'type': job_type, 'params': params})
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Thông tin/kết quả job (None nếu không có)"""
+        return self._request('GET', f"/jobs/{job_id}").get('job')
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """Hủy job (job đang chạy dừng ở điểm kiểm tra kế tiếp)"""
+        return self._request('POST', f"/jobs/{job_id}/cancel", {})
+
+    def stream_events(self, job_id: str, on_event: Callable[[Dict[str, Any]], None] = None,
+                      since: int = 0, max_reconnects: int = 3) -> Optional[Dict[str, Any]]:
+        """
+        Nhận event của job tới khi job kết thúc (tự kết nối lại từ event cuối khi đứt kết nối)
+
+        Args:
+            job_id (str): ID job
+            on_event (Callable): Hàm gọi với mỗi event {seq, time, type, level, message}
+            since (int): Nhận từ event có seq này
+            max_reconnects (int): Số lần kết nối lại tối đa
+
+        Khi chạy trong một job (JobManager) bị hủy, gửi lệnh hủy tới daemon rồi raise JobCancelled
+
+        Returns:
+            Optional[Dict[str, Any]]: Thông tin job khi kết thúc hoặc None nếu mất kết nối
+        """
+        reconnects = 0
+        while reconnects <= max_reconnects:
+            try:
+                # Daemon gửi heartbeat mỗi 2 giây nên timeout đọc 60 giây là đủ
+                with self._open('GET', f"/jobs/{job_id}/stream?since={since}", timeout=60) as response:
+                    if response.status != 200:
+                        return None
+                    for raw_line in response:
+                        # Mỗi dòng (kể cả heartbeat) là một điểm kiểm tra hủy
+                        check_cancelled()
+                        if not raw_line.strip():
+                            continue
+                        event = json.loads(raw_line.decode('utf-8'))
+                        if event.get('type') == 'end':
+                            return event.get('job')
+                        if event.get('type') == 'heartbeat':
+                            continue
+                        since = event['seq'] + 1
+                        if event.get('type') == 'progress':
+                            report_progress(event.get('progress', 0), event['message'])
+                        if on_event:
+                            on_event(event)
+            except JobCancelled:
+                self.cancel(job_id)
+                raise
+            except (OSError, ValueError):
+                pass
+            reconnects += 1
+        return self.get_job(job_id)
+
+    def run_job(self, job_type: str, params: Dict[str, Any],
+                on_event: Callable[[Dict[str, Any]], None] = None) -> Dict[str, Any]:
+        """
+        Gửi job và chờ kết quả
+
+        Returns:
+            Dict[str, Any]: {'submitted': bool, 'job_id', 'status', 'result', 'error'}
+        """
+        submit_result = self.submit(job_type, params)
+        if not submit_result.get('success'):
+            return {'submitted': False, 'job_id': None, 'status': None, 'result': None,
+                    'error': submit_result.get('error')}
+
+        job_id = submit_result['job_id']
+        job = self.stream_events(job_id, on_event) or {}
+        return {
+            'submitted': True,
+            'job_id': job_id,
+            'status': job.get('status'),
+            'result': job.get('result'),
+            'error': job.get('error') or (None if job else 'Mất kết nối với worker daemon')
+        }
+
+
+def read_token_file(token_file: str) -> str:
+    """Đọc token daemon ghi khi khởi động (rỗng nếu không có file)"""
+    try:
+        with open(token_file, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def get_worker_client() -> Optional[WorkerClient]:
+    """
+    Lấy WorkerClient nếu bật WORKER_DAEMON_ENABLED và daemon đang chạy
+
+    Returns:
+        Optional[WorkerClient]: Client hoặc None (chạy job trực tiếp trong process)
+    """
+    from config.config_manager import get_config
+
+    daemon_config = get_config().get_worker_daemon_config()
+    if not daemon_config['enabled']:
+        return None
+
+    token = daemon_config['token'] or read_token_file(daemon_config['token_file'])
+    if not token:
+        # Daemon chưa chạy (token file chỉ tồn tại khi daemon đang chạy)
+        return None
+
+    client = WorkerClient(f"http://{daemon_config['host']}:{daemon_config['port']}", token=token)
+    return client if client.is_available() else None
+
+
+def run_with_worker(job_type: str, params: Dict[str, Any], local_runner: Callable[[], Any],
+                    on_event: Callable[[Dict[str, Any]], None] = None) -> Any:
+    """
+    Chạy job trên worker daemon nếu có, không thì gọi local_runner()
+
+    Args:
+        job_type (str): Loại job của daemon
+        params (Dict[str, Any]): Tham số job (phải JSON được)
+        local_runner (Callable): Hàm chạy trực tiếp khi không có daemon
+        on_event (Callable): Hàm nhận event tiến trình, mặc định in message ra console
+
+    Returns:
+        Any: Kết quả job (giống kết quả của local_runner)
+    """
+    worker = get_worker_client()
+    if worker is None:
+        return local_runner()
+
+    if on_event is None:
+        on_event = lambda event: print(event['message']) if event['type'] == 'log' else None
+
+    print(f"🛰️ Gửi job '{job_type}' tới worker daemon {worker.base_url}")
+    outcome = worker.run_job(job_type, params, on_event)
+    if not outcome['submitted']:
+        print(f"⚠️ Worker daemon không nhận job ({outcome['error']}) - chạy trực tiếp")
+        return local_runner()
+
+    if outcome['error']:
+        print(f"❌ Job {outcome['job_id']} ({outcome['status']}): {outcome['error']}")
+    return outcome['result']
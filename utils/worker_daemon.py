@@ -0,0 +1,688 @@
+"""
+Worker Daemon
+Process chạy nền giữ sẵn trạng thái "ấm" (pandas/openpyxl/Google API đã import, Google
+services đã build, connection pool HTTP và token OnLuyen trong file login) và nhận job
+Case 1 / Case 2 / convert / upload qua HTTP API local. Output print của job được phát
+lại cho client dưới dạng event (NDJSON stream hoặc long-poll)
+
+Cách chạy:
+    python -m utils.worker_daemon --port 8766 --workers 2
+
+API (JSON, luôn cần header X-Worker-Token - token lấy từ WORKER_DAEMON_TOKEN hoặc sinh ngẫu
+nhiên khi khởi động và ghi vào WORKER_DAEMON_TOKEN_FILE chỉ user hiện tại đọc được; POST phải
+có Content-Type application/json và Host phải là loopback để trang web không gửi job được):
+    GET  /health                        trạng thái daemon, warm-up, số job theo trạng thái
+    GET  /jobs                          danh sách job
+    POST /jobs                          {"type": "case_1", "params": {...}} -> {"job_id": ...}
+    GET  /jobs/<id>                     trạng thái/kết quả job
+    GET  /jobs/<id>/events?since=0      event mới (long-poll, tham số wait=giây)
+    GET  /jobs/<id>/stream?since=0      stream event NDJSON tới khi job kết thúc
+    POST /jobs/<id>/cancel              hủy job (job đang chạy dừng ở điểm kiểm tra kế tiếp)
+    POST /shutdown                      dừng daemon
+
+Author: Assistant
+Date: 2025-07-26
+"""
+
+import io
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import secrets
+import argparse
+import importlib
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+from utils.job_manager import (
+    JOB_PENDING, JOB_RUNNING, JOB_DONE, JOB_FAILED, JOB_CANCELLED, FINISHED_STATUSES,
+    CancellationToken, JobCancelled, JobContext, run_in_job_context
+)
+
+
+# Số job đã kết thúc giữ lại trong bộ nhớ để client xem kết quả
+MAX_FINISHED_JOBS = 200
+# Khoảng thời gian (giây) gửi heartbeat trên stream khi job chưa có event mới - ngắn để
+# phát hiện sớm client đã đóng kết nối (vd người dùng bấm dừng trên UI)
+STREAM_HEARTBEAT = 2.0
+
+# Giá trị header Host được chấp nhận (chặn DNS rebinding từ trình duyệt)
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+# Module nặng import sẵn khi daemon khởi động
+WARM_MODULES = ['pandas', 'openpyxl', 'converters', 'config.onluyen_api', 'config.google_oauth_drive']
+
+
+def _run_case_1(app, params: Dict[str, Any]) -> Any:
+    return app._execute_workflow_case_1(params['school_data'], ui_mode=True,
+                                        delta_sync=bool(params.get('delta_sync')))
+
+
+def _run_case_1_multi_year(app, params: Dict[str, Any]) -> Any:
+    school_years = [int(year) for year in params['school_years']]
+    return app._execute_workflow_case_1_multi_year(params['school_data'], school_years, ui_mode=True,
+                                                   login_file_path=params.get('login_file_path'))
+
+
+def _run_case_2(app, params: Dict[str, Any]) -> Any:
+    return app._execute_workflow_case_2(params['school_data'], ui_mode=True)
+
+
+def _run_convert(app, params: Dict[str, Any]) -> Any:
+    excel_file_path = app._convert_json_to_excel(params['json_file_path'])
+    return {
+        'success': bool(excel_file_path),
+        'json_file_path': params['json_file_path'],
+        'excel_file_path': excel_file_path
+    }
+
+
+def _run_upload(app, params: Dict[str, Any]) -> Any:
+    return app.upload_to_drive(params.get('json_file_path'), params['excel_file_path'],
+                               params.get('drive_link'), params.get('school_name', 'N/A'),
+                               wait=bool(params.get('wait')))
+
+
+# Loại job -> (hàm chạy trên SchoolProcessApp, tham số bắt buộc)
+JOB_TYPES: Dict[str, tuple] = {
+    'case_1': (_run_case_1, ['school_data']),
+    'case_1_multi_year': (_run_case_1_multi_year, ['school_data', 'school_years']),
+    'case_2': (_run_case_2, ['school_data']),
+    'convert': (_run_convert, ['json_file_path']),
+    'upload': (_run_upload, ['excel_file_path'])
+}
+
+
+def _guess_level(line: str) -> str:
+    """Đoán mức log (cho màu trên UI) từ emoji đầu dòng của print/print_status"""
+    stripped = line.lstrip()
+    if stripped.startswith(('❌', '💥')):
+        return 'error'
+    if stripped.startswith('⚠️'):
+        return 'warning'
+    if stripped.startswith(('✅', '🎉')):
+        return 'success'
+    return 'info'
+
+
+def write_token_file(token_file: str, token: str) -> None:
+    """Ghi token ra file chỉ user hiện tại đọc/ghi được (0600)"""
+    directory = os.path.dirname(token_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if os.path.exists(token_file):
+        os.remove(token_file)
+    fd = os.open(token_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token)
+
+
+def _host_name(host_header: str) -> str:
+    """Tên host trong header Host (bỏ cổng và dấu [] của IPv6)"""
+    host = (host_header or '').strip().lower()
+    if host.startswith('['):
+        return host[1:host.find(']')] if ']' in host else host[1:]
+    return host.rsplit(':', 1)[0] if host.count(':') == 1 else host
+
+
+def _json_safe(value: Any) -> Any:
+    """Chuyển kết quả job về dạng JSON được (datetime, Path... thành chuỗi)"""
+    return json.loads(json.dumps(value, ensure_ascii=False, default=str))
+
+
+class _JobOutputRouter(io.TextIOBase):
+    """stdout thay thế: output của luồng đang chạy job thành event của job, vẫn in ra stdout gốc"""
+
+    def __init__(self, original, emit: Callable[[str, str], None]):
+        self.original = original
+        self.emit = emit
+        self.jobs: Dict[int, str] = {}
+        self.partial: Dict[int, str] = {}
+
+    def write(self, text):
+        self.original.write(text)
+        ident = threading.get_ident()
+        job_id = self.jobs.get(ident)
+        if job_id is not None:
+            lines = (self.partial.pop(ident, '') + text).split('\n')
+            if lines[-1]:
+                self.partial[ident] = lines[-1]
+            for line in lines[:-1]:
+                if line.strip():
+                    self.emit(job_id, line)
+        return len(text)
+
+    def flush(self):
+        self.original.flush()
+
+    def attach(self, job_id: str) -> None:
+        """Gắn luồng hiện tại với job"""
+        self.jobs[threading.get_ident()] = job_id
+
+    def detach(self) -> None:
+        """Bỏ gắn luồng hiện tại (phát nốt dòng chưa xuống dòng)"""
+        ident = threading.get_ident()
+        job_id = self.jobs.pop(ident, None)
+        rest = self.partial.pop(ident, '')
+        if job_id is not None and rest.strip():
+            self.emit(job_id, rest)
+
+
+class WorkerDaemon:
+    """Daemon nhận job qua HTTP local, chạy trên một SchoolProcessApp dùng chung với worker pool"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 8766, max_workers: int = 2,
+                 token: str = '', event_buffer: int = 5000, token_file: str = None):
+        """
+        Khởi tạo WorkerDaemon
+
+        Args:
+            host (str): Địa chỉ bind (chỉ nên dùng localhost - params job chứa mật khẩu admin)
+            port (int): Cổng HTTP (0 = chọn cổng trống)
+            max_workers (int): Số job chạy song song
+            token (str): Token client phải gửi trong header X-Worker-Token (rỗng = sinh ngẫu nhiên)
+            event_buffer (int): Số event tối đa giữ lại cho mỗi job
+            token_file (str): File ghi token cho client (quyền 0600, xóa khi daemon dừng)
+        """
+        self.host = host
+        self.port = port
+        self.max_workers = max_workers
+        self.token = token or secrets.token_urlsafe(32)
+        self.event_buffer = event_buffer
+        self.token_file = token_file
+
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.started_at = None
+        self.warmup: Dict[str, Any] = {'done': False, 'steps': {}}
+
+        self._app = None
+        self._app_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures: Dict[str, Any] = {}
+        self._tokens: Dict[str, CancellationToken] = {}
+        self._router: Optional[_JobOutputRouter] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Trạng thái ấm
+    # ------------------------------------------------------------------
+
+    def get_app(self):
+        """SchoolProcessApp dùng chung cho mọi job (tạo một lần)"""
+        with self._app_lock:
+            if self._app is None:
+                from app import SchoolProcessApp
+                self._app = SchoolProcessApp()
+            return self._app
+
+    def warm_up(self) -> Dict[str, Any]:
+        """
+        Import module nặng, tạo app và build Google services một lần khi khởi động
+
+        Returns:
+            Dict[str, Any]: {done, steps: {tên bước: {seconds, error}}}
+        """
+        def google_services():
+            from config.google_client_registry import get_google_registry
+            registry = get_google_registry()
+            registry.get_sheets_service()
+            registry.get_drive_service()
+
+        def http_transport():
+            from utils.http_transport import get_http_transport
+            get_http_transport()
+
+        steps = [('app', self.get_app)]
+        steps += [(f"import {name}", lambda name=name: importlib.import_module(name)) for name in WARM_MODULES]
+        steps += [('http_transport', http_transport), ('google_services', google_services)]
+
+        for name, func in steps:
+            started = time.perf_counter()
+            error = None
+            try:
+                func()
+            except Exception as e:
+                error = str(e)
+            self.warmup['steps'][name] = {'seconds': round(time.perf_counter() - started, 3), 'error': error}
+            if error:
+                print(f"⚠️ Warm-up {name}: {error}")
+
+        self.warmup['done'] = True
+        total = sum(step['seconds'] for step in self.warmup['steps'].values())
+        print(f"🔥 Worker daemon đã sẵn sàng (warm-up {total:.2f}s)")
+        return self.warmup
+
+    # ------------------------------------------------------------------
+    # Job
+    # ------------------------------------------------------------------
+
+    def submit(self, job_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Đưa job vào hàng đợi
+
+        Args:
+            job_type (str): Loại job (case_1, case_1_multi_year, case_2, convert, upload)
+            params (Dict[str, Any]): Tham số job
+
+        Returns:
+            Dict[str, Any]: {'success': bool, 'job_id': str, 'job': dict, 'error': str}
+        """
+        if job_type not in JOB_TYPES:
+            return {'success': False, 'error': f"Loại job không hợp lệ: {job_type} (hỗ trợ: {', '.join(JOB_TYPES)})"}
+        params = params or {}
+        missing = [name for name in JOB_TYPES[job_type][1] if not params.get(name)]
+        if missing:
+            return {'success': False, 'error': f"Thiếu tham số: {', '.join(missing)}"}
+        if self._executor is None:
+            return {'success': False, 'error': 'Worker daemon chưa khởi động'}
+
+        school_data = params.get('school_data') or {}
+        job = {
+            'id': uuid.uuid4().hex[:12],
+            'type': job_type,
+            'status': JOB_PENDING,
+            'school_name': school_data.get('Tên trường') or params.get('school_name'),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None,
+            'events': deque(maxlen=self.event_buffer),
+            'next_seq': 0
+        }
+
+        with self._condition:
+            self._prune_finished_jobs()
+            self.jobs[job['id']] = job
+            self._tokens[job['id']] = CancellationToken()
+        self._emit(job['id'], 'status', JOB_PENDING)
+        future = self._futures[job['id']] = self._executor.submit(self._run_job, job['id'], params)
+        future.add_done_callback(lambda _, job_id=job['id']: self._futures.pop(job_id, None))
+        return {'success': True, 'job_id': job['id'], 'job': self.get_job(job['id'])}
+
+    def _run_job(self, job_id: str, params: Dict[str, Any]) -> None:
+        """Chạy job trong luồng worker, gom output print và tiến độ thành event"""
+        job = self.jobs[job_id]
+        with self._condition:
+            if job['status'] != JOB_PENDING:
+                return
+            job['status'] = JOB_RUNNING
+            job['started_at'] = datetime.now().isoformat(timespec='seconds')
+        self._emit(job_id, 'status', JOB_RUNNING)
+
+        handler = JOB_TYPES[job['type']][0]
+        context = JobContext(self._tokens[job_id], on_progress=lambda percent, message: self._emit(
+            job_id, 'progress', message, progress=round(float(percent), 1)))
+        if self._router is not None:
+            self._router.attach(job_id)
+        try:
+            result = _json_safe(run_in_job_context(context, handler, self.get_app(), params))
+            status, error = JOB_DONE, None
+            if result is None or (isinstance(result, dict) and result.get('success') is False):
+                status = JOB_FAILED
+                error = (result or {}).get('error') or ('Job không trả về kết quả' if result is None else 'Job thất bại')
+        except JobCancelled:
+            result, status, error = None, JOB_CANCELLED, 'Job đã bị hủy'
+        except Exception as e:
+            traceback.print_exc()
+            result, status, error = None, JOB_FAILED, str(e)
+        finally:
+            if self._router is not None:
+                self._router.detach()
+
+        with self._condition:
+            self._tokens.pop(job_id, None)
+            job['result'] = result
+            job['error'] = error
+            job['status'] = status
+            job['finished_at'] = datetime.now().isoformat(timespec='seconds')
+        level = {JOB_DONE: 'success', JOB_CANCELLED: 'warning'}.get(status, 'error')
+        self._emit(job_id, 'status', status, level=level)
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """
+        Hủy job: job đang chờ bị bỏ khỏi hàng đợi, job đang chạy dừng ở điểm kiểm tra kế tiếp
+        (giữa các bước workflow và trước mỗi request OnLuyen)
+
+        Args:
+            job_id (str): ID job
+
+        Returns:
+            Dict[str, Any]: {'success': bool, 'error': str}
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return {'success': False, 'error': 'Không tìm thấy job'}
+
+        future = self._futures.get(job_id)
+        with self._condition:
+            if job['status'] in FINISHED_STATUSES:
+                return {'success': False, 'error': f"Job đã kết thúc ({job['status']})"}
+            token = self._tokens.get(job_id)
+            if token is not None:
+                token.cancel()
+            if job['status'] == JOB_RUNNING or (future is not None and not future.cancel()):
+                # Đã chạy: _run_job ghi trạng thái cancelled khi job dừng ở điểm kiểm tra
+                running = True
+            else:
+                running = False
+                job['status'] = JOB_CANCELLED
+                job['finished_at'] = datetime.now().isoformat(timespec='seconds')
+                self._tokens.pop(job_id, None)
+        if running:
+            self._emit(job_id, 'log', '⏹️ Đang dừng job...', level='warning')
+        else:
+            self._emit(job_id, 'status', JOB_CANCELLED, level='warning')
+        return {'success': True}
+
+    def _emit(self, job_id: str, event_type: str, message: str, level: str = None, **extra) -> None:
+        """Thêm event vào job và đánh thức các client đang chờ"""
+        with self._condition:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            job['events'].append(dict({
+                'seq': job['next_seq'],
+                'time': datetime.now().strftime('%H:%M:%S'),
+                'type': event_type,
+                'level': level or (_guess_level(message) if event_type == 'log' else 'info'),
+                'message': message
+            }, **extra))
+            job['next_seq'] += 1
+            self._condition.notify_all()
+
+    def _prune_finished_jobs(self) -> None:
+        """Bỏ bớt job đã kết thúc cũ nhất (gọi khi đang giữ _condition)"""
+        finished = [job_id for job_id, job in self.jobs.items() if job['status'] in FINISHED_STATUSES]
+        for job_id in finished[:max(len(finished) - MAX_FINISHED_JOBS + 1, 0)]:
+            self.jobs.pop(job_id, None)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Thông tin job (không gồm event)"""
+        with self._condition:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            return {key: value for key, value in job.items() if key != 'events'}
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Danh sách job (không gồm kết quả và event)"""
+        with self._condition:
+            return [{key: value for key, value in job.items() if key not in ('events', 'result')}
+                    for job in self.jobs.values()]
+
+    def wait_events(self, job_id: str, since: int = 0, timeout: float = 0) -> Optional[Dict[str, Any]]:
+        """
+        Lấy event có seq >= since, chờ tối đa timeout giây nếu chưa có event mới
+
+        Returns:
+            Optional[Dict[str, Any]]: {events, next, status, finished} hoặc None nếu không có job
+        """
+        with self._condition:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            self._condition.wait_for(
+                lambda: job['next_seq'] > since or job['status'] in FINISHED_STATUSES or self._stopped.is_set(),
+                timeout=timeout
+            )
+            return {
+                'events': [event for event in job['events'] if event['seq'] >= since],
+                'next': job['next_seq'],
+                'status': job['status'],
+                'finished': job['status'] in FINISHED_STATUSES
+            }
+
+    def get_health(self) -> Dict[str, Any]:
+        """Trạng thái daemon"""
+        with self._condition:
+            counts: Dict[str, int] = {}
+            for job in self.jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+        return {
+            'success': True,
+            'pid': os.getpid(),
+            'started_at': self.started_at,
+            'max_workers': self.max_workers,
+            'warm': self.warmup['done'],
+            'warmup': self.warmup['steps'],
+            'jobs': counts,
+            'job_types': list(JOB_TYPES)
+        }
+
+    # ------------------------------------------------------------------
+    # HTTP server
+    # ------------------------------------------------------------------
+
+    @property
+    def base_url(self) -> str:
+        """URL gốc của daemon"""
+        host, port = self._server.server_address[:2] if self._server else (self.host, self.port)
+        return f"http://{host}:{port}"
+
+    def start(self, warm_up: bool = True) -> str:
+        """
+        Khởi động HTTP server và worker pool trong thread nền
+
+        Args:
+            warm_up (bool): Chạy warm-up trong thread nền
+
+        Returns:
+            str: Base URL (vd http://127.0.0.1:8766)
+        """
+        if self._server:
+            return self.base_url
+
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send_json(self, status: int, payload: Any) -> None:
+                content = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def _authorized(self) -> bool:
+                host = _host_name(self.headers.get('Host'))
+                if host not in LOOPBACK_HOSTS and host != daemon.host.lower():
+                    self._send_json(403, {'success': False, 'error': 'Host không hợp lệ'})
+                    return False
+                token = self.headers.get('X-Worker-Token') or ''
+                if not hmac.compare_digest(token.encode('utf-8'), daemon.token.encode('utf-8')):
+                    self._send_json(401, {'success': False, 'error': 'Sai hoặc thiếu X-Worker-Token'})
+                    return False
+                return True
+
+            def _read_json(self) -> Dict[str, Any]:
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length).decode('utf-8')) if length else {}
+
+            def do_GET(self):
+                if not self._authorized():
+                    return
+                parsed = urlparse(self.path)
+                query = parse_qs(parsed.query)
+                parts = [part for part in parsed.path.split('/') if part]
+                try:
+                    since = int(query.get('since', ['0'])[0] or 0)
+                    wait = min(float(query.get('wait', ['0'])[0] or 0), 60.0)
+                except ValueError:
+                    return self._send_json(400, {'success': False, 'error': 'Tham số since/wait không hợp lệ'})
+
+                if parts == ['health']:
+                    return self._send_json(200, daemon.get_health())
+                if parts == ['jobs']:
+                    return self._send_json(200, {'success': True, 'jobs': daemon.list_jobs()})
+                if len(parts) >= 2 and parts[0] == 'jobs':
+                    job_id = parts[1]
+                    if len(parts) == 2:
+                        job = daemon.get_job(job_id)
+                        if job is None:
+                            return self._send_json(404, {'success': False, 'error': 'Không tìm thấy job'})
+                        return self._send_json(200, {'success': True, 'job': job})
+                    if parts[2:] == ['events']:
+                        events = daemon.wait_events(job_id, since, wait)
+                        if events is None:
+                            return self._send_json(404, {'success': False, 'error': 'Không tìm thấy job'})
+                        return self._send_json(200, dict(events, success=True))
+                    if parts[2:] == ['stream']:
+                        return self._stream(job_id, since)
+                self._send_json(404, {'success': False, 'error': f"Không có endpoint {parsed.path}"})
+
+            def do_POST(self):
+                if not self._authorized():
+                    return
+                parts = [part for part in urlparse(self.path).path.split('/') if part]
+                # Chỉ nhận JSON: trình duyệt không gửi được Content-Type này mà không qua preflight CORS
+                content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+                if content_type != 'application/json':
+                    return self._send_json(415, {'success': False, 'error': 'Content-Type phải là application/json'})
+                try:
+                    payload = self._read_json()
+                except ValueError:
+                    return self._send_json(400, {'success': False, 'error': 'Body không phải JSON'})
+
+                if parts == ['jobs']:
+                    result = daemon.submit(payload.get('type'), payload.get('params') or {})
+                    return self._send_json(202 if result['success'] else 400, result)
+                if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+                    result = daemon.cancel(parts[1])
+                    return self._send_json(200 if result['success'] else 409, result)
+                if parts == ['shutdown']:
+                    self._send_json(200, {'success': True})
+                    threading.Thread(target=daemon.stop, daemon=True).start()
+                    return
+                self._send_json(404, {'success': False, 'error': f"Không có endpoint {self.path}"})
+
+            def _stream(self, job_id: str, since: int) -> None:
+                """Gửi event dạng NDJSON (mỗi dòng một JSON) tới khi job kết thúc"""
+                if daemon.get_job(job_id) is None:
+                    return self._send_json(404, {'success': False, 'error': 'Không tìm thấy job'})
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+                try:
+                    while True:
+                        batch = daemon.wait_events(job_id, since, STREAM_HEARTBEAT)
+                        if batch is None:
+                            break
+                        lines = [json.dumps(event, ensure_ascii=False) for event in batch['events']]
+                        since = batch['next']
+                        if batch['finished'] or daemon._stopped.is_set():
+                            lines.append(json.dumps({'type': 'end', 'job': daemon.get_job(job_id)},
+                                                    ensure_ascii=False, default=str))
+                        elif not lines:
+                            lines.append(json.dumps({'type': 'heartbeat'}))
+                        self.wfile.write(('\n'.join(lines) + '\n').encode('utf-8'))
+                        self.wfile.flush()
+                        if batch['finished'] or daemon._stopped.is_set():
+                            break
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client đóng kết nối - job vẫn chạy tiếp
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        self._stopped.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='worker-job')
+        if self._router is None:
+            self._router = _JobOutputRouter(sys.stdout, lambda job_id, line: self._emit(job_id, 'log', line))
+            sys.stdout = self._router
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        if self.token_file:
+            write_token_file(self.token_file, self.token)
+        self._thread = threading.Thread(target=self._server.serve_forever, name='WorkerDaemon', daemon=True)
+        self._thread.start()
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+
+        if warm_up:
+            threading.Thread(target=self.warm_up, name='WorkerDaemonWarmUp', daemon=True).start()
+        return self.base_url
+
+    def stop(self) -> None:
+        """Dừng server, hủy job đang chờ/đang chạy và chờ các job dừng"""
+        if not self._server:
+            return
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self._thread = None
+        if self.token_file and os.path.exists(self.token_file):
+            os.remove(self.token_file)
+
+        for job_id in list(self._futures):
+            self.cancel(job_id)
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+        if self._router is not None:
+            if sys.stdout is self._router:
+                sys.stdout = self._router.original
+            self._router = None
+
+    def wait(self) -> None:
+        """Chờ tới khi daemon dừng (Ctrl+C hoặc POST /shutdown)"""
+        try:
+            while not self._stopped.wait(0.5):
+                pass
+        except KeyboardInterrupt:
+            print("\n⏹️  Đang dừng worker daemon...")
+            self.stop()
+
+
+def main(argv=None):
+    """Chạy worker daemon: python -m utils.worker_daemon --port 8766 --workers 2"""
+    from config.config_manager import get_config
+
+    daemon_config = get_config().get_worker_daemon_config()
+    parser = argparse.ArgumentParser(description='School Process worker daemon')
+    parser.add_argument('--host', default=daemon_config['host'])
+    parser.add_argument('--port', type=int, default=daemon_config['port'])
+    parser.add_argument('--workers', type=int, default=daemon_config['max_workers'], help='Số job chạy song song')
+    parser.add_argument('--no-warm-up', dest='warm_up', action='store_false', help='Không import/build trước')
+    args = parser.parse_args(argv)
+
+    daemon = WorkerDaemon(host=args.host, port=args.port, max_workers=args.workers,
+                          token=daemon_config['token'], event_buffer=daemon_config['event_buffer'],
+                          token_file=daemon_config['token_file'])
+    try:
+        base_url = daemon.start(warm_up=args.warm_up)
+    except OSError as e:
+        print(f"❌ Không thể mở cổng {args.host}:{args.port}: {e}")
+        return 1
+
+    print(f"🛰️ Worker daemon đang chạy tại {base_url} ({args.workers} worker) - Ctrl+C để dừng")
+    print(f"🔑 Token cho client: {daemon_config['token_file']}")
+    if not daemon_config['enabled']:
+        print("💡 Đặt WORKER_DAEMON_ENABLED=true trong .env để console/UI gửi job tới daemon")
+    daemon.wait()
+    return 0
+
+
+if __name__ == '__main__':
+    # Chạy từ thư mục gốc project: đường dẫn data/... trong job là tương đối
+    os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    sys.path.insert(0, os.getcwd())
+    sys.exit(main())